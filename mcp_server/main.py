@@ -1,12 +1,50 @@
 #!/usr/bin/env python3
 
+import asyncio
 import sys
-
-from fastmcp import FastMCP
-
-from mcp_server.utils.utils import load_prompt_from_markdown
+from typing import Any
+
+from fastmcp import Context, FastMCP
+from fastmcp.prompts.prompt import Message, Prompt, PromptArgument
+from mcp.shared.exceptions import McpError
+from mcp.types import INVALID_PARAMS, ErrorData, ListPromptsRequest, ListPromptsResult, PromptMessage, ServerResult
+
+from mcp_server.utils import snapshots
+from mcp_server.utils.candidate_files import DEFAULT_PAGE_SIZE as DEFAULT_CANDIDATE_PAGE_SIZE
+from mcp_server.utils.candidate_files import DEFAULT_SINCE_DAYS, FileScanCache, candidate_files_page
+from mcp_server.utils.changed_hunks import DEFAULT_CONTEXT_LINES, DEFAULT_TOKEN_BUDGET, changed_hunks_page
+from mcp_server.utils.coderabbit import dump_output
+from mcp_server.utils.commit_context import CommitContextCache, gather_commit_context
+from mcp_server.utils.github_api import get_client
+from mcp_server.utils.github_daemon import daemon_enabled, serve_in_background
+from mcp_server.utils.impact_index import ImpactIndexCache, affected_tests, affected_tests_section
+from mcp_server.utils.prompt_catalog import DEFAULT_PAGE_SIZE as DEFAULT_PROMPT_PAGE_SIZE
+from mcp_server.utils.prompt_catalog import CatalogEntry, PromptCatalog
+from mcp_server.utils.prompt_search import DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT
+from mcp_server.utils.prompt_search import PromptDocument, PromptSearchIndex
+from mcp_server.utils.prompt_templates import CompiledPrompt, TemplateError
+from mcp_server.utils.review_batch import DEFAULT_CONCURRENCY, review_batch
+from mcp_server.utils.review_pages import DEFAULT_PAGE_SIZE, PAGE_PHASES, ReviewPageCache, review_comment_page
+from mcp_server.utils.review_store import ReviewStore
+from mcp_server.utils.utils import get_fragment_index, get_prompt_index, load_prompt_from_markdown, prompt_templates
 
 mcp = FastMCP("AI Prompts MCP Server")
+# Flattened CodeRabbit reports by pull request head, shared by the pages of get_review_comments
+review_pages = ReviewPageCache()
+# Pre-flight summaries of the commit prompt by checkout state
+commit_contexts = CommitContextCache()
+# Test impact indexes of the smart-test-runner prompt and get_affected_tests by checkout
+impact_indexes = ImpactIndexCache()
+# Scans of the source files of get_candidate_files by path, size and modification time
+file_scans = FileScanCache()
+# Full-text index of the prompts for search_prompts, synced with the prompt files on search
+prompt_search = PromptSearchIndex()
+# Sorted catalog of the prompts served by prompts/list and list_prompts, synced on listing
+prompt_catalog = PromptCatalog()
+# Prompts printed at startup; the rest are counted
+MAX_PRINTED_PROMPTS = 50
+# Logger of the log messages carrying the comments completed by each phase of get_review_comments
+REVIEW_COMMENTS_LOGGER = "review_comments"
 
 
 @mcp.prompt(name="github-coderabbitai-review-handler")
@@ -27,16 +65,23 @@ def github_coderabbitai_review_handler() -> str:
 
 
 @mcp.prompt(name="commit")
-def commit() -> str:
+async def commit(repository_path: str | None = None) -> str:
     """Smart Git Commit with analysis and conventional commit messages.
 
     Analyzes changes in the git repository and creates meaningful commit messages
-    following conventional commit format.
+    following conventional commit format. Given the path of the checkout, the server
+    gathers the status, diffs and commit conventions itself and embeds them.
+
+    Args:
+        repository_path: Path of the git checkout to commit in, for the pre-flight context
 
     Returns:
         Complete instructions for smart git commit workflow
     """
-    return load_prompt_from_markdown("commit")
+    prompt = load_prompt_from_markdown("commit")
+    if not repository_path:
+        return prompt
+    return f"{prompt}\n\n{await gather_commit_context(repository_path, commit_contexts)}"
 
 
 @mcp.prompt(name="github-review-handler")
@@ -67,16 +112,19 @@ def code_review() -> str:
 
 
 @mcp.prompt(name="code-beautifier")
-def code_beautifier() -> str:
+def code_beautifier(files: str | None = None) -> str:
     """Code beautification and refactoring for improved readability and maintainability.
 
     Analyzes code structure and formatting to suggest improvements for better
     readability, consistency, and maintainability while preserving functionality.
 
+    Args:
+        files: Files or directories to beautify; candidates are ranked when omitted
+
     Returns:
         Complete instructions for code beautification and refactoring
     """
-    return load_prompt_from_markdown("code-beautifier")
+    return load_prompt_from_markdown("code-beautifier", arguments={"files": files})
 
 
 @mcp.prompt(name="comment-cleaner")
@@ -93,16 +141,23 @@ def comment_cleaner() -> str:
 
 
 @mcp.prompt(name="smart-test-runner")
-def smart_test_runner() -> str:
+async def smart_test_runner(repository_path: str | None = None) -> str:
     """Intelligent test running with failure analysis and optimization.
 
     Provides smart test execution strategies, failure analysis, and optimization
-    recommendations for efficient testing workflows and debugging.
+    recommendations for efficient testing workflows and debugging. Given the path of
+    the checkout, the server selects the tests affected by its changes and embeds them.
+
+    Args:
+        repository_path: Path of the git checkout whose changes select the tests
 
     Returns:
         Complete instructions for intelligent test running and analysis
     """
-    return load_prompt_from_markdown("smart-test-runner")
+    prompt = load_prompt_from_markdown("smart-test-runner")
+    if not repository_path:
+        return prompt
+    return f"{prompt}\n\n{await asyncio.to_thread(affected_tests_section, repository_path, impact_indexes)}"
 
 
 @mcp.prompt(name="tasks")
@@ -119,6 +174,507 @@ def tasks() -> str:
     return load_prompt_from_markdown("tasks")
 
 
+@mcp.tool(name="github_request_metrics")
+def github_request_metrics() -> dict[str, Any]:
+    """Report the state of the shared GitHub request scheduler and connection pool.
+
+    Shows queue depth, wait times, the adaptive concurrency limit, the last known
+    GitHub rate limit budget and the connections opened, so slowdowns can be told
+    apart from failures.
+
+    Returns:
+        Scheduler and connection pool metrics
+    """
+    return get_client().metrics()
+
+
+@mcp.tool(name="query_review_comments")
+async def query_review_comments(
+    repository: str,
+    pr_number: int,
+    category: str | None = None,
+    source: str | None = None,
+    since_commit: str | None = None,
+    file: str | None = None,
+    unresolved_only: bool = False,
+    limit: int = 100,
+    output_format: str | None = None,
+) -> dict[str, Any] | str:
+    """Query review comments recorded by the review scripts, without calling GitHub.
+
+    Answers repeated or historical questions such as "all unresolved nitpicks on this
+    PR since commit X" from the local review store, which get-coderabbit-comments.sh
+    and get-human-reviews.sh fill on every run.
+
+    Args:
+        repository: Repository as owner/name
+        pr_number: Pull request number
+        category: actionable, nitpicks, duplicates, outside_diff_range or human
+        source: coderabbit or human
+        since_commit: Only comments made after this commit (SHA or prefix) showed up
+        file: Only comments on this file
+        unresolved_only: Skip comments known to be resolved
+        limit: Maximum number of comments
+        output_format: compact (one line of JSON) or ndjson (one comment per line, total
+            last) to get text instead of a structured result
+
+    Returns:
+        Dict with the total and the comments, highest priority first
+    """
+
+    def query() -> list[dict[str, Any]]:
+        with ReviewStore.default() as store:
+            return store.query_comments(
+                repository,
+                pr_number,
+                category=category,
+                source=source,
+                since_commit=since_commit,
+                file=file,
+                unresolved_only=unresolved_only,
+                limit=limit,
+            )
+
+    comments = await asyncio.to_thread(query)
+    return _formatted({"total": len(comments), "comments": comments}, output_format)
+
+
+@mcp.tool(name="get_review_comments")
+async def get_review_comments(
+    repository: str,
+    pr_number: int,
+    cursor: str | None = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    output_format: str | None = None,
+    ctx: Context | None = None,
+) -> dict[str, Any] | str:
+    """Page through the CodeRabbit comments of the latest review of a PR head, most important first.
+
+    Comments come actionable first, then outside diff range, duplicates and nitpicks, so
+    work can start on the first page while the rest is fetched later. The report of a
+    head is cached on the server: only the first page calls GitHub.
+
+    While a report is fetched, a progress notification is sent after each phase (pull
+    request info, review history, inline comments, review body), and the comments a
+    phase completed are sent right away as an info log message of the review_comments
+    logger (phase and comments in its extra data): the actionable comments arrive before
+    the review body is parsed.
+
+    Args:
+        repository: Repository as owner/name
+        pr_number: Pull request number
+        cursor: next_cursor of the previous page; omit for the first page of the current head
+        page_size: Comments per page (1-100)
+        output_format: compact (one line of JSON) or ndjson (one comment per line, the
+            rest of the page last) to get text instead of a structured result
+        ctx: MCP request context, used for the progress notifications
+
+    Returns:
+        Dict with head_sha, reviewed, the report summary, the total number of comments,
+        the comments of the page (each with its category) and next_cursor (null on the last page)
+    """
+    progress = None
+    if ctx is not None:
+        loop = asyncio.get_running_loop()
+        context = ctx
+
+        def progress(phase: str, comments: list[dict[str, Any]]) -> None:
+            # Called from the worker thread: wait for the notification so they arrive in order
+            asyncio.run_coroutine_threadsafe(_report_phase(context, phase, comments), loop).result()
+
+    page = await asyncio.to_thread(
+        review_comment_page, get_client(), review_pages, repository, pr_number, cursor, page_size, progress
+    )
+    return _formatted(page, output_format)
+
+
+async def _report_phase(ctx: Context, phase: str, comments: list[dict[str, Any]]) -> None:
+    """Send the progress notification of a finished phase and the comments it completed."""
+    message = f"{phase}: {len(comments)} comments" if comments else phase
+    await ctx.report_progress(PAGE_PHASES.index(phase) + 1, len(PAGE_PHASES), message)
+    if comments:
+        await ctx.info(message, logger_name=REVIEW_COMMENTS_LOGGER, extra={"phase": phase, "comments": comments})
+
+
+@mcp.tool(name="get_review_batch")
+async def get_review_batch(
+    targets: list[str],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    output_format: str | None = None,
+) -> dict[str, Any] | str:
+    """Summarize the CodeRabbit reviews of many PRs at once, e.g. every open PR before a release.
+
+    The PRs are fetched concurrently through the shared GitHub client, and their reports
+    are cached like the ones of get_review_comments, so paging through the comments of
+    one of them afterwards calls GitHub only for its head.
+
+    Args:
+        targets: PRs as owner/repo#number, or owner/repo for all open PRs of a repository
+        concurrency: PRs fetched at the same time (1-16)
+        output_format: compact (one line of JSON) or ndjson (one PR per line, the aggregate
+            last) to get text instead of a structured result
+
+    Returns:
+        Dict with one entry per PR (pull_request, head_sha, reviewed and the report summary,
+        or pull_request and error) and the aggregate counts over all of them
+    """
+    batch = await asyncio.to_thread(review_batch, get_client(), review_pages, targets, concurrency)
+    return _formatted(batch, output_format, records="pull_requests")
+
+
+@mcp.tool(name="get_changed_hunks")
+async def get_changed_hunks(
+    repository_path: str,
+    base_ref: str | None = None,
+    context_lines: int = DEFAULT_CONTEXT_LINES,
+    cursor: str | None = None,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    output_format: str | None = None,
+) -> dict[str, Any] | str:
+    """Page through the changed hunks of a checkout, riskiest files first, for a code review.
+
+    The changes are the ones of the branch since its merge base with the base branch,
+    including uncommitted edits and untracked files. Files are ranked by changed lines
+    weighted by their path (security-sensitive code, schema and build files first, tests,
+    docs and generated files last), and each page holds the hunks of as many files as fit
+    the token budget.
+
+    Args:
+        repository_path: Any directory inside the checkout
+        base_ref: Base branch; defaults to the remote's default branch, and without one
+            only the uncommitted changes are listed
+        context_lines: Lines of context around each change (0-20)
+        cursor: next_cursor of the previous page; omit for the first page
+        token_budget: Approximate number of tokens of a page (500-100000)
+        output_format: compact (one line of JSON) or ndjson (one file per line, the rest
+            of the page last) to get text instead of a structured result
+
+    Returns:
+        Dict with the base commit, the number of changed files and lines, the files of the
+        page (path, status, line counts, risk reasons, score and hunks) and next_cursor
+        (null on the last page)
+    """
+    page = await asyncio.to_thread(changed_hunks_page, repository_path, base_ref, context_lines, cursor, token_budget)
+    return _formatted(page, output_format, records="files")
+
+
+@mcp.tool(name="get_affected_tests")
+async def get_affected_tests(
+    repository_path: str, base_ref: str | None = None, coverage_file: str | None = None
+) -> dict[str, Any]:
+    """Select the tests affected by the changes of a checkout, to run them before the full suite.
+
+    Tests are mapped to files from the per-test coverage contexts of a coverage data file
+    (recorded with `pytest --cov --cov-context=test`) and from the import graph of the
+    Python files, so the selection works without coverage data too. The index is kept on
+    the server and only changed files are parsed again.
+
+    Args:
+        repository_path: Any directory inside the checkout
+        base_ref: Base branch; defaults to the remote's default branch, and without one
+            only the uncommitted changes count
+        coverage_file: Coverage data file relative to the root of the checkout (default .coverage)
+
+    Returns:
+        Dict with the base commit, the number of changed files and of files with coverage
+        data, the tests to run as pytest arguments, the tests of each changed file, the
+        changed files no test maps to, and whether the full suite should run (with why)
+    """
+    return await asyncio.to_thread(affected_tests, repository_path, base_ref, coverage_file, impact_indexes)
+
+
+@mcp.tool(name="get_candidate_files")
+async def get_candidate_files(
+    repository_path: str,
+    purpose: str = "comments",
+    scope: str = "changed",
+    base_ref: str | None = None,
+    since_days: int = DEFAULT_SINCE_DAYS,
+    cursor: str | None = None,
+    page_size: int = DEFAULT_CANDIDATE_PAGE_SIZE,
+    output_format: str | None = None,
+) -> dict[str, Any] | str:
+    """Page through the source files with the most to clean up, for the comment-cleaner and code-beautifier.
+
+    The files are listed from git and scanned on the server: for comments, their comment
+    density and the comments restating the next line of code; for formatting, the lines
+    over 120 characters, trailing whitespace and indentation mixing tabs and spaces. Files
+    with nothing found are left out. Scans are cached until a file changes.
+
+    Args:
+        repository_path: Any directory inside the checkout
+        purpose: comments or formatting, what to rank the files by
+        scope: changed (the changes of the branch, uncommitted and untracked files
+            included), recent (those and the files of the commits of the last since_days
+            days) or all (every file of the checkout)
+        base_ref: Base branch of the changes; defaults to the remote's default branch
+        since_days: Age limit of the commits of the recent scope
+        cursor: next_cursor of the previous page; omit for the first page
+        page_size: Files per page (1-500)
+        output_format: compact (one line of JSON) or ndjson (one file per line, the rest
+            of the page last) to get text instead of a structured result
+
+    Returns:
+        Dict with the number of files scanned and of candidates, the files of the page
+        (path, score and the counts of the scan) and next_cursor (null on the last page)
+    """
+    page = await asyncio.to_thread(
+        candidate_files_page, repository_path, purpose, scope, base_ref, since_days, cursor, page_size, file_scans
+    )
+    return _formatted(page, output_format, records="files")
+
+
+@mcp.tool(name="create_snapshot")
+async def create_snapshot(
+    repository_path: str, paths: list[str] | None = None, label: str | None = None
+) -> dict[str, Any]:
+    """Snapshot files of a checkout before changing them, to restore them with restore_snapshot.
+
+    The snapshot is a git commit kept under refs/snapshots/, written without touching the
+    branch, the index or the working tree. Only files changed since the last commit cost
+    anything, so snapshot the paths about to change (or omit them for the whole working
+    tree) instead of copying files. The newest 20 snapshots are kept.
+
+    Args:
+        repository_path: Any directory inside the checkout
+        paths: Files or directories about to change, relative to the root of the checkout;
+            all files when omitted (ignored files excepted)
+        label: What the snapshot is for, e.g. "Before prettifying"
+
+    Returns:
+        Dict with the snapshot name, its commit, the paths it covers and the files in
+        them that differ from HEAD
+    """
+    return await asyncio.to_thread(snapshots.create_snapshot, repository_path, paths, label)
+
+
+@mcp.tool(name="restore_snapshot")
+async def restore_snapshot(repository_path: str, snapshot: str, paths: list[str] | None = None) -> dict[str, Any]:
+    """Bring the files of a snapshot back into the working tree, e.g. to roll back a failed cleanup.
+
+    Files added to git since the snapshot are deleted; untracked files created since are
+    left alone. The index is not changed.
+
+    Args:
+        repository_path: Any directory inside the checkout
+        snapshot: Name returned by create_snapshot (see list_snapshots)
+        paths: Part of the snapshot's paths to restore; all of them when omitted
+
+    Returns:
+        Dict with the snapshot name, the restored paths and the files that were changed back
+    """
+    return await asyncio.to_thread(snapshots.restore_snapshot, repository_path, snapshot, paths)
+
+
+@mcp.tool(name="list_snapshots")
+async def list_snapshots(repository_path: str) -> list[dict[str, Any]]:
+    """List the snapshots of a checkout, newest first, with their commit, creation time, label and paths.
+
+    Args:
+        repository_path: Any directory inside the checkout
+    """
+    return await asyncio.to_thread(snapshots.list_snapshots, repository_path)
+
+
+def _compiled_prompt(name: str) -> CompiledPrompt | None:
+    """The compiled prompt file of a registered prompt; None if it has none or it is malformed."""
+    path = get_prompt_index().resolve(name)
+    if path is None:
+        return None
+    try:
+        return prompt_templates.compiled(path, get_fragment_index().resolve)
+    except (OSError, TemplateError):
+        return None
+
+
+def _prompt_documents() -> list[PromptDocument]:
+    """The registered prompts as search documents, their body read from their prompt file."""
+    documents = []
+    for name, prompt in mcp._prompt_manager._prompts.items():
+        compiled = _compiled_prompt(name)
+        # Without a prompt file, still found by its name and description
+        body, version = (compiled.source, compiled.digest) if compiled is not None else ("", "")
+        documents.append(PromptDocument(name, prompt.description or "", body, version))
+    return documents
+
+
+@mcp.tool(name="search_prompts")
+async def search_prompts(query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> dict[str, Any]:
+    """Find the prompts of the server matching a few words, best match first.
+
+    Prompts are ranked with BM25 over their name, description and body; words of the
+    name and description weigh more. The index is kept in memory and only the prompts
+    whose file (or an included fragment) changed are indexed again.
+
+    Args:
+        query: Words to look for, e.g. "review comments github"
+        limit: Maximum number of prompts returned (1-100)
+
+    Returns:
+        Dict with the query, the number of prompts searched and the matches (name, first
+        line of the description and score)
+    """
+
+    def search() -> list[dict[str, Any]]:
+        prompt_search.refresh(_prompt_documents)
+        return prompt_search.search(query, limit)
+
+    matches = await asyncio.to_thread(search)
+    return {"query": query, "prompts_searched": len(prompt_search), "matches": matches}
+
+
+def _catalog_entries() -> list[CatalogEntry]:
+    """The registered prompts FastMCP lists as catalog entries, tagged from their prompt file's frontmatter.
+
+    Disabled prompts and those ruled out by the include_tags and exclude_tags of the server
+    are left out, as FastMCP's own prompts/list does. The listed form of a prompt is built
+    again only when the prompt or its file changed.
+    """
+    entries = []
+    for name, prompt in mcp._prompt_manager._prompts.items():
+        if not mcp._should_enable_component(prompt):
+            continue
+        compiled = _compiled_prompt(name)
+        metadata = compiled.metadata if compiled is not None else {}
+        version = f"{id(prompt)}:{compiled.digest if compiled is not None else ''}"
+        current = prompt_catalog.get(name)
+        if current is not None and current.version == version:
+            entries.append(current)
+            continue
+        tags = metadata.get("tags")
+        category = metadata.get("category")
+        entries.append(
+            CatalogEntry(
+                name=name,
+                tags=frozenset(prompt.tags) | frozenset(tags if isinstance(tags, list) else []),
+                category=category if isinstance(category, str) and category else None,
+                version=version,
+                listed=prompt.to_mcp_prompt(name=prompt.key, include_fastmcp_meta=mcp.include_fastmcp_meta),
+            )
+        )
+    return entries
+
+
+def _catalog_page(
+    cursor: str | None, page_size: int, tag: str | None, category: str | None
+) -> tuple[list[Any], str | None]:
+    """A page of the prompt catalog, synced with the registered prompts first (see PromptCatalog.page)."""
+    prompt_catalog.refresh(_catalog_entries)
+    return prompt_catalog.page(cursor, page_size, tag, category)
+
+
+async def _list_prompts_page(request: ListPromptsRequest) -> ServerResult:
+    """Handle prompts/list a page at a time from the catalog.
+
+    The tag and category filters are read from the _meta of the request parameters (the
+    protocol has no parameters for them); the cursor keeps them for the next pages.
+    """
+    params = request.params
+    meta = params.meta.model_dump() if params is not None and params.meta is not None else {}
+    try:
+        prompts, next_cursor = await asyncio.to_thread(
+            _catalog_page,
+            params.cursor if params is not None else None,
+            DEFAULT_PROMPT_PAGE_SIZE,
+            meta.get("tag"),
+            meta.get("category"),
+        )
+    except ValueError as exc:
+        raise McpError(ErrorData(code=INVALID_PARAMS, message=str(exc))) from exc
+    return ServerResult(ListPromptsResult(prompts=prompts, nextCursor=next_cursor))
+
+
+# Replaces the handler of FastMCP, which lists every prompt at once. FastMCP has no hook for
+# this: fastmcp is pinned to the minor version this was written against (pyproject.toml), and
+# TestListPrompts fails if prompts/list no longer reaches _list_prompts_page.
+mcp._mcp_server.request_handlers[ListPromptsRequest] = _list_prompts_page
+
+
+@mcp.tool(name="list_prompts")
+async def list_prompts(
+    tag: str | None = None,
+    category: str | None = None,
+    cursor: str | None = None,
+    page_size: int = DEFAULT_PROMPT_PAGE_SIZE,
+) -> dict[str, Any]:
+    """Page through the prompts of the server in name order, filtered by tag or category.
+
+    The same catalog serves prompts/list; this tool takes the filters as arguments and
+    also returns the tags and categories to filter by.
+
+    Args:
+        tag: Only the prompts with this tag
+        category: Only the prompts of this category
+        cursor: next_cursor of the previous page (it keeps the filters); omit for the first page
+        page_size: Prompts per page (1-1000)
+
+    Returns:
+        Dict with the prompts of the page (name, description and arguments), next_cursor
+        (null on the last page) and the number of prompts of every tag and category
+    """
+    prompts, next_cursor = await asyncio.to_thread(_catalog_page, cursor, page_size, tag, category)
+    return {
+        "prompts": [
+            prompt.model_dump(include={"name", "description", "arguments"}, exclude_none=True) for prompt in prompts
+        ],
+        "next_cursor": next_cursor,
+        "tags": prompt_catalog.tags(),
+        "categories": prompt_catalog.categories(),
+    }
+
+
+def _formatted(result: dict[str, Any], output_format: str | None, records: str = "comments") -> dict[str, Any] | str:
+    """A tool result as is, or as compact or NDJSON text (the `records` list first, the other fields last)."""
+    if output_format is None:
+        return result
+    if output_format == "ndjson":
+        rest = {key: value for key, value in result.items() if key != records}
+        return dump_output(rest, output_format, result[records])
+    if output_format == "compact":
+        return dump_output(result, output_format)
+    raise ValueError(f"Unknown output format: {output_format} (expected compact or ndjson)")
+
+
+class MarkdownPrompt(Prompt):
+    """A prompt of a prompt root with no function of its own, rendered from its markdown file."""
+
+    async def render(self, arguments: dict[str, Any] | None = None) -> list[PromptMessage]:
+        """Render the prompt file with the arguments it declares."""
+        return [Message(load_prompt_from_markdown(self.name, arguments=arguments))]
+
+
+def register_prompt_packs() -> None:
+    """Register the prompts of the prompt roots that no prompt function serves.
+
+    Prompt packs and overrides live in the directories of AI_PROMPTS_MCP_PROMPT_PATH; a
+    prompt file there with the name of a registered prompt overrides its content, any
+    other one is registered here with the description and arguments of its frontmatter.
+    """
+    index = get_prompt_index()
+    for name in index.names():
+        path = index.resolve(name)
+        if name in mcp._prompt_manager._prompts or path is None:
+            continue
+        try:
+            compiled = prompt_templates.compiled(path, get_fragment_index().resolve)
+        except (OSError, TemplateError) as exc:
+            print(f"Skipping prompt {name} ({path}): {exc}", file=sys.stderr)
+            continue
+        description = compiled.metadata.get("description")
+        mcp.add_prompt(
+            MarkdownPrompt(
+                name=name,
+                description=str(description) if description else None,
+                arguments=[
+                    PromptArgument(
+                        name=argument.name, description=argument.description or None, required=argument.required
+                    )
+                    for argument in compiled.arguments
+                ],
+            )
+        )
+
+
 def print_available_prompts() -> None:
     """Print all available prompts before server starts."""
     # Get all registered prompts from the prompt manager
@@ -132,7 +688,7 @@ def print_available_prompts() -> None:
         print("\n📋 Available Prompts:", file=sys.stderr)
         print("-" * 30, file=sys.stderr)
 
-        for i, name in enumerate(sorted_names, 1):
+        for i, name in enumerate(sorted_names[:MAX_PRINTED_PROMPTS], 1):
             prompt_info = prompt_dict[name]
             print(f"  {i}. {name}", file=sys.stderr)
             if hasattr(prompt_info, "description") and prompt_info.description:
@@ -144,6 +700,9 @@ def print_available_prompts() -> None:
             else:
                 print("     No description available", file=sys.stderr)
 
+        if len(sorted_names) > MAX_PRINTED_PROMPTS:
+            print(f"  ... and {len(sorted_names) - MAX_PRINTED_PROMPTS} more (see prompts/list)", file=sys.stderr)
+
         print(f"\nTotal: {len(prompt_dict)} prompts registered", file=sys.stderr)
         print("-" * 30, file=sys.stderr)
         print("Server ready for connections...\n", file=sys.stderr)
@@ -151,6 +710,20 @@ def print_available_prompts() -> None:
         print("No prompts registered", file=sys.stderr)
 
 
-if __name__ == "__main__":
+def main() -> None:
+    """Start the server: register the prompt packs, build the prompt indexes and serve.
+
+    Entry point of the ai-prompts-mcp console script and of running this module.
+    """
+    register_prompt_packs()
+    prompt_search.sync(_prompt_documents())
+    prompt_catalog.sync(_catalog_entries())
     print_available_prompts()
+    if daemon_enabled():
+        # Scripts run during the session send their GitHub requests through this process
+        serve_in_background(get_client())
     mcp.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,30 +3,11 @@
 # Script to get current branch and PR information
 # Usage: get-pr-info.sh
 # Returns: REPO_FULL_NAME PR_NUMBER (space separated)
+#
+# The branch and repository are read locally from the git directory; the branch -> PR
+# lookup is cached for AI_PROMPTS_MCP_PR_CACHE_TTL seconds (default 300), keyed on the
+# branch and its head commit (see mcp_server.utils.pr_info).
 
-# Get current branch
-CURRENT_BRANCH=$(git rev-parse --abbrev-ref HEAD)
+PACKAGE_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../../.." && pwd)"
 
-if [ -z "$CURRENT_BRANCH" ]; then
-  echo "❌ Error: Could not get current branch" >&2
-  exit 1
-fi
-
-# Get PR number for current branch
-PR_NUMBER=$(gh pr view "$CURRENT_BRANCH" --json number --jq .number)
-
-if [ -z "$PR_NUMBER" ] || [ "$PR_NUMBER" == "null" ]; then
-  echo "❌ Error: No PR found for branch '$CURRENT_BRANCH'" >&2
-  exit 1
-fi
-
-# Get repository full name
-REPO_FULL_NAME=$(gh repo view --json owner,name -q '.owner.login + "/" + .name')
-
-if [ -z "$REPO_FULL_NAME" ]; then
-  echo "❌ Error: Could not get repository information" >&2
-  exit 1
-fi
-
-# Output the results (space separated for easy parsing)
-echo "$REPO_FULL_NAME $PR_NUMBER"
+PYTHONPATH="$PACKAGE_ROOT${PYTHONPATH:+:$PYTHONPATH}" exec "${PYTHON:-python3}" -m mcp_server.utils.pr_info
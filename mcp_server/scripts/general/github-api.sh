@@ -0,0 +1,12 @@
+#!/bin/bash
+
+# Rate-limit-aware replacement for `gh api` shared by all scripts
+# Usage: github-api.sh <endpoint> [--field <dotted.path>]
+# Returns: The raw JSON response, or only the requested field (strings unquoted)
+#
+# Requests go through mcp_server.utils.github_api, which paces calls using the
+# X-RateLimit-* / Retry-After headers and retries throttled requests with jitter.
+
+PACKAGE_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../../.." && pwd)"
+
+PYTHONPATH="$PACKAGE_ROOT${PYTHONPATH:+:$PYTHONPATH}" exec "${PYTHON:-python3}" -m mcp_server.utils.github_api "$@"
@@ -0,0 +1,33 @@
+#!/bin/bash
+
+# Summarize the CodeRabbit reviews of many pull requests at once
+# Usage: get-coderabbit-batch.sh [--compact|--ndjson] <owner/repo|owner/repo#pr>...
+# Returns: The summary counts of the latest review of each PR head, and their totals
+#
+# A bare owner/repo stands for all of its open pull requests. PRs are fetched
+# concurrently (REVIEW_BATCH_CONCURRENCY at a time, default 4) through the shared
+# rate-limit-aware client, and their reports are kept like get-coderabbit-comments.sh
+# keeps them, so running it on a single PR afterwards is cheap. Exits with 1 if any PR
+# failed; the others are still reported.
+
+PACKAGE_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../../.." && pwd)"
+
+# Output format: --compact (one line of JSON) or --ndjson (one PR per line, totals last),
+# or REVIEW_OUTPUT_FORMAT=compact|ndjson; pretty-printed JSON by default.
+OUTPUT_FORMAT="${REVIEW_OUTPUT_FORMAT:-}"
+while [[ "$1" == --compact || "$1" == --ndjson ]]; do
+  OUTPUT_FORMAT="${1#--}"
+  shift
+done
+
+if [ $# -eq 0 ]; then
+  echo "Usage: $0 [--compact|--ndjson] <owner/repo|owner/repo#pr>..." >&2
+  echo "" >&2
+  echo "Examples:" >&2
+  echo "  $0 owner/repo                    # All open PRs" >&2
+  echo "  $0 owner/repo#12 owner/other#3   # Specific PRs" >&2
+  exit 1
+fi
+
+PYTHONPATH="$PACKAGE_ROOT${PYTHONPATH:+:$PYTHONPATH}" exec "${PYTHON:-python3}" -m mcp_server.utils.review_batch \
+  ${REVIEW_BATCH_CONCURRENCY:+--concurrency=$REVIEW_BATCH_CONCURRENCY} ${OUTPUT_FORMAT:+--format=$OUTPUT_FORMAT} "$@"
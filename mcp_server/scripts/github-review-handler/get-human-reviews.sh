@@ -1,8 +1,20 @@
 #!/bin/bash
 
 # Script to extract human reviewer comments for processing
-# Usage: get-human-reviews.sh <pr-info-script-path>
-#   OR:  get-human-reviews.sh <owner/repo> <pr_number>
+# Usage: get-human-reviews.sh [--compact|--ndjson] <pr-info-script-path>
+#   OR:  get-human-reviews.sh [--compact|--ndjson] <owner/repo> <pr_number>
+
+# All GitHub API calls go through the shared rate-limit-aware client (mcp_server.utils.github_api)
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+PACKAGE_ROOT="$(cd "$SCRIPT_DIR/../../.." && pwd)"
+
+# Output format: --compact (one line of JSON) or --ndjson (one comment per line, summary last),
+# before the other arguments, or REVIEW_OUTPUT_FORMAT=compact|ndjson; pretty-printed JSON by default.
+OUTPUT_FORMAT="${REVIEW_OUTPUT_FORMAT:-}"
+while [[ "$1" == --compact || "$1" == --ndjson ]]; do
+  OUTPUT_FORMAT="${1#--}"
+  shift
+done
 
 if [ $# -eq 1 ]; then
   # Single argument: path to pr-info script
@@ -21,8 +33,7 @@ if [ $# -eq 1 ]; then
   fi
 
   # Parse the output (space-separated: REPO_FULL_NAME PR_NUMBER)
-  REPO_FULL_NAME=$(echo "$PR_INFO" | cut -d' ' -f1)
-  PR_NUMBER=$(echo "$PR_INFO" | cut -d' ' -f2)
+  read -r REPO_FULL_NAME PR_NUMBER _ <<< "$PR_INFO"
 
 elif [ $# -eq 2 ]; then
   # Two arguments: direct repo and PR number (backwards compatibility)
@@ -30,83 +41,25 @@ elif [ $# -eq 2 ]; then
   PR_NUMBER="$2"
 
 else
-  echo "Usage: $0 <pr-info-script-path>"
-  echo "   OR: $0 <owner/repo> <pr_number>"
-  exit 1
-fi
-
-OWNER=$(echo "$REPO_FULL_NAME" | cut -d'/' -f1)
-REPO=$(echo "$REPO_FULL_NAME" | cut -d'/' -f2)
-
-# Step 1: Get the latest commit SHA and timestamp
-LATEST_COMMIT_SHA=$(gh api "/repos/$OWNER/$REPO/pulls/$PR_NUMBER" --jq '.head.sha')
-
-if [ -z "$LATEST_COMMIT_SHA" ]; then
-  echo "❌ Error: Could not retrieve latest commit SHA"
-  exit 1
-fi
-
-# Get the latest commit timestamp
-LATEST_COMMIT_DATE=$(gh api "/repos/$OWNER/$REPO/commits/$LATEST_COMMIT_SHA" --jq '.commit.committer.date')
-
-if [ -z "$LATEST_COMMIT_DATE" ]; then
-  echo "❌ Error: Could not retrieve latest commit date"
+  echo "Usage: $0 [--compact|--ndjson] <pr-info-script-path>"
+  echo "   OR: $0 [--compact|--ndjson] <owner/repo> <pr_number>"
   exit 1
 fi
 
-# Step 2: Get all reviews submitted after the latest commit, excluding CodeRabbit
-HUMAN_REVIEWS=$(gh api "/repos/$OWNER/$REPO/pulls/$PR_NUMBER/reviews" |
-  jq --arg bot_user "coderabbitai[bot]" --arg latest_date "$LATEST_COMMIT_DATE" \
-    '[.[] | select(.user.login != $bot_user and (.body | length) > 10 and .submitted_at > $latest_date)] | sort_by(.submitted_at)')
-
-# Step 3: Get all review comments from human reviewers
-ALL_COMMENTS='[]'
-
-for review_id in $(echo "$HUMAN_REVIEWS" | jq -r '.[].id'); do
-  REVIEWER=$(echo "$HUMAN_REVIEWS" | jq -r --arg id "$review_id" '.[] | select(.id == ($id | tonumber)) | .user.login')
-
-  # Get inline comments for this review
-  REVIEW_COMMENTS=$(gh api "/repos/$OWNER/$REPO/pulls/$PR_NUMBER/reviews/$review_id/comments" |
-    jq --arg reviewer "$REVIEWER" '[.[] |
-      {
-        reviewer: $reviewer,
-        file: .path,
-        line: (.line // .original_line // ""),
-        body: .body
-      }
-    ]')
-
-  # Merge with all comments
-  ALL_COMMENTS=$(echo "$ALL_COMMENTS $REVIEW_COMMENTS" | jq -s 'add')
-done
-
-# Step 4: Get PR review comments (not inline review comments) created after the latest commit
-PR_COMMENTS=$(gh api "/repos/$OWNER/$REPO/pulls/$PR_NUMBER/comments" |
-  jq --arg bot_user "coderabbitai[bot]" --arg latest_date "$LATEST_COMMIT_DATE" '[.[] |
-    select(.user.login != $bot_user and (.body | length) > 10 and .created_at > $latest_date) |
-    {
-      reviewer: .user.login,
-      file: .path,
-      line: (.line // .original_line // ""),
-      body: .body
-    }
-  ]')
-
-# Merge PR review comments with review-specific comments
-ALL_COMMENTS=$(echo "$ALL_COMMENTS $PR_COMMENTS" | jq -s 'add')
+IFS=/ read -r OWNER REPO _ <<< "$REPO_FULL_NAME"
 
+# Fetch the latest commit and its date, the human reviews and review comments given after it,
+# and build the report in a single process.
 # Note: We only include review comments (with file/line info) submitted after the latest commit, not general PR conversation comments
 # This ensures we only get human feedback that came after the latest changes
-
-# Count comments
-TOTAL_COUNT=$(echo "$ALL_COMMENTS" | jq '. | length')
-
-# Build final JSON
-JSON_OUTPUT="{"
-JSON_OUTPUT="$JSON_OUTPUT\"summary\": {"
-JSON_OUTPUT="$JSON_OUTPUT\"total\": $TOTAL_COUNT"
-JSON_OUTPUT="$JSON_OUTPUT},"
-JSON_OUTPUT="$JSON_OUTPUT\"comments\": $ALL_COMMENTS"
-JSON_OUTPUT="$JSON_OUTPUT}"
-
-echo "$JSON_OUTPUT" | jq '.'
+# Reviews and comments seen by earlier runs are kept per PR and only the changes are fetched;
+# set REVIEW_FULL_RESYNC=1 to fetch everything again.
+# Replies are grouped into their thread, and threads that were resolved on GitHub are left out
+# (counted as "resolved" in the summary); set REVIEW_INCLUDE_RESOLVED=1 to keep them.
+# Inside a checkout of the PR, comments on lines the local diff against the merge base no longer
+# changes are left out; set REVIEW_STALE_COMMENTS=mark to flag them instead, or keep to skip the
+# check, and REVIEW_BASE_REF to diff against another base branch.
+PYTHONPATH="$PACKAGE_ROOT${PYTHONPATH:+:$PYTHONPATH}" exec "${PYTHON:-python3}" -m mcp_server.utils.human_reviews \
+  ${OUTPUT_FORMAT:+--format=$OUTPUT_FORMAT} ${REVIEW_FULL_RESYNC:+--full-resync} ${REVIEW_INCLUDE_RESOLVED:+--include-resolved} \
+  ${REVIEW_STALE_COMMENTS:+--stale=$REVIEW_STALE_COMMENTS} ${REVIEW_BASE_REF:+--base-ref=$REVIEW_BASE_REF} \
+  "$OWNER" "$REPO" "$PR_NUMBER"
@@ -1,8 +1,12 @@
 """Pytest configuration for mcp_server tests."""
 
+import json
 import os
+import subprocess
 import pytest
 import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 
@@ -31,6 +35,10 @@ def performance_thresholds():
     Thresholds can be overridden via environment variables:
     - PERF_THRESHOLD_PROMPT_LOADING: for prompt loading performance (default: 1.0s)
     - PERF_THRESHOLD_ATTRIBUTE_ACCESS: for attribute access performance (default: 0.5s)
+    - PERF_THRESHOLD_REVIEW_PARSING: for parsing a ~5 MB CodeRabbit review body (default: 5.0s)
+    - PERF_THRESHOLD_PROMPT_SEARCH: for one search of a 1,000-prompt library (default: 0.005s,
+      room for coverage tracing; a search takes well under a millisecond without it)
+    - PERF_THRESHOLD_PROMPT_LISTING: for one prompts/list page of a 10,000-prompt catalog (default: 0.005s)
     """
 
     def _parse_threshold(env_var: str, default: str, description: str) -> float:
@@ -47,8 +55,133 @@ def performance_thresholds():
     return {
         "prompt_loading": _parse_threshold("PERF_THRESHOLD_PROMPT_LOADING", "1.0", "prompt loading performance"),
         "attribute_access": _parse_threshold("PERF_THRESHOLD_ATTRIBUTE_ACCESS", "0.5", "attribute access performance"),
+        "review_parsing": _parse_threshold("PERF_THRESHOLD_REVIEW_PARSING", "5.0", "review parsing performance"),
+        "prompt_search": _parse_threshold("PERF_THRESHOLD_PROMPT_SEARCH", "0.005", "prompt search performance"),
+        "prompt_listing": _parse_threshold("PERF_THRESHOLD_PROMPT_LISTING", "0.005", "prompt listing performance"),
     }
 
 
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    """Keep persistent caches and state written during tests out of the user's home."""
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv("AI_PROMPTS_MCP_CACHE_DIR", str(cache_dir))
+    return cache_dir
+
+
+@pytest.fixture(autouse=True)
+def no_github_daemon(monkeypatch):
+    """Send GitHub requests directly unless a test opts into the helper daemon."""
+    monkeypatch.setenv("AI_PROMPTS_MCP_DAEMON", "off")
+
+
+class FakeGitHub:
+    """Local HTTP server standing in for the GitHub REST API.
+
+    Routes map a request path (including query string) to a response tuple of
+    (status, headers, body) or to a list of such tuples served in order, the last
+    one repeating. Bodies that are not bytes are JSON encoded. POST requests are routed
+    alike and recorded with their decoded JSON body. `connections` counts the TCP
+    connections accepted.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.connections = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                fake.connections += 1
+                super().setup()
+
+            def do_GET(self):
+                fake.requests.append({"path": self.path, "headers": dict(self.headers)})
+                self._respond()
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+                fake.requests.append({"path": self.path, "headers": dict(self.headers), "body": body})
+                self._respond()
+
+            def _respond(self):
+                route = fake.routes.get(self.path, (404, {}, {"message": "Not Found"}))
+                if isinstance(route, list):
+                    route = route.pop(0) if len(route) > 1 else route[0]
+                status, headers, body = route
+                payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_github(monkeypatch):
+    """Fixture providing a FakeGitHub server that the GitHub client and scripts talk to."""
+    from mcp_server.utils import github_api
+
+    fake = FakeGitHub()
+    monkeypatch.setenv("GITHUB_API_URL", fake.url)
+    monkeypatch.setenv("GH_TOKEN", "test-token")
+    # The shared client and scheduler must pick up the fake server and a fresh state
+    github_api.get_client.cache_clear()
+    github_api.get_scheduler.cache_clear()
+    yield fake
+    github_api.get_client.cache_clear()
+    github_api.get_scheduler.cache_clear()
+    fake.close()
+
+
 # Enable async testing support for pytest
 pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.fixture
+def pr_checkout(tmp_path):
+    """A checkout of pull request branch `feature` on o/r, changing lines 2-3 of src/module_0.py.
+
+    The base branch is origin/main (40 lines per file, in src/module_0.py and src/module_1.py).
+    Returns a function running git in the checkout, with the checkout path and head SHA as
+    its `path` and `sha` attributes.
+    """
+    path = tmp_path / "checkout"
+    (path / "src").mkdir(parents=True)
+
+    def git(*args: str) -> str:
+        command = ["git", "-C", str(path), "-c", "user.name=Test", "-c", "user.email=test@example.com", *args]
+        return subprocess.run(command, check=True, capture_output=True, text=True).stdout.strip()
+
+    git("init", "-q", "-b", "main")
+    git("remote", "add", "origin", "https://github.com/o/r.git")
+    for name in ("module_0.py", "module_1.py"):
+        (path / "src" / name).write_text("".join(f"line_{n} = {n}\n" for n in range(1, 41)), encoding="utf-8")
+    git("add", ".")
+    git("commit", "-q", "-m", "Base")
+    git("update-ref", "refs/remotes/origin/main", "HEAD")
+    git("checkout", "-q", "-b", "feature")
+    lines = (path / "src" / "module_0.py").read_text(encoding="utf-8").splitlines(keepends=True)
+    lines[1:3] = ["line_2 = 'two'\n", "line_3 = 'three'\n"]
+    (path / "src" / "module_0.py").write_text("".join(lines), encoding="utf-8")
+    git("commit", "-q", "-am", "Change")
+    git.path = path
+    git.sha = git("rev-parse", "HEAD")
+    return git
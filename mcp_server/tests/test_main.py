@@ -1,11 +1,19 @@
 """Tests for mcp_server.main module."""
 
+import json
 import pytest
 from io import StringIO
 from unittest.mock import patch, Mock
 
+from fastmcp import Client
+from mcp.shared.exceptions import McpError
+from mcp.types import ClientRequest, ListPromptsRequest, ListPromptsResult, PaginatedRequestParams
+
 import mcp_server.main as main_module
 from mcp_server.main import print_available_prompts, mcp
+from mcp_server.utils.prompt_catalog import PromptCatalog
+from mcp_server.utils.prompt_search import PromptSearchIndex
+from mcp_server.utils.review_store import ReviewStore
 
 
 class TestPromptFunctions:
@@ -44,6 +52,219 @@ class TestPromptFunctions:
         assert main_module.github_review_handler.name == "github-review-handler"
 
 
+class TestCommitPrompt:
+    """Test cases for the pre-flight context of the commit prompt."""
+
+    async def test_without_repository_path(self):
+        """Test that the prompt is the plain instructions by default."""
+        async with Client(mcp) as client:
+            result = await client.get_prompt("commit")
+
+        assert result.messages[0].content.text == main_module.load_prompt_from_markdown("commit")
+
+    async def test_with_repository_path(self, pr_checkout):
+        """Test that the server appends the summary of the checkout."""
+        (pr_checkout.path / "src" / "module_1.py").write_text("changed\n", encoding="utf-8")
+        main_module.commit_contexts.clear()
+
+        async with Client(mcp) as client:
+            result = await client.get_prompt("commit", {"repository_path": str(pr_checkout.path)})
+
+        text = result.messages[0].content.text
+        assert text.startswith(main_module.load_prompt_from_markdown("commit"))
+        assert "## Pre-flight context" in text
+        assert "- src/module_1.py (+1 -40)" in text
+
+
+class TestSmartTestRunnerPrompt:
+    """Test cases for the affected tests of the smart-test-runner prompt."""
+
+    async def test_with_repository_path(self, pr_checkout):
+        """Test that the server appends the tests affected by the changes of the checkout."""
+        (pr_checkout.path / "tests").mkdir()
+        (pr_checkout.path / "tests" / "test_module.py").write_text("from src import module_0\n", encoding="utf-8")
+        main_module.impact_indexes.clear()
+
+        async with Client(mcp) as client:
+            result = await client.get_prompt("smart-test-runner", {"repository_path": str(pr_checkout.path)})
+
+        text = result.messages[0].content.text
+        assert text.startswith(main_module.load_prompt_from_markdown("smart-test-runner"))
+        assert "## Affected tests" in text
+        assert "```\ntests/test_module.py\n```" in text
+
+    async def test_get_affected_tests(self, pr_checkout):
+        """Test that the tool selects the tests importing the changed modules."""
+        (pr_checkout.path / "test_module.py").write_text("import src.module_0\n", encoding="utf-8")
+        pr_checkout("add", "test_module.py")
+        pr_checkout("commit", "-q", "-m", "Test")
+
+        selection = await main_module.get_affected_tests.fn(str(pr_checkout.path))
+
+        assert selection["tests"] == ["test_module.py"]
+        assert selection["by_file"]["src/module_0.py"] == ["test_module.py"]
+
+
+class TestCodeBeautifierPrompt:
+    """Test cases for the files argument of the code-beautifier prompt."""
+
+    async def test_with_files(self):
+        """Test that the given files replace the candidate ranking."""
+        async with Client(mcp) as client:
+            result = await client.get_prompt("code-beautifier", {"files": "src/app.py"})
+
+        text = result.messages[0].content.text
+        assert "I'll beautify these files: src/app.py" in text
+        assert "get_candidate_files" not in text
+        assert "{%" not in text
+
+    async def test_without_files(self):
+        """Test that the candidates are ranked when no files are given."""
+        async with Client(mcp) as client:
+            result = await client.get_prompt("code-beautifier")
+
+        text = result.messages[0].content.text
+        assert "get_candidate_files" in text
+        assert "{{ files }}" not in text
+
+
+class TestRegisterPromptPacks:
+    """Test cases for register_prompt_packs function."""
+
+    async def test_pack_prompts(self, tmp_path, monkeypatch):
+        """Test that the prompts of a pack are served with their frontmatter arguments."""
+        (tmp_path / "team-review.md").write_text(
+            "---\ndescription: Review like the team\narguments:\n  - name: focus\n    required: true\n---\n"
+            "Focus on {{ focus }}.",
+            encoding="utf-8",
+        )
+        (tmp_path / "commit.md").write_text("Team commit rules", encoding="utf-8")
+        monkeypatch.setenv("AI_PROMPTS_MCP_PROMPT_PATH", str(tmp_path))
+        registered = dict(mcp._prompt_manager._prompts)
+        monkeypatch.setattr(mcp._prompt_manager, "_prompts", registered)
+
+        monkeypatch.setattr(main_module.prompt_catalog, "refresh_interval", 0)
+
+        main_module.register_prompt_packs()
+
+        async with Client(mcp) as client:
+            prompts = {prompt.name: prompt for prompt in await client.list_prompts()}
+            review = await client.get_prompt("team-review", {"focus": "security"})
+            commit = await client.get_prompt("commit")
+
+        assert prompts["team-review"].description == "Review like the team"
+        assert [(argument.name, argument.required) for argument in prompts["team-review"].arguments] == [
+            ("focus", True)
+        ]
+        assert review.messages[0].content.text == "Focus on security."
+        assert commit.messages[0].content.text == "Team commit rules"
+
+
+class TestSearchPrompts:
+    """Test cases for the search_prompts tool."""
+
+    async def test_search(self):
+        """Test that the registered prompts are searched by name, description and body."""
+        result = await main_module.search_prompts.fn("coderabbit priority", limit=2)
+
+        assert result["prompts_searched"] == len(mcp._prompt_manager._prompts)
+        assert result["matches"][0]["name"] == "github-coderabbitai-review-handler"
+        assert len(result["matches"]) <= 2
+
+    async def test_body_words(self):
+        """Test that words found only in the body of a prompt file are searched."""
+        result = await main_module.search_prompts.fn("snapshot")
+
+        assert result["matches"][0]["name"] == "code-beautifier"
+
+
+class TestListPrompts:
+    """Test cases for the prompts/list handler and the list_prompts tool."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_catalog(self, monkeypatch):
+        monkeypatch.setattr(main_module, "prompt_catalog", PromptCatalog())
+
+    async def test_pages(self, monkeypatch):
+        """Test that prompts/list serves every prompt once, in name order, a page at a time."""
+        monkeypatch.setattr(main_module, "DEFAULT_PROMPT_PAGE_SIZE", 3)
+        names, cursor = [], None
+        async with Client(mcp) as client:
+            while True:
+                result = await client.session.list_prompts(cursor)
+                assert len(result.prompts) <= 3
+                names.extend(prompt.name for prompt in result.prompts)
+                cursor = result.nextCursor
+                if cursor is None:
+                    break
+
+        assert names == sorted(mcp._prompt_manager._prompts)
+
+    async def test_filters_in_meta(self):
+        """Test the category and tag filters sent in the _meta of prompts/list."""
+
+        async def listed(meta):
+            request = ListPromptsRequest(method="prompts/list", params=PaginatedRequestParams(_meta=meta))
+            result = await client.session.send_request(ClientRequest(request), ListPromptsResult)
+            return [prompt.name for prompt in result.prompts]
+
+        async with Client(mcp) as client:
+            assert await listed({"category": "review"}) == [
+                "code-review",
+                "github-coderabbitai-review-handler",
+                "github-review-handler",
+            ]
+            assert await listed({"category": "review", "tag": "coderabbit"}) == ["github-coderabbitai-review-handler"]
+
+    async def test_handler_is_dispatched(self, monkeypatch):
+        """Test that prompts/list still reaches the replaced handler of FastMCP."""
+        pages = []
+        catalog_page = main_module._catalog_page
+        monkeypatch.setattr(main_module, "_catalog_page", lambda *args: pages.append(args) or catalog_page(*args))
+
+        assert mcp._mcp_server.request_handlers[ListPromptsRequest] is main_module._list_prompts_page
+        async with Client(mcp) as client:
+            await client.session.list_prompts()
+
+        assert len(pages) == 1
+
+    async def test_server_tag_rules(self, monkeypatch):
+        """Test that the include and exclude tags of the server rule out prompts like FastMCP does."""
+        prompts = mcp._prompt_manager._prompts
+        monkeypatch.setattr(prompts["commit"], "tags", {"git"})
+        monkeypatch.setattr(prompts["code-review"], "tags", {"git", "slow"})
+        monkeypatch.setattr(mcp, "include_tags", {"git"})
+        monkeypatch.setattr(mcp, "exclude_tags", {"slow"})
+
+        async with Client(mcp) as client:
+            result = await client.session.list_prompts()
+
+        assert [prompt.name for prompt in result.prompts] == ["commit"]
+        assert [prompt.name for prompt in await mcp._mcp_list_prompts()] == ["commit"]
+
+    async def test_invalid_cursor(self):
+        """Test that an invalid cursor is an invalid params error."""
+        async with Client(mcp) as client:
+            with pytest.raises(McpError, match="Invalid cursor"):
+                await client.session.list_prompts("bogus")
+
+    async def test_tool(self):
+        """Test that the list_prompts tool pages through the prompts and counts the tags and categories."""
+        first = await main_module.list_prompts.fn(tag="readability", page_size=1)
+        second = await main_module.list_prompts.fn(cursor=first["next_cursor"], page_size=1)
+
+        assert [prompt["name"] for prompt in first["prompts"] + second["prompts"]] == [
+            "code-beautifier",
+            "comment-cleaner",
+        ]
+        assert second["next_cursor"] is None
+        assert first["prompts"][0]["arguments"] == [
+            {"name": "files", "description": first["prompts"][0]["arguments"][0]["description"], "required": False}
+        ]
+        assert first["categories"]["review"] == 3
+        assert first["tags"]["readability"] == 2
+
+
 class TestPrintAvailablePrompts:
     """Test cases for print_available_prompts function."""
 
@@ -230,6 +451,24 @@ class TestPrintAvailablePrompts:
             assert desc_line.strip() == ""
             assert desc_line == "     "  # Exactly 5 spaces for indentation
 
+    @patch("sys.stderr", new_callable=StringIO)
+    def test_print_available_prompts_truncated(self, mock_stderr, monkeypatch):
+        """Test that only the first prompts are printed and the others counted."""
+        monkeypatch.setattr(main_module, "MAX_PRINTED_PROMPTS", 2)
+        mock_prompt_info = Mock()
+        mock_prompt_info.description = "Test description"
+
+        with patch.object(mcp, "_prompt_manager") as mock_prompt_manager:
+            mock_prompt_manager._prompts = {f"prompt-{n}": mock_prompt_info for n in range(5)}
+
+            print_available_prompts()
+
+        output = mock_stderr.getvalue()
+        assert "  2. prompt-1" in output
+        assert "prompt-2" not in output
+        assert "  ... and 3 more (see prompts/list)" in output
+        assert "Total: 5 prompts registered" in output
+
 
 class TestMCPInstance:
     """Test cases for MCP instance configuration."""
@@ -264,6 +503,23 @@ class TestMainExecution:
         assert hasattr(mcp, "run")
         assert callable(mcp.run)
 
+    def test_main(self, tmp_path, monkeypatch):
+        """Test that the entry point registers the prompt packs and builds the indexes before serving."""
+        (tmp_path / "team-only.md").write_text("---\ndescription: Team prompt\n---\nBody", encoding="utf-8")
+        monkeypatch.setenv("AI_PROMPTS_MCP_PROMPT_PATH", str(tmp_path))
+        monkeypatch.setenv("AI_PROMPTS_MCP_DAEMON", "off")
+        monkeypatch.setattr(mcp._prompt_manager, "_prompts", dict(mcp._prompt_manager._prompts))
+        monkeypatch.setattr(main_module, "prompt_search", PromptSearchIndex())
+        monkeypatch.setattr(main_module, "prompt_catalog", PromptCatalog())
+
+        with patch.object(mcp, "run") as run, patch("sys.stderr", new_callable=StringIO):
+            main_module.main()
+
+        run.assert_called_once_with()
+        assert "team-only" in mcp._prompt_manager._prompts
+        assert main_module.prompt_catalog.get("team-only") is not None
+        assert len(main_module.prompt_search) == len(mcp._prompt_manager._prompts)
+
     def test_prompt_registration(self):
         """Test that prompts are properly registered with the MCP instance."""
         # Verify that the decorators have been applied
@@ -308,3 +564,148 @@ class TestPromptIntegration:
         expected_names = ["github-coderabbitai-review-handler", "commit", "github-review-handler"]
         for name in expected_names:
             assert name in prompt_dict
+
+
+class TestTools:
+    """Test cases for MCP tools."""
+
+    def test_github_request_metrics(self):
+        """Test that the scheduler metrics tool reports queue depth and wait times."""
+        metrics = main_module.github_request_metrics.fn()
+
+        assert metrics["queue_depth"] == 0
+        assert "average_wait_seconds" in metrics
+        assert "concurrency_limit" in metrics
+
+    async def test_query_review_comments(self):
+        """Test that review comments are answered from the local review store."""
+        with ReviewStore.default() as store:
+            store.record_comments(
+                "o/r",
+                1,
+                "coderabbit",
+                [
+                    {"category": "nitpicks", "priority": "LOW", "title": "Nit", "created_at": "2024-05-02"},
+                    {"category": "actionable", "priority": "HIGH", "title": "Bug", "created_at": "2024-05-02"},
+                ],
+                review_id=3,
+            )
+
+        result = await main_module.query_review_comments.fn("o/r", 1)
+
+        assert result["total"] == 2
+        assert [comment["title"] for comment in result["comments"]] == ["Bug", "Nit"]
+        assert (await main_module.query_review_comments.fn("o/r", 1, category="nitpicks", limit=1))["total"] == 1
+
+    async def test_get_review_comments(self, fake_github):
+        """Test that the tool pages through the comments of the current head."""
+        fake_github.routes["/repos/o/r/pulls/1"] = (200, {}, {"head": {"sha": "abc1"}})
+        fake_github.routes["/repos/o/r/pulls/1/reviews?per_page=100"] = (200, {}, [])
+        main_module.review_pages.clear()
+
+        result = await main_module.get_review_comments.fn("o/r", 1)
+
+        assert (result["head_sha"], result["reviewed"], result["comments"]) == ("abc1", False, [])
+
+    async def test_get_review_comments_progress(self, fake_github, test_data_dir):
+        """Test that each phase is notified, with the actionable comments sent before the review body is parsed."""
+        routes = json.loads((test_data_dir / "review-scripts" / "github.json").read_text(encoding="utf-8"))
+        for path, body in routes.items():
+            fake_github.routes[path] = (200, {}, body)
+        main_module.review_pages.clear()
+        events = []
+
+        async def on_progress(progress, total, message):
+            events.append(("progress", progress, total, message))
+
+        async def on_log(message):
+            extra = message.data["extra"]
+            events.append(("log", message.logger, extra["phase"], len(extra["comments"])))
+
+        async with Client(mcp, log_handler=on_log) as client:
+            result = await client.call_tool(
+                "get_review_comments", {"repository": "owner/repo", "pr_number": 7}, progress_handler=on_progress
+            )
+            events.append(("result", len(json.loads(result.content[0].text)["comments"])))
+            cached = await client.call_tool(
+                "get_review_comments", {"repository": "owner/repo", "pr_number": 7}, progress_handler=on_progress
+            )
+
+        assert events == [
+            ("progress", 1, 4, "pr_info"),
+            ("progress", 2, 4, "reviews"),
+            ("progress", 3, 4, "inline_comments: 3 comments"),
+            ("log", "review_comments", "inline_comments", 3),
+            ("progress", 4, 4, "review_body: 7 comments"),
+            ("log", "review_comments", "review_body", 7),
+            ("result", 10),
+            ("progress", 1, 4, "pr_info"),
+        ]
+        assert json.loads(cached.content[0].text)["total"] == 10
+
+    async def test_get_review_batch(self, fake_github, test_data_dir):
+        """Test that the batch tool summarizes each PR and fills the cache of get_review_comments."""
+        routes = json.loads((test_data_dir / "review-scripts" / "github.json").read_text(encoding="utf-8"))
+        for path, body in routes.items():
+            fake_github.routes[path] = (200, {}, body)
+        main_module.review_pages.clear()
+
+        ndjson = await main_module.get_review_batch.fn(["owner/repo#7"], output_format="ndjson")
+        fake_github.requests.clear()
+        page = await main_module.get_review_comments.fn("owner/repo", 7)
+
+        records = [json.loads(line) for line in ndjson.splitlines()]
+        assert records[0]["pull_request"] == "owner/repo#7"
+        assert records[-1]["aggregate"]["reviewed"] == 1
+        assert page["total"] == 10
+        assert [request["path"] for request in fake_github.requests] == ["/repos/owner/repo/pulls/7"]
+
+    async def test_get_changed_hunks(self, pr_checkout):
+        """Test that the changed hunks tool pages through the changes of a checkout."""
+        page = await main_module.get_changed_hunks.fn(str(pr_checkout.path))
+        ndjson = await main_module.get_changed_hunks.fn(str(pr_checkout.path), output_format="ndjson")
+
+        assert [entry["path"] for entry in page["files"]] == ["src/module_0.py"]
+        assert page["next_cursor"] is None
+        records = [json.loads(line) for line in ndjson.splitlines()]
+        assert records[0]["path"] == "src/module_0.py"
+        assert records[-1]["files_changed"] == 1
+
+    async def test_get_candidate_files(self, pr_checkout):
+        """Test that the candidate files tool ranks the changed source files."""
+        (pr_checkout.path / "src" / "module_1.py").write_text("# load the config\nload_config()\n", encoding="utf-8")
+
+        page = await main_module.get_candidate_files.fn(str(pr_checkout.path))
+
+        assert [entry["path"] for entry in page["files"]] == ["src/module_1.py"]
+        assert page["files"][0]["restating_comments"] == 1
+
+    async def test_snapshot_tools(self, pr_checkout):
+        """Test that the snapshot tools take, list and restore a snapshot."""
+        module = pr_checkout.path / "src" / "module_0.py"
+        module.write_text("before\n", encoding="utf-8")
+
+        snapshot = await main_module.create_snapshot.fn(str(pr_checkout.path), ["src/module_0.py"], "Before")
+        module.write_text("after\n", encoding="utf-8")
+        listed = await main_module.list_snapshots.fn(str(pr_checkout.path))
+        restored = await main_module.restore_snapshot.fn(str(pr_checkout.path), snapshot["snapshot"])
+
+        assert [entry["label"] for entry in listed] == ["Before"]
+        assert restored["restored_files"] == ["src/module_0.py"]
+        assert module.read_text(encoding="utf-8") == "before\n"
+
+    async def test_output_formats(self):
+        """Test that the review tools can answer with compact or NDJSON text."""
+        with ReviewStore.default() as store:
+            store.record_comments(
+                "o/r", 1, "human", [{"category": "human", "body": "Fix", "created_at": "2024-05-02"}] * 2
+            )
+
+        ndjson = await main_module.query_review_comments.fn("o/r", 1, output_format="ndjson")
+        compact = await main_module.query_review_comments.fn("o/r", 1, output_format="compact")
+
+        assert [json.loads(line).get("body") for line in ndjson.splitlines()] == ["Fix", "Fix", None]
+        assert json.loads(ndjson.splitlines()[-1]) == {"total": 2}
+        assert json.loads(compact) == await main_module.query_review_comments.fn("o/r", 1)
+        with pytest.raises(ValueError, match="Unknown output format"):
+            await main_module.query_review_comments.fn("o/r", 1, output_format="pretty")
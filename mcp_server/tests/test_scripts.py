@@ -0,0 +1,297 @@
+"""Tests running the review handler shell scripts against a fake GitHub API."""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from mcp_server.main import query_review_comments
+
+SCRIPTS_DIR = Path(__file__).parent.parent / "scripts"
+CODERABBIT_SCRIPT = SCRIPTS_DIR / "github-coderabbitai-review-handler" / "get-coderabbit-comments.sh"
+BATCH_SCRIPT = SCRIPTS_DIR / "github-coderabbitai-review-handler" / "get-coderabbit-batch.sh"
+HUMAN_REVIEWS_SCRIPT = SCRIPTS_DIR / "github-review-handler" / "get-human-reviews.sh"
+PR_INFO_SCRIPT = SCRIPTS_DIR / "general" / "get-pr-info.sh"
+
+# External commands the scripts may spawn; each one gets a counting wrapper on PATH
+TRACED_COMMANDS = ["python3", "jq", "gh", "git", "cut", "grep", "sed", "awk", "cat", "dirname"]
+
+
+@pytest.fixture
+def github_routes(fake_github, test_data_dir):
+    """Serve the recorded GitHub responses of pull request owner/repo#7."""
+    routes = json.loads((test_data_dir / "review-scripts" / "github.json").read_text(encoding="utf-8"))
+    for path, body in routes.items():
+        fake_github.routes[path] = (200, {}, body)
+    return fake_github
+
+
+@pytest.fixture
+def traced_path(tmp_path):
+    """Put counting wrappers for TRACED_COMMANDS first on PATH.
+
+    Returns a function giving a Counter of the commands spawned so far.
+    """
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log_file = tmp_path / "spawned.log"
+    log_file.touch()
+    for command in TRACED_COMMANDS:
+        real = sys.executable if command == "python3" else shutil.which(command)
+        if real is None:
+            continue
+        wrapper = bin_dir / command
+        wrapper.write_text(f'#!/bin/bash\necho {command} >> "{log_file}"\nexec "{real}" "$@"\n', encoding="utf-8")
+        wrapper.chmod(0o755)
+
+    env = dict(os.environ, PATH=f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    env.pop("PYTHON", None)
+
+    def spawned() -> Counter:
+        return Counter(log_file.read_text(encoding="utf-8").split())
+
+    spawned.env = env
+    return spawned
+
+
+def run_script(
+    script: Path, *args: str, env: dict[str, str] | None = None, cwd: Path | None = None
+) -> subprocess.CompletedProcess:
+    return subprocess.run(["bash", str(script), *args], capture_output=True, env=env, cwd=cwd, timeout=60)
+
+
+class TestGetPrInfo:
+    """Test cases for get-pr-info.sh."""
+
+    @pytest.fixture
+    def repo(self, tmp_path):
+        """A checkout of branch feature on owner/repo."""
+        path = tmp_path / "repo"
+        subprocess.run(["git", "init", "-q", "-b", "feature", str(path)], check=True)
+        subprocess.run(["git", "-C", str(path), "remote", "add", "origin", "https://github.com/owner/repo"], check=True)
+        return path
+
+    def test_prints_repo_and_number_without_git_or_gh(self, repo, fake_github, traced_path):
+        """Test the output and that neither git nor gh is spawned, and a repeated run uses the cache."""
+        fake_github.routes["/repos/owner/repo/pulls?head=owner%3Afeature&state=open&per_page=1"] = (
+            200,
+            {},
+            [{"number": 7}],
+        )
+
+        for _ in range(2):
+            result = run_script(PR_INFO_SCRIPT, env=traced_path.env, cwd=repo)
+
+            assert result.returncode == 0, result.stderr.decode()
+            assert result.stdout.decode() == "owner/repo 7\n"
+
+        assert traced_path() == Counter({"python3": 2, "dirname": 2})
+        assert len(fake_github.requests) == 1
+
+
+class TestGetCoderabbitComments:
+    """Test cases for get-coderabbit-comments.sh."""
+
+    def test_output_is_byte_identical(self, github_routes, test_data_dir):
+        """Test that the report matches the stored report byte for byte."""
+        result = run_script(CODERABBIT_SCRIPT, "owner/repo", "7")
+
+        assert result.returncode == 0, result.stderr.decode()
+        assert result.stdout == (test_data_dir / "review-scripts" / "coderabbit-comments.json").read_bytes()
+
+    def test_subprocess_count(self, github_routes, traced_path):
+        """Test that a run spawns one API call for the commit and one process for the report."""
+        result = run_script(CODERABBIT_SCRIPT, "owner/repo", "7", env=traced_path.env)
+
+        assert result.returncode == 0, result.stderr.decode()
+        assert traced_path() == Counter({"python3": 2, "dirname": 2})
+
+    def test_second_run_fetches_only_the_review_list(self, github_routes, test_data_dir, monkeypatch):
+        """Test that a rerun reuses the stored report and REVIEW_FULL_RESYNC=1 fetches everything again."""
+        expected = (test_data_dir / "review-scripts" / "coderabbit-comments.json").read_bytes()
+        assert run_script(CODERABBIT_SCRIPT, "owner/repo", "7").stdout == expected
+        first_run = len(github_routes.requests)
+        github_routes.requests.clear()
+
+        assert run_script(CODERABBIT_SCRIPT, "owner/repo", "7").stdout == expected
+        assert [request["path"] for request in github_routes.requests] == [
+            "/repos/owner/repo/pulls/7",
+            "/repos/owner/repo/pulls/7/reviews?per_page=100",
+        ]
+        github_routes.requests.clear()
+
+        monkeypatch.setenv("REVIEW_FULL_RESYNC", "1")
+        assert run_script(CODERABBIT_SCRIPT, "owner/repo", "7").stdout == expected
+        assert len(github_routes.requests) == first_run
+
+    def test_stream_mode(self, github_routes, monkeypatch):
+        """Test that CODERABBIT_STREAM=1 writes one record per comment with the summary last."""
+        monkeypatch.setenv("CODERABBIT_STREAM", "1")
+
+        result = run_script(CODERABBIT_SCRIPT, "owner/repo", "7")
+
+        assert result.returncode == 0, result.stderr.decode()
+        records = [json.loads(line) for line in result.stdout.decode().splitlines()]
+        assert records[-1] == {
+            "summary": {"actionable": 3, "nitpicks": 3, "duplicates": 2, "outside_diff_range": 2, "total": 10}
+        }
+        assert all("category" in record for record in records[:-1])
+
+    @pytest.mark.parametrize("script", [CODERABBIT_SCRIPT, HUMAN_REVIEWS_SCRIPT])
+    def test_output_formats(self, github_routes, test_data_dir, monkeypatch, script):
+        """Test --compact and REVIEW_OUTPUT_FORMAT=ndjson against the pretty-printed report."""
+        pretty = run_script(script, "owner/repo", "7").stdout
+        compact = run_script(script, "--compact", "owner/repo", "7").stdout
+        monkeypatch.setenv("REVIEW_OUTPUT_FORMAT", "ndjson")
+        records = [json.loads(line) for line in run_script(script, "owner/repo", "7").stdout.splitlines()]
+
+        report = json.loads(pretty)
+        assert json.loads(compact) == report
+        assert compact.count(b"\n") == 1
+        assert len(compact) < len(pretty)
+        assert records[-1] == {"summary": report["summary"]}
+        assert len(records) - 1 == report["summary"]["total"]
+
+    def test_no_review_for_commit(self, github_routes):
+        """Test the message when CodeRabbit did not review the target commit."""
+        result = run_script(CODERABBIT_SCRIPT, "owner/repo", "7", "deadbeef")
+
+        assert result.returncode == 1
+        assert result.stdout.decode() == "❌ No CodeRabbit reviews found\n"
+
+
+class TestGetCoderabbitBatch:
+    """Test cases for get-coderabbit-batch.sh."""
+
+    def test_summaries_of_every_pull_request(self, github_routes, monkeypatch):
+        """Test one record per PR with the totals last, and the failure of a missing PR in the exit status."""
+        monkeypatch.setenv("REVIEW_BATCH_CONCURRENCY", "2")
+
+        result = run_script(BATCH_SCRIPT, "--ndjson", "owner/repo#7", "owner/repo#8")
+
+        assert result.returncode == 1, result.stderr.decode()
+        records = [json.loads(line) for line in result.stdout.decode().splitlines()]
+        assert records[0]["summary"]["total"] == 10
+        assert records[1] == {"pull_request": "owner/repo#8", "error": "GitHub API request failed (404): Not Found"}
+        assert records[2]["aggregate"]["failed"] == 1
+
+    def test_usage(self):
+        """Test that at least one PR or repository is required."""
+        result = run_script(BATCH_SCRIPT, "--compact")
+
+        assert result.returncode == 1
+        assert result.stderr.decode().startswith("Usage:")
+
+
+class TestGetHumanReviews:
+    """Test cases for get-human-reviews.sh."""
+
+    def test_output_is_byte_identical(self, github_routes, test_data_dir):
+        """Test that the report (jq pipeline output plus thread states) matches byte for byte."""
+        result = run_script(HUMAN_REVIEWS_SCRIPT, "owner/repo", "7")
+
+        assert result.returncode == 0, result.stderr.decode()
+        assert result.stdout == (test_data_dir / "review-scripts" / "human-reviews.json").read_bytes()
+
+    def test_subprocess_count(self, github_routes, traced_path):
+        """Test that a run spawns a single process regardless of the number of reviews."""
+        result = run_script(HUMAN_REVIEWS_SCRIPT, "owner/repo", "7", env=traced_path.env)
+
+        assert result.returncode == 0, result.stderr.decode()
+        assert traced_path() == Counter({"python3": 1, "dirname": 1})
+
+    def test_second_run_fetches_only_changes(self, github_routes, test_data_dir):
+        """Test that a rerun skips the commit and the inline comments of known reviews."""
+        expected = (test_data_dir / "review-scripts" / "human-reviews.json").read_bytes()
+        assert run_script(HUMAN_REVIEWS_SCRIPT, "owner/repo", "7").stdout == expected
+        github_routes.requests.clear()
+
+        result = run_script(HUMAN_REVIEWS_SCRIPT, "owner/repo", "7")
+
+        assert result.stdout == expected
+        assert [request["path"] for request in github_routes.requests] == [
+            "/repos/owner/repo/pulls/7",
+            "/repos/owner/repo/pulls/7/reviews?per_page=100",
+            "/graphql",
+            "/repos/owner/repo/pulls/7/comments",
+        ]
+
+    def test_include_resolved(self, github_routes, monkeypatch):
+        """Test that REVIEW_INCLUDE_RESOLVED=1 keeps resolved threads, flagged as such."""
+        monkeypatch.setenv("REVIEW_INCLUDE_RESOLVED", "1")
+
+        result = run_script(HUMAN_REVIEWS_SCRIPT, "owner/repo", "7")
+
+        assert result.returncode == 0, result.stderr.decode()
+        report = json.loads(result.stdout)
+        assert report["summary"] == {"total": 5}
+        assert [comment["resolved"] for comment in report["comments"]] == [None, None, None, False, True]
+
+    def test_missing_pull_request(self, fake_github):
+        """Test that API failures are reported with a non-zero exit code."""
+        result = run_script(HUMAN_REVIEWS_SCRIPT, "owner/repo", "404")
+
+        assert result.returncode == 1
+        assert "❌ Error" in result.stderr.decode()
+
+
+class TestReviewStore:
+    """Test cases for the review store filled by the scripts."""
+
+    async def test_scripts_record_comments_for_the_server(self, github_routes):
+        """Test that a review session can be queried from the store by the MCP server tool."""
+        for script, args in ((CODERABBIT_SCRIPT, ("owner/repo", "7")), (HUMAN_REVIEWS_SCRIPT, ("owner/repo", "7"))):
+            result = run_script(script, *args)
+            assert result.returncode == 0, result.stderr.decode()
+        github_routes.requests.clear()
+
+        nitpicks = await query_review_comments.fn("owner/repo", 7, category="nitpicks", since_commit="abc123")
+        human = await query_review_comments.fn("owner/repo", 7, source="human")
+
+        assert nitpicks["total"] == 3
+        assert all(comment["priority"] == "LOW" and comment["review_id"] == 13 for comment in nitpicks["comments"])
+        assert human["total"] > 0
+        assert (await query_review_comments.fn("owner/repo", 7, source="human", unresolved_only=True))[
+            "total"
+        ] == human["total"] - 1
+        assert all(comment["author"] != "coderabbitai[bot]" for comment in human["comments"])
+        assert github_routes.requests == []
+
+    async def test_stream_mode_records_comments(self, github_routes, monkeypatch):
+        """Test that streamed comments are recorded like the ones of the full report."""
+        monkeypatch.setenv("CODERABBIT_STREAM", "1")
+        assert run_script(CODERABBIT_SCRIPT, "owner/repo", "7").returncode == 0
+
+        assert (await query_review_comments.fn("owner/repo", 7, source="coderabbit"))["total"] == 10
+
+
+class TestHelperDaemon:
+    """Test cases for the scripts sharing connections through the helper daemon."""
+
+    @pytest.fixture
+    def daemon_env(self, github_routes, monkeypatch):
+        """Enable the daemon on a private socket and stop it after the test."""
+        socket_dir = Path(tempfile.mkdtemp(prefix="ghd-", dir="/tmp"))
+        monkeypatch.setenv("AI_PROMPTS_MCP_DAEMON", "on")
+        monkeypatch.setenv("AI_PROMPTS_MCP_DAEMON_SOCKET", str(socket_dir / "github.sock"))
+        yield
+        subprocess.run([sys.executable, "-m", "mcp_server.utils.github_daemon", "stop"], capture_output=True)
+        shutil.rmtree(socket_dir, ignore_errors=True)
+
+    def test_one_connection_per_session(self, daemon_env, github_routes, test_data_dir):
+        """Test that a full review session opens a single connection to GitHub."""
+        for _ in range(2):
+            result = run_script(CODERABBIT_SCRIPT, "owner/repo", "7")
+            assert result.returncode == 0, result.stderr.decode()
+            assert result.stdout == (test_data_dir / "review-scripts" / "coderabbit-comments.json").read_bytes()
+        result = run_script(HUMAN_REVIEWS_SCRIPT, "owner/repo", "7")
+
+        assert result.returncode == 0, result.stderr.decode()
+        assert result.stdout == (test_data_dir / "review-scripts" / "human-reviews.json").read_bytes()
+        assert github_routes.connections == 1
@@ -0,0 +1,153 @@
+"""Tests for mcp_server.utils.candidate_files module."""
+
+import pytest
+
+from mcp_server.utils.candidate_files import (
+    FileScan,
+    FileScanCache,
+    candidate_files_page,
+    restates,
+    scan_source,
+)
+
+COMMENTED = "# create the user\nuser = create_user(name)\n# Retry because the API drops connections\nretry()\n"
+LONG = "x = '" + "a" * 130 + "'\n"
+
+
+def write(checkout, name, content):
+    path = checkout.path / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+
+
+class TestCandidateFilesPage:
+    """Test cases for candidate_files_page function."""
+
+    def test_changed_files_by_comments(self, pr_checkout):
+        """Test that changed source files are ranked by comments and files without any are left out."""
+        write(pr_checkout, "src/commented.py", COMMENTED)
+        write(pr_checkout, "src/light.py", "# Why this exists\nvalue = compute()\n" + "a = 1\n" * 8)
+        write(pr_checkout, "notes.md", "# Title\n")
+
+        page = candidate_files_page(pr_checkout.path)
+
+        assert [entry["path"] for entry in page["files"]] == ["src/commented.py", "src/light.py"]
+        assert page["files_scanned"] == 3
+        first = page["files"][0]
+        assert (first["comment_lines"], first["restating_comments"], first["comment_density"]) == (2, 1, 0.5)
+        assert first["score"] == 3.0
+
+    def test_formatting(self, pr_checkout):
+        """Test that files are ranked by formatting hotspots."""
+        write(pr_checkout, "src/long.py", LONG * 2)
+        write(pr_checkout, "src/mixed.py", "if x:\n \tpass\ny = 1   \n")
+
+        page = candidate_files_page(pr_checkout.path, purpose="formatting")
+
+        assert [(entry["path"], entry["score"]) for entry in page["files"]] == [
+            ("src/mixed.py", 3.0),
+            ("src/long.py", 2.0),
+        ]
+
+    def test_scopes(self, pr_checkout):
+        """Test that the recent scope adds committed files and the all scope every file."""
+        write(pr_checkout, "src/old.py", LONG)
+        pr_checkout("add", "src/old.py")
+        pr_checkout("commit", "-q", "-m", "Old")
+        pr_checkout("update-ref", "refs/remotes/origin/main", "HEAD")
+
+        def paths(scope, **kwargs):
+            page = candidate_files_page(pr_checkout.path, purpose="formatting", scope=scope, **kwargs)
+            return [entry["path"] for entry in page["files"]]
+
+        assert paths("changed") == []
+        assert paths("recent") == ["src/old.py"]
+        assert paths("all") == ["src/old.py"]
+
+    def test_pages(self, pr_checkout):
+        """Test that the pages list every candidate once and a stale cursor is refused."""
+        for n in range(5):
+            write(pr_checkout, f"pkg/file_{n}.py", LONG * (n + 1))
+
+        first = candidate_files_page(pr_checkout.path, purpose="formatting", page_size=2)
+        second = candidate_files_page(pr_checkout.path, purpose="formatting", page_size=2, cursor=first["next_cursor"])
+
+        assert [entry["path"] for entry in first["files"] + second["files"]] == [
+            "pkg/file_4.py",
+            "pkg/file_3.py",
+            "pkg/file_2.py",
+            "pkg/file_1.py",
+        ]
+        assert first["candidates"] == 5
+        write(pr_checkout, "pkg/file_0.py", LONG * 9)
+        with pytest.raises(ValueError, match="start again without a cursor"):
+            candidate_files_page(pr_checkout.path, purpose="formatting", page_size=2, cursor=second["next_cursor"])
+
+    def test_scans_are_cached(self, pr_checkout):
+        """Test that unchanged files are not read again."""
+        cache = FileScanCache()
+        write(pr_checkout, "src/a.py", COMMENTED)
+        write(pr_checkout, "src/b.py", COMMENTED)
+        candidate_files_page(pr_checkout.path, cache=cache)
+        scanned = cache.scanned
+
+        candidate_files_page(pr_checkout.path, cache=cache)
+        assert cache.scanned == scanned
+
+        write(pr_checkout, "src/b.py", COMMENTED * 2)
+        candidate_files_page(pr_checkout.path, cache=cache)
+        assert cache.scanned == scanned + 1
+
+    def test_binary_files_are_skipped(self, pr_checkout):
+        """Test that files with NUL bytes are not scanned."""
+        (pr_checkout.path / "src" / "blob.py").write_bytes(b"# x\0\n")
+
+        assert candidate_files_page(pr_checkout.path)["files_scanned"] == 1
+
+    @pytest.mark.parametrize(
+        "kwargs, message",
+        [
+            ({"purpose": "speed"}, "Unknown purpose"),
+            ({"scope": "everything"}, "Unknown scope"),
+            ({"page_size": 0}, "page_size"),
+            ({"since_days": 0}, "since_days"),
+        ],
+    )
+    def test_invalid_arguments(self, pr_checkout, kwargs, message):
+        """Test that unknown and out of range arguments are rejected."""
+        with pytest.raises(ValueError, match=message):
+            candidate_files_page(pr_checkout.path, **kwargs)
+
+
+class TestScanning:
+    """Test cases for the line scanner."""
+
+    def test_block_comments(self):
+        """Test C-style line and block comments."""
+        source = "/* License\n * text\n */\n// get the user name\nconst userName = getUserName();\n"
+
+        assert scan_source(source, ".ts") == FileScan(lines=5, comment_lines=4, restating_comments=1)
+
+    def test_kept_comments(self):
+        """Test that directives and TODOs are never counted as restating."""
+        source = "#!/usr/bin/env python\n# TODO: run\nrun()\n# type: ignore\nignore()\n"
+
+        assert scan_source(source, ".py").restating_comments == 0
+
+    def test_blank_line_ends_a_comment(self):
+        """Test that a comment is compared with the code right below it only."""
+        assert scan_source("# load config\n\nload_config()\n", ".py").restating_comments == 0
+
+    @pytest.mark.parametrize(
+        "comment, code, expected",
+        [
+            ("increment the counter", "counter += 1", False),
+            ("increment the counter", "increment_counter()", True),
+            ("Create the users", "createUser(name)", True),
+            ("Retry because the API drops connections", "retry()", False),
+            ("", "x = 1", False),
+        ],
+    )
+    def test_restates(self, comment, code, expected):
+        """Test the restating comment heuristic."""
+        assert restates(comment, code) is expected
@@ -0,0 +1,229 @@
+"""Tests for mcp_server.utils.changed_hunks module."""
+
+import subprocess
+
+import pytest
+
+from mcp_server.utils.changed_hunks import (
+    ChangedFile,
+    ChangedHunksError,
+    ChangeSet,
+    changed_hunks_page,
+    parse_name_status,
+    parse_numstat,
+    risk_of,
+    split_hunks,
+)
+from mcp_server.utils.review_pages import decode_cursor
+
+
+def write_lines(path, count, prefix="value"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(f"{prefix}_{n} = {n}\n" for n in range(count)), encoding="utf-8")
+
+
+class TestChangeSet:
+    """Test cases for ChangeSet.for_checkout."""
+
+    def test_branch_changes_against_the_merge_base(self, pr_checkout):
+        """Test that the committed changes of the branch are taken against origin/main."""
+        changes = ChangeSet.for_checkout(pr_checkout.path / "src")
+
+        assert changes.base == pr_checkout("rev-parse", "origin/main")
+        assert [(f.path, f.status, f.added, f.deleted) for f in changes.files] == [
+            ("src/module_0.py", "modified", 2, 2)
+        ]
+
+    def test_uncommitted_and_untracked_files(self, pr_checkout):
+        """Test that working tree edits and untracked files are part of the changes."""
+        (pr_checkout.path / "src" / "module_1.py").write_text("changed\n", encoding="utf-8")
+        write_lines(pr_checkout.path / "notes" / "new.py", 5)
+        (pr_checkout.path / "image.bin").write_bytes(b"\0\1\2")
+
+        files = {f.path: f for f in ChangeSet.for_checkout(pr_checkout.path).files}
+
+        assert (files["src/module_1.py"].added, files["src/module_1.py"].deleted) == (1, 40)
+        assert (files["notes/new.py"].status, files["notes/new.py"].added) == ("untracked", 5)
+        assert files["image.bin"].binary
+
+    def test_ranking(self, pr_checkout):
+        """Test that risky paths rank above larger but low-risk changes."""
+        write_lines(pr_checkout.path / "src" / "auth.py", 10)
+        write_lines(pr_checkout.path / "tests" / "test_big.py", 30)
+        write_lines(pr_checkout.path / "README.md", 40)
+        pr_checkout("add", ".")
+
+        changes = ChangeSet.for_checkout(pr_checkout.path)
+
+        assert [f.path for f in changes.files] == ["src/auth.py", "tests/test_big.py", "README.md", "src/module_0.py"]
+        assert changes.files[0].risk == ["security"]
+        assert changes.files[0].score == 20.0
+
+    def test_renamed_file(self, pr_checkout):
+        """Test that a rename is reported with its old path."""
+        pr_checkout("mv", "src/module_1.py", "src/renamed.py")
+
+        renamed = next(f for f in ChangeSet.for_checkout(pr_checkout.path).files if f.path == "src/renamed.py")
+
+        assert (renamed.status, renamed.old_path, renamed.added) == ("renamed", "src/module_1.py", 0)
+
+    def test_explicit_base_ref(self, pr_checkout):
+        """Test that an unknown base ref is an error rather than a silent fallback."""
+        with pytest.raises(ChangedHunksError):
+            ChangeSet.for_checkout(pr_checkout.path, "no-such-branch")
+
+    def test_without_default_branch(self, pr_checkout):
+        """Test that only uncommitted changes are listed when there is no base branch."""
+        pr_checkout("update-ref", "-d", "refs/remotes/origin/main")
+
+        assert ChangeSet.for_checkout(pr_checkout.path).files == []
+
+    def test_before_the_first_commit(self, tmp_path):
+        """Test that the files of a repository without commits are all new."""
+        (tmp_path / "a.py").write_text("x = 1\n", encoding="utf-8")
+        subprocess.run(["git", "-C", str(tmp_path), "init", "-q"], check=True)
+        subprocess.run(["git", "-C", str(tmp_path), "add", "a.py"], check=True)
+
+        changes = ChangeSet.for_checkout(tmp_path)
+
+        assert [(f.path, f.status, f.added) for f in changes.files] == [("a.py", "added", 1)]
+
+    def test_not_a_checkout(self, tmp_path):
+        """Test the error outside a git checkout."""
+        with pytest.raises(ChangedHunksError):
+            ChangeSet.for_checkout(tmp_path)
+
+
+class TestChangedHunksPage:
+    """Test cases for changed_hunks_page function."""
+
+    def test_first_page(self, pr_checkout):
+        """Test the hunks of a small change with the requested context."""
+        page = changed_hunks_page(pr_checkout.path, context_lines=1)
+
+        assert page["files_changed"] == 1
+        assert (page["lines_added"], page["lines_deleted"]) == (2, 2)
+        assert page["next_cursor"] is None
+        [entry] = page["files"]
+        assert entry["path"] == "src/module_0.py"
+        assert entry["hunks"] == [
+            "@@ -1,4 +1,4 @@\n line_1 = 1\n-line_2 = 2\n-line_3 = 3\n+line_2 = 'two'\n+line_3 = 'three'\n line_4 = 4\n"
+        ]
+
+    def test_pages_fit_the_budget(self, pr_checkout):
+        """Test that files are spread over pages within the budget, each listed once."""
+        for n in range(6):
+            write_lines(pr_checkout.path / "pkg" / f"file_{n}.py", 60, prefix=f"name_{n}")
+
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            page = changed_hunks_page(pr_checkout.path, cursor=cursor, token_budget=500)
+            pages += 1
+            assert page["estimated_tokens"] <= 500
+            seen += [entry["path"] for entry in page["files"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert pages > 1
+        assert sorted(seen) == sorted([f"pkg/file_{n}.py" for n in range(6)] + ["src/module_0.py"])
+
+    def test_large_file_is_cut(self, pr_checkout):
+        """Test that a file larger than the budget gets the hunks that fit."""
+        path = pr_checkout.path / "src" / "module_1.py"
+        lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+        for n in range(0, 40, 8):
+            lines[n] = f"changed_{n} = {'x' * 400}\n"
+        path.write_text("".join(lines), encoding="utf-8")
+
+        page = changed_hunks_page(pr_checkout.path, context_lines=0, token_budget=500)
+
+        entry = page["files"][0]
+        assert entry["path"] == "src/module_1.py"
+        assert entry["hunks"] and entry["omitted_hunks"] > 0
+        assert len(entry["hunks"]) + entry["omitted_hunks"] == 5
+        assert page["estimated_tokens"] <= 500
+
+    def test_stale_cursor(self, pr_checkout):
+        """Test that a cursor is refused once the changes are different."""
+        for n in range(3):
+            write_lines(pr_checkout.path / "pkg" / f"file_{n}.py", 60)
+        cursor = changed_hunks_page(pr_checkout.path, token_budget=500)["next_cursor"]
+        (pr_checkout.path / "src" / "module_1.py").write_text("changed\n", encoding="utf-8")
+
+        with pytest.raises(ValueError, match="start again without a cursor"):
+            changed_hunks_page(pr_checkout.path, cursor=cursor, token_budget=500)
+
+    def test_cursor_names_the_changes(self, pr_checkout):
+        """Test that the cursor carries the signature of the changes and the next offset."""
+        for n in range(3):
+            write_lines(pr_checkout.path / "pkg" / f"file_{n}.py", 60)
+
+        page = changed_hunks_page(pr_checkout.path, token_budget=500)
+
+        signature, offset = decode_cursor(page["next_cursor"])
+        assert signature == ChangeSet.for_checkout(pr_checkout.path).signature
+        assert offset == len(page["files"])
+
+    @pytest.mark.parametrize(
+        "kwargs, message",
+        [
+            ({"context_lines": -1}, "context_lines"),
+            ({"context_lines": 21}, "context_lines"),
+            ({"token_budget": 100}, "token_budget"),
+            ({"cursor": "not a cursor"}, "Invalid cursor"),
+        ],
+    )
+    def test_invalid_arguments(self, pr_checkout, kwargs, message):
+        """Test that out of range arguments and malformed cursors are rejected."""
+        with pytest.raises(ValueError, match=message):
+            changed_hunks_page(pr_checkout.path, **kwargs)
+
+
+class TestParsing:
+    """Test cases for the git output parsers and the risk rules."""
+
+    def test_parse_numstat(self):
+        """Test text, binary and renamed files."""
+        output = "3\t1\ta.py\0-\t-\timage.png\0" + "0\t2\t\0old.py\0new.py\0"
+
+        assert parse_numstat(output, {"a.py": "added", "new.py": "renamed"}) == [
+            ChangedFile("a.py", "added", 3, 1),
+            ChangedFile("image.png", "modified", None, None),
+            ChangedFile("new.py", "renamed", 0, 2, old_path="old.py"),
+        ]
+
+    def test_parse_name_status(self):
+        """Test the status letters, renames included."""
+        output = "A\0a.py\0D\0b.py\0R100\0old.py\0new.py\0M\0c.py\0"
+
+        assert parse_name_status(output) == {
+            "a.py": "added",
+            "b.py": "deleted",
+            "new.py": "renamed",
+            "c.py": "modified",
+        }
+
+    def test_split_hunks(self):
+        """Test that the file header is dropped and each hunk keeps its lines."""
+        diff = "diff --git a/x b/x\n--- a/x\n+++ b/x\n@@ -1 +1 @@\n-a\n+b\n@@ -9 +9 @@\n-c\n+d\n"
+
+        assert split_hunks(diff) == ["@@ -1 +1 @@\n-a\n+b\n", "@@ -9 +9 @@\n-c\n+d\n"]
+
+    @pytest.mark.parametrize(
+        "path, weight, reasons",
+        [
+            ("src/app.py", 1.0, []),
+            ("src/auth/session.py", 2.0, ["security"]),
+            ("db/migrations/0001_init.py", 1.8, ["schema"]),
+            ("pyproject.toml", 1.5, ["build"]),
+            ("tests/test_auth.py", 1.0, ["security", "test"]),
+            ("docs/index.md", 0.3, ["docs"]),
+            ("uv.lock", 0.1, ["generated"]),
+        ],
+    )
+    def test_risk_of(self, path, weight, reasons):
+        """Test the weights of the risk rules."""
+        assert risk_of(path) == (pytest.approx(weight), reasons)
@@ -0,0 +1,664 @@
+"""Tests for mcp_server.utils.coderabbit module."""
+
+import io
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import pytest
+
+from mcp_server.utils.coderabbit import (
+    ACTIONABLE_COMMENTS,
+    DUPLICATE_COMMENTS,
+    NITPICK_COMMENTS,
+    OUTSIDE_DIFF_RANGE_COMMENTS,
+    SUMMARY_KEYS,
+    actionable_comment,
+    build_report,
+    comment_fingerprint,
+    drop_repeated,
+    dump_json,
+    dump_output,
+    fetch_review_report,
+    is_positive_feedback,
+    iter_review_comments,
+    main,
+    parse_review_body,
+    select_latest_review,
+    stream_review_report,
+    without_repeated,
+    without_stale,
+)
+from mcp_server.utils.diff_index import DiffIndex
+from mcp_server.utils.github_api import GitHubClient, RateLimitScheduler
+from mcp_server.utils.review_store import ReviewStore
+
+GOLDEN_BODIES = ["full-review", "nitpicks-only", "no-comments"]
+
+
+def synthetic_review_body(files: int, comments_per_file: int, paragraphs: int = 1) -> str:
+    """Build a large CodeRabbit-style body with nitpicks spread over many files."""
+    parts = [
+        "**Actionable comments posted: 0**",
+        "",
+        "<details>",
+        f"<summary>🧹 Nitpick comments ({files * comments_per_file})</summary><blockquote>",
+        "",
+    ]
+    for file_index in range(files):
+        parts += ["<details>", f"<summary>src/module_{file_index}.py ({comments_per_file})</summary><blockquote>", ""]
+        for comment_index in range(comments_per_file):
+            start = comment_index * 10 + 1
+            parts += [
+                f"`{start}-{start + 4}`: **Rename variable {file_index}-{comment_index}.**",
+                "",
+                *["The current name does not describe what the value holds. " * 3, ""] * paragraphs,
+                "```python",
+                "value = compute()",
+                "```",
+                "",
+                "---",
+                "",
+            ]
+        parts += ["</blockquote></details>", ""]
+    parts += ["</blockquote></details>", "", "<details>", "<summary>📜 Review details</summary>", "</details>"]
+    return "\n".join(parts)
+
+
+def serve_review(fake_github, body: str, inline_comments: list | None = None) -> int:
+    """Serve a CodeRabbit review of commit abc on o/r#1, returning the body size in bytes."""
+    review = {"id": 1, "user": {"login": "coderabbitai[bot]"}, "body": body, "commit_id": "abc", "submitted_at": "1"}
+    # Pre-encoded, so serving the responses allocates nothing in the measured process
+    fake_github.routes["/repos/o/r/pulls/1/reviews?per_page=100"] = (200, {}, json.dumps([review]).encode())
+    fake_github.routes["/repos/o/r/pulls/1/reviews/1"] = (200, {}, json.dumps(review).encode())
+    fake_github.routes["/repos/o/r/pulls/1/reviews/1/comments"] = (200, {}, json.dumps(inline_comments or []).encode())
+    return len(body.encode())
+
+
+def serve_reviews(fake_github, bodies: list[str]) -> None:
+    """Serve one CodeRabbit review per body on o/r#1, review N being of commit c00N."""
+    reviews = [
+        {"id": n, "user": {"login": "coderabbitai[bot]"}, "body": body, "commit_id": f"c{n:03}", "submitted_at": f"{n}"}
+        for n, body in enumerate(bodies, 1)
+    ]
+    fake_github.routes["/repos/o/r/pulls/1/reviews?per_page=100"] = (200, {}, reviews)
+    for review in reviews:
+        fake_github.routes[f"/repos/o/r/pulls/1/reviews/{review['id']}"] = (200, {}, review)
+        fake_github.routes[f"/repos/o/r/pulls/1/reviews/{review['id']}/comments"] = (200, {}, [])
+
+
+class TestParseReviewBodyGolden:
+    """Golden-file tests; expected outputs were produced by the original awk programs, in document order."""
+
+    @pytest.mark.parametrize("name", GOLDEN_BODIES)
+    def test_matches_golden_file(self, test_data_dir, name):
+        """Test that every category matches the awk output."""
+        body = (test_data_dir / "coderabbit" / f"{name}.md").read_text(encoding="utf-8")
+        expected = json.loads((test_data_dir / "coderabbit" / f"{name}.json").read_text(encoding="utf-8"))
+
+        assert parse_review_body(body) == expected
+
+    @pytest.mark.parametrize("name", GOLDEN_BODIES)
+    def test_streamed_lines_match_golden_file(self, test_data_dir, name):
+        """Test that parsing a stream of lines gives the same result as parsing the whole body."""
+        expected = json.loads((test_data_dir / "coderabbit" / f"{name}.json").read_text(encoding="utf-8"))
+
+        with open(test_data_dir / "coderabbit" / f"{name}.md", encoding="utf-8") as body_file:
+            assert parse_review_body(body_file) == expected
+
+
+class TestParseReviewBody:
+    """Test cases for parse_review_body edge cases."""
+
+    def test_empty_body(self):
+        """Test that an empty body has no comments in any category."""
+        assert parse_review_body("") == {
+            NITPICK_COMMENTS: [],
+            DUPLICATE_COMMENTS: [],
+            OUTSIDE_DIFF_RANGE_COMMENTS: [],
+        }
+
+    def test_non_file_summary_keeps_current_file(self):
+        """Test that summaries without a slash or dot do not switch the current file."""
+        body = "\n".join([
+            "<summary>🧹 Nitpick comments (2)</summary><blockquote>",
+            "<summary>src/a.py (1)</summary><blockquote>",
+            "`1`: **First**",
+            "<summary>Proposed fix (1)</summary>",
+            "`2`: **Second**",
+        ])
+
+        nitpicks = parse_review_body(body)[NITPICK_COMMENTS]
+
+        assert [(comment["file"], comment["title"]) for comment in nitpicks] == [
+            ("src/a.py", "First"),
+            ("src/a.py", "Second"),
+        ]
+
+    def test_blocks_before_a_file_summary_are_ignored(self):
+        """Test that block headers outside a file section are not comments."""
+        body = "<summary>🧹 Nitpick comments (1)</summary>\n`1`: **Not in a file section**"
+
+        assert parse_review_body(body)[NITPICK_COMMENTS] == []
+
+    def test_body_cleanup(self):
+        """Test removal of code fences, HTML tags and blank lines from the body."""
+        body = "\n".join([
+            "<summary>🧹 Nitpick comments (1)</summary>",
+            "<summary>a.py (1)</summary>",
+            "`3-4`: **Title**",
+            "<b>Bold</b> text",
+            "inline ```code``` here",
+            "---",
+        ])
+
+        assert parse_review_body(body)[NITPICK_COMMENTS][0]["body"] == "`3-4`: **Title**\nBold text\ninline  here"
+
+    def test_backslashes_are_kept_literally(self):
+        """Test that backslashes survive (the awk escaping made jq reinterpret or reject them)."""
+        body = "<summary>🧹 Nitpick comments (1)</summary>\n<summary>a.py (1)</summary>\n`1`: **Use `\\n`**\nC:\\temp"
+
+        comment = parse_review_body(body)[NITPICK_COMMENTS][0]
+
+        assert comment["title"] == "Use `\\n`"
+        assert comment["body"].endswith("C:\\temp")
+
+    def test_duplicate_section_stops_at_nitpicks(self):
+        """Test that duplicate parsing ends where the nitpick section begins."""
+        body = "\n".join([
+            "<summary>♻️ Duplicate comments (1)</summary>",
+            "<summary>a.py (1)</summary>",
+            "`1`: **Duplicate**",
+            "<summary>🧹 Nitpick comments (1)</summary>",
+            "<summary>b.py (1)</summary>",
+            "`2`: **Nitpick**",
+        ])
+
+        result = parse_review_body(body)
+
+        assert [comment["title"] for comment in result[DUPLICATE_COMMENTS]] == ["Duplicate"]
+        assert [comment["title"] for comment in result[NITPICK_COMMENTS]] == ["Nitpick"]
+
+    def test_same_title_in_other_files_is_kept(self):
+        """Test that findings sharing a title in different files all survive, in document order."""
+        body = "\n".join([
+            "<summary>♻️ Duplicate comments (2)</summary>",
+            "<summary>b.py (1)</summary>",
+            "`1`: **Avoid the private API.**",
+            "Uses `_private` here.",
+            "<summary>a.py (1)</summary>",
+            "`9`: **Avoid the private API.**",
+            "Uses `_private` there too.",
+        ])
+
+        result = parse_review_body(body)
+        report = build_report([], body)
+
+        assert [(comment["file"], comment["line"]) for comment in result[DUPLICATE_COMMENTS]] == [
+            ("b.py", "1"),
+            ("a.py", "9"),
+        ]
+        assert report[DUPLICATE_COMMENTS] == result[DUPLICATE_COMMENTS]
+        assert report["summary"]["duplicates"] == 2
+
+    def test_stops_reading_after_review_details(self):
+        """Test that the stream is not consumed past the review details section."""
+        consumed = []
+
+        def lines():
+            for line in ["<summary>📜 Review details</summary>", "more", "lines"]:
+                consumed.append(line)
+                yield line
+
+        assert list(iter_review_comments(lines())) == []
+        assert consumed == ["<summary>📜 Review details</summary>"]
+
+
+class TestDumpJson:
+    """Test cases for dump_json function."""
+
+    def test_matches_jq_pretty_print(self):
+        """Test that output is byte-identical to `jq '.'`."""
+        document = {"summary": {"total": 1}, "empty": [], "obj": {}, "text": 'é "q" \x01\x7f\t/'}
+
+        jq_output = subprocess.run(
+            ["jq", "."], input=json.dumps(document).encode(), capture_output=True, check=True
+        ).stdout.decode()
+
+        assert dump_json(document) + "\n" == jq_output
+
+
+class TestDumpOutput:
+    """Test cases for dump_output function."""
+
+    def test_formats(self):
+        """Test the pretty, compact and NDJSON serializations."""
+        document = {"summary": {"total": 2}}
+        records = [{"category": NITPICK_COMMENTS, "title": "é"}, {"category": NITPICK_COMMENTS, "title": "b"}]
+
+        assert dump_output(document, "pretty") == dump_json(document)
+        assert dump_output({**document, "x": [1]}, "compact") == '{"summary":{"total":2},"x":[1]}'
+        assert dump_output(document, "ndjson", records).splitlines() == [
+            '{"category":"nitpick_comments","title":"é"}',
+            '{"category":"nitpick_comments","title":"b"}',
+            '{"summary":{"total":2}}',
+        ]
+        with pytest.raises(ValueError, match="Unknown output format"):
+            dump_output(document, "yaml")
+
+
+class TestActionableComment:
+    """Test cases for actionable_comment function."""
+
+    def test_prompt_for_ai_agents_replaces_body(self):
+        """Test that the fenced AI prompt becomes the body, without surrounding newlines."""
+        comment = {
+            "path": "a.py",
+            "body": "_⚠️ Potential issue_\n\n**Fix it.**\n\n<summary>🤖 Prompt for AI Agents</summary>\n\n```\n\nDo X.\n\n```",
+        }
+
+        assert actionable_comment(comment) == {"priority": "HIGH", "title": "Fix it.", "file": "a.py", "body": "Do X."}
+
+    def test_body_without_prompt_is_kept(self):
+        """Test that comments without an AI prompt keep their whole body."""
+        comment = {"path": "a.py", "body": "_Note_\n\n**Title**\n\nDetails"}
+
+        assert actionable_comment(comment)["body"] == comment["body"]
+
+    def test_short_body_has_no_title(self):
+        """Test that a body with fewer than three lines has a null title."""
+        assert actionable_comment({"path": "a.py", "body": "One line"})["title"] is None
+
+
+class TestSelectLatestReview:
+    """Test cases for select_latest_review function."""
+
+    def test_latest_substantial_coderabbit_review_of_commit(self):
+        """Test filtering by author, body length and commit, then picking the latest."""
+        long_body = "x" * 101
+        reviews = [
+            {"id": 1, "user": {"login": "coderabbitai[bot]"}, "body": long_body, "commit_id": "a", "submitted_at": "2"},
+            {"id": 2, "user": {"login": "coderabbitai[bot]"}, "body": long_body, "commit_id": "a", "submitted_at": "3"},
+            {"id": 3, "user": {"login": "coderabbitai[bot]"}, "body": "short", "commit_id": "a", "submitted_at": "4"},
+            {"id": 4, "user": {"login": "coderabbitai[bot]"}, "body": long_body, "commit_id": "b", "submitted_at": "5"},
+            {"id": 5, "user": {"login": "alice"}, "body": long_body, "commit_id": "a", "submitted_at": "6"},
+            {
+                "id": 6,
+                "user": {"login": "coderabbitai[bot]"},
+                "body": long_body,
+                "commit_id": "a",
+                "submitted_at": None,
+            },
+        ]
+
+        assert select_latest_review(reviews, "a")["id"] == 2
+        assert select_latest_review(reviews, "c") is None
+
+
+class TestBuildReport:
+    """Test cases for build_report function."""
+
+    def test_empty_sections_are_omitted(self):
+        """Test that only non-empty sections appear in the summary and the report."""
+        report = build_report([], "")
+
+        assert report == {"summary": {"total": 0}}
+
+    def test_positive_duplicates_are_filtered(self, test_data_dir):
+        """Test that approving duplicates are dropped and the counts recomputed."""
+        body = (test_data_dir / "coderabbit" / "full-review.md").read_text(encoding="utf-8")
+        inline = [{"path": "a.py", "body": "_Issue_\n\n**Title**\n\nBody"}]
+
+        report = build_report(inline, body)
+
+        assert list(report) == [
+            "summary",
+            ACTIONABLE_COMMENTS,
+            NITPICK_COMMENTS,
+            DUPLICATE_COMMENTS,
+            OUTSIDE_DIFF_RANGE_COMMENTS,
+        ]
+        assert report["summary"] == {
+            "actionable": 1,
+            "nitpicks": 3,
+            "duplicates": 2,
+            "outside_diff_range": 2,
+            "total": 8,
+        }
+        assert not any(is_positive_feedback(comment) for comment in report[DUPLICATE_COMMENTS])
+
+    def test_duplicates_section_kept_when_all_filtered(self):
+        """Test that the duplicates section stays (empty) when every duplicate is an approval."""
+        body = "<summary>♻️ Duplicate comments (1)</summary>\n<summary>a.py (1)</summary>\n`1`: **LGTM**"
+
+        report = build_report([], body)
+
+        assert report == {"summary": {"duplicates": 0, "total": 0}, DUPLICATE_COMMENTS: []}
+
+
+class TestCommentFingerprint:
+    """Test cases for comment_fingerprint function."""
+
+    def test_decoration_case_and_punctuation_are_ignored(self):
+        """Test that the same finding gets the same fingerprint in differently formatted sections."""
+        quoted = {
+            "title": "Rename the variable.",
+            "file": "a.py",
+            "line": "3-5",
+            "body": "> `3-5`: **Rename the variable.**\n> _⚠️ Potential issue_\n> The name is *unclear*.",
+        }
+        plain = {"title": "Rename", "file": "a.py", "line": "3 - 5", "body": "The  NAME is unclear!"}
+
+        assert comment_fingerprint(quoted) == comment_fingerprint(plain)
+
+    def test_file_and_line_range_matter(self):
+        """Test that the same text on other lines or files is a different finding."""
+        comment = {"file": "a.py", "line": "7", "body": "Fix this"}
+
+        assert comment_fingerprint(comment) == comment_fingerprint({**comment, "line": "7-7"})
+        assert comment_fingerprint(comment) != comment_fingerprint({**comment, "line": "8"})
+        assert comment_fingerprint(comment) != comment_fingerprint({**comment, "file": "b.py"})
+        assert comment_fingerprint(comment) != comment_fingerprint({**comment, "body": "Fix that"})
+
+
+class TestRepeatedFindings:
+    """Test cases for dropping findings repeated across sections and reviews."""
+
+    def finding(self, text, title="Title"):
+        return {"priority": "LOW", "title": title, "file": "a.py", "line": "1", "body": text}
+
+    def test_most_important_section_keeps_the_finding(self):
+        """Test that a repeated finding is kept once, in the highest priority section."""
+        sections = {
+            NITPICK_COMMENTS: [self.finding("Same"), self.finding("Other")],
+            DUPLICATE_COMMENTS: [self.finding("Same")],
+            OUTSIDE_DIFF_RANGE_COMMENTS: [self.finding("Same")],
+        }
+        seen = set()
+
+        assert drop_repeated(sections, seen) == 2
+        assert sections == {NITPICK_COMMENTS: [self.finding("Other")], DUPLICATE_COMMENTS: [self.finding("Same")]}
+        assert len(seen) == 2
+
+    def test_summary_counts_repeats(self):
+        """Test that the summary is recomputed and counts the dropped comments."""
+        report = build_report([], "")
+        report.update({NITPICK_COMMENTS: [self.finding("A"), self.finding("B")]})
+
+        result = without_repeated(report, {comment_fingerprint(self.finding("A"))})
+
+        assert result == {"summary": {"nitpicks": 1, "total": 1, "repeated": 1}, NITPICK_COMMENTS: [self.finding("B")]}
+
+    def test_findings_of_earlier_reviews_are_skipped(self, fake_github):
+        """Test that a later review only reports new findings, while the store keeps all of them."""
+        serve_reviews(
+            fake_github,
+            [synthetic_review_body(files=1, comments_per_file=2), synthetic_review_body(files=1, comments_per_file=3)],
+        )
+        client = GitHubClient(scheduler=RateLimitScheduler(rate=1000.0))
+
+        with ReviewStore() as store:
+            first = fetch_review_report(client, "o", "r", "1", "c001", store=store)
+            second = fetch_review_report(client, "o", "r", "1", "c002", store=store)
+            everything = fetch_review_report(client, "o", "r", "1", "c002", store=store, keep_repeated=True)
+            stored = store.query_comments("o/r", 1, since_commit="c002")
+
+        assert first["summary"] == {"nitpicks": 2, "total": 2}
+        assert second["summary"] == {"nitpicks": 1, "total": 1, "repeated": 2}
+        assert second[NITPICK_COMMENTS][0]["title"] == "Rename variable 0-2."
+        assert everything["summary"] == {"nitpicks": 3, "total": 3}
+        assert len(stored) == 3
+
+    def test_rerunning_a_review_reports_it_again(self, fake_github):
+        """Test that a review is never deduplicated against its own recorded comments."""
+        serve_reviews(fake_github, [synthetic_review_body(files=1, comments_per_file=2)])
+        client = GitHubClient(scheduler=RateLimitScheduler(rate=1000.0))
+
+        with ReviewStore() as store:
+            reports = [fetch_review_report(client, "o", "r", "1", "c001", store=store) for _ in range(2)]
+
+        assert reports[0] == reports[1]
+        assert reports[1]["summary"] == {"nitpicks": 2, "total": 2}
+
+    def test_streamed_repeats_are_looked_up_in_the_store(self, fake_github):
+        """Test that stream mode skips repeated findings, counting them in the summary."""
+        serve_reviews(
+            fake_github,
+            [synthetic_review_body(files=1, comments_per_file=2), synthetic_review_body(files=1, comments_per_file=3)],
+        )
+        client = GitHubClient(scheduler=RateLimitScheduler(rate=1000.0))
+        out = io.StringIO()
+
+        with ReviewStore() as store:
+            fetch_review_report(client, "o", "r", "1", "c001", store=store)
+            stream_review_report(client, "o", "r", "1", "c002", out, store=store)
+            assert len(store.query_comments("o/r", 1)) == 5
+
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [record.get("title") for record in records[:-1]] == ["Rename variable 0-2."]
+        assert records[-1] == {"summary": {"nitpicks": 1, "total": 1, "repeated": 2}}
+
+
+class TestStaleComments:
+    """Test cases for comments on code the local checkout no longer changes."""
+
+    def serve_checkout_review(self, fake_github, pr_checkout):
+        """Serve a review of the checkout's head with nitpicks on lines 1-5, 11-15 and 21-25 of src/module_0.py."""
+        serve_reviews(fake_github, [synthetic_review_body(files=1, comments_per_file=3)])
+        reviews = fake_github.routes["/repos/o/r/pulls/1/reviews?per_page=100"][2]
+        reviews[0]["commit_id"] = pr_checkout.sha
+
+    def test_outside_diff_range_comments_are_kept(self):
+        """Test that only comments expected on changed lines are checked."""
+        report = build_report([], "")
+        report.update({
+            NITPICK_COMMENTS: [{"file": "a.py", "line": "1"}, {"file": "a.py", "line": "90"}],
+            OUTSIDE_DIFF_RANGE_COMMENTS: [{"file": "a.py", "line": "90"}],
+        })
+        report["summary"]["repeated"] = 1
+
+        result = without_stale(report, DiffIndex({"a.py": [(1, 1)]}), "mark")
+
+        assert result["summary"] == {"nitpicks": 2, "outside_diff_range": 1, "total": 3, "repeated": 1, "stale": 1}
+        assert [comment.get("stale") for comment in result[NITPICK_COMMENTS]] == [None, True]
+        assert result[OUTSIDE_DIFF_RANGE_COMMENTS] == [{"file": "a.py", "line": "90"}]
+
+    def test_report_drops_stale_comments(self, fake_github, pr_checkout, monkeypatch):
+        """Test that the report of a PR checkout only keeps comments on changed lines, the store all of them."""
+        self.serve_checkout_review(fake_github, pr_checkout)
+        monkeypatch.chdir(pr_checkout.path)
+        client = GitHubClient(scheduler=RateLimitScheduler(rate=1000.0))
+
+        with ReviewStore() as store:
+            report = fetch_review_report(client, "o", "r", "1", pr_checkout.sha, store=store, stale="drop")
+            assert len(store.query_comments("o/r", 1)) == 3
+        kept = fetch_review_report(client, "o", "r", "1", pr_checkout.sha)
+
+        assert report["summary"] == {"nitpicks": 1, "total": 1, "stale": 2}
+        assert report[NITPICK_COMMENTS][0]["line"] == "1-5"
+        assert kept["summary"] == {"nitpicks": 3, "total": 3}
+
+    def test_stream_marks_stale_comments(self, fake_github, pr_checkout, monkeypatch):
+        """Test that stream mode flags stale comments and counts them in the summary."""
+        self.serve_checkout_review(fake_github, pr_checkout)
+        monkeypatch.chdir(pr_checkout.path)
+        out = io.StringIO()
+
+        client = GitHubClient(scheduler=RateLimitScheduler(rate=1000.0))
+        stream_review_report(client, "o", "r", "1", pr_checkout.sha, out, stale="mark")
+
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [record.get("stale", False) for record in records[:-1]] == [False, True, True]
+        assert records[-1] == {"summary": {"nitpicks": 3, "total": 3, "stale": 2}}
+
+    def test_command_line_drops_by_default(self, fake_github, pr_checkout, monkeypatch, capsys):
+        """Test that the report command drops stale comments unless told to keep them."""
+        self.serve_checkout_review(fake_github, pr_checkout)
+        monkeypatch.chdir(pr_checkout.path)
+
+        assert main(["report", "o", "r", "1", pr_checkout.sha]) == 0
+        assert json.loads(capsys.readouterr().out)["summary"]["stale"] == 2
+        assert main(["report", "--stale", "keep", "--full-resync", "o", "r", "1", pr_checkout.sha]) == 0
+        assert "stale" not in json.loads(capsys.readouterr().out)["summary"]
+
+
+class TestStreamReviewReport:
+    """Test cases for stream_review_report function."""
+
+    def make_client(self):
+        return GitHubClient(scheduler=RateLimitScheduler(rate=1000.0))
+
+    def test_records_match_report(self, fake_github, test_data_dir):
+        """Test that the streamed records hold the same comments as the full report, summary last."""
+        body = (test_data_dir / "coderabbit" / "full-review.md").read_text(encoding="utf-8")
+        inline = [{"path": "a.py", "body": "_Issue_\n\n**Title**\n\nBody"}]
+        serve_review(fake_github, body, inline)
+        out = io.StringIO()
+
+        assert stream_review_report(self.make_client(), "o", "r", "1", "abc", out)
+
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        report = build_report(inline, body)
+        assert records[-1] == {"summary": report["summary"]}
+        streamed = {category: [] for category in SUMMARY_KEYS}
+        for record in records[:-1]:
+            streamed[record.pop("category")].append(record)
+        for category, comments in streamed.items():
+            assert sorted(comments, key=str) == sorted(report[category], key=str)
+
+    def test_records_are_compact(self, fake_github):
+        """Test that each record is a single line of compact JSON."""
+        serve_review(fake_github, "x" * 200, [{"path": "a.py", "body": "a\nb\n**Title**"}])
+        out = io.StringIO()
+
+        stream_review_report(self.make_client(), "o", "r", "1", "abc", out)
+
+        assert out.getvalue().splitlines() == [
+            '{"category":"actionable_comments","priority":"HIGH","title":"Title","file":"a.py","body":"a\\nb\\n**Title**"}',
+            '{"summary":{"actionable":1,"total":1}}',
+        ]
+
+    def test_records_are_stored(self, fake_github, test_data_dir):
+        """Test that each written comment is recorded in the review store with its review."""
+        body = (test_data_dir / "coderabbit" / "full-review.md").read_text(encoding="utf-8")
+        serve_review(fake_github, body, [{"path": "a.py", "body": "_Issue_\n\n**Title**\n\nBody"}])
+        out = io.StringIO()
+
+        with ReviewStore() as store:
+            stream_review_report(self.make_client(), "o", "r", "1", "abc", out, store=store)
+            stored = store.query_comments("o/r", 1)
+            reviews = store.reviews("o/r", 1)
+
+        assert len(stored) == len(out.getvalue().splitlines()) - 1
+        assert stored[0]["category"] == "actionable" and stored[0]["priority"] == "HIGH"
+        assert {(comment["review_id"], comment["commit_sha"]) for comment in stored} == {(1, "abc")}
+        assert [review["review_id"] for review in reviews] == [1]
+
+    def test_no_review(self, fake_github):
+        """Test that nothing is written when there is no review for the commit."""
+        fake_github.routes["/repos/o/r/pulls/1/reviews?per_page=100"] = (200, {}, [])
+        out = io.StringIO()
+
+        assert not stream_review_report(self.make_client(), "o", "r", "1", "abc", out)
+        assert out.getvalue() == ""
+
+    def test_peak_memory_is_flat(self, fake_github):
+        """Test that peak memory does not grow with the review size, up to a 50 MB body."""
+
+        class CountingSink(io.TextIOBase):
+            records = 0
+
+            def write(self, text):
+                self.records += text.count("\n")
+                return len(text)
+
+        peaks = {}
+        for files in (36, 360):
+            size = serve_review(fake_github, synthetic_review_body(files=files, comments_per_file=40, paragraphs=20))
+            sink = CountingSink()
+            tracemalloc.start()
+            try:
+                stream_review_report(self.make_client(), "o", "r", "1", "abc", sink)
+                peaks[size] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            assert sink.records == files * 40 + 1
+
+        small, large = sorted(peaks)
+        assert large > 50_000_000
+        assert peaks[large] < 2 * peaks[small]
+        assert peaks[large] < large / 20
+
+
+class TestMain:
+    """Test cases for the command line entry point."""
+
+    def test_parse_reads_stdin(self, test_data_dir, monkeypatch, capsys):
+        """Test that the body is read from stdin and all categories are printed."""
+        body = (test_data_dir / "coderabbit" / "full-review.md").read_bytes()
+        monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(body)))
+
+        assert main(["parse"]) == 0
+
+        output = json.loads(capsys.readouterr().out)
+        assert len(output[NITPICK_COMMENTS]) == 3
+        assert len(output[DUPLICATE_COMMENTS]) == 3
+        assert len(output[OUTSIDE_DIFF_RANGE_COMMENTS]) == 2
+
+    def test_report_without_review(self, fake_github, capsys):
+        """Test the message when there is no CodeRabbit review for the commit."""
+        fake_github.routes["/repos/o/r/pulls/1/reviews?per_page=100"] = (200, {}, [])
+
+        assert main(["report", "o", "r", "1", "abc"]) == 1
+        assert capsys.readouterr().out == "❌ No CodeRabbit reviews found\n"
+
+    def test_report_stream(self, fake_github, capsys):
+        """Test that --stream prints records instead of the report."""
+        serve_review(fake_github, "x" * 200)
+
+        assert main(["report", "--stream", "o", "r", "1", "abc"]) == 0
+        assert capsys.readouterr().out == '{"summary":{"total":0}}\n'
+
+    def test_report_formats(self, fake_github, test_data_dir, capsys):
+        """Test that --format ndjson prints the sorted report one comment per line, summary last."""
+        serve_review(fake_github, (test_data_dir / "coderabbit" / "full-review.md").read_text(encoding="utf-8"))
+        assert main(["report", "o", "r", "1", "abc"]) == 0
+        report = json.loads(capsys.readouterr().out)
+
+        assert main(["report", "--format", "compact", "o", "r", "1", "abc"]) == 0
+        compact = capsys.readouterr().out
+        assert main(["report", "--format", "ndjson", "o", "r", "1", "abc"]) == 0
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+        assert compact.count("\n") == 1
+        assert json.loads(compact) == report
+        assert records[-1] == {"summary": report["summary"]}
+        assert [record["title"] for record in records[:-1] if record["category"] == NITPICK_COMMENTS] == [
+            comment["title"] for comment in report[NITPICK_COMMENTS]
+        ]
+        assert len(records) - 1 == report["summary"]["total"]
+
+    def test_report_api_error(self, fake_github, capsys):
+        """Test that API failures are reported on stderr."""
+        assert main(["report", "o", "r", "1", "abc"]) == 1
+        assert "❌ Error" in capsys.readouterr().err
+
+
+class TestParsingBenchmark:
+    """Benchmark on large synthetic review bodies."""
+
+    def test_large_body_parsing_performance(self, performance_thresholds):
+        """Test that a ~5 MB body is parsed in one pass within the threshold."""
+        body = synthetic_review_body(files=500, comments_per_file=40)
+        assert len(body) > 4_000_000
+
+        start_time = time.perf_counter()
+        result = parse_review_body(body)
+        elapsed = time.perf_counter() - start_time
+
+        threshold = performance_thresholds["review_parsing"]
+        assert elapsed < threshold, f"Parsing took {elapsed:.3f}s, exceeding threshold of {threshold}s"
+        assert len(result[NITPICK_COMMENTS]) == 20_000
+        assert result[NITPICK_COMMENTS][-1]["file"] == "src/module_499.py"
@@ -0,0 +1,172 @@
+"""Tests for mcp_server.utils.commit_context module."""
+
+import pytest
+
+import mcp_server.utils.commit_context as commit_context_module
+from mcp_server.utils.commit_context import (
+    CommitContext,
+    CommitContextCache,
+    FileStat,
+    detect_conventions,
+    gather_commit_context,
+    parse_numstat,
+    parse_status,
+    render_commit_context,
+)
+
+
+@pytest.fixture
+def git_calls(monkeypatch):
+    """Record the git subcommands run by the pre-flight."""
+    calls = []
+    run_git = commit_context_module.run_git
+
+    async def recording_run_git(path, *args, check=True):
+        calls.append(args[0])
+        return await run_git(path, *args, check=check)
+
+    monkeypatch.setattr(commit_context_module, "run_git", recording_run_git)
+    return calls
+
+
+class TestGatherCommitContext:
+    """Test cases for gather_commit_context function."""
+
+    async def test_unstaged_changes(self, pr_checkout):
+        """Test that without staged changes the diff shows what `git add -u` would stage."""
+        (pr_checkout.path / "src" / "module_1.py").write_text("changed\n", encoding="utf-8")
+        (pr_checkout.path / "notes.txt").write_text("draft\n", encoding="utf-8")
+
+        summary = await gather_commit_context(pr_checkout.path / "src")
+
+        assert f"from `{pr_checkout.path}` (branch `feature`, HEAD `{pr_checkout.sha[:12]}`)" in summary
+        assert "### Staged changes" not in summary
+        assert "### Unstaged changes (1 files, +1 -40)\n\n- src/module_1.py (+1 -40)" in summary
+        assert "### Untracked files (1, not staged by `git add -u`)\n\n- notes.txt" in summary
+        assert "### Diff (unstaged, what `git add -u` would stage)" in summary
+        assert "+changed" in summary
+        assert "Recent commits use free-form subjects. Latest subjects:\n- Change\n- Base" in summary
+
+    async def test_staged_changes(self, pr_checkout):
+        """Test that staged changes are listed apart and only their diff is shown."""
+        (pr_checkout.path / "src" / "module_0.py").write_text("staged\n", encoding="utf-8")
+        pr_checkout("add", "src/module_0.py")
+        (pr_checkout.path / "src" / "module_1.py").write_text("unstaged\n", encoding="utf-8")
+
+        summary = await gather_commit_context(pr_checkout.path)
+
+        assert "- src/module_0.py (+1 -40)" in summary.split("### Unstaged")[0]
+        assert "### Diff (staged)" in summary
+        assert "+staged" in summary
+        assert "+unstaged" not in summary
+
+    async def test_no_changes(self, pr_checkout):
+        """Test the summary of a clean checkout."""
+        summary = await gather_commit_context(pr_checkout.path)
+
+        assert summary.endswith("No changes to commit.")
+
+    async def test_not_a_repository(self, tmp_path):
+        """Test that the prompt says why there is no context outside a checkout."""
+        summary = await gather_commit_context(tmp_path)
+
+        assert summary.startswith("## Pre-flight context\n\nNot available: ")
+
+    async def test_repeat_invocations_are_cached(self, pr_checkout, git_calls):
+        """Test that an unchanged checkout is summarized once and any change is picked up."""
+        cache = CommitContextCache()
+        module = pr_checkout.path / "src" / "module_1.py"
+        module.write_text("changed\n", encoding="utf-8")
+        first = await gather_commit_context(pr_checkout.path, cache)
+        git_calls.clear()
+
+        assert await gather_commit_context(pr_checkout.path, cache) == first
+        assert sorted(git_calls) == ["rev-parse", "rev-parse", "status", "symbolic-ref", "write-tree"]
+
+        module.write_text("changed again\n", encoding="utf-8")
+        assert "+changed again" in await gather_commit_context(pr_checkout.path, cache)
+        pr_checkout("add", "-u")
+        assert "### Diff (staged)" in await gather_commit_context(pr_checkout.path, cache)
+
+    async def test_write_tree_runs_alone(self, pr_checkout, monkeypatch):
+        """Test that no other git query runs while `git write-tree` holds the index lock."""
+        events = []
+        run_git = commit_context_module.run_git
+
+        async def tracing_run_git(path, *args, check=True):
+            events.append(("start", args[0]))
+            try:
+                return await run_git(path, *args, check=check)
+            finally:
+                events.append(("end", args[0]))
+
+        monkeypatch.setattr(commit_context_module, "run_git", tracing_run_git)
+        (pr_checkout.path / "src" / "module_1.py").write_text("changed\n", encoding="utf-8")
+
+        await gather_commit_context(pr_checkout.path)
+
+        start = events.index(("start", "write-tree"))
+        assert events[start + 1] == ("end", "write-tree")
+        assert events[start - 1][0] == "end"
+
+
+class TestRendering:
+    """Test cases for the summary rendering."""
+
+    def test_diff_is_truncated_to_the_budget(self):
+        """Test that a large diff is cut at a line end and the rest is counted."""
+        diff = "".join(f"+line {n}\n" for n in range(5000))
+        context = CommitContext("/repo", "main", "a" * 40, staged=[FileStat("a.py", 5000, 0)], diff=diff)
+
+        summary = render_commit_context(context, max_chars=2000)
+
+        assert len(summary) <= 2000
+        assert "+line 0\n" in summary
+        assert summary.endswith("more diff lines not shown: read the files for the rest)")
+        shown = summary.count("\n+line ")
+        assert f"({5000 - shown} more diff lines" in summary
+
+    def test_long_file_lists_are_bounded(self):
+        """Test that only the first files are listed."""
+        stats = [FileStat(f"f{n}.py", 1, 1) for n in range(100)]
+        context = CommitContext("/repo", None, None, unstaged=stats)
+
+        summary = render_commit_context(context)
+
+        assert "(detached HEAD, HEAD no commits yet)" in summary
+        assert "- f39.py (+1 -1)\n- ... and 60 more" in summary
+
+
+class TestParsing:
+    """Test cases for the git output parsers."""
+
+    def test_parse_status(self):
+        """Test staged, modified, renamed and untracked entries."""
+        output = "M  staged.py\0 M modified.py\0R  new.py\0old.py\0?? new file.txt\0MM both.py\0"
+
+        assert parse_status(output) == (True, ["modified.py", "both.py"], ["new file.txt"])
+        assert parse_status(" M a.py\0") == (False, ["a.py"], [])
+
+    def test_parse_numstat(self):
+        """Test text and binary files."""
+        assert parse_numstat("3\t1\ta.py\n-\t-\timage.png\n") == [
+            FileStat("a.py", 3, 1),
+            FileStat("image.png", None, None),
+        ]
+
+    @pytest.mark.parametrize(
+        "subjects, expected",
+        [
+            (
+                ["feat(api): add x", "fix: y", "docs(api): z"],
+                "Conventional Commits (types: feat, fix, docs; scopes: api)",
+            ),
+            (["[user-1] Add x", "[user-2] Fix y"], "a bracketed tag before the subject"),
+            (["ABC-12 Add x", "ABC-13 Fix y", "Merge stuff"], "a ticket key before the subject"),
+            (["Add x", "fix: y", "Update z"], "free-form subjects"),
+            ([], "No commits yet"),
+        ],
+    )
+    def test_detect_conventions(self, subjects, expected):
+        """Test the detected commit message styles."""
+        assert expected in detect_conventions(subjects)
@@ -0,0 +1,225 @@
+"""Tests for mcp_server.utils.diff_index module."""
+
+import pytest
+
+from mcp_server.utils.diff_index import DiffIndex, LineMap, default_branch, parse_line_range, stale_filter
+
+DIFF = """\
+diff --git a/src/app.py b/src/app.py
+index 1111111..2222222 100644
+--- a/src/app.py
++++ b/src/app.py
+@@ -10,2 +10,3 @@ def main():
+-old
+--- not a header
++new
++++ not a header either
++more
+@@ -40 +41,0 @@ def other():
+-removed
+diff --git a/old name.py b/new name.py
+similarity index 90%
+rename from old name.py
+rename to new name.py
+--- a/old name.py
++++ b/new name.py
+@@ -3 +3 @@
+-x
++y
+diff --git a/gone.py b/gone.py
+deleted file mode 100644
+--- a/gone.py
++++ /dev/null
+@@ -1 +0,0 @@
+-x
+"""
+
+
+@pytest.fixture
+def index():
+    return DiffIndex.from_diff(DIFF.splitlines(), tolerance=0)
+
+
+class TestParseLineRange:
+    """Test cases for parse_line_range function."""
+
+    @pytest.mark.parametrize(
+        "line, expected",
+        [(12, (12, 12)), ("12", (12, 12)), ("3-5", (3, 5)), (" 3 - 5 ", (3, 5)), ("", None), (None, None)],
+    )
+    def test_line_formats(self, line, expected):
+        """Test the line and range formats of CodeRabbit and GitHub comments."""
+        assert parse_line_range(line) == expected
+
+    @pytest.mark.parametrize("line", [0, True, "5-3", "12a"])
+    def test_invalid_lines(self, line):
+        """Test that values that are not positive lines or ranges are ignored."""
+        assert parse_line_range(line) is None
+
+
+class TestDiffIndex:
+    """Test cases for DiffIndex."""
+
+    def test_hunks_of_every_file(self, index):
+        """Test that added and renamed files are indexed, deleted ones are not."""
+        assert index.files == {"src/app.py", "new name.py"}
+        assert index.renames == {"old name.py": "new name.py"}
+
+    def test_content_lines_are_not_headers(self, index):
+        """Test that removed and added lines looking like file headers stay part of the hunk."""
+        assert index.is_current("src/app.py", 10)
+        assert index.is_current("src/app.py", "12")
+        assert not index.is_current("src/app.py", 13)
+
+    def test_pure_deletion_matches_the_lines_around_it(self, index):
+        """Test that a removed block counts as a change between its neighbouring lines."""
+        assert index.is_current("src/app.py", 41)
+        assert index.is_current("src/app.py", "42")
+        assert not index.is_current("src/app.py", 43)
+
+    def test_renamed_files_match_their_old_path(self, index):
+        """Test that comments on the path before a rename are looked up in the new path."""
+        assert index.is_current("old name.py", 3)
+        assert not index.is_current("old name.py", 10)
+
+    def test_files_and_lines(self, index):
+        """Test comments without a file, without a line, and on unchanged files."""
+        assert index.is_current(None, 5)
+        assert index.is_current("src/app.py")
+        assert index.is_current("src/app.py", "")
+        assert not index.is_current("README.md")
+        assert not index.is_current("gone.py", 1)
+
+    def test_tolerance(self):
+        """Test that lines near a hunk still count as changed."""
+        index = DiffIndex({"a.py": [(20, 22)]}, tolerance=3)
+
+        assert index.is_current("a.py", 17)
+        assert index.is_current("a.py", "10-17")
+        assert index.is_current("a.py", 25)
+        assert not index.is_current("a.py", 26)
+        assert not index.is_current("a.py", "1-16")
+
+    def test_overlapping_hunks_are_merged(self):
+        """Test that ranges are merged into sorted non-overlapping intervals."""
+        index = DiffIndex({"a.py": [(30, 31), (1, 5), (4, 10), (11, 12)]}, tolerance=0)
+
+        assert index._starts["a.py"] == [1, 30]
+        assert index._ends["a.py"] == [12, 31]
+
+
+class TestLineMap:
+    """Test cases for LineMap."""
+
+    def test_lines_after_hunks_move(self):
+        """Test that lines move by what the hunks before them added and removed."""
+        # 2 lines inserted after line 5, lines 20-22 replaced by one line
+        moves = LineMap({"a.py": [(5, 0, 6, 2), (20, 3, 22, 1)]})
+
+        assert moves.lines("a.py", 1, 5) == (1, 5)
+        assert moves.lines("a.py", 6, 19) == (8, 21)
+        assert moves.lines("a.py", 30, 30) == (30, 30)
+        assert moves.lines("other.py", 6, 6) == (6, 6)
+
+    def test_changed_lines_map_to_the_new_side(self):
+        """Test that changed and removed lines map to the new side of their hunk."""
+        moves = LineMap({"a.py": [(20, 3, 22, 1), (40, 2, 39, 0)]})
+
+        assert moves.lines("a.py", 21, 21) == (22, 22)
+        assert moves.lines("a.py", 19, 41) == (19, 39)
+
+    def test_renames(self):
+        """Test that renamed files are followed."""
+        moves = LineMap.from_diff(DIFF.splitlines())
+
+        assert moves.path("old name.py") == "new name.py"
+        assert moves.lines("src/app.py", 12, 12) == (13, 13)
+
+
+class TestStaleFilter:
+    """Test cases for stale_filter function."""
+
+    COMMENTS = [{"file": "a.py", "line": "1-2"}, {"file": "a.py", "line": 50}, {"file": "b.py", "line": 1}, {}]
+
+    def test_drop(self):
+        """Test that stale comments are removed and counted."""
+        index = DiffIndex({"a.py": [(1, 3)]}, tolerance=0)
+
+        assert stale_filter(self.COMMENTS, index) == ([self.COMMENTS[0], {}], 2)
+
+    def test_mark(self):
+        """Test that stale comments are flagged without changing the originals."""
+        index = DiffIndex({"a.py": [(1, 3)]}, tolerance=0)
+
+        comments, stale = stale_filter(self.COMMENTS, index, "mark")
+
+        assert stale == 2
+        assert [comment.get("stale", False) for comment in comments] == [False, True, True, False]
+        assert "stale" not in self.COMMENTS[1]
+
+    @pytest.mark.parametrize("mode", ["keep", "drop"])
+    def test_without_index_or_check(self, mode):
+        """Test that comments are kept when there is no index or the check is off."""
+        index = DiffIndex({}) if mode == "keep" else None
+
+        assert stale_filter(self.COMMENTS, index, mode) == (self.COMMENTS, 0)
+
+
+class TestForCheckout:
+    """Test cases for indexing a local pull request checkout."""
+
+    def test_diff_against_merge_base_with_uncommitted_changes(self, pr_checkout):
+        """Test that committed and working tree changes are indexed against origin/main."""
+        (pr_checkout.path / "src" / "module_1.py").write_text("changed\n", encoding="utf-8")
+
+        index = DiffIndex.for_checkout("O/R", pr_checkout.sha, path=pr_checkout.path, tolerance=0)
+
+        assert index is not None
+        assert index.files == {"src/module_0.py", "src/module_1.py"}
+        assert index.is_current("src/module_0.py", "2-3")
+        assert not index.is_current("src/module_0.py", 10)
+
+    def test_lines_moved_since_the_review(self, pr_checkout):
+        """Test that comments on the reviewed commit follow their lines when lines are added above them."""
+        module = pr_checkout.path / "src" / "module_0.py"
+        lines = module.read_text(encoding="utf-8").splitlines(keepends=True)
+        lines[29] = "line_30 = 'thirty'\n"
+        module.write_text("".join(lines), encoding="utf-8")
+        pr_checkout("commit", "-q", "-am", "Reviewed")
+        reviewed = pr_checkout("rev-parse", "HEAD")
+        # Fixing another comment adds lines above line 30
+        module.write_text("".join([*lines[:5], *["# added\n"] * 10, *lines[5:]]), encoding="utf-8")
+
+        index = DiffIndex.for_checkout("o/r", reviewed, path=pr_checkout.path, tolerance=0)
+
+        assert index is not None
+        assert index.is_current("src/module_0.py", 30)
+        assert index.is_current("src/module_0.py", "2-3")
+        assert not index.is_current("src/module_0.py", 20)
+
+    def test_base_ref(self, pr_checkout):
+        """Test that an explicit base branch is diffed against."""
+        index = DiffIndex.for_checkout("o/r", pr_checkout.sha, path=pr_checkout.path, base_ref="HEAD")
+
+        assert index is not None
+        assert index.files == set()
+
+    def test_other_checkouts_are_not_indexed(self, pr_checkout):
+        """Test that no index is built for another repository or without the reviewed commit."""
+        assert DiffIndex.for_checkout("o/other", pr_checkout.sha, path=pr_checkout.path) is None
+        assert DiffIndex.for_checkout("o/r", "0" * 40, path=pr_checkout.path) is None
+        assert DiffIndex.for_checkout("o/r", None, path=pr_checkout.path) is None
+
+    def test_outside_a_checkout(self, tmp_path):
+        """Test that no index is built outside git checkouts."""
+        assert DiffIndex.for_checkout("o/r", "abc", path=tmp_path) is None
+
+    def test_default_branch(self, pr_checkout):
+        """Test that the remote HEAD takes precedence over well-known branch names."""
+        common_dir = pr_checkout.path / ".git"
+        assert default_branch(common_dir) == "origin/main"
+
+        pr_checkout("update-ref", "refs/remotes/origin/develop", "HEAD")
+        pr_checkout("symbolic-ref", "refs/remotes/origin/HEAD", "refs/remotes/origin/develop")
+
+        assert default_branch(common_dir) == "origin/develop"
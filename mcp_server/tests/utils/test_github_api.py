@@ -0,0 +1,418 @@
+"""Tests for mcp_server.utils.github_api module."""
+
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import mcp_server.utils.github_api as github_api_module
+from mcp_server.utils.github_api import (
+    GitHubAPIError,
+    GitHubClient,
+    RateLimitScheduler,
+    backoff_delay,
+    extract_field,
+    format_field,
+    main,
+)
+
+
+class FakeClock:
+    """Manually advanced wall clock."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimitScheduler:
+    """Test cases for RateLimitScheduler."""
+
+    def test_burst_then_paced_by_rate(self):
+        """Test that the bucket allows a burst and then paces requests at the fill rate."""
+        clock = FakeClock()
+        scheduler = RateLimitScheduler(rate=2.0, burst=2, clock=clock)
+
+        assert scheduler._next_delay(clock.now) == 0
+        scheduler._tokens -= 2
+
+        assert scheduler._next_delay(clock.now) == pytest.approx(0.5)
+        clock.now += 0.5
+        assert scheduler._next_delay(clock.now) == 0
+
+    def test_headers_slow_down_when_budget_is_low(self):
+        """Test that a low X-RateLimit budget is spread until the reset time."""
+        clock = FakeClock()
+        scheduler = RateLimitScheduler(rate=10.0, clock=clock)
+        headers = {
+            "X-RateLimit-Limit": "5000",
+            "X-RateLimit-Remaining": "100",
+            "X-RateLimit-Reset": str(int(clock.now) + 200),
+        }
+
+        assert scheduler.observe(200, headers) == 0
+        assert scheduler.metrics()["requests_per_second"] == pytest.approx(0.5)
+        assert scheduler.metrics()["rate_limit_remaining"] == 100
+
+    def test_plenty_of_budget_keeps_full_rate(self):
+        """Test that the configured rate is used while plenty of budget is left."""
+        clock = FakeClock()
+        scheduler = RateLimitScheduler(rate=10.0, clock=clock)
+        headers = {
+            "x-ratelimit-limit": "5000",
+            "x-ratelimit-remaining": "4000",
+            "x-ratelimit-reset": str(int(clock.now) + 3600),
+        }
+
+        scheduler.observe(200, headers)
+
+        assert scheduler.metrics()["requests_per_second"] == 10.0
+
+    def test_exhausted_budget_pauses_until_reset(self):
+        """Test that a 403 with no remaining budget pauses all requests until the reset."""
+        clock = FakeClock()
+        scheduler = RateLimitScheduler(clock=clock)
+        headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(clock.now) + 30)}
+
+        assert scheduler.observe(403, headers) == pytest.approx(30)
+        assert scheduler._next_delay(clock.now) == pytest.approx(30)
+
+    def test_retry_after_halves_concurrency(self):
+        """Test that Retry-After pauses requests and triggers multiplicative decrease."""
+        clock = FakeClock()
+        scheduler = RateLimitScheduler(max_concurrency=8, clock=clock)
+
+        assert scheduler.observe(429, {"Retry-After": "5"}) == pytest.approx(5)
+
+        metrics = scheduler.metrics()
+        assert metrics["concurrency_limit"] == 4
+        assert metrics["paused_for"] == pytest.approx(5)
+        assert metrics["throttled"] == 1
+
+    def test_retry_after_http_date(self):
+        """Test that Retry-After given as an HTTP date is understood."""
+        clock = FakeClock(now=1_700_000_000.0)
+        scheduler = RateLimitScheduler(clock=clock)
+
+        delay = scheduler.observe(429, {"Retry-After": "Tue, 14 Nov 2023 22:13:40 GMT"})
+
+        assert delay == pytest.approx(20)
+
+    def test_success_grows_concurrency_back(self):
+        """Test additive increase of the concurrency limit after throttling."""
+        clock = FakeClock()
+        scheduler = RateLimitScheduler(max_concurrency=4, min_concurrency=1, clock=clock)
+        scheduler.observe(429, {})
+        scheduler.observe(429, {})
+        assert scheduler.metrics()["concurrency_limit"] == 1
+
+        for _ in range(10):
+            scheduler.observe(200, {})
+
+        assert scheduler.metrics()["concurrency_limit"] == 4
+
+    def test_concurrency_limit_blocks(self):
+        """Test that no slot is handed out while the concurrency limit is reached."""
+        scheduler = RateLimitScheduler(max_concurrency=1)
+        scheduler._in_flight = 1
+
+        assert scheduler._next_delay(time.time()) is None
+
+    def test_slot_tracks_queue_and_waits(self):
+        """Test that slots are handed out across threads and waits are recorded."""
+        scheduler = RateLimitScheduler(rate=1000.0, burst=1, max_concurrency=1)
+        in_flight = []
+
+        def worker():
+            with scheduler.slot():
+                in_flight.append(scheduler.metrics()["in_flight"])
+                time.sleep(0.01)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        metrics = scheduler.metrics()
+        assert in_flight == [1, 1, 1, 1]
+        assert metrics["requests"] == 4
+        assert metrics["queue_depth"] == 0
+        assert metrics["max_wait_seconds"] > 0
+
+    def test_state_is_shared_through_state_file(self, tmp_path):
+        """Test that a pause recorded by one process is honored by the next one."""
+        clock = FakeClock()
+        state_file = tmp_path / "rate-limit.json"
+        RateLimitScheduler(clock=clock, state_file=state_file).throttle(60)
+
+        scheduler = RateLimitScheduler(clock=clock, state_file=state_file)
+
+        assert scheduler._next_delay(clock.now) == pytest.approx(60)
+        assert scheduler.metrics()["concurrency_limit"] == 4
+
+    def test_corrupt_state_file_is_ignored(self, tmp_path):
+        """Test that an unreadable state file does not prevent requests."""
+        state_file = tmp_path / "rate-limit.json"
+        state_file.write_text("not json", encoding="utf-8")
+
+        scheduler = RateLimitScheduler(state_file=state_file)
+
+        assert scheduler._next_delay(time.time()) == 0
+
+
+class TestGitHubClient:
+    """Test cases for GitHubClient against a fake GitHub server."""
+
+    def make_client(self, fake_github, **kwargs):
+        return GitHubClient(scheduler=RateLimitScheduler(rate=1000.0), sleep=lambda _: None, **kwargs)
+
+    def test_get_json(self, fake_github):
+        """Test a successful request with auth and API headers."""
+        fake_github.routes["/repos/o/r/pulls/1"] = (200, {}, {"head": {"sha": "abc"}})
+        client = self.make_client(fake_github)
+
+        assert client.get_json("/repos/o/r/pulls/1") == {"head": {"sha": "abc"}}
+        assert fake_github.requests[0]["headers"]["Authorization"] == "Bearer test-token"
+        assert fake_github.requests[0]["headers"]["Accept"] == "application/vnd.github+json"
+
+    def test_token_is_looked_up_again(self, fake_github, monkeypatch):
+        """Test that a looked up token expires, so a long-lived client follows `gh auth switch`."""
+        tokens = iter(["first-account", "second-account"])
+        monkeypatch.setattr(github_api_module, "resolve_token", lambda: next(tokens))
+        fake_github.routes["/user"] = (200, {}, {})
+        client = self.make_client(fake_github, token_ttl=0)
+
+        client.get_json("/user")
+        client.get_json("/user")
+
+        assert [request["headers"]["Authorization"] for request in fake_github.requests] == [
+            "Bearer first-account",
+            "Bearer second-account",
+        ]
+
+    def test_given_token_is_kept(self, fake_github, monkeypatch):
+        """Test that a token passed to the client is never looked up."""
+        monkeypatch.setattr(github_api_module, "resolve_token", lambda: pytest.fail("looked up"))
+        fake_github.routes["/user"] = (200, {}, {})
+        client = self.make_client(fake_github, token="explicit", token_ttl=0)
+
+        client.get_json("/user")
+
+        assert fake_github.requests[0]["headers"]["Authorization"] == "Bearer explicit"
+
+    def test_connection_is_reused(self, fake_github):
+        """Test that consecutive requests reuse the keep-alive connection."""
+        fake_github.routes["/a"] = (200, {}, [])
+        client = self.make_client(fake_github)
+
+        client.get_json("a")
+        client.get_json("/a")
+
+        assert client.metrics()["connections_opened"] == 1
+        assert client.metrics()["idle_connections"] == 1
+        assert len(fake_github.requests) == 2
+        assert fake_github.connections == 1
+
+    def test_pool_is_shared_between_threads(self, fake_github):
+        """Test that threads take turns on pooled connections instead of opening their own."""
+        fake_github.routes["/a"] = (200, {}, [])
+        client = self.make_client(fake_github)
+
+        for _ in range(3):
+            thread = threading.Thread(target=client.get_json, args=("/a",))
+            thread.start()
+            thread.join()
+
+        assert client.metrics()["connections_opened"] == 1
+        assert fake_github.connections == 1
+
+    def test_dropped_idle_connection_is_replaced(self, fake_github):
+        """Test that a keep-alive connection closed by the server is reopened without a retry."""
+        fake_github.routes["/a"] = (200, {}, {"ok": True})
+        client = self.make_client(fake_github)
+        client.get_json("/a")
+
+        client._idle[0].sock.shutdown(socket.SHUT_RDWR)
+
+        assert client.get_json("/a") == {"ok": True}
+        assert client.metrics()["connections_opened"] == 2
+        assert client.metrics()["retries"] == 0
+
+    def test_idle_connections_are_bounded(self, fake_github):
+        """Test that connections beyond the idle limit are closed when released."""
+        fake_github.routes["/big"] = (200, {}, b"x" * 10)
+        client = self.make_client(fake_github, max_idle_connections=1)
+
+        with client.stream("/big") as first, client.stream("/big") as second:
+            assert first.read() == second.read() == b"x" * 10
+
+        assert client.metrics()["connections_opened"] == 2
+        assert client.metrics()["idle_connections"] == 1
+
+    def test_retries_secondary_rate_limit(self, fake_github):
+        """Test that a secondary rate limit is retried instead of failing the run."""
+        fake_github.routes["/repos/o/r/pulls/1"] = [
+            (403, {"Retry-After": "0"}, {"message": "You have exceeded a secondary rate limit"}),
+            (403, {}, {"message": "You have exceeded a secondary rate limit"}),
+            (200, {}, {"head": {"sha": "abc"}}),
+        ]
+        client = self.make_client(fake_github)
+        client.scheduler.throttle = lambda seconds: None
+
+        assert client.get_json("/repos/o/r/pulls/1") == {"head": {"sha": "abc"}}
+        assert client.scheduler.metrics()["retries"] == 2
+
+    def test_retries_server_errors(self, fake_github):
+        """Test that transient 5xx responses are retried."""
+        fake_github.routes["/x"] = [(502, {}, {"message": "Bad Gateway"}), (200, {}, {"ok": True})]
+        client = self.make_client(fake_github)
+
+        assert client.get_json("/x") == {"ok": True}
+
+    def test_client_errors_are_not_retried(self, fake_github):
+        """Test that a 404 fails immediately with the API message."""
+        client = self.make_client(fake_github)
+
+        with pytest.raises(GitHubAPIError, match="404.*Not Found") as exc_info:
+            client.get_json("/missing")
+
+        assert exc_info.value.status == 404
+        assert len(fake_github.requests) == 1
+
+    def test_gives_up_after_max_retries(self, fake_github):
+        """Test that persistent failures raise after the configured retries."""
+        fake_github.routes["/x"] = (503, {}, b"unavailable")
+        client = self.make_client(fake_github, max_retries=2)
+
+        with pytest.raises(GitHubAPIError, match="unavailable"):
+            client.get_json("/x")
+
+        assert len(fake_github.requests) == 3
+
+    def test_stream_reads_body_incrementally(self, fake_github):
+        """Test that a streamed body can be read in pieces and the connection reused after."""
+        fake_github.routes["/big"] = (200, {}, b"x" * 100_000)
+        fake_github.routes["/a"] = (200, {}, [])
+        client = self.make_client(fake_github)
+
+        with client.stream("/big") as raw:
+            assert raw.read(10) == b"x" * 10
+            assert len(raw.read()) == 99_990
+        client.get_json("/a")
+
+        assert client.metrics()["connections_opened"] == 1
+
+    def test_partly_read_stream_closes_connection(self, fake_github):
+        """Test that a body left unread does not leave the connection in a broken state."""
+        fake_github.routes["/big"] = (200, {}, b"x" * 100_000)
+        fake_github.routes["/a"] = (200, {}, {"ok": True})
+        client = self.make_client(fake_github)
+
+        with client.stream("/big") as raw:
+            raw.read(10)
+
+        assert client.get_json("/a") == {"ok": True}
+        assert client.metrics()["connections_opened"] == 2
+
+    def test_stream_errors_are_raised_before_the_body(self, fake_github):
+        """Test that error statuses raise instead of handing out the error body."""
+        client = self.make_client(fake_github)
+
+        with pytest.raises(GitHubAPIError, match="404"):
+            with client.stream("/missing"):
+                pass  # pragma: no cover
+
+    def test_iter_array_and_string_field(self, fake_github):
+        """Test the incremental JSON helpers."""
+        fake_github.routes["/reviews"] = (200, {}, [{"id": 1, "body": "x" * 5000}, {"id": 2, "body": "short"}])
+        fake_github.routes["/reviews/1"] = (200, {}, {"id": 1, "body": "line 1\nline 2"})
+        client = self.make_client(fake_github)
+
+        assert list(client.iter_array("/reviews", max_string_length=3)) == [
+            {"id": 1, "body": "xxx"},
+            {"id": 2, "body": "sho"},
+        ]
+        assert "".join(client.iter_string_field("/reviews/1", "body")) == "line 1\nline 2"
+
+    def test_graphql(self, fake_github):
+        """Test that queries are posted as JSON and their data or errors returned."""
+        fake_github.routes["/graphql"] = [
+            (200, {}, {"data": {"viewer": {"login": "amy"}}}),
+            (200, {}, {"data": None, "errors": [{"message": "Field 'x' doesn't exist"}]}),
+        ]
+        client = self.make_client(fake_github)
+
+        assert client.graphql("query($n: Int!) { viewer { login } }", {"n": 1}) == {"viewer": {"login": "amy"}}
+        with pytest.raises(GitHubAPIError, match="Field 'x' doesn't exist"):
+            client.graphql("{ x }")
+
+        first = fake_github.requests[0]
+        assert first["body"] == {"query": "query($n: Int!) { viewer { login } }", "variables": {"n": 1}}
+        assert first["headers"]["Content-Type"] == "application/json"
+        assert fake_github.connections == 1
+
+    def test_connection_errors_are_retried(self, monkeypatch):
+        """Test that connection failures are retried and finally reported."""
+        monkeypatch.setenv("GH_TOKEN", "t")
+        client = GitHubClient(api_url="http://127.0.0.1:1", max_retries=1, sleep=lambda _: None)
+
+        with pytest.raises(GitHubAPIError, match="request failed"):
+            client.get_json("/x")
+
+        assert client.scheduler.metrics()["retries"] == 1
+
+
+class TestHelpers:
+    """Test cases for module helpers."""
+
+    def test_backoff_delay_is_jittered_and_capped(self):
+        """Test exponential backoff bounds."""
+        assert 0.5 <= backoff_delay(0) <= 1.0
+        assert 4.0 <= backoff_delay(3) <= 8.0
+        assert 30.0 <= backoff_delay(20) <= 60.0
+
+    def test_extract_field(self):
+        """Test dotted path lookup behaves like a simple jq path."""
+        document = {"head": {"sha": "abc"}, "items": [{"id": 1}, {"id": 2}]}
+
+        assert extract_field(document, "head.sha") == "abc"
+        assert extract_field(document, "items.-1.id") == 2
+        assert extract_field(document, "missing.path") is None
+        assert extract_field(document, "items.5") is None
+
+    def test_format_field(self):
+        """Test that strings are printed raw and other values as JSON."""
+        assert format_field("abc") == "abc"
+        assert format_field(None) == "null"
+        assert format_field({"a": 1}) == '{"a": 1}'
+
+
+class TestMain:
+    """Test cases for the command line entry point."""
+
+    def test_prints_raw_body(self, fake_github, capsys):
+        """Test that the raw response body is printed."""
+        fake_github.routes["/repos/o/r/pulls/1/reviews"] = (200, {}, [{"id": 1}])
+
+        assert main(["/repos/o/r/pulls/1/reviews"]) == 0
+        assert json.loads(capsys.readouterr().out) == [{"id": 1}]
+
+    def test_prints_field(self, fake_github, capsys):
+        """Test that --field prints a single unquoted value."""
+        fake_github.routes["/repos/o/r/pulls/1"] = (200, {}, {"head": {"sha": "abc"}})
+
+        assert main(["/repos/o/r/pulls/1", "--field", "head.sha", "--metrics"]) == 0
+
+        captured = capsys.readouterr()
+        assert captured.out == "abc\n"
+        assert json.loads(captured.err)["requests"] == 1
+
+    def test_reports_errors(self, fake_github, capsys):
+        """Test that failures are reported on stderr with a non-zero exit code."""
+        assert main(["/missing"]) == 1
+        assert "❌ Error" in capsys.readouterr().err
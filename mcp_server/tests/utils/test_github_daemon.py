@@ -0,0 +1,290 @@
+"""Tests for mcp_server.utils.github_daemon module."""
+
+import io
+import json
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from mcp_server.utils.github_api import GitHubAPIError, GitHubClient, RateLimitScheduler
+from mcp_server.utils.github_daemon import (
+    DaemonAlreadyRunningError,
+    DaemonClient,
+    GitHubDaemon,
+    connect,
+    get_shared_client,
+    get_socket_path,
+    main,
+    serve_in_background,
+)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def socket_path(monkeypatch):
+    """Socket path in a short private directory (unix socket paths are limited to ~100 bytes)."""
+    directory = Path(tempfile.mkdtemp(prefix="ghd-", dir="/tmp"))
+    path = directory / "github.sock"
+    monkeypatch.setenv("AI_PROMPTS_MCP_DAEMON_SOCKET", str(path))
+    yield path
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture
+def daemon(fake_github, socket_path):
+    """In-process daemon serving a fresh client."""
+    client = GitHubClient(scheduler=RateLimitScheduler(rate=1000.0), sleep=lambda _: None)
+    server = GitHubDaemon(socket_path, client, idle_timeout=None)
+    server.start()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def spawned_daemon(fake_github, socket_path, monkeypatch):
+    """Enable the daemon for the test and stop any daemon process it started."""
+    monkeypatch.setenv("AI_PROMPTS_MCP_DAEMON", "on")
+    yield socket_path
+    main(["stop"], out=io.StringIO())
+
+
+class TestDaemon:
+    """Test cases for requests sent through an in-process daemon."""
+
+    def test_script_processes_share_one_connection(self, daemon, fake_github):
+        """Test that clients of separate runs reuse the daemon's keep-alive connection and token."""
+        fake_github.routes["/repos/o/r/pulls/1"] = (200, {}, {"head": {"sha": "abc"}})
+
+        for _ in range(3):
+            client = DaemonClient(daemon.socket_path)
+            assert client.get_json("/repos/o/r/pulls/1") == {"head": {"sha": "abc"}}
+
+        assert fake_github.connections == 1
+        assert all(request["headers"]["Authorization"] == "Bearer test-token" for request in fake_github.requests)
+        assert DaemonClient(daemon.socket_path).metrics()["connections_opened"] == 1
+
+    def test_concurrent_clients(self, daemon, fake_github):
+        """Test that connections are served concurrently from the shared pool."""
+        fake_github.routes["/a"] = (200, {}, {"ok": True})
+        results = []
+
+        def fetch():
+            results.append(DaemonClient(daemon.socket_path).get_json("/a"))
+
+        threads = [threading.Thread(target=fetch) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == [{"ok": True}] * 4
+        assert daemon.client.metrics()["connections_opened"] <= 4
+
+    def test_streamed_responses(self, daemon, fake_github):
+        """Test the incremental helpers over the framed stream, then reuse of the connection."""
+        reviews = [{"id": n, "body": "x" * 50_000} for n in range(4)]
+        fake_github.routes["/reviews"] = (200, {}, reviews)
+        fake_github.routes["/reviews/1"] = (200, {}, {"id": 1, "body": "line 1\nline 2"})
+        client = DaemonClient(daemon.socket_path)
+
+        assert list(client.iter_array("/reviews")) == reviews
+        assert "".join(client.iter_string_field("/reviews/1", "body")) == "line 1\nline 2"
+        assert list(client.iter_array("/reviews", max_string_length=2)) == [{"id": n, "body": "xx"} for n in range(4)]
+        assert fake_github.connections == 1
+
+    def test_partly_read_stream_reconnects(self, daemon, fake_github):
+        """Test that abandoning a streamed body does not break the next request."""
+        fake_github.routes["/big"] = (200, {}, b"x" * 500_000)
+        fake_github.routes["/a"] = (200, {}, {"ok": True})
+        client = DaemonClient(daemon.socket_path)
+
+        with client.stream("/big") as raw:
+            assert raw.read(10) == b"x" * 10
+
+        assert client.get_json("/a") == {"ok": True}
+
+    def test_api_errors_are_forwarded(self, daemon, fake_github):
+        """Test that failed requests raise the API error and keep the connection usable."""
+        fake_github.routes["/a"] = (200, {}, {"ok": True})
+        client = DaemonClient(daemon.socket_path)
+
+        with pytest.raises(GitHubAPIError, match="404.*Not Found") as exc_info:
+            client.get_json("/missing")
+        with pytest.raises(GitHubAPIError, match="404"):
+            with client.stream("/missing"):
+                pass  # pragma: no cover
+
+        assert exc_info.value.status == 404
+        assert client.get_json("/a") == {"ok": True}
+
+    def test_request_bodies(self, daemon, fake_github):
+        """Test that GraphQL queries are passed through the daemon with their body."""
+        fake_github.routes["/graphql"] = (200, {}, {"data": {"ok": True}})
+
+        assert DaemonClient(daemon.socket_path).graphql("{ ok }") == {"ok": True}
+        assert fake_github.requests[0]["body"] == {"query": "{ ok }", "variables": {}}
+
+    def test_falls_back_to_direct_requests(self, fake_github, socket_path):
+        """Test that a missing daemon does not fail requests."""
+        fake_github.routes["/reviews"] = (200, {}, [{"id": 1}])
+        client = DaemonClient(socket_path)
+
+        assert client.get_json("/reviews") == [{"id": 1}]
+        assert list(client.iter_array("/reviews")) == [{"id": 1}]
+        assert client.metrics()["requests"] == 2
+        assert connect(socket_path, autostart=False) is None
+
+    def test_daemon_going_away_is_reported(self, daemon, fake_github):
+        """Test that a daemon vanishing between requests raises an API error."""
+        fake_github.routes["/a"] = (200, {}, {"ok": True})
+        client = DaemonClient(daemon.socket_path)
+        client.get_json("/a")
+
+        client._local.connection.rfile.close()
+
+        with pytest.raises(GitHubAPIError, match="helper daemon"):
+            client.get_json("/a")
+        assert client.get_json("/a") == {"ok": True}
+
+    def test_unknown_operation(self, daemon):
+        """Test that unknown requests are answered with an error."""
+        client = DaemonClient(daemon.socket_path)
+        client.connect()
+
+        with pytest.raises(GitHubAPIError, match="Unknown operation"):
+            client._local.connection.call({"op": "delete-everything"})
+
+
+class TestLifecycle:
+    """Test cases for starting and stopping daemons."""
+
+    def test_one_daemon_per_socket(self, daemon):
+        """Test that a second daemon for the same socket is refused."""
+        with pytest.raises(DaemonAlreadyRunningError):
+            GitHubDaemon(daemon.socket_path, daemon.client)
+
+        assert serve_in_background(daemon.client, daemon.socket_path) is None
+
+    def test_stale_socket_is_replaced(self, fake_github, socket_path):
+        """Test that a socket file left by a dead daemon does not prevent a new one."""
+        socket_path.write_text("", encoding="utf-8")
+        fake_github.routes["/a"] = (200, {}, {"ok": True})
+
+        server = serve_in_background(GitHubClient(), socket_path)
+        try:
+            assert DaemonClient(socket_path).get_json("/a") == {"ok": True}
+        finally:
+            server.close()
+        assert not socket_path.exists()
+
+    def test_idle_timeout(self, fake_github, socket_path):
+        """Test that the daemon winds down after the idle timeout, but not while a script is connected."""
+        clock = FakeClock()
+        server = GitHubDaemon(socket_path, GitHubClient(), idle_timeout=10.0, clock=clock)
+        server.enter()
+        clock.now = 60.0
+        waiter = threading.Thread(target=server.wait_until_idle, kwargs={"poll_interval": 0.01})
+        waiter.start()
+        waiter.join(0.1)
+        assert waiter.is_alive()
+
+        server.leave()
+        clock.now = 75.0
+        waiter.join(5)
+
+        assert not waiter.is_alive()
+        server.close()
+
+    def test_stop_command(self, daemon):
+        """Test that `stop` ends a daemon serving without idle timeout."""
+        waiter = threading.Thread(target=daemon.wait_until_idle, kwargs={"poll_interval": 0.01})
+        waiter.start()
+        out = io.StringIO()
+
+        assert main(["stop"], out=out) == 0
+        waiter.join(5)
+
+        assert not waiter.is_alive()
+        assert out.getvalue() == "GitHub helper daemon stopped\n"
+
+    def test_status_command(self, daemon, fake_github):
+        """Test that `status` prints the daemon's metrics."""
+        fake_github.routes["/a"] = (200, {}, {"ok": True})
+        DaemonClient(daemon.socket_path).get_json("/a")
+        out = io.StringIO()
+
+        assert main(["status"], out=out) == 0
+
+        status = json.loads(out.getvalue())
+        assert status["socket"] == str(daemon.socket_path)
+        assert status["requests"] == 1
+        assert status["connections_opened"] == 1
+
+    def test_status_without_daemon(self, socket_path):
+        """Test that `status` reports a daemon that is not running."""
+        out = io.StringIO()
+
+        assert main(["status"], out=out) == 1
+        assert out.getvalue() == "GitHub helper daemon is not running\n"
+
+    def test_public_directory_is_refused(self, fake_github, tmp_path):
+        """Test that the socket is never created in a directory other users can write to."""
+        directory = tmp_path / "shared"
+        directory.mkdir(mode=0o777)
+        directory.chmod(0o777)
+
+        with pytest.raises(PermissionError):
+            GitHubDaemon(directory / "github.sock", GitHubClient())
+
+    def test_autostart(self, spawned_daemon, fake_github):
+        """Test that the first script starts a daemon process that later ones reuse."""
+        fake_github.routes["/a"] = (200, {}, {"ok": True})
+
+        first = get_shared_client()
+        second = get_shared_client()
+
+        assert isinstance(first, DaemonClient)
+        assert first.get_json("/a") == second.get_json("/a") == {"ok": True}
+        assert fake_github.connections == 1
+
+    def test_disabled(self, fake_github, socket_path):
+        """Test that AI_PROMPTS_MCP_DAEMON=off sends requests directly."""
+        assert not isinstance(get_shared_client(), DaemonClient)
+        assert not socket_path.exists()
+
+
+class TestSocketPath:
+    """Test cases for get_socket_path."""
+
+    def test_depends_on_api_url_and_token(self, monkeypatch):
+        """Test that differently configured processes never share a daemon."""
+        monkeypatch.delenv("AI_PROMPTS_MCP_DAEMON_SOCKET", raising=False)
+        monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+        monkeypatch.setenv("GH_TOKEN", "one")
+        first = get_socket_path()
+        monkeypatch.setenv("GH_TOKEN", "two")
+        second = get_socket_path()
+        monkeypatch.setenv("GITHUB_API_URL", "https://github.example.com/api/v3")
+        third = get_socket_path()
+
+        assert len({first, second, third}) == 3
+        assert first.parent == Path("/run/user/1000") / first.parent.name
+        assert "one" not in str(first)
+
+    def test_override(self, monkeypatch):
+        """Test the explicit socket location."""
+        monkeypatch.setenv("AI_PROMPTS_MCP_DAEMON_SOCKET", "/tmp/custom.sock")
+
+        assert get_socket_path() == Path("/tmp/custom.sock")
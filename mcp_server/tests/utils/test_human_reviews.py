@@ -0,0 +1,361 @@
+"""Tests for mcp_server.utils.human_reviews module."""
+
+import json
+
+from mcp_server.utils.github_api import GitHubClient, RateLimitScheduler
+from mcp_server.utils.human_reviews import (
+    build_report,
+    collect_comments,
+    fetch_thread_states,
+    human_reviews,
+    is_human_feedback,
+    main,
+    review_comment,
+    thread_roots,
+    without_resolved,
+)
+from mcp_server.utils.review_store import ReviewStore
+
+SINCE = "2024-05-01T12:00:00Z"
+
+
+class TestIsHumanFeedback:
+    """Test cases for is_human_feedback function."""
+
+    def test_filters(self):
+        """Test author, body length and timestamp filtering."""
+        item = {"user": {"login": "alice"}, "body": "Please rename this", "submitted_at": "2024-05-02T00:00:00Z"}
+
+        assert is_human_feedback(item, SINCE, "submitted_at")
+        assert not is_human_feedback({**item, "user": {"login": "coderabbitai[bot]"}}, SINCE, "submitted_at")
+        assert not is_human_feedback({**item, "body": "ok"}, SINCE, "submitted_at")
+        assert not is_human_feedback({**item, "submitted_at": "2024-04-01T00:00:00Z"}, SINCE, "submitted_at")
+        assert not is_human_feedback({**item, "submitted_at": None}, SINCE, "submitted_at")
+
+
+class TestReviewComment:
+    """Test cases for review_comment function."""
+
+    def test_line_fallbacks(self):
+        """Test jq `.line // .original_line // ""` semantics."""
+        assert review_comment({"line": 0, "original_line": 5}, "a")["line"] == 0
+        assert review_comment({"line": None, "original_line": 5}, "a")["line"] == 5
+        assert review_comment({"path": "a.py", "body": "b"}, "alice") == {
+            "reviewer": "alice",
+            "file": "a.py",
+            "line": "",
+            "body": "b",
+        }
+
+
+class TestCollectComments:
+    """Test cases for collect_comments function."""
+
+    def test_review_comments_in_submission_order_then_pr_comments(self):
+        """Test ordering of review comments and standalone pull request comments."""
+        reviews = [
+            {"id": 2, "user": {"login": "bob"}, "body": "Second review here", "submitted_at": "2024-05-03T00:00:00Z"},
+            {"id": 1, "user": {"login": "amy"}, "body": "First review here", "submitted_at": "2024-05-02T00:00:00Z"},
+        ]
+        review_comments = {1: [{"path": "a.py", "line": 1, "body": "A"}], 2: [{"path": "b.py", "line": 2, "body": "B"}]}
+        pr_comments = [
+            {
+                "user": {"login": "cat"},
+                "path": "c.py",
+                "line": 3,
+                "body": "Standalone comment",
+                "created_at": "2024-05-04",
+            },
+            {
+                "user": {"login": "cat"},
+                "path": "c.py",
+                "line": 3,
+                "body": "Old standalone one",
+                "created_at": "2024-04-04",
+            },
+        ]
+
+        comments = collect_comments(reviews, review_comments, pr_comments, SINCE)
+
+        assert [(comment["reviewer"], comment["body"]) for comment in comments] == [
+            ("amy", "A"),
+            ("bob", "B"),
+            ("cat", "Standalone comment"),
+        ]
+
+    def test_replies_are_grouped_into_their_thread(self):
+        """Test that replies join the entry of their thread, also when reached through older comments."""
+        pr_comments = [
+            {"id": 1, "user": {"login": "amy"}, "path": "a.py", "line": 5, "body": "Old root", "created_at": "2024-04"},
+            {
+                "id": 2,
+                "in_reply_to_id": 1,
+                "user": {"login": "bob"},
+                "body": "First new reply",
+                "created_at": "2024-05-02",
+            },
+            {
+                "id": 3,
+                "in_reply_to_id": 2,
+                "user": {"login": "amy"},
+                "body": "Second new reply",
+                "created_at": "2024-05-03",
+            },
+            {
+                "id": 4,
+                "user": {"login": "cat"},
+                "path": "b.py",
+                "line": 1,
+                "body": "Another thread",
+                "created_at": "2024-05-04",
+            },
+        ]
+        states = {1: {"resolved": False, "outdated": True}, 4: {"resolved": True, "outdated": False}}
+
+        comments = collect_comments([], {}, pr_comments, SINCE, states)
+
+        assert comments == [
+            {
+                "reviewer": "bob",
+                "file": None,
+                "line": "",
+                "body": "First new reply",
+                "outdated": True,
+                "resolved": False,
+                "replies": [{"reviewer": "amy", "body": "Second new reply"}],
+            },
+            {
+                "reviewer": "cat",
+                "file": "b.py",
+                "line": 1,
+                "body": "Another thread",
+                "outdated": False,
+                "resolved": True,
+            },
+        ]
+        assert without_resolved(comments) == (comments[:1], 1)
+
+    def test_comments_seen_twice_are_listed_once(self):
+        """Test that a review comment also listed among the pull request comments is not repeated."""
+        reviews = [{"id": 9, "user": {"login": "amy"}, "body": "Review body text", "submitted_at": "2024-05-02"}]
+        comment = {"id": 5, "user": {"login": "amy"}, "path": "a.py", "line": 2, "body": "Fix this please"}
+
+        comments = collect_comments(reviews, {9: [comment]}, [{**comment, "created_at": "2024-05-02"}], SINCE)
+
+        assert len(comments) == 1
+        assert (comments[0]["outdated"], comments[0]["resolved"]) == (False, None)
+
+    def test_thread_roots(self):
+        """Test that reply chains lead to their first comment, even with cycles or deleted parents."""
+        comments = [
+            {"id": 1},
+            {"id": 2, "in_reply_to_id": 1},
+            {"id": 3, "in_reply_to_id": 2},
+            {"id": 4, "in_reply_to_id": 99},
+        ]
+        comments += [{"id": 5, "in_reply_to_id": 6}, {"id": 6, "in_reply_to_id": 5}, {"body": "no id"}]
+
+        assert thread_roots(comments) == {1: 1, 2: 1, 3: 1, 4: 99, 5: 6, 6: 5}
+
+    def test_human_reviews_sorted(self):
+        """Test that human reviews are sorted by submission time."""
+        reviews = [
+            {"id": 2, "user": {"login": "b"}, "body": "Second review here", "submitted_at": "2024-05-03"},
+            {"id": 1, "user": {"login": "a"}, "body": "First review here", "submitted_at": "2024-05-02"},
+        ]
+
+        assert [review["id"] for review in human_reviews(reviews, SINCE)] == [1, 2]
+
+
+class TestFetchThreadStates:
+    """Test cases for fetch_thread_states function."""
+
+    def test_pages_are_followed(self, fake_github):
+        """Test that every page of threads is queried, by its cursor."""
+
+        def page(first_comment, has_next):
+            thread = {
+                "isResolved": has_next,
+                "isOutdated": False,
+                "comments": {"nodes": [{"databaseId": first_comment}]},
+            }
+            threads = {"pageInfo": {"hasNextPage": has_next, "endCursor": "next"}, "nodes": [thread, {"comments": {}}]}
+            return (200, {}, {"data": {"repository": {"pullRequest": {"reviewThreads": threads}}}})
+
+        fake_github.routes["/graphql"] = [page(1, True), page(2, False)]
+        client = GitHubClient(scheduler=RateLimitScheduler(rate=1000.0))
+
+        assert fetch_thread_states(client, "o", "r", "7") == {
+            1: {"resolved": True, "outdated": False},
+            2: {"resolved": False, "outdated": False},
+        }
+        assert [request["body"]["variables"]["cursor"] for request in fake_github.requests] == [None, "next"]
+
+
+class TestMain:
+    """Test cases for the command line entry point."""
+
+    def test_prints_report(self, fake_github, capsys):
+        """Test a full run against the fake GitHub API."""
+        fake_github.routes["/repos/o/r/pulls/1"] = (200, {}, {"head": {"sha": "abc"}})
+        fake_github.routes["/repos/o/r/commits/abc"] = (200, {}, {"commit": {"committer": {"date": SINCE}}})
+        fake_github.routes["/repos/o/r/pulls/1/reviews?per_page=100"] = (
+            200,
+            {},
+            [{"id": 9, "user": {"login": "amy"}, "body": "Looks mostly fine", "submitted_at": "2024-05-02"}],
+        )
+        fake_github.routes["/repos/o/r/pulls/1/reviews/9/comments"] = (200, {}, [{"path": "a.py", "body": "Fix"}])
+        fake_github.routes["/repos/o/r/pulls/1/comments"] = (200, {}, [])
+
+        assert main(["o", "r", "1"]) == 0
+        assert json.loads(capsys.readouterr().out) == build_report([
+            {"reviewer": "amy", "file": "a.py", "line": "", "body": "Fix", "outdated": False, "resolved": None}
+        ])
+
+    def test_ndjson_format(self, fake_github, capsys):
+        """Test that --format ndjson prints one comment per line with the summary last."""
+        fake_github.routes["/repos/o/r/pulls/1"] = (200, {}, {"head": {"sha": "abc"}})
+        fake_github.routes["/repos/o/r/commits/abc"] = (200, {}, {"commit": {"committer": {"date": SINCE}}})
+        fake_github.routes["/repos/o/r/pulls/1/reviews?per_page=100"] = (200, {}, [])
+        fake_github.routes["/repos/o/r/pulls/1/comments"] = (
+            200,
+            {},
+            [
+                {"user": {"login": "amy"}, "path": "a.py", "body": f"Comment {n} here", "created_at": "2024-05-02"}
+                for n in (1, 2)
+            ],
+        )
+
+        assert main(["--format", "ndjson", "o", "r", "1"]) == 0
+
+        lines = capsys.readouterr().out.splitlines()
+        assert [json.loads(line).get("body") for line in lines] == ["Comment 1 here", "Comment 2 here", None]
+        assert json.loads(lines[-1]) == {"summary": {"total": 2}}
+
+    def test_records_history_in_store(self, fake_github, capsys):
+        """Test that the head commit, reviews and all human comments (also older ones) are stored."""
+        fake_github.routes["/repos/o/r/pulls/1"] = (200, {}, {"head": {"sha": "abc1"}})
+        fake_github.routes["/repos/o/r/commits/abc1"] = (200, {}, {"commit": {"committer": {"date": SINCE}}})
+        fake_github.routes["/repos/o/r/pulls/1/reviews?per_page=100"] = (200, {}, [])
+        fake_github.routes["/repos/o/r/pulls/1/comments"] = (
+            200,
+            {},
+            [
+                {"id": 1, "user": {"login": "amy"}, "path": "a.py", "line": 3, "body": "Old", "created_at": "2024-04"},
+                {"id": 2, "user": {"login": "coderabbitai[bot]"}, "body": "Bot", "created_at": "2024-05-02"},
+            ],
+        )
+
+        assert main(["o", "r", "1"]) == 0
+
+        with ReviewStore.default() as store:
+            (stored,) = store.query_comments("o/r", 1)
+            assert store.commit_time("o/r", 1, "abc1") == SINCE
+        assert (stored["comment_id"], stored["author"], stored["line"], stored["category"]) == (1, "amy", "3", "human")
+
+    def test_stale_comments_in_checkout(self, fake_github, pr_checkout, monkeypatch, capsys):
+        """Test that comments on lines the checkout no longer changes are dropped or marked."""
+        fake_github.routes["/repos/o/r/pulls/1"] = (200, {}, {"head": {"sha": pr_checkout.sha}})
+        fake_github.routes[f"/repos/o/r/commits/{pr_checkout.sha}"] = (
+            200,
+            {},
+            {"commit": {"committer": {"date": SINCE}}},
+        )
+        fake_github.routes["/repos/o/r/pulls/1/reviews?per_page=100"] = (200, {}, [])
+        fake_github.routes["/repos/o/r/pulls/1/comments"] = (
+            200,
+            {},
+            [
+                {
+                    "user": {"login": "amy"},
+                    "path": path,
+                    "line": line,
+                    "body": "Please fix it",
+                    "created_at": "2024-05-02",
+                }
+                for path, line in (("src/module_0.py", 2), ("src/module_0.py", 30), ("src/module_1.py", 2))
+            ],
+        )
+        monkeypatch.chdir(pr_checkout.path)
+
+        assert main(["o", "r", "1"]) == 0
+        report = json.loads(capsys.readouterr().out)
+        assert report["summary"] == {"total": 1, "stale": 2}
+        assert report["comments"][0]["line"] == 2
+
+        assert main(["--stale", "mark", "o", "r", "1"]) == 0
+        report = json.loads(capsys.readouterr().out)
+        assert [comment.get("stale", False) for comment in report["comments"]] == [False, True, True]
+
+    def test_resolved_threads(self, fake_github, capsys):
+        """Test that resolved threads are left out of the report by default and recorded as resolved."""
+        fake_github.routes["/repos/o/r/pulls/1"] = (200, {}, {"head": {"sha": "abc1"}})
+        fake_github.routes["/repos/o/r/commits/abc1"] = (200, {}, {"commit": {"committer": {"date": SINCE}}})
+        fake_github.routes["/repos/o/r/pulls/1/reviews?per_page=100"] = (200, {}, [])
+        fake_github.routes["/repos/o/r/pulls/1/comments"] = (
+            200,
+            {},
+            [
+                {
+                    "id": n,
+                    "user": {"login": "amy"},
+                    "path": "a.py",
+                    "line": n,
+                    "body": f"Comment {n} here",
+                    "created_at": "2024-05-02",
+                }
+                for n in (1, 2)
+            ],
+        )
+        fake_github.routes["/graphql"] = (
+            200,
+            {},
+            {
+                "data": {
+                    "repository": {
+                        "pullRequest": {
+                            "reviewThreads": {
+                                "nodes": [
+                                    {
+                                        "isResolved": True,
+                                        "isOutdated": False,
+                                        "comments": {"nodes": [{"databaseId": 2}]},
+                                    }
+                                ]
+                            }
+                        }
+                    }
+                }
+            },
+        )
+
+        assert main(["o", "r", "1"]) == 0
+        report = json.loads(capsys.readouterr().out)
+        assert report["summary"] == {"total": 1, "resolved": 1}
+        assert main(["--include-resolved", "o", "r", "1"]) == 0
+        assert json.loads(capsys.readouterr().out)["summary"] == {"total": 2}
+
+        with ReviewStore.default() as store:
+            assert [comment["comment_id"] for comment in store.query_comments("o/r", 1, unresolved_only=True)] == [1]
+        query = next(request for request in fake_github.requests if request["path"] == "/graphql")
+        assert query["body"]["variables"] == {"owner": "o", "repo": "r", "number": 1, "cursor": None}
+
+    def test_missing_commit_sha(self, fake_github, capsys):
+        """Test the error printed when the pull request has no head commit."""
+        fake_github.routes["/repos/o/r/pulls/1"] = (200, {}, {})
+
+        assert main(["o", "r", "1"]) == 1
+        assert capsys.readouterr().out == "❌ Error: Could not retrieve latest commit SHA\n"
+
+    def test_missing_commit_date(self, fake_github, capsys):
+        """Test the error printed when the latest commit has no date."""
+        fake_github.routes["/repos/o/r/pulls/1"] = (200, {}, {"head": {"sha": "abc"}})
+        fake_github.routes["/repos/o/r/commits/abc"] = (200, {}, {})
+
+        assert main(["o", "r", "1"]) == 1
+        assert capsys.readouterr().out == "❌ Error: Could not retrieve latest commit date\n"
+
+    def test_api_error(self, fake_github, capsys):
+        """Test that API failures are reported on stderr."""
+        assert main(["o", "r", "1"]) == 1
+        assert "❌ Error" in capsys.readouterr().err
@@ -0,0 +1,247 @@
+"""Tests for mcp_server.utils.impact_index module."""
+
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mcp_server.utils.impact_index import (
+    ImpactIndexCache,
+    affected_tests,
+    affected_tests_section,
+    module_names,
+    parse_imports,
+    read_coverage_contexts,
+)
+
+PROJECT = {
+    "src/app/__init__.py": "",
+    "src/app/core.py": "def add(a, b):\n    return a + b\n",
+    "src/app/api.py": "from app.core import add\n",
+    "src/app/util.py": "import os\n",
+    "tests/conftest.py": "",
+    "tests/test_api.py": "from app.api import add\n",
+    "tests/test_core.py": "from app import core\n",
+    "tests/test_dynamic.py": "def test_x():\n    pass\n",
+    "tests/unit/conftest.py": "",
+    "tests/unit/test_util.py": "from app.util import os\n",
+}
+
+
+@pytest.fixture
+def project(pr_checkout):
+    """pr_checkout with a src layout package and its tests on the base branch."""
+    for name, content in PROJECT.items():
+        path = pr_checkout.path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+    pr_checkout("add", ".")
+    pr_checkout("commit", "-q", "-m", "Project")
+    pr_checkout("update-ref", "refs/remotes/origin/main", "HEAD")
+    return pr_checkout
+
+
+def edit(project, name, content="# edited\n"):
+    path = project.path / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+
+
+def write_coverage(path, measured):
+    """A coverage data file with the given (file, context) pairs measured."""
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        "CREATE TABLE file (id INTEGER PRIMARY KEY, path TEXT);"
+        "CREATE TABLE context (id INTEGER PRIMARY KEY, context TEXT);"
+        "CREATE TABLE line_bits (file_id INTEGER, context_id INTEGER, numbits BLOB);"
+        "CREATE TABLE arc (file_id INTEGER, context_id INTEGER, fromno INTEGER, tono INTEGER);"
+    )
+    for number, (file, context) in enumerate(measured, start=1):
+        connection.execute("INSERT INTO file VALUES (?, ?)", (number, file))
+        connection.execute("INSERT INTO context VALUES (?, ?)", (number, context))
+        connection.execute("INSERT INTO line_bits VALUES (?, ?, ?)", (number, number, b"\x01"))
+    connection.commit()
+    connection.close()
+
+
+class TestAffectedTests:
+    """Test cases for affected_tests function."""
+
+    def test_transitive_imports(self, project):
+        """Test that the tests importing a module directly or through others are selected."""
+        edit(project, "src/app/core.py")
+
+        selection = affected_tests(project.path)
+
+        assert selection["tests"] == ["tests/test_api.py", "tests/test_core.py"]
+        assert selection["by_file"] == {"src/app/core.py": ["tests/test_api.py", "tests/test_core.py"]}
+        assert not selection["full_suite"]
+
+    def test_package_init(self, project):
+        """Test that a package's __init__ affects every test importing something of it."""
+        edit(project, "src/app/__init__.py")
+
+        assert affected_tests(project.path)["tests"] == [
+            "tests/test_api.py",
+            "tests/test_core.py",
+            "tests/unit/test_util.py",
+        ]
+
+    def test_conftest_and_test_files(self, project):
+        """Test that a conftest.py selects the tests below it and a test file itself."""
+        edit(project, "tests/unit/conftest.py")
+        edit(project, "tests/test_dynamic.py", "def test_y():\n    pass\n")
+
+        assert affected_tests(project.path)["tests"] == ["tests/test_dynamic.py", "tests/unit/test_util.py"]
+
+    def test_renamed_module(self, project):
+        """Test that the tests importing the old name of a moved module are selected."""
+        project("mv", "src/app/util.py", "src/app/helpers.py")
+
+        assert affected_tests(project.path)["tests"] == ["tests/unit/test_util.py"]
+
+    def test_configuration_and_unmapped_files(self, project):
+        """Test that test configuration asks for the full suite and data files are reported."""
+        edit(project, "pyproject.toml", "[tool.pytest.ini_options]\n")
+        edit(project, "data/table.csv", "a,b\n")
+
+        selection = affected_tests(project.path)
+
+        assert selection["full_suite"]
+        assert selection["full_suite_reasons"] == ["pyproject.toml configures the tests"]
+        assert selection["unmapped"] == ["data/table.csv"]
+
+    def test_coverage_contexts(self, project):
+        """Test that tests recorded running a file are selected with the importing ones."""
+        write_coverage(
+            project.path / ".coverage",
+            [
+                (str(project.path / "src" / "app" / "util.py"), "tests/test_dynamic.py::test_x|run"),
+                (str(project.path / "src" / "app" / "util.py"), "tests/test_removed.py::test_z|run"),
+                (str(project.path / "src" / "app" / "core.py"), ""),
+            ],
+        )
+        edit(project, "src/app/util.py")
+
+        selection = affected_tests(project.path)
+
+        assert selection["coverage_files"] == 1
+        assert selection["unmapped"] == []
+        assert selection["tests"] == ["tests/test_dynamic.py::test_x", "tests/unit/test_util.py"]
+
+    def test_test_file_covers_its_node_ids(self, project):
+        """Test that node IDs are dropped once their whole file is selected."""
+        write_coverage(
+            project.path / "cov.db",
+            [(str(project.path / "src" / "app" / "util.py"), "tests/test_dynamic.py::test_x|run")],
+        )
+        edit(project, "src/app/util.py")
+        edit(project, "tests/test_dynamic.py", "def test_x():\n    assert True\n")
+
+        selection = affected_tests(project.path, coverage_file="cov.db")
+
+        assert selection["tests"] == ["tests/test_dynamic.py", "tests/unit/test_util.py"]
+
+    def test_index_is_refreshed_incrementally(self, project):
+        """Test that only the files changed since the last selection are parsed again."""
+        cache = ImpactIndexCache()
+        affected_tests(project.path, cache=cache)
+        index = cache.get(str(project.path))
+        parsed = index.parsed
+
+        affected_tests(project.path, cache=cache)
+        assert index.parsed == parsed
+
+        edit(project, "tests/test_dynamic.py", "from app.core import add\n")
+        edit(project, "src/app/core.py")
+        assert "tests/test_dynamic.py" in affected_tests(project.path, cache=cache)["tests"]
+        assert index.parsed == parsed + 2
+
+    def test_concurrent_selections_share_one_index(self, project):
+        """Test that selections on worker threads share the index and parse each file once."""
+        edit(project, "src/app/core.py")
+        single = ImpactIndexCache()
+        expected = affected_tests(project.path, cache=single)
+        cache = ImpactIndexCache()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            selections = list(pool.map(lambda _: affected_tests(project.path, cache=cache), range(16)))
+
+        assert all(selection == expected for selection in selections)
+        assert cache.get(str(project.path)).parsed == single.get(str(project.path)).parsed
+
+
+class TestRendering:
+    """Test cases for the prompt section."""
+
+    def test_section(self, project):
+        """Test the tests and unmapped files of the section."""
+        edit(project, "src/app/core.py")
+        edit(project, "notes.txt")
+
+        section = affected_tests_section(project.path)
+
+        assert section.startswith("## Affected tests\n\nSelected by the server from the import graph")
+        assert "```\ntests/test_api.py\ntests/test_core.py\n```" in section
+        assert "- notes.txt" in section
+
+    def test_full_suite(self, project):
+        """Test that the section asks for the full suite with the reasons."""
+        edit(project, "tox.ini")
+
+        assert "Run the full suite:\n\n- tox.ini configures the tests" in affected_tests_section(project.path)
+
+    def test_not_a_repository(self, tmp_path):
+        """Test that the prompt says why there is no selection outside a checkout."""
+        assert affected_tests_section(tmp_path).startswith("## Affected tests\n\nNot available: ")
+
+
+class TestParsing:
+    """Test cases for the import and coverage parsers."""
+
+    def test_parse_imports(self):
+        """Test absolute, from and relative imports with their parent packages."""
+        source = "import a.b\nfrom c import d\nfrom . import e\nfrom ..f import g\n"
+
+        assert parse_imports(source, "pkg/sub/mod.py") == {
+            "a",
+            "a.b",
+            "c",
+            "c.d",
+            "pkg",
+            "pkg.sub",
+            "pkg.sub.e",
+            "pkg.f",
+            "pkg.f.g",
+        }
+        assert parse_imports("def broken(:\n", "x.py") == set()
+
+    @pytest.mark.parametrize(
+        "path, expected",
+        [
+            ("pkg/mod.py", ["pkg.mod"]),
+            ("pkg/__init__.py", ["pkg"]),
+            ("src/pkg/mod.py", ["src.pkg.mod", "pkg.mod"]),
+            ("README.md", []),
+        ],
+    )
+    def test_module_names(self, path, expected):
+        """Test the names of plain, package and src layout files."""
+        assert module_names(path) == expected
+
+    def test_read_coverage_contexts(self, tmp_path):
+        """Test that only pytest-cov test contexts of files inside the checkout are used."""
+        write_coverage(
+            tmp_path / ".coverage",
+            [
+                (str(tmp_path / "a.py"), "tests/test_a.py::test_one|run"),
+                ("b.py", "tests/test_b.py::TestB::test_two|setup"),
+                ("/elsewhere/c.py", "tests/test_c.py::test_three|run"),
+                (str(tmp_path / "d.py"), "test_d.test_four"),
+            ],
+        )
+
+        assert read_coverage_contexts(tmp_path / ".coverage", tmp_path) == {
+            "a.py": {"tests/test_a.py::test_one"},
+            "b.py": {"tests/test_b.py::TestB::test_two"},
+        }
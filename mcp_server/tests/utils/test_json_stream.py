@@ -0,0 +1,96 @@
+"""Tests for mcp_server.utils.json_stream module."""
+
+import io
+import json
+
+import pytest
+
+from mcp_server.utils.json_stream import JSONStreamError, JSONStreamReader, iter_lines
+
+
+def reader(document, chunk_size=3):
+    raw = document if isinstance(document, bytes) else json.dumps(document).encode()
+    return JSONStreamReader(io.BytesIO(raw), chunk_size=chunk_size)
+
+
+class TestIterArray:
+    """Test cases for JSONStreamReader.iter_array."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 7, 64 * 1024])
+    def test_elements_match_json_loads(self, chunk_size):
+        """Test that elements split across any chunk boundary decode like json.loads."""
+        document = [
+            {"id": 1, "body": 'Quote " backslash \\ newline \n tab \t', "nested": [True, False, None, {}]},
+            {"emoji": "😀 é \u007f", "number": -12.5e3, "big": 12345678901234567890, "empty": []},
+            "plain",
+            0,
+        ]
+        for ensure_ascii in (True, False):
+            raw = json.dumps(document, ensure_ascii=ensure_ascii, indent=2).encode()
+
+            assert list(reader(raw, chunk_size).iter_array()) == document
+
+    def test_empty_array(self):
+        """Test that an empty array yields nothing."""
+        assert list(reader(b" [ ] ").iter_array()) == []
+
+    def test_strings_are_truncated(self):
+        """Test that max_string_length truncates values but not keys."""
+        document = [{"long_key_name": "x" * 100, "items": ["y" * 50]}]
+
+        assert list(reader(document).iter_array(max_string_length=4)) == [{"long_key_name": "xxxx", "items": ["yyyy"]}]
+
+    def test_elements_are_read_lazily(self):
+        """Test that the stream is only read as far as the consumed elements."""
+        raw = io.BytesIO(json.dumps([{"id": index} for index in range(1000)]).encode())
+
+        elements = JSONStreamReader(raw, chunk_size=16).iter_array()
+
+        assert next(elements) == {"id": 0}
+        assert raw.tell() < 100
+
+    @pytest.mark.parametrize(
+        "raw",
+        [b'{"a": 1}', b"[1 2]", b'["unterminated', b'["bad \\x escape and more text"]', b"[tru]", b"[1,"],
+    )
+    def test_invalid_documents(self, raw):
+        """Test that malformed input raises JSONStreamError."""
+        with pytest.raises(JSONStreamError):
+            list(reader(raw).iter_array())
+
+
+class TestIterField:
+    """Test cases for JSONStreamReader.iter_field."""
+
+    def test_streams_field_in_pieces(self):
+        """Test that a string field is yielded in several pieces and other fields are skipped."""
+        document = {"id": 1, "user": {"login": "a", "tags": ["x"]}, "body": "line 1\nline 2 😀" * 100, "after": 2}
+
+        pieces = list(reader(document, chunk_size=64).iter_field("body"))
+
+        assert len(pieces) > 1
+        assert "".join(pieces) == document["body"]
+
+    def test_surrogate_pair_split_across_chunks(self):
+        """Test that an escaped surrogate pair is decoded even when split between chunks."""
+        raw = json.dumps({"body": "a😀b"}).encode()
+
+        for chunk_size in range(1, len(raw)):
+            assert "".join(reader(raw, chunk_size).iter_field("body")) == "a😀b"
+
+    @pytest.mark.parametrize("document", [{}, {"body": None}, {"other": "x"}])
+    def test_missing_or_null_field(self, document):
+        """Test that nothing is yielded for missing or null fields."""
+        assert list(reader(document).iter_field("body")) == []
+
+
+class TestIterLines:
+    """Test cases for iter_lines function."""
+
+    @pytest.mark.parametrize("text", ["", "a", "a\n", "a\nb", "\n\nab\nc\n", "long line " * 20])
+    def test_matches_split(self, text):
+        """Test that lines match str.split regardless of how the text is chunked."""
+        for size in (1, 2, 5):
+            chunks = [text[index : index + size] for index in range(0, len(text), size)]
+
+            assert list(iter_lines(chunks)) == text.split("\n")
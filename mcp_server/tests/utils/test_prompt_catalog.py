@@ -0,0 +1,126 @@
+"""Tests for mcp_server.utils.prompt_catalog module."""
+
+import time
+import tracemalloc
+
+import pytest
+from mcp.types import Prompt, PromptArgument
+
+from mcp_server.utils.prompt_catalog import CatalogEntry, PromptCatalog, encode_cursor
+
+CATEGORIES = ["review", "git", "testing", "refactoring"]
+
+
+def entry(name, tags=(), category=None, version="1"):
+    return CatalogEntry(name, frozenset(tags), category, version, listed=name)
+
+
+def synthetic_entry(n):
+    """A prompt as listed by prompts/list, with a description, an argument, two tags and a category."""
+    name = f"prompt-{n:05d}"
+    prompt = Prompt(
+        name=name,
+        description=f"Synthetic prompt {n} for listing benchmarks.",
+        arguments=[PromptArgument(name="files", description="Files to work on", required=False)],
+    )
+    return CatalogEntry(name, frozenset({f"tag-{n % 50}", "synthetic"}), CATEGORIES[n % 4], "1", listed=prompt)
+
+
+def pages(catalog, **kwargs):
+    """Every page of a listing, following the cursors."""
+    listed, cursor = catalog.page(**kwargs)
+    result = [listed]
+    while cursor is not None:
+        listed, cursor = catalog.page(cursor=cursor, page_size=kwargs.get("page_size", 100))
+        result.append(listed)
+    return result
+
+
+class TestPromptCatalog:
+    """Test cases for PromptCatalog class."""
+
+    def test_pages_in_name_order(self):
+        """Test that the pages list every prompt once, in name order."""
+        catalog = PromptCatalog()
+        catalog.sync(entry(name) for name in ["tasks", "commit", "code-review", "smart-test-runner", "comment-cleaner"])
+
+        assert pages(catalog, page_size=2) == [
+            ["code-review", "comment-cleaner"],
+            ["commit", "smart-test-runner"],
+            ["tasks"],
+        ]
+
+    def test_filters(self):
+        """Test the tag and category filters, alone and together, kept by the cursor."""
+        catalog = PromptCatalog()
+        catalog.sync([
+            entry("a", {"github"}, "review"),
+            entry("b", {"github"}, "git"),
+            entry("c", {"github", "tests"}, "review"),
+            entry("d", {"tests"}, "review"),
+        ])
+
+        assert pages(catalog, tag="github", page_size=2) == [["a", "b"], ["c"]]
+        assert pages(catalog, category="review", page_size=2) == [["a", "c"], ["d"]]
+        assert pages(catalog, tag="github", category="review", page_size=1) == [["a"], ["c"]]
+        assert catalog.page(tag="missing") == ([], None)
+        assert catalog.tags() == {"github": 3, "tests": 2}
+        assert catalog.categories() == {"git": 1, "review": 3}
+
+    def test_changes_between_pages(self):
+        """Test that prompts added or removed between two pages neither repeat nor shift the listing."""
+        catalog = PromptCatalog()
+        catalog.sync(entry(name) for name in "bdfh")
+        first, cursor = catalog.page(page_size=2)
+
+        catalog.update(entry("a"))
+        catalog.remove("d")
+        catalog.update(entry("e"))
+
+        assert first == ["b", "d"]
+        assert catalog.page(cursor=cursor, page_size=2) == (["e", "f"], encode_cursor("f", None, None))
+
+    def test_incremental_sync(self):
+        """Test that only new, changed and removed prompts count as changes."""
+        catalog = PromptCatalog()
+        catalog.sync([entry("a", {"x"}), entry("b", {"x"}), entry("c")])
+
+        changes = catalog.sync([entry("a", {"x"}), entry("b", {"y"}, version="2")])
+
+        assert (changes, len(catalog)) == (2, 2)
+        assert catalog.tags() == {"x": 1, "y": 1}
+        assert catalog.get("b").tags == {"y"}
+
+    @pytest.mark.parametrize(
+        "kwargs, message",
+        [
+            ({"cursor": "bogus"}, "Invalid cursor"),
+            ({"page_size": 0}, "page_size"),
+            ({"cursor": encode_cursor("a", "github", None), "tag": "tests"}, "other filters"),
+        ],
+    )
+    def test_invalid_arguments(self, kwargs, message):
+        """Test that invalid cursors, page sizes and changed filters are rejected."""
+        with pytest.raises(ValueError, match=message):
+            PromptCatalog().page(**kwargs)
+
+    def test_listing_performance(self, performance_thresholds):
+        """Test the page latency and memory of a catalog of 10,000 prompts."""
+        entries = [synthetic_entry(n) for n in range(10_000)]
+        tracemalloc.start()
+        catalog = PromptCatalog()
+        catalog.sync(reversed(entries))
+        catalog_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        start_time = time.perf_counter()
+        listing = pages(catalog, page_size=100)
+        filtered = pages(catalog, tag="tag-7", category="git", page_size=100)
+        elapsed = (time.perf_counter() - start_time) / (len(listing) + len(filtered))
+
+        assert [prompt.name for page in listing for prompt in page] == [entry.name for entry in entries]
+        assert sum(map(len, filtered)) == 100
+        threshold = performance_thresholds["prompt_listing"]
+        assert elapsed < threshold, f"A page took {elapsed * 1000:.3f}ms, exceeding threshold of {threshold}s"
+        # The catalog holds names and indexes, the listed prompts are shared with the entries
+        assert catalog_memory < 5_000_000, f"The catalog took {catalog_memory / 1e6:.1f} MB"
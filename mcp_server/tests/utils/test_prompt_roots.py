@@ -0,0 +1,103 @@
+"""Tests for mcp_server.utils.prompt_roots module."""
+
+import os
+from pathlib import Path
+
+import mcp_server.utils.prompt_roots as prompt_roots_module
+from mcp_server.utils.prompt_roots import PromptIndex, configured_roots
+
+
+def write(root, name, content="# Prompt\n"):
+    root.mkdir(parents=True, exist_ok=True)
+    (root / f"{name}.md").write_text(content, encoding="utf-8")
+
+
+def touch(directory):
+    """Move the modification time of a directory forward, as coarse clocks may not."""
+    stat = directory.stat()
+    os.utime(directory, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+class TestConfiguredRoots:
+    """Test cases for configured_roots function."""
+
+    def test_prompt_path_first(self, tmp_path):
+        """Test that the prompt path comes before the bundled prompts, in its order."""
+        prompt_path = os.pathsep.join(["/user", "", "/team"])
+
+        assert configured_roots(tmp_path, prompt_path) == [Path("/user"), Path("/team"), tmp_path / "prompts"]
+
+    def test_environment(self, tmp_path, monkeypatch):
+        """Test that the prompt path is read from the environment by default."""
+        monkeypatch.setenv("AI_PROMPTS_MCP_PROMPT_PATH", "/org")
+
+        assert configured_roots(tmp_path) == [Path("/org"), tmp_path / "prompts"]
+
+
+class TestPromptIndex:
+    """Test cases for PromptIndex class."""
+
+    def test_precedence(self, tmp_path):
+        """Test that a prompt resolves to the first root that has it."""
+        user, team, bundled = tmp_path / "user", tmp_path / "team", tmp_path / "bundled"
+        write(user, "commit")
+        write(team, "commit")
+        write(team, "review")
+        write(bundled, "review")
+        write(bundled, "tasks")
+        (bundled / "notes.txt").write_text("not a prompt", encoding="utf-8")
+
+        index = PromptIndex([user, team, bundled])
+
+        assert index.names() == ["commit", "review", "tasks"]
+        assert index.resolve("commit") == user / "commit.md"
+        assert index.resolve("review") == team / "review.md"
+        assert index.root_of("tasks") == bundled
+        assert index.resolve("notes") is None
+
+    def test_incremental_refresh(self, tmp_path):
+        """Test that only the roots that changed are listed again."""
+        user, bundled = tmp_path / "user", tmp_path / "bundled"
+        write(user, "other")
+        write(bundled, "commit")
+        index = PromptIndex([user, bundled], refresh_interval=0)
+        listings = index.listings
+
+        assert index.refresh() == set()
+        assert index.listings == listings
+
+        write(user, "commit")
+        touch(user)
+        assert index.refresh() == {"commit"}
+        assert index.listings == listings + 1
+        assert index.resolve("commit") == user / "commit.md"
+
+        (user / "commit.md").unlink()
+        touch(user)
+        assert index.resolve("commit") == bundled / "commit.md"
+
+    def test_root_created_later(self, tmp_path):
+        """Test that a missing root is indexed once it exists, a new prompt as soon as it is looked up."""
+        user, bundled = tmp_path / "user", tmp_path / "bundled"
+        write(bundled, "commit")
+        index = PromptIndex([user, bundled], refresh_interval=3600)
+
+        write(user, "team-review")
+
+        assert index.resolve("team-review") == user / "team-review.md"
+        assert index.resolve("commit") == bundled / "commit.md"
+
+    def test_repeated_misses_refresh_once(self, tmp_path, monkeypatch):
+        """Test that a missing prompt stats the roots on its first lookup of an interval only."""
+        user, bundled = tmp_path / "user", tmp_path / "bundled"
+        write(bundled, "commit")
+        index = PromptIndex([user, bundled], refresh_interval=3600)
+        stats = []
+        stamp = prompt_roots_module._stamp
+        monkeypatch.setattr(prompt_roots_module, "_stamp", lambda root: stats.append(root) or stamp(root))
+
+        for _ in range(100):
+            assert index.resolve("missing") is None
+        assert index.resolve("other") is None
+
+        assert stats == [user, bundled] * 2
@@ -0,0 +1,92 @@
+"""Tests for mcp_server.utils.prompt_search module."""
+
+import random
+import time
+
+import pytest
+
+from mcp_server.utils.prompt_search import PromptDocument, PromptSearchIndex, tokenize
+
+DOCUMENTS = [
+    PromptDocument("commit", "Smart Git Commit with conventional messages.", "Stage the files and commit.", "1"),
+    PromptDocument("code-review", "Comprehensive code review.", "Look for bugs in the commit range.", "1"),
+    PromptDocument("tasks", "Task management workflow.", "Create and update tasks.", "1"),
+]
+
+
+def names(matches):
+    return [match["name"] for match in matches]
+
+
+class TestPromptSearchIndex:
+    """Test cases for PromptSearchIndex class."""
+
+    def test_ranking(self):
+        """Test that a word of the name or description ranks above the same word in a body."""
+        index = PromptSearchIndex()
+        index.sync(DOCUMENTS)
+
+        matches = index.search("commit")
+
+        assert names(matches) == ["commit", "code-review"]
+        assert matches[0]["description"] == "Smart Git Commit with conventional messages."
+        assert matches[0]["score"] > matches[1]["score"]
+        assert index.search("the of") == []
+        assert names(index.search("review tasks", limit=1)) == ["code-review"]
+
+    def test_incremental_sync(self):
+        """Test that only changed prompts are indexed again and removed ones are dropped."""
+        index = PromptSearchIndex()
+        index.sync(DOCUMENTS)
+
+        changes = index.sync([
+            DOCUMENTS[0],
+            PromptDocument("code-review", "Security review.", "Find injection flaws.", "2"),
+        ])
+
+        assert (changes, index.indexed, len(index)) == (2, 4, 2)
+        assert names(index.search("injection")) == ["code-review"]
+        assert index.search("bugs tasks") == []
+
+    def test_refresh_interval(self):
+        """Test that refresh syncs at most once per interval."""
+        index = PromptSearchIndex(refresh_interval=3600)
+        calls = []
+
+        def documents():
+            calls.append(1)
+            return DOCUMENTS
+
+        index.refresh(documents)
+        index.refresh(documents)
+
+        assert len(calls) == 1
+
+    @pytest.mark.parametrize("limit", [0, 101])
+    def test_invalid_limit(self, limit):
+        """Test that the limit is checked."""
+        with pytest.raises(ValueError, match="limit"):
+            PromptSearchIndex().search("commit", limit)
+
+    def test_tokenize(self):
+        """Test that words are lowercased and stop words dropped."""
+        assert tokenize("Review the PR-123 comments, a b") == ["review", "pr", "123", "comments"]
+
+    def test_search_performance(self, performance_thresholds):
+        """Test that a search of a 1,000-prompt library stays under the threshold."""
+        words = [f"word{n}" for n in range(2000)]
+        rng = random.Random(0)
+        index = PromptSearchIndex()
+        index.sync(
+            PromptDocument(f"prompt-{n}", " ".join(rng.choices(words, k=12)), " ".join(rng.choices(words, k=400)), "1")
+            for n in range(1000)
+        )
+        queries = [" ".join(rng.choices(words, k=3)) for _ in range(100)]
+
+        start_time = time.perf_counter()
+        for query in queries:
+            index.search(query)
+        elapsed = (time.perf_counter() - start_time) / len(queries)
+
+        threshold = performance_thresholds["prompt_search"]
+        assert elapsed < threshold, f"A search took {elapsed * 1000:.3f}ms, exceeding threshold of {threshold}s"
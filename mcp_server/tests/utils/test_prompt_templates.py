@@ -0,0 +1,215 @@
+"""Tests for mcp_server.utils.prompt_templates module."""
+
+import os
+
+import pytest
+
+from mcp_server.utils.prompt_templates import (
+    CompiledPrompt,
+    PromptArgument,
+    PromptTemplateCache,
+    TemplateError,
+    parse_frontmatter,
+)
+
+
+def write(path, content):
+    path.write_text(content, encoding="utf-8")
+    # Coarse clocks may give a rewritten file the same modification time
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def fragment_resolver(directory):
+    def resolve(name):
+        path = directory / f"{name}.md"
+        return path if path.exists() else None
+
+    return resolve
+
+
+FRONTMATTER = """---
+title: Test Prompt
+arguments:
+  - name: files
+    description: "Files to work on"
+  - name: mode
+    required: true
+  - name: style
+    default: pep8
+---
+"""
+
+
+class TestParseFrontmatter:
+    """Test cases for parse_frontmatter function."""
+
+    def test_arguments(self):
+        """Test that scalars and the list of arguments are parsed."""
+        metadata = parse_frontmatter(FRONTMATTER.strip("-\n"))
+
+        assert metadata["title"] == "Test Prompt"
+        assert metadata["arguments"] == [
+            {"name": "files", "description": "Files to work on"},
+            {"name": "mode", "required": True},
+            {"name": "style", "default": "pep8"},
+        ]
+
+    def test_other_lines_are_ignored(self):
+        """Test that comments and lines without a key are skipped."""
+        assert parse_frontmatter("# comment\njust text\nkey: value\n") == {"key": "value"}
+
+
+class TestCompiledPrompt:
+    """Test cases for CompiledPrompt class."""
+
+    def test_declared_arguments(self):
+        """Test the arguments read from the frontmatter."""
+        prompt = CompiledPrompt.from_source(FRONTMATTER + "Body")
+
+        assert prompt.arguments == (
+            PromptArgument("files", "Files to work on"),
+            PromptArgument("mode", required=True),
+            PromptArgument("style", default="pep8"),
+        )
+        assert prompt.values({"mode": "fast", "files": None}) == {"files": "", "mode": "fast", "style": "pep8"}
+
+    @pytest.mark.parametrize(
+        "arguments, message",
+        [
+            ({}, "Missing required prompt argument: mode"),
+            ({"mode": "fast", "color": "red"}, "Unknown prompt arguments: color"),
+        ],
+    )
+    def test_invalid_values(self, arguments, message):
+        """Test that missing and undeclared arguments are rejected."""
+        prompt = CompiledPrompt.from_source(FRONTMATTER + "Body")
+
+        with pytest.raises(TemplateError, match=message):
+            prompt.values(arguments)
+
+    def test_conditionals(self):
+        """Test both branches, negation and tags alone on their line."""
+        prompt = CompiledPrompt.from_source(
+            "Start\n{% if files %}\nFiles: {{ files }}\n{% else %}\nEverything\n{% endif %}\n"
+            "Mode {% if not files %}all{% endif %}."
+        )
+
+        assert prompt.render({"files": "a.py"}) == "Start\nFiles: a.py\nMode ."
+        assert prompt.render({"files": ""}) == "Start\nEverything\nMode all."
+
+    def test_values_are_not_templates(self):
+        """Test that values are inserted as they are and unknown names are left alone."""
+        prompt = CompiledPrompt.from_source("{{ files }} {{SCRIPT_PATHS}} {{ a.b }} {% raw %}")
+
+        assert (
+            prompt.render({"files": "{{ secret }}{% if x %}"})
+            == "{{ secret }}{% if x %} {{SCRIPT_PATHS}} {{ a.b }} {% raw %}"
+        )
+
+    def test_includes(self, tmp_path):
+        """Test that fragments are spliced in before compiling, with the tags they contain."""
+        write(tmp_path / "steps.md", "{% if files %}Check {{ files }}{% endif %}\n")
+        prompt = CompiledPrompt.from_source('Start\n{% include "steps" %}\nEnd', fragment_resolver(tmp_path))
+
+        assert prompt.render({"files": "a.py"}) == "Start\nCheck a.py\nEnd"
+        assert list(prompt.dependencies) == ["steps"]
+
+    @pytest.mark.parametrize(
+        "fragments, message",
+        [
+            ({"a": '{% include "b" %}', "b": '{% include "a" %}'}, "Include cycle: a -> b -> a"),
+            ({"a": '{% include "missing" %}'}, "Unknown fragment: missing"),
+        ],
+    )
+    def test_invalid_includes(self, tmp_path, fragments, message):
+        """Test that include cycles and unknown fragments are rejected."""
+        for name, content in fragments.items():
+            write(tmp_path / f"{name}.md", content)
+
+        with pytest.raises(TemplateError, match=message):
+            CompiledPrompt.from_source('{% include "a" %}', fragment_resolver(tmp_path))
+
+    @pytest.mark.parametrize(
+        "source",
+        ["{% if a %}open", "{% endif %}", "{% else %}", "{% if a %}{% else %}{% else %}{% endif %}"],
+    )
+    def test_unbalanced_tags(self, source):
+        """Test that mismatched block tags are rejected."""
+        with pytest.raises(TemplateError):
+            CompiledPrompt.from_source(source)
+
+
+class TestPromptTemplateCache:
+    """Test cases for PromptTemplateCache class."""
+
+    def test_compiled_once(self, tmp_path):
+        """Test that a prompt file is compiled again only when it changes."""
+        path = tmp_path / "prompt.md"
+        path.write_text("Hello {{ name }}", encoding="utf-8")
+        cache = PromptTemplateCache()
+
+        assert cache.compiled(path) is cache.compiled(path)
+        assert cache.compilations == 1
+
+        path.write_text("Bye {{ name }}", encoding="utf-8")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        assert cache.render(path, variables={"name": "you"}) == "Bye you"
+        assert cache.compilations == 2
+
+    def test_fragment_change_recompiles_its_prompts(self, tmp_path):
+        """Test that editing a fragment recompiles and re-renders only the prompts including it."""
+        fragments = tmp_path / "fragments"
+        fragments.mkdir()
+        write(fragments / "workflow.md", "Run the tests.\n")
+        write(fragments / "other.md", "Other.\n")
+        review, handler, unrelated = tmp_path / "review.md", tmp_path / "handler.md", tmp_path / "tasks.md"
+        write(review, '# Review\n{% include "workflow" %}')
+        write(handler, '# Handler\n{% include "workflow" %}')
+        write(unrelated, '# Tasks\n{% include "other" %}')
+        cache = PromptTemplateCache()
+        resolve = fragment_resolver(fragments)
+        for path in (review, handler, unrelated):
+            cache.render(path, fragments=resolve)
+
+        write(fragments / "workflow.md", "Run the tests with coverage.\n")
+
+        assert cache.render(review, fragments=resolve) == "# Review\nRun the tests with coverage."
+        assert cache.compilations == 4
+        assert cache.render(handler, fragments=resolve) == "# Handler\nRun the tests with coverage."
+        assert cache.render(unrelated, fragments=resolve) == "# Tasks\nOther."
+        assert (cache.compilations, cache.renders) == (5, 5)
+
+    def test_invalidate(self, tmp_path):
+        """Test that invalidating a fragment drops the prompts including it, directly or not."""
+        fragments = tmp_path / "fragments"
+        fragments.mkdir()
+        write(fragments / "outer.md", 'Outer {% include "inner" %}')
+        write(fragments / "inner.md", "inner")
+        prompt = tmp_path / "prompt.md"
+        write(prompt, '{% include "outer" %}')
+        cache = PromptTemplateCache()
+
+        assert cache.render(prompt, fragments=fragment_resolver(fragments)) == "Outer inner"
+        assert cache.invalidate(fragments / "inner.md") == [str(prompt)]
+        assert cache.invalidate(fragments / "inner.md") == []
+
+    def test_rendered_prompts_are_cached(self, tmp_path):
+        """Test that rendered prompts are kept by arguments, least recently used first out."""
+        path = tmp_path / "prompt.md"
+        path.write_text(FRONTMATTER + "{{ mode }} {{ files }}", encoding="utf-8")
+        cache = PromptTemplateCache(max_entries=2)
+
+        assert cache.render(path, {"mode": "fast"}) == "fast "
+        assert cache.render(path, {"mode": "fast", "files": None}) == "fast "
+        assert cache.renders == 1
+
+        cache.render(path, {"mode": "slow"})
+        cache.render(path, {"mode": "fast"})
+        cache.render(path, {"mode": "new"})
+        assert cache.renders == 3
+        cache.render(path, {"mode": "fast"})
+        assert cache.renders == 3
+        cache.render(path, {"mode": "slow"})
+        assert cache.renders == 4
@@ -0,0 +1,151 @@
+"""Tests for mcp_server.utils.review_batch module."""
+
+import json
+
+import pytest
+
+from mcp_server.utils.github_api import GitHubClient, RateLimitScheduler
+from mcp_server.utils.review_batch import aggregate, main, parse_target, review_batch
+from mcp_server.utils.review_pages import ReviewPageCache
+
+OPEN_PULLS = "/repos/owner/repo/pulls?state=open&per_page=100"
+
+
+@pytest.fixture
+def github_routes(fake_github, test_data_dir):
+    """Pull request owner/repo#7 (head abc123, reviewed) and #8 (head def456, not reviewed), both open."""
+    routes = json.loads((test_data_dir / "review-scripts" / "github.json").read_text(encoding="utf-8"))
+    for path, body in routes.items():
+        fake_github.routes[path] = (200, {}, body)
+    fake_github.routes[OPEN_PULLS] = (
+        200,
+        {},
+        [{"number": 8, "head": {"sha": "def456"}}, {"number": 7, "head": {"sha": "abc123"}}],
+    )
+    fake_github.routes["/repos/owner/repo/pulls/8/reviews?per_page=100"] = (200, {}, [])
+    return fake_github
+
+
+@pytest.fixture
+def client(fake_github):
+    return GitHubClient(scheduler=RateLimitScheduler(rate=1000.0), sleep=lambda _: None)
+
+
+SUMMARY_7 = {"actionable": 3, "nitpicks": 3, "duplicates": 2, "outside_diff_range": 2, "total": 10}
+
+
+class TestReviewBatch:
+    """Test cases for review_batch function."""
+
+    def test_repository_and_pull_requests(self, github_routes, client):
+        """Test that repositories expand to their open PRs, in order and without repeats."""
+        batch = review_batch(client, ReviewPageCache(), ["owner/repo#7", "owner/repo", "owner/repo#9"], concurrency=3)
+
+        assert batch["pull_requests"] == [
+            {"pull_request": "owner/repo#7", "head_sha": "abc123", "reviewed": True, "summary": SUMMARY_7},
+            {"pull_request": "owner/repo#8", "head_sha": "def456", "reviewed": False, "summary": {"total": 0}},
+            {"pull_request": "owner/repo#9", "error": "GitHub API request failed (404): Not Found"},
+        ]
+        assert batch["aggregate"] == {
+            "pull_requests": 3,
+            "reviewed": 1,
+            "unreviewed": 1,
+            "failed": 1,
+            "summary": {"actionable": 3, "duplicates": 2, "nitpicks": 3, "outside_diff_range": 2, "total": 10},
+        }
+
+    def test_listed_heads_are_not_fetched_again(self, github_routes, client):
+        """Test that the head SHAs of the open PR list are used as they are."""
+        review_batch(client, ReviewPageCache(), ["owner/repo"])
+
+        paths = [request["path"] for request in github_routes.requests]
+        assert "/repos/owner/repo/pulls/7" not in paths
+        assert "/repos/owner/repo/pulls/8" not in paths
+
+    def test_reports_are_cached_for_the_pages(self, github_routes, client):
+        """Test that the reports fetched by the batch are reused by a later run."""
+        cache = ReviewPageCache()
+        review_batch(client, cache, ["owner/repo#7"])
+        github_routes.requests.clear()
+
+        entry = cache.get(client, "owner", "repo", "7", "abc123")
+
+        assert entry is not None and entry["summary"] == SUMMARY_7
+        assert github_routes.requests == []
+
+    def test_connections_are_shared(self, github_routes, client):
+        """Test that the workers share the client's pooled connections."""
+        review_batch(client, ReviewPageCache(), ["owner/repo"], concurrency=2)
+
+        assert github_routes.connections <= 2
+
+    def test_invalid_targets_are_reported(self, github_routes, client):
+        """Test that a malformed target is an entry with its error, not a failed batch."""
+        batch = review_batch(client, ReviewPageCache(), ["owner", "owner/repo#7"])
+
+        assert batch["pull_requests"][0] == {
+            "pull_request": "owner",
+            "error": "Invalid target: 'owner' (expected owner/name or owner/name#number)",
+        }
+        assert batch["aggregate"]["failed"] == 1
+
+    @pytest.mark.parametrize("targets, concurrency", [([], 4), (["owner/repo"], 0), (["owner/repo"], 17)])
+    def test_invalid_arguments(self, client, targets, concurrency):
+        """Test that an empty batch and an out of range concurrency are rejected."""
+        with pytest.raises(ValueError):
+            review_batch(client, ReviewPageCache(), targets, concurrency)
+
+
+class TestHelpers:
+    """Test cases for targets and aggregates."""
+
+    @pytest.mark.parametrize(
+        "target, expected",
+        [
+            ("owner/repo", ("owner", "repo", None)),
+            ("my-org/my.repo#12", ("my-org", "my.repo", 12)),
+            (" owner/repo#3 ", ("owner", "repo", 3)),
+        ],
+    )
+    def test_parse_target(self, target, expected):
+        """Test the repository and pull request forms."""
+        assert parse_target(target) == expected
+
+    @pytest.mark.parametrize("target", ["owner", "owner/repo/x", "owner/repo#", "owner/repo#x"])
+    def test_invalid_targets(self, target):
+        """Test that other forms are rejected."""
+        with pytest.raises(ValueError, match="Invalid target"):
+            parse_target(target)
+
+    def test_aggregate_adds_up_removed_counts(self):
+        """Test that repeated and stale counts are added up like the category counts."""
+        entries = [
+            {"reviewed": True, "summary": {"nitpicks": 1, "total": 1, "repeated": 2}},
+            {"reviewed": True, "summary": {"nitpicks": 2, "total": 2}},
+        ]
+
+        assert aggregate(entries)["summary"] == {"nitpicks": 3, "repeated": 2, "total": 3}
+
+
+class TestMain:
+    """Test cases for the command line entry point."""
+
+    def test_ndjson(self, github_routes, capsys):
+        """Test one record per pull request with the aggregate last."""
+        assert main(["--format", "ndjson", "--concurrency", "2", "owner/repo"]) == 0
+
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [record.get("pull_request") for record in records] == ["owner/repo#8", "owner/repo#7", None]
+        assert records[-1]["aggregate"]["summary"]["total"] == 10
+
+    def test_failed_pull_requests(self, github_routes, capsys):
+        """Test that the exit status reports failed pull requests while the batch is still printed."""
+        assert main(["owner/repo#7", "owner/repo#9"]) == 1
+
+        assert json.loads(capsys.readouterr().out)["aggregate"]["failed"] == 1
+
+    def test_invalid_concurrency(self, capsys):
+        """Test the error message of a rejected batch."""
+        assert main(["--concurrency", "0", "owner/repo"]) == 1
+
+        assert "concurrency must be between 1 and 16" in capsys.readouterr().err
@@ -0,0 +1,184 @@
+"""Tests for mcp_server.utils.review_pages module."""
+
+import json
+
+import pytest
+
+from mcp_server.utils.github_api import GitHubClient, RateLimitScheduler
+from mcp_server.utils.review_pages import (
+    ReviewPageCache,
+    decode_cursor,
+    encode_cursor,
+    flatten_report,
+    review_comment_page,
+)
+
+
+@pytest.fixture
+def github_routes(fake_github, test_data_dir):
+    """Serve the recorded GitHub responses of pull request owner/repo#7 (head abc123)."""
+    routes = json.loads((test_data_dir / "review-scripts" / "github.json").read_text(encoding="utf-8"))
+    for path, body in routes.items():
+        fake_github.routes[path] = (200, {}, body)
+    return fake_github
+
+
+@pytest.fixture
+def client(fake_github):
+    return GitHubClient(scheduler=RateLimitScheduler(rate=1000.0), sleep=lambda _: None)
+
+
+def all_pages(client, cache, page_size):
+    pages = [review_comment_page(client, cache, "owner/repo", 7, page_size=page_size)]
+    while pages[-1]["next_cursor"]:
+        pages.append(review_comment_page(client, cache, "owner/repo", 7, pages[-1]["next_cursor"], page_size))
+    return pages
+
+
+class TestReviewCommentPage:
+    """Test cases for review_comment_page function."""
+
+    def test_pages_in_priority_order(self, github_routes, client):
+        """Test that pages walk actionable, outside diff range, duplicate then nitpick comments."""
+        pages = all_pages(client, ReviewPageCache(), page_size=4)
+
+        assert [len(page["comments"]) for page in pages] == [4, 4, 2]
+        assert all(page["total"] == 10 and page["head_sha"] == "abc123" and page["reviewed"] for page in pages)
+        assert pages[0]["summary"]["total"] == 10
+        categories = [comment["category"] for page in pages for comment in page["comments"]]
+        assert categories == ["actionable"] * 3 + ["outside_diff_range"] * 2 + ["duplicates"] * 2 + ["nitpicks"] * 3
+
+    def test_later_pages_are_served_from_the_cache(self, github_routes, client):
+        """Test that only the first page calls GitHub."""
+        cache = ReviewPageCache()
+        first = review_comment_page(client, cache, "owner/repo", 7, page_size=4)
+        github_routes.requests.clear()
+
+        review_comment_page(client, cache, "owner/repo", 7, first["next_cursor"], 4)
+
+        assert github_routes.requests == []
+
+    def test_cursor_stays_on_its_head(self, github_routes, client):
+        """Test that a push while paging does not shift the pages, and the next first page follows it."""
+        cache = ReviewPageCache()
+        first = review_comment_page(client, cache, "owner/repo", 7, page_size=4)
+        github_routes.routes["/repos/owner/repo/pulls/7"] = (200, {}, {"head": {"sha": "def456"}})
+
+        second = review_comment_page(client, cache, "owner/repo", 7, first["next_cursor"], 4)
+        restarted = review_comment_page(client, cache, "owner/repo", 7)
+
+        assert (second["head_sha"], len(second["comments"])) == ("abc123", 4)
+        assert restarted == {
+            "head_sha": "def456",
+            "reviewed": False,
+            "summary": {"total": 0},
+            "total": 0,
+            "comments": [],
+            "next_cursor": None,
+        }
+
+    def test_review_posted_after_a_miss(self, github_routes, client):
+        """Test that a head without a review is fetched again, so a review posted later is found."""
+        cache = ReviewPageCache()
+        reviews = github_routes.routes["/repos/owner/repo/pulls/7/reviews?per_page=100"]
+        github_routes.routes["/repos/owner/repo/pulls/7/reviews?per_page=100"] = (200, {}, [])
+
+        before = review_comment_page(client, cache, "owner/repo", 7)
+        github_routes.routes["/repos/owner/repo/pulls/7/reviews?per_page=100"] = reviews
+        after = review_comment_page(client, cache, "owner/repo", 7)
+
+        assert (before["reviewed"], before["total"]) == (False, 0)
+        assert (after["reviewed"], after["total"]) == (True, 10)
+
+    def test_least_recently_used_heads_are_evicted(self, github_routes, client):
+        """Test that the cache is bounded."""
+        cache = ReviewPageCache(max_entries=1)
+        review_comment_page(client, cache, "owner/repo", 7)
+        # CodeRabbit reviews a new head
+        routes = github_routes.routes
+        status, headers, reviews = routes["/repos/owner/repo/pulls/7/reviews?per_page=100"]
+        review = {**reviews[2], "id": 16, "commit_id": "def456", "submitted_at": "2024-05-04T11:00:00Z"}
+        routes["/repos/owner/repo/pulls/7/reviews?per_page=100"] = (status, headers, [*reviews, review])
+        routes["/repos/owner/repo/pulls/7/reviews/16"] = (200, {}, review)
+        routes["/repos/owner/repo/pulls/7/reviews/16/comments"] = (200, {}, [])
+        routes["/repos/owner/repo/pulls/7"] = (200, {}, {"head": {"sha": "def456"}})
+        assert review_comment_page(client, cache, "owner/repo", 7)["reviewed"]
+        github_routes.requests.clear()
+
+        review_comment_page(client, cache, "owner/repo", 7, encode_cursor("abc123", 0))
+
+        assert "/repos/owner/repo/pulls/7/reviews?per_page=100" in [
+            request["path"] for request in github_routes.requests
+        ]
+
+    def test_progress(self, github_routes, client):
+        """Test that the phases are reported with the comments they completed, cache hits with none."""
+        cache = ReviewPageCache()
+        phases = []
+
+        def progress(phase, comments):
+            phases.append((phase, [comment["category"] for comment in comments]))
+
+        first = review_comment_page(client, cache, "owner/repo", 7, page_size=4, progress=progress)
+        review_comment_page(client, cache, "owner/repo", 7, first["next_cursor"], 4, progress)
+
+        assert phases == [
+            ("pr_info", []),
+            ("reviews", []),
+            ("inline_comments", ["actionable"] * 3),
+            ("review_body", ["outside_diff_range"] * 2 + ["duplicates"] * 2 + ["nitpicks"] * 3),
+        ]
+
+    def test_progress_of_a_stored_report(self, github_routes, client):
+        """Test that a report stored by an earlier run still reports the actionable comments first."""
+        review_comment_page(client, ReviewPageCache(), "owner/repo", 7)
+        github_routes.requests.clear()
+        phases = []
+
+        review_comment_page(
+            client, ReviewPageCache(), "owner/repo", 7, progress=lambda phase, comments: phases.append(len(comments))
+        )
+
+        assert phases == [0, 0, 3, 7]
+        assert not any("/reviews/" in request["path"] for request in github_routes.requests)
+
+    @pytest.mark.parametrize(
+        "repository, kwargs, message",
+        [
+            ("owner", {}, "Invalid repository"),
+            ("owner/repo/x", {}, "Invalid repository"),
+            ("owner/repo", {"page_size": 0}, "page_size"),
+            ("owner/repo", {"cursor": "not a cursor"}, "Invalid cursor"),
+        ],
+    )
+    def test_invalid_arguments(self, client, repository, kwargs, message):
+        """Test that bad arguments are rejected before calling GitHub."""
+        with pytest.raises(ValueError, match=message):
+            review_comment_page(client, ReviewPageCache(), repository, 7, **kwargs)
+
+
+class TestHelpers:
+    """Test cases for cursors and flattening."""
+
+    def test_cursor_round_trip(self):
+        """Test that cursors decode to the head and offset they were made from."""
+        assert decode_cursor(encode_cursor("abc123", 40)) == ("abc123", 40)
+
+    @pytest.mark.parametrize("cursor", [encode_cursor("abc", -1), "W10=", "bnVsbA=="])
+    def test_malformed_cursors(self, cursor):
+        """Test that well-encoded cursors with bad contents are rejected too."""
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            decode_cursor(cursor)
+
+    def test_flatten_report(self):
+        """Test the category names and that the summary is not a comment."""
+        report = {
+            "summary": {"total": 2},
+            "nitpick_comments": [{"title": "N"}],
+            "actionable_comments": [{"title": "A"}],
+        }
+
+        assert flatten_report(report) == [
+            {"category": "actionable", "title": "A"},
+            {"category": "nitpicks", "title": "N"},
+        ]
@@ -0,0 +1,230 @@
+"""Tests for mcp_server.utils.review_store module."""
+
+import sqlite3
+
+import pytest
+
+from mcp_server.utils.review_store import ReviewStore, get_review_store_path
+
+REPO = "owner/repo"
+
+
+def review(review_id, commit_sha, submitted_at, login="coderabbitai[bot]"):
+    return {
+        "id": review_id,
+        "user": {"login": login},
+        "commit_id": commit_sha,
+        "submitted_at": submitted_at,
+        "state": "COMMENTED",
+        "body": "Review body",
+    }
+
+
+def comment(category, priority, title, created_at, review_id=None, **fields):
+    return {
+        "category": category,
+        "priority": priority,
+        "title": title,
+        "file": "a.py",
+        "line": "3-5",
+        "body": f"Body of {title}",
+        "created_at": created_at,
+        "review_id": review_id,
+        **fields,
+    }
+
+
+@pytest.fixture
+def store():
+    with ReviewStore() as review_store:
+        yield review_store
+
+
+@pytest.fixture
+def history(store):
+    """Two CodeRabbit reviews on commits aaa111 and bbb222, plus human comments."""
+    store.record_reviews(
+        REPO,
+        7,
+        [review(1, "aaa111", "2024-05-01T10:00:00Z"), review(2, "bbb222", "2024-05-02T10:00:00Z"), {"body": "no id"}],
+    )
+    store.record_comments(
+        REPO,
+        7,
+        "coderabbit",
+        [
+            comment("nitpicks", "LOW", "Old nitpick", "2024-05-01T10:00:00Z"),
+            comment("actionable", "HIGH", "Old bug", "2024-05-01T10:00:00Z"),
+        ],
+        review_id=1,
+    )
+    store.record_comments(
+        REPO,
+        7,
+        "coderabbit",
+        [
+            comment("nitpicks", "LOW", "New nitpick", "2024-05-02T10:00:00Z"),
+            comment("outside_diff_range", "VERY LOW", "Elsewhere", "2024-05-02T10:00:00Z"),
+            comment("duplicates", "MEDIUM", "Again", "2024-05-02T10:00:00Z"),
+        ],
+        review_id=2,
+    )
+    store.record_comments(
+        REPO,
+        7,
+        "human",
+        [
+            comment("human", None, None, "2024-05-02T12:00:00Z", review_id=5, author="alice", line=12),
+            comment("human", None, None, "2024-05-01T12:00:00Z", review_id=4, author="bob", resolved=True),
+        ],
+    )
+    return store
+
+
+def titles(comments):
+    return [item["title"] or item["author"] for item in comments]
+
+
+class TestQueries:
+    """Test cases for querying stored comments."""
+
+    def test_priority_then_time_order(self, history):
+        """Test that comments come highest priority first, oldest first within a priority."""
+        comments = history.query_comments(REPO, 7)
+
+        assert titles(comments) == ["Old bug", "Again", "Old nitpick", "New nitpick", "Elsewhere", "bob", "alice"]
+
+    def test_nitpicks_since_commit(self, history):
+        """Test the "unresolved nitpicks since commit X" query, also with a SHA prefix."""
+        for commit in ("bbb222", "BBB2"):
+            comments = history.query_comments(REPO, 7, category="nitpicks", since_commit=commit, unresolved_only=True)
+
+            assert titles(comments) == ["New nitpick"]
+
+    def test_commit_date_takes_precedence_over_reviews(self, history):
+        """Test that a known head commit date is used as the start of the commit."""
+        history.record_commit(REPO, 7, "bbb222", "2024-05-01T11:00:00Z")
+
+        assert titles(history.query_comments(REPO, 7, source="human", since_commit="bbb222")) == ["bob", "alice"]
+
+    def test_unresolved_only(self, history):
+        """Test that comments known to be resolved are skipped, unknown ones kept."""
+        comments = history.query_comments(REPO, 7, source="human", unresolved_only=True)
+
+        assert titles(comments) == ["alice"]
+        assert comments[0]["resolved"] is None
+        assert history.query_comments(REPO, 7, source="human")[0]["resolved"] is True
+
+    def test_file_and_limit(self, history):
+        """Test the file filter and the limit."""
+        assert history.query_comments(REPO, 7, file="b.py") == []
+        assert titles(history.query_comments(REPO, 7, file="a.py", limit=2)) == ["Old bug", "Again"]
+
+    def test_lines_are_text(self, history):
+        """Test that line numbers and ranges are returned alike."""
+        assert {item["line"] for item in history.query_comments(REPO, 7)} == {"3-5", "12"}
+
+    @pytest.mark.parametrize("commit, message", [("ccc333", "not in the review store"), ("x'--", "Invalid commit")])
+    def test_unknown_commit(self, history, commit, message):
+        """Test that since_commit must name a stored, well-formed commit."""
+        with pytest.raises(ValueError, match=message):
+            history.query_comments(REPO, 7, since_commit=commit)
+
+    def test_other_pull_requests_are_separate(self, history):
+        """Test that queries are scoped to the repository and pull request."""
+        assert history.query_comments(REPO, 8) == []
+        assert history.query_comments("owner/other", 7) == []
+
+    def test_queries_use_indexes(self, history):
+        """Test that category and time queries do not scan the comments table."""
+        plan = history._connection.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM comments WHERE repository = ? AND pr_number = ? AND category = ?"
+            " AND created_at >= ?",
+            (REPO, 7, "nitpicks", ""),
+        ).fetchall()
+
+        assert "USING INDEX comments_by_category" in " ".join(row[-1] for row in plan)
+
+
+class TestRecording:
+    """Test cases for recording reviews and comments."""
+
+    def test_recording_a_review_again_replaces_its_comments(self, history):
+        """Test that only the comments of the recorded review are replaced."""
+        history.record_comments(
+            REPO, 7, "coderabbit", [comment("nitpicks", "LOW", "Reworded", "2024-05-02T10:00:00Z")], review_id=2
+        )
+
+        assert titles(history.query_comments(REPO, 7, source="coderabbit")) == ["Old bug", "Old nitpick", "Reworded"]
+
+    def test_human_comments_are_replaced_as_a_whole(self, history):
+        """Test that recording without a review ID replaces every comment of the source."""
+        history.record_comments(REPO, 7, "human", [])
+
+        assert history.query_comments(REPO, 7, source="human") == []
+        assert len(history.query_comments(REPO, 7)) == 5
+
+    def test_failed_recording_keeps_the_previous_comments(self, history):
+        """Test that an error while recording rolls the replacement back."""
+        with pytest.raises(KeyError):
+            history.record_comments(REPO, 7, "coderabbit", [{"title": "no category"}], review_id=2)
+
+        assert len(history.query_comments(REPO, 7, source="coderabbit")) == 5
+
+    def test_fingerprints_of_earlier_reviews(self, history):
+        """Test the lookups used to skip findings that were already reported."""
+        history.record_comments(
+            REPO,
+            7,
+            "coderabbit",
+            [comment("nitpicks", "LOW", "Old nitpick", "2024-05-01T10:00:00Z", fingerprint="f1")],
+            review_id=1,
+        )
+        history.record_comments(
+            REPO,
+            7,
+            "coderabbit",
+            [comment("nitpicks", "LOW", "New nitpick", "2024-05-02T10:00:00Z", fingerprint="f2")],
+            review_id=2,
+        )
+
+        assert history.fingerprints(REPO, 7, "coderabbit") == {"f1", "f2"}
+        assert history.fingerprints(REPO, 7, "coderabbit", before_review_id=2) == {"f1"}
+        assert history.has_fingerprint(REPO, 7, "coderabbit", 2, "f2")
+        assert not history.has_fingerprint(REPO, 7, "coderabbit", 1, "f2")
+        assert not history.has_fingerprint(REPO, 7, "human", 2, "f1")
+
+    def test_reviews(self, history):
+        """Test that reviews are updated in place and can be listed per commit."""
+        history.record_reviews(REPO, 7, [{**review(2, "bbb222", "2024-05-02T10:00:00Z"), "state": "DISMISSED"}])
+
+        assert [item["review_id"] for item in history.reviews(REPO, 7)] == [1, 2]
+        (dismissed,) = history.reviews(REPO, 7, commit="bbb222")
+        assert dismissed["state"] == "DISMISSED"
+        assert dismissed["author"] == "coderabbitai[bot]"
+
+
+class TestDatabase:
+    """Test cases for the database file."""
+
+    def test_default_location_is_shared_between_connections(self, isolated_cache_dir):
+        """Test that the store persists in the cache directory and is readable while open for writing."""
+        with ReviewStore.default() as writer:
+            writer.record_comments(REPO, 7, "human", [comment("human", None, None, "2024-05-01T00:00:00Z")])
+            with ReviewStore.default() as reader:
+                assert len(reader.query_comments(REPO, 7)) == 1
+
+        assert get_review_store_path() == isolated_cache_dir / "reviews.sqlite3"
+        journal_mode = sqlite3.connect(get_review_store_path()).execute("PRAGMA journal_mode").fetchone()[0]
+        assert journal_mode == "wal"
+
+    def test_other_schema_versions_are_replaced(self, tmp_path):
+        """Test that a store written by another version starts empty with the current tables."""
+        path = tmp_path / "reviews.sqlite3"
+        with sqlite3.connect(path) as connection:
+            connection.executescript("CREATE TABLE comments (old TEXT); PRAGMA user_version = 1;")
+
+        with ReviewStore(path) as store:
+            store.record_comments(REPO, 7, "human", [comment("human", None, None, "2024-05-01", fingerprint="f")])
+
+            assert store.fingerprints(REPO, 7, "human") == {"f"}
@@ -0,0 +1,247 @@
+"""Tests for mcp_server.utils.review_sync module."""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mcp_server.utils.github_api import GitHubClient, RateLimitScheduler
+from mcp_server.utils.review_sync import ReviewSync, get_sync_state_path
+
+PULL = "/repos/o/r/pulls/1"
+
+
+def review(review_id, login="alice", body="Looks mostly fine to me"):
+    return {
+        "id": review_id,
+        "user": {"login": login},
+        "body": body,
+        "submitted_at": f"2024-05-02T{review_id % 24:02}:00:00Z",
+    }
+
+
+def comment(comment_id, updated_at, body="Please rename", review_id=None):
+    return {
+        "id": comment_id,
+        "user": {"login": "bob"},
+        "path": "a.py",
+        "line": 1,
+        "body": body,
+        "updated_at": updated_at,
+        "pull_request_review_id": review_id,
+    }
+
+
+def requested(fake_github):
+    return [request["path"] for request in fake_github.requests]
+
+
+@pytest.fixture
+def client(fake_github):
+    return GitHubClient(scheduler=RateLimitScheduler(rate=1000.0), sleep=lambda _: None)
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return tmp_path / "sync" / "1.json"
+
+
+class TestReviews:
+    """Test cases for incremental review syncing."""
+
+    def test_later_runs_fetch_only_the_last_page(self, fake_github, client, state_path):
+        """Test that a second run starts at the page of the last seen review and appends new ones."""
+        fake_github.routes[f"{PULL}/reviews?per_page=100"] = (200, {}, [review(n) for n in range(1, 101)])
+        fake_github.routes[f"{PULL}/reviews?per_page=100&page=2"] = [
+            (200, {}, [review(n) for n in range(101, 151)]),
+            (200, {}, [review(n) for n in range(101, 153)]),
+        ]
+        first = ReviewSync(client, "o", "r", 1, state_path)
+        assert [item["id"] for item in first.reviews()] == list(range(1, 151))
+        first.save()
+        fake_github.requests.clear()
+
+        second = ReviewSync(client, "o", "r", 1, state_path)
+
+        assert [item["id"] for item in second.reviews()] == list(range(1, 153))
+        assert requested(fake_github) == [f"{PULL}/reviews?per_page=100&page=2"]
+        assert second.cursor["last_review_id"] == 152
+
+    def test_deleted_reviews_restart_the_sync(self, fake_github, client, state_path):
+        """Test that a missing last seen review makes the whole list be fetched again."""
+        fake_github.routes[f"{PULL}/reviews?per_page=100"] = [
+            (200, {}, [review(1), review(2)]),
+            (200, {}, [review(1), review(3)]),
+        ]
+        first = ReviewSync(client, "o", "r", 1, state_path)
+        first.reviews()
+        first.save()
+
+        second = ReviewSync(client, "o", "r", 1, state_path)
+
+        assert [item["id"] for item in second.reviews()] == [1, 3]
+        assert len(fake_github.requests) == 3
+
+    def test_bodies_are_truncated_and_unused_fields_dropped(self, fake_github, client):
+        """Test that only the fields the reports use are kept, with bodies cut to a preview."""
+        fake_github.routes[f"{PULL}/reviews?per_page=100"] = (
+            200,
+            {},
+            [{**review(1, body="x" * 5000), "html_url": "https://github.com/o/r/pull/1", "commit_id": "abc"}],
+        )
+        sync = ReviewSync(client, "o", "r", 1)
+
+        (item,) = sync.reviews()
+
+        assert set(item) == {"id", "user", "body", "submitted_at", "commit_id"}
+        assert len(item["body"]) == 1024
+
+    def test_synced_once_per_instance(self, fake_github, client):
+        """Test that repeated access does not repeat requests."""
+        fake_github.routes[f"{PULL}/reviews?per_page=100"] = (200, {}, [review(1)])
+        sync = ReviewSync(client, "o", "r", 1)
+
+        sync.reviews()
+        sync.reviews()
+
+        assert len(fake_github.requests) == 1
+
+
+class TestComments:
+    """Test cases for review comments and pull request comments."""
+
+    def test_comments_updated_since_the_cursor_are_merged(self, fake_github, client, state_path):
+        """Test that edits replace stored comments (also in their review) and new ones are appended."""
+        fake_github.routes[f"{PULL}/comments"] = (
+            200,
+            {},
+            [comment(1, "2024-05-02T08:00:00Z", review_id=9), comment(2, "2024-05-02T09:00:00Z")],
+        )
+        fake_github.routes[f"{PULL}/reviews/9/comments"] = (200, {}, [comment(1, "2024-05-02T08:00:00Z", review_id=9)])
+        fake_github.routes[f"{PULL}/comments?since=2024-05-02T09%3A00%3A00Z"] = (
+            200,
+            {},
+            [
+                comment(1, "2024-05-02T10:00:00Z", body="Please rename it", review_id=9),
+                comment(3, "2024-05-02T11:00:00Z"),
+            ],
+        )
+        first = ReviewSync(client, "o", "r", 1, state_path)
+        first.pr_comments()
+        first.review_comments(9)
+        first.save()
+        fake_github.requests.clear()
+
+        second = ReviewSync(client, "o", "r", 1, state_path)
+        comments = second.pr_comments()
+
+        assert [(item["id"], item["body"]) for item in comments] == [
+            (1, "Please rename it"),
+            (2, "Please rename"),
+            (3, "Please rename"),
+        ]
+        assert second.review_comments(9)[0]["body"] == "Please rename it"
+        assert second.cursor["last_comment_id"] == 3
+        assert second.cursor["comments_since"] == "2024-05-02T11:00:00Z"
+        assert requested(fake_github) == [f"{PULL}/comments?since=2024-05-02T09%3A00%3A00Z"]
+
+    def test_comments_without_update_times_are_refetched(self, fake_github, client, state_path):
+        """Test that no cursor is kept when comments cannot be merged safely."""
+        fake_github.routes[f"{PULL}/comments"] = (200, {}, [{"body": "No id"}])
+        first = ReviewSync(client, "o", "r", 1, state_path)
+        first.pr_comments()
+        first.save()
+
+        assert ReviewSync(client, "o", "r", 1, state_path).pr_comments() == [{"body": "No id"}]
+        assert requested(fake_github) == [f"{PULL}/comments"] * 2
+
+    def test_review_comments_are_fetched_once(self, fake_github, client, state_path):
+        """Test that inline comments of a review are kept across runs."""
+        fake_github.routes[f"{PULL}/reviews/9/comments"] = (200, {}, [{"id": 1, "body": "Fix"}])
+        first = ReviewSync(client, "o", "r", 1, state_path)
+        first.review_comments(9)
+        first.save()
+
+        assert ReviewSync(client, "o", "r", 1, state_path).review_comments(9) == [{"id": 1, "body": "Fix"}]
+        assert len(fake_github.requests) == 1
+
+
+class TestState:
+    """Test cases for the cursor, stored reports and the state file."""
+
+    def test_commit_date_is_fetched_when_the_head_moves(self, fake_github, client, state_path):
+        """Test that the head commit date is cached per head SHA."""
+        fake_github.routes["/repos/o/r/commits/a"] = (200, {}, {"commit": {"committer": {"date": "2024-05-01"}}})
+        fake_github.routes["/repos/o/r/commits/b"] = (200, {}, {"commit": {"committer": {"date": "2024-05-03"}}})
+        first = ReviewSync(client, "o", "r", 1, state_path)
+        assert first.commit_date("a") == "2024-05-01"
+        first.save()
+
+        second = ReviewSync(client, "o", "r", 1, state_path)
+
+        assert second.commit_date("a") == "2024-05-01"
+        assert second.commit_date("b") == "2024-05-03"
+        assert second.cursor["head_sha"] == "b"
+        assert requested(fake_github) == ["/repos/o/r/commits/a", "/repos/o/r/commits/b"]
+
+    def test_reports_are_kept_per_review(self, client, state_path):
+        """Test that a stored report is only returned for the review it was built from."""
+        sync = ReviewSync(client, "o", "r", 1, state_path)
+        sync.store_report("coderabbit", 13, {"summary": {"total": 0}})
+        sync.save()
+
+        stored = ReviewSync(client, "o", "r", 1, state_path)
+
+        assert stored.report("coderabbit", 13) == {"summary": {"total": 0}}
+        assert stored.report("coderabbit", 14) is None
+        assert stored.report("other", 13) is None
+
+    def test_concurrent_saves(self, client, state_path):
+        """Test that threads saving the same pull request at once do not clash on the temp file."""
+        syncs = [ReviewSync(client, "o", "r", 1, state_path) for _ in range(4)]
+        for review_id, sync in enumerate(syncs):
+            sync.store_report("coderabbit", review_id, {})
+
+        def save(sync):
+            for _ in range(100):
+                sync.save()
+
+        with ThreadPoolExecutor(len(syncs)) as pool:
+            list(pool.map(save, syncs))
+
+        assert ReviewSync(client, "o", "r", 1, state_path).state["reports"]["coderabbit"]["report"] == {}
+        assert [path.name for path in state_path.parent.iterdir()] == ["1.json"]
+
+    def test_full_resync_ignores_the_stored_state(self, client, state_path):
+        """Test that a full resync starts from an empty state."""
+        sync = ReviewSync(client, "o", "r", 1, state_path)
+        sync.store_report("coderabbit", 13, {})
+        sync.save()
+
+        assert ReviewSync(client, "o", "r", 1, state_path, full_resync=True).report("coderabbit", 13) is None
+
+    @pytest.mark.parametrize("content", ["not json", "[]", json.dumps({"version": 0, "reviews": [1]})])
+    def test_unusable_state_is_ignored(self, client, state_path, content):
+        """Test that corrupt or outdated state files start a fresh sync."""
+        state_path.parent.mkdir(parents=True)
+        state_path.write_text(content, encoding="utf-8")
+
+        assert ReviewSync(client, "o", "r", 1, state_path).state["reviews"] == []
+
+    def test_in_memory_sync_is_not_saved(self, client, isolated_cache_dir):
+        """Test that instances without a path keep nothing."""
+        ReviewSync(client, "o", "r", 1).save()
+
+        assert not isolated_cache_dir.exists()
+
+    def test_persistent_state_path(self, client, isolated_cache_dir):
+        """Test the state file location in the cache directory."""
+        sync = ReviewSync.persistent(client, "owner", "my.repo", "7")
+
+        assert sync.path == isolated_cache_dir / "review-sync" / "owner" / "my.repo" / "7.json"
+
+    @pytest.mark.parametrize("owner, repo, pr_number", [("..", "r", 1), ("o", "r/../x", 1), ("o", "r", "1/2")])
+    def test_state_path_cannot_escape_the_cache(self, owner, repo, pr_number):
+        """Test that names that are not plain path components are rejected."""
+        with pytest.raises(ValueError, match="Invalid pull request"):
+            get_sync_state_path(owner, repo, pr_number)
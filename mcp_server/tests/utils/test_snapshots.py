@@ -0,0 +1,133 @@
+"""Tests for mcp_server.utils.snapshots module."""
+
+import subprocess
+
+import pytest
+
+import mcp_server.utils.snapshots as snapshots_module
+from mcp_server.utils.snapshots import SnapshotError, create_snapshot, list_snapshots, restore_snapshot
+
+MODULE = "src/module_0.py"
+
+
+def read(checkout, name):
+    return (checkout.path / name).read_text(encoding="utf-8")
+
+
+def write(checkout, name, content):
+    (checkout.path / name).write_text(content, encoding="utf-8")
+
+
+class TestCreateSnapshot:
+    """Test cases for create_snapshot function."""
+
+    def test_nothing_else_changes(self, pr_checkout):
+        """Test that the branch, the index and the working tree are left as they are."""
+        write(pr_checkout, MODULE, "edited\n")
+        pr_checkout("add", MODULE)
+        write(pr_checkout, "src/module_1.py", "unstaged\n")
+        status = pr_checkout("status", "--porcelain")
+
+        snapshot = create_snapshot(pr_checkout.path / "src", label="Before prettifying")
+
+        assert pr_checkout("rev-parse", "HEAD") == pr_checkout.sha
+        assert pr_checkout("status", "--porcelain") == status
+        assert snapshot["changed_files"] == [MODULE, "src/module_1.py"]
+        assert pr_checkout("rev-parse", f"refs/snapshots/{snapshot['snapshot']}") == snapshot["commit"]
+        assert pr_checkout("rev-parse", f"{snapshot['commit']}^") == pr_checkout.sha
+
+    def test_only_given_paths(self, pr_checkout):
+        """Test that a snapshot of some paths leaves the changes of the others out."""
+        write(pr_checkout, MODULE, "edited\n")
+        write(pr_checkout, "src/module_1.py", "unstaged\n")
+
+        snapshot = create_snapshot(pr_checkout.path, [MODULE])
+
+        assert snapshot["paths"] == [MODULE]
+        assert snapshot["changed_files"] == [MODULE]
+        assert pr_checkout("show", f"{snapshot['commit']}:src/module_1.py") == pr_checkout(
+            "show", "HEAD:src/module_1.py"
+        )
+
+    def test_untracked_files(self, pr_checkout):
+        """Test that untracked files are part of the snapshot and ignored ones are not."""
+        write(pr_checkout, ".gitignore", "*.log\n")
+        write(pr_checkout, "notes.txt", "draft\n")
+        write(pr_checkout, "debug.log", "noise\n")
+
+        snapshot = create_snapshot(pr_checkout.path)
+
+        assert snapshot["changed_files"] == [".gitignore", "notes.txt"]
+
+    def test_before_the_first_commit(self, tmp_path):
+        """Test a snapshot of a repository without commits."""
+        subprocess.run(["git", "-C", str(tmp_path), "init", "-q"], check=True)
+        (tmp_path / "a.py").write_text("x = 1\n", encoding="utf-8")
+
+        snapshot = create_snapshot(tmp_path)
+
+        assert snapshot["changed_files"] == ["a.py"]
+
+    def test_old_snapshots_are_pruned(self, pr_checkout, monkeypatch):
+        """Test that only the newest snapshots are kept."""
+        monkeypatch.setattr(snapshots_module, "MAX_SNAPSHOTS", 2)
+        names = [create_snapshot(pr_checkout.path, label=f"Snapshot {n}")["snapshot"] for n in range(3)]
+
+        listed = list_snapshots(pr_checkout.path)
+
+        assert [entry["snapshot"] for entry in listed] == names[:0:-1]
+        assert [entry["label"] for entry in listed] == ["Snapshot 2", "Snapshot 1"]
+
+    def test_not_a_checkout(self, tmp_path):
+        """Test the error outside a git checkout."""
+        with pytest.raises(SnapshotError):
+            create_snapshot(tmp_path)
+
+
+class TestRestoreSnapshot:
+    """Test cases for restore_snapshot function."""
+
+    def test_round_trip(self, pr_checkout):
+        """Test that changed, deleted and newly added files are brought back to the snapshot."""
+        write(pr_checkout, MODULE, "work in progress\n")
+        snapshot = create_snapshot(pr_checkout.path)["snapshot"]
+        write(pr_checkout, MODULE, "broken\n")
+        (pr_checkout.path / "src" / "module_1.py").unlink()
+        write(pr_checkout, "added.py", "new\n")
+        pr_checkout("add", "added.py")
+        write(pr_checkout, "scratch.txt", "untracked\n")
+        staged = pr_checkout("diff", "--cached", "--name-only")
+
+        result = restore_snapshot(pr_checkout.path, snapshot)
+
+        assert result["restored_files"] == ["added.py", MODULE, "src/module_1.py"]
+        assert read(pr_checkout, MODULE) == "work in progress\n"
+        assert (pr_checkout.path / "src" / "module_1.py").is_file()
+        assert not (pr_checkout.path / "added.py").exists()
+        assert read(pr_checkout, "scratch.txt") == "untracked\n"
+        assert pr_checkout("diff", "--cached", "--name-only") == staged
+
+    def test_snapshot_paths_are_restored(self, pr_checkout):
+        """Test that a snapshot of some paths restores only those by default."""
+        snapshot = create_snapshot(pr_checkout.path, [MODULE], label="Only the module")["snapshot"]
+        write(pr_checkout, MODULE, "changed\n")
+        write(pr_checkout, "src/module_1.py", "kept\n")
+
+        assert list_snapshots(pr_checkout.path)[0]["paths"] == [MODULE]
+        assert restore_snapshot(pr_checkout.path, snapshot)["restored_files"] == [MODULE]
+        assert read(pr_checkout, "src/module_1.py") == "kept\n"
+
+    def test_paths_with_spaces(self, pr_checkout):
+        """Test that the paths of a snapshot are stored one per line."""
+        write(pr_checkout, "my notes.txt", "draft\n")
+        snapshot = create_snapshot(pr_checkout.path, ["my notes.txt"])["snapshot"]
+        write(pr_checkout, "my notes.txt", "changed\n")
+
+        restore_snapshot(pr_checkout.path, snapshot)
+
+        assert read(pr_checkout, "my notes.txt") == "draft\n"
+
+    def test_unknown_snapshot(self, pr_checkout):
+        """Test the error for a snapshot name that does not exist."""
+        with pytest.raises(SnapshotError, match="No snapshot named 'nope'"):
+            restore_snapshot(pr_checkout.path, "nope")
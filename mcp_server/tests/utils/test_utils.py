@@ -3,7 +3,9 @@
 from pathlib import Path
 from unittest.mock import patch
 
-from mcp_server.utils.utils import get_script_path, load_prompt_from_markdown
+import pytest
+
+from mcp_server.utils.utils import get_cache_dir, get_script_path, load_prompt_from_markdown
 
 
 class TestGetScriptPath:
@@ -379,3 +381,60 @@ Additional content here."""
         assert "{{SCRIPT_PATHS}}" not in result
         expected_script_path = str(custom_base / "scripts" / "test-script.sh")
         assert expected_script_path in result
+
+    def test_load_prompt_from_markdown_prompt_path_override(self, tmp_path, monkeypatch):
+        """Test that a prompt of the prompt path overrides the bundled one, until it is removed."""
+        bundled = tmp_path / "base" / "prompts"
+        overrides = tmp_path / "overrides"
+        bundled.mkdir(parents=True)
+        overrides.mkdir()
+        (bundled / "test-prompt.md").write_text("Bundled", encoding="utf-8")
+        (overrides / "test-prompt.md").write_text("Override", encoding="utf-8")
+        monkeypatch.setenv("AI_PROMPTS_MCP_PROMPT_PATH", str(overrides))
+
+        assert load_prompt_from_markdown("test-prompt", base_dir=tmp_path / "base") == "Override"
+
+        (overrides / "test-prompt.md").unlink()
+        assert load_prompt_from_markdown("test-prompt", base_dir=tmp_path / "base") == "Bundled"
+
+    def test_load_prompt_from_markdown_fragment_override(self, tmp_path, monkeypatch):
+        """Test that fragments are included from the prompt roots by precedence."""
+        bundled = tmp_path / "base" / "prompts"
+        overrides = tmp_path / "overrides"
+        (bundled / "fragments").mkdir(parents=True)
+        (overrides / "fragments").mkdir(parents=True)
+        (bundled / "test-prompt.md").write_text('Steps: {% include "steps" %}', encoding="utf-8")
+        (bundled / "fragments" / "steps.md").write_text("bundled\n", encoding="utf-8")
+        (overrides / "fragments" / "steps.md").write_text("team\n", encoding="utf-8")
+        monkeypatch.setenv("AI_PROMPTS_MCP_PROMPT_PATH", str(overrides))
+
+        assert load_prompt_from_markdown("test-prompt", base_dir=tmp_path / "base") == "Steps: team"
+
+    @pytest.mark.parametrize("prompt_name", ["github-review-handler", "github-coderabbitai-review-handler"])
+    def test_load_prompt_from_markdown_bundled_fragments(self, prompt_name):
+        """Test that the review handlers get their shared workflow from fragments."""
+        result = load_prompt_from_markdown(prompt_name)
+
+        assert "{% include" not in result
+        assert "SESSION ISOLATION & FLOW ENFORCEMENT" in result
+        assert "**PHASE 4: Push Phase**" in result
+
+
+class TestGetCacheDir:
+    """Test cases for get_cache_dir function."""
+
+    def test_get_cache_dir_override(self, tmp_path, monkeypatch):
+        """Test that AI_PROMPTS_MCP_CACHE_DIR overrides the location and is created."""
+        monkeypatch.setenv("AI_PROMPTS_MCP_CACHE_DIR", str(tmp_path / "custom"))
+
+        result = get_cache_dir()
+
+        assert result == tmp_path / "custom"
+        assert result.is_dir()
+
+    def test_get_cache_dir_xdg(self, tmp_path, monkeypatch):
+        """Test that XDG_CACHE_HOME is used when no override is set."""
+        monkeypatch.delenv("AI_PROMPTS_MCP_CACHE_DIR")
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+        assert get_cache_dir() == tmp_path / "ai-prompts-mcp"
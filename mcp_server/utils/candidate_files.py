@@ -0,0 +1,314 @@
+"""Source files worth a cleanup pass, found from the git index and ranked by a quick scan.
+
+The comment-cleaner and code-beautifier prompts have the agent find the files to work
+on by hand, which in a large repository means listing directories and opening files
+that turn out to need nothing. Here the candidates are listed from git: the changes of
+the branch (as in changed_hunks), the files touched in recent commits, or every file of
+the index. Source files among them are read on a thread pool and scanned line by line
+for what each prompt looks for:
+
+- comments: comment density and comments restating the next line of code (every word
+  of the comment is part of an identifier there, e.g. `# create the user` above
+  `user = create_user(name)`)
+- formatting: lines over the length limit, trailing whitespace and indentation mixing
+  tabs and spaces
+
+The files are ranked by the score of the requested purpose and returned in pages.
+Scans are cached by path, size and modification time, so the pages after the first
+cost a listing and a stat per file.
+"""
+
+import hashlib
+import os
+import re
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from mcp_server.utils.changed_hunks import ChangeSet
+from mcp_server.utils.review_pages import decode_cursor, encode_cursor
+
+GIT_TIMEOUT = 30
+MAX_WORKERS = 8
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+DEFAULT_SINCE_DAYS = 14
+MAX_LINE_LENGTH = 120
+# Larger files are generated or data more often than not
+MAX_FILE_BYTES = 512 * 1024
+DEFAULT_CACHE_SIZE = 50_000
+
+PURPOSES = ("comments", "formatting")
+SCOPES = ("changed", "recent", "all")
+
+HASH_COMMENTS = (".py", ".sh", ".bash", ".zsh", ".rb", ".pl", ".r", ".yaml", ".yml", ".toml", ".cfg", ".ini")
+SLASH_COMMENTS = tuple(
+    ".js .jsx .ts .tsx .mjs .cjs .java .kt .kts .scala .go .rs .c .h .cc .cpp .hpp .cs .swift .php .dart .css .scss".split()
+)
+DASH_COMMENTS = (".sql", ".lua", ".hs")
+# Line comment marker and block comment delimiters by file extension
+COMMENT_SYNTAX: dict[str, tuple[str, tuple[str, str] | None]] = {
+    **dict.fromkeys(HASH_COMMENTS, ("#", None)),
+    **dict.fromkeys(SLASH_COMMENTS, ("//", ("/*", "*/"))),
+    **dict.fromkeys(DASH_COMMENTS, ("--", None)),
+}
+
+WORD = re.compile(r"[a-z]{3,}")
+IDENTIFIER_PART = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+# Comments kept whatever they say
+KEPT_COMMENT = re.compile(r"TODO|FIXME|HACK|XXX|NOTE|noqa|type:|pragma|pylint|eslint|-\*-|^!", re.I)
+STOP_WORDS = frozenset({"the", "and", "for", "this", "that", "with", "from", "into", "then", "its", "all", "our"})
+# Longer comments usually say more than the code
+MAX_RESTATING_WORDS = 6
+
+
+class CandidateFilesError(Exception):
+    """Raised when the files of a checkout cannot be listed."""
+
+
+@dataclass
+class FileScan:
+    """Line counts of a scanned source file."""
+
+    lines: int = 0
+    comment_lines: int = 0
+    restating_comments: int = 0
+    long_lines: int = 0
+    trailing_whitespace: int = 0
+    mixed_indentation: int = 0
+
+    @property
+    def comment_density(self) -> float:
+        """Share of the non-blank lines that are comments."""
+        return self.comment_lines / self.lines if self.lines else 0.0
+
+    def score(self, purpose: str) -> float:
+        """How much a file has for the given purpose (see PURPOSES) to clean up."""
+        if purpose == "comments":
+            return round(self.restating_comments * 2 + self.comment_lines * self.comment_density, 2)
+        return float(self.long_lines + self.trailing_whitespace + self.mixed_indentation * 2)
+
+
+def _git(path: str | Path, *args: str) -> str:
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(path), "-c", "core.quotePath=false", *args],
+            capture_output=True,
+            text=True,
+            errors="replace",
+            timeout=GIT_TIMEOUT,
+        )
+    except (OSError, subprocess.SubprocessError) as exc:
+        raise CandidateFilesError(f"git {args[0]} failed: {exc}") from exc
+    if result.returncode:
+        raise CandidateFilesError(result.stderr.strip() or f"git {args[0]} failed")
+    return result.stdout
+
+
+def restates(comment: str, code: str) -> bool:
+    """Whether a comment only names things found in the identifiers of a line of code."""
+    words = [word for word in WORD.findall(comment.lower()) if word not in STOP_WORDS]
+    if not words or len(words) > MAX_RESTATING_WORDS:
+        return False
+    parts = {part.lower() for part in IDENTIFIER_PART.findall(code)}
+    return all(word in parts or word.rstrip("s") in parts for word in words)
+
+
+def scan_source(text: str, extension: str, max_line_length: int = MAX_LINE_LENGTH) -> FileScan:
+    """Scan the lines of a source file (see module docstring)."""
+    marker, block = COMMENT_SYNTAX.get(extension, ("#", None))
+    scan = FileScan()
+    in_block = False
+    # Text of the full-line comment right above the current line
+    pending = None
+    for line in text.splitlines():
+        if len(line) > max_line_length:
+            scan.long_lines += 1
+        if line != line.rstrip():
+            scan.trailing_whitespace += 1
+        indent = line[: len(line) - len(line.lstrip())]
+        if " " in indent and "\t" in indent:
+            scan.mixed_indentation += 1
+        stripped = line.strip()
+        if not stripped:
+            pending = None
+            continue
+        scan.lines += 1
+        if in_block:
+            scan.comment_lines += 1
+            in_block = block is not None and block[1] not in stripped
+            continue
+        if block is not None and stripped.startswith(block[0]):
+            scan.comment_lines += 1
+            in_block = block[1] not in stripped[len(block[0]) :]
+            pending = None
+            continue
+        if stripped.startswith(marker):
+            scan.comment_lines += 1
+            comment = stripped[len(marker) :]
+            pending = None if KEPT_COMMENT.search(comment) else comment
+            continue
+        if pending is not None and restates(pending, stripped):
+            scan.restating_comments += 1
+        pending = None
+    return scan
+
+
+def _scan_file(path: Path) -> FileScan | None:
+    try:
+        if path.stat().st_size > MAX_FILE_BYTES:
+            return None
+        data = path.read_bytes()
+    except OSError:
+        return None
+    if b"\0" in data:
+        return None
+    return scan_source(data.decode("utf-8", errors="replace"), path.suffix.lower())
+
+
+class FileScanCache:
+    """LRU cache of file scans by path, valid while the size and modification time are unchanged."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE) -> None:
+        """Create an empty cache.
+
+        Args:
+            max_entries: Number of scans kept
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[tuple[int, int], FileScan | None]] = OrderedDict()
+        # Number of files scanned so far
+        self.scanned = 0
+        # Scans run on worker threads
+        self._lock = threading.Lock()
+
+    def scan(self, path: Path) -> FileScan | None:
+        """The scan of a file, None for missing, binary and oversized files."""
+        key = str(path)
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == stamp:
+                self._entries.move_to_end(key)
+                return cached[1]
+        scan = _scan_file(path)
+        with self._lock:
+            self.scanned += 1
+            self._entries[key] = (stamp, scan)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return scan
+
+    def clear(self) -> None:
+        """Forget every scan."""
+        with self._lock:
+            self._entries.clear()
+
+
+def list_candidates(
+    path: str | Path, scope: str, base_ref: str | None = None, since_days: int = DEFAULT_SINCE_DAYS
+) -> tuple[str, list[str]]:
+    """The root of a checkout and the paths of the source files in a scope (see SCOPES).
+
+    Raises:
+        ChangedHunksError: If the changes of the checkout cannot be listed
+        CandidateFilesError: If git fails
+    """
+    changes = ChangeSet.for_checkout(path, base_ref)
+    toplevel = changes.toplevel
+    paths = {changed.path for changed in changes.files if changed.status != "deleted"}
+    if scope == "recent":
+        log = _git(toplevel, "log", f"--since={since_days}.days", "--name-only", "--pretty=format:", "-z")
+        paths.update(name.strip("\n") for name in log.split("\0"))
+    elif scope == "all":
+        paths.update(_git(toplevel, "ls-files", "-z", "--cached", "--others", "--exclude-standard").split("\0"))
+    candidates = sorted(
+        name
+        for name in paths
+        if os.path.splitext(name)[1].lower() in COMMENT_SYNTAX and os.path.isfile(os.path.join(toplevel, name))
+    )
+    return toplevel, candidates
+
+
+def candidate_files_page(
+    path: str | Path,
+    purpose: str = "comments",
+    scope: str = "changed",
+    base_ref: str | None = None,
+    since_days: int = DEFAULT_SINCE_DAYS,
+    cursor: str | None = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    cache: FileScanCache | None = None,
+) -> dict[str, Any]:
+    """One page of the source files of a checkout with the most to clean up, best candidates first.
+
+    Args:
+        path: Any directory inside the checkout
+        purpose: What to rank the files by (see PURPOSES)
+        scope: Which files: the changes of the branch, those plus the files of the commits
+            of the last since_days days, or every file (see SCOPES)
+        base_ref: Base branch of the changes, defaults to the remote's default branch
+        since_days: Age limit of the commits of the recent scope
+        cursor: `next_cursor` of the previous page; without one, the first page
+        page_size: Files per page (1-MAX_PAGE_SIZE)
+        cache: Cache of the file scans
+
+    Returns:
+        Dict with the number of files scanned and of candidates, the candidates of the page
+        (path, score and scan counts) and the cursor of the next page (None on the last page)
+
+    Raises:
+        ValueError: If an argument is out of range, or the cursor was made for other candidates
+        ChangedHunksError: If the changes of the checkout cannot be listed
+        CandidateFilesError: If git fails
+    """
+    if purpose not in PURPOSES:
+        raise ValueError(f"Unknown purpose: {purpose} (expected one of {', '.join(PURPOSES)})")
+    if scope not in SCOPES:
+        raise ValueError(f"Unknown scope: {scope} (expected one of {', '.join(SCOPES)})")
+    if not 0 < page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+    if since_days < 1:
+        raise ValueError("since_days must be at least 1")
+
+    toplevel, paths = list_candidates(path, scope, base_ref, since_days)
+    cache = cache if cache is not None else FileScanCache()
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        scans = list(pool.map(cache.scan, (Path(toplevel, name) for name in paths)))
+    ranked = sorted(
+        (
+            (scan.score(purpose), name, scan)
+            for name, scan in zip(paths, scans, strict=True)
+            if scan is not None and scan.score(purpose) > 0
+        ),
+        key=lambda candidate: (-candidate[0], candidate[1]),
+    )
+    listing = "\0".join(f"{name}:{score}" for score, name, _ in ranked)
+    signature = hashlib.sha256(f"{toplevel}\0{purpose}\0{listing}".encode()).hexdigest()[:16]
+
+    offset = 0
+    if cursor:
+        cursor_signature, offset = decode_cursor(cursor)
+        if cursor_signature != signature:
+            raise ValueError("The files changed since the cursor was made: start again without a cursor")
+    end = offset + page_size
+    return {
+        "purpose": purpose,
+        "scope": scope,
+        "files_scanned": sum(1 for scan in scans if scan is not None),
+        "candidates": len(ranked),
+        "files": [
+            {"path": name, "score": score, **asdict(scan), "comment_density": round(scan.comment_density, 2)}
+            for score, name, scan in ranked[offset:end]
+        ],
+        "next_cursor": encode_cursor(signature, end) if end < len(ranked) else None,
+    }
@@ -0,0 +1,357 @@
+"""The review surface of a checkout: its changed hunks, riskiest first, in token-bounded pages.
+
+The code-review prompt has the agent look at "the files we've been working on and any
+recent changes", which in a big repository takes many exploratory tool calls and
+diffs too large to read. Here the changes of the branch (working tree, including
+uncommitted edits and untracked files, against the merge base with the base branch)
+are listed with one `git diff --numstat`, ranked by size weighted by risk heuristics
+on the path (security-sensitive code and build configuration up, tests, docs and
+generated files down), and cut into pages fitting a token budget. Only the files of
+the requested page are diffed, in parallel, with the requested number of context lines.
+
+The cursor of the next page names the changes it was made for: if the checkout
+changed in between, it is refused rather than skipping or repeating files.
+"""
+
+import hashlib
+import re
+import subprocess
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from mcp_server.utils.diff_index import default_branch
+from mcp_server.utils.pr_info import PRInfoError, find_git_dirs
+from mcp_server.utils.review_pages import decode_cursor, encode_cursor
+
+GIT_TIMEOUT = 30
+MAX_WORKERS = 8
+DEFAULT_CONTEXT_LINES = 3
+MAX_CONTEXT_LINES = 20
+DEFAULT_TOKEN_BUDGET = 8_000
+MIN_TOKEN_BUDGET = 500
+MAX_TOKEN_BUDGET = 100_000
+# Rough size of a token of code
+CHARS_PER_TOKEN = 4
+# Untracked files larger than this are listed without their content
+MAX_UNTRACKED_BYTES = 256 * 1024
+
+# Path patterns and the weight they give a file's changes, with the reason reported
+RISK_RULES = (
+    (re.compile(r"auth|crypt|secur|secret|token|passw|permission|credential|session|sanitiz", re.I), 2.0, "security"),
+    (re.compile(r"(^|/)(migrations?|alembic)/|\.sql$", re.I), 1.8, "schema"),
+    (
+        re.compile(r"(^|/)(\.github/workflows/|Dockerfile|Makefile|setup\.py|pyproject\.toml|setup\.cfg|tox\.ini)"),
+        1.5,
+        "build",
+    ),
+    (re.compile(r"(^|/)(tests?|spec)/|(^|/)test_[^/]*$|_test\.\w+$|\.spec\.\w+$"), 0.5, "test"),
+    (re.compile(r"\.(md|rst|txt)$|(^|/)docs?/", re.I), 0.3, "docs"),
+    (
+        re.compile(r"\.lock$|-lock\.json$|(^|/)(vendor|dist|build|node_modules)/|\.min\.\w+$|_pb2\.py$"),
+        0.1,
+        "generated",
+    ),
+)
+
+
+class ChangedHunksError(Exception):
+    """Raised when the changes of a checkout cannot be listed."""
+
+
+@dataclass
+class ChangedFile:
+    """A changed file of the review surface."""
+
+    path: str
+    status: str
+    added: int | None
+    deleted: int | None
+    old_path: str | None = None
+    risk: list[str] = field(default_factory=list)
+    score: float = 0.0
+
+    @property
+    def binary(self) -> bool:
+        """Whether git shows no line counts for the file."""
+        return self.added is None
+
+
+def _git(path: str | Path, *args: str) -> str:
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(path), "-c", "core.quotePath=false", *args],
+            capture_output=True,
+            text=True,
+            errors="replace",
+            timeout=GIT_TIMEOUT,
+        )
+    except (OSError, subprocess.SubprocessError) as exc:
+        raise ChangedHunksError(f"git {args[0]} failed: {exc}") from exc
+    if result.returncode:
+        raise ChangedHunksError(result.stderr.strip() or f"git {args[0]} failed")
+    return result.stdout
+
+
+def risk_of(path: str) -> tuple[float, list[str]]:
+    """Weight of the changes of a file and the reasons for it (see RISK_RULES)."""
+    weight = 1.0
+    reasons = []
+    for pattern, factor, reason in RISK_RULES:
+        if pattern.search(path):
+            weight *= factor
+            reasons.append(reason)
+    return weight, reasons
+
+
+def parse_numstat(output: str, statuses: dict[str, str]) -> list[ChangedFile]:
+    """Parse `git diff --numstat -z` output, with the status letters of `git diff --name-status -z`."""
+    files = []
+    fields = iter(output.split("\0"))
+    for entry in fields:
+        if not entry:
+            continue
+        added, deleted, path = entry.split("\t", 2)
+        old_path = None
+        if not path:
+            # Renamed or copied: the old and new paths follow as their own fields
+            old_path, path = next(fields, ""), next(fields, "")
+        files.append(
+            ChangedFile(
+                path=path,
+                status=statuses.get(path, "modified"),
+                added=int(added) if added.isdigit() else None,
+                deleted=int(deleted) if deleted.isdigit() else None,
+                old_path=old_path,
+            )
+        )
+    return files
+
+
+def parse_name_status(output: str) -> dict[str, str]:
+    """Status (added, modified, deleted, renamed, ...) by path, from `git diff --name-status -z` output."""
+    names = {"A": "added", "M": "modified", "D": "deleted", "R": "renamed", "C": "copied", "T": "type changed"}
+    statuses = {}
+    fields = iter(output.split("\0"))
+    for letter in fields:
+        if not letter:
+            continue
+        path = next(fields, "")
+        if letter[0] in "RC":
+            path = next(fields, "")
+        statuses[path] = names.get(letter[0], "modified")
+    return statuses
+
+
+def split_hunks(diff: str) -> list[str]:
+    """The hunks of a one-file diff, each starting with its @@ header."""
+    hunks: list[str] = []
+    for line in diff.splitlines(keepends=True):
+        if line.startswith("@@"):
+            hunks.append(line)
+        elif hunks:
+            hunks[-1] += line
+    return hunks
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough number of tokens of a text."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class ChangeSet:
+    """The ranked changed files of a checkout against a base."""
+
+    def __init__(self, toplevel: str, base: str, files: list[ChangedFile]) -> None:
+        """Rank the files.
+
+        Args:
+            toplevel: Root of the checkout
+            base: Commit (merge base or HEAD) or tree (the empty one before the first commit) the
+                changes are taken against
+            files: Changed files
+        """
+        self.toplevel = toplevel
+        self.base = base
+        for changed in files:
+            weight, changed.risk = risk_of(changed.path)
+            size = (changed.added or 0) + (changed.deleted or 0) if not changed.binary else 1
+            changed.score = round(size * weight, 2)
+        self.files = sorted(files, key=lambda changed: (-changed.score, changed.path))
+        listing = "\0".join(f"{f.path}:{f.added}:{f.deleted}" for f in self.files)
+        self.signature = hashlib.sha256(f"{base}\0{listing}".encode()).hexdigest()[:16]
+
+    @classmethod
+    def for_checkout(cls, path: str | Path, base_ref: str | None = None) -> "ChangeSet":
+        """List the changes of a checkout: committed on the branch, uncommitted and untracked.
+
+        Args:
+            path: Any directory inside the checkout
+            base_ref: Base branch, defaults to the remote's default branch; without one,
+                only the uncommitted changes (against HEAD) are listed
+
+        Raises:
+            ChangedHunksError: If path is not in a git checkout or git fails
+        """
+        try:
+            _, common_dir = find_git_dirs(path)
+        except (PRInfoError, OSError) as exc:
+            raise ChangedHunksError(str(exc)) from exc
+        toplevel = _git(path, "rev-parse", "--show-toplevel").strip()
+        base: str | None = None
+        if base_ref:
+            base = _git(toplevel, "merge-base", "HEAD", base_ref).strip()
+        elif (default := default_branch(common_dir)) is not None:
+            try:
+                base = _git(toplevel, "merge-base", "HEAD", default).strip()
+            except ChangedHunksError:
+                # Unrelated histories or no commits yet
+                pass
+        if base is None:
+            try:
+                base = _git(toplevel, "rev-parse", "-q", "--verify", "HEAD").strip()
+            except ChangedHunksError:
+                # No commits yet: compare against the empty tree
+                base = _git(toplevel, "hash-object", "-t", "tree", "/dev/null").strip()
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            numstat = pool.submit(_git, toplevel, "diff", "--numstat", "-z", "--find-renames", base)
+            name_status = pool.submit(_git, toplevel, "diff", "--name-status", "-z", "--find-renames", base)
+            untracked = pool.submit(_git, toplevel, "ls-files", "--others", "--exclude-standard", "-z")
+            files = parse_numstat(numstat.result(), parse_name_status(name_status.result()))
+            untracked_paths = [name for name in untracked.result().split("\0") if name]
+        files += [_untracked_file(toplevel, name) for name in untracked_paths]
+        return cls(toplevel, base, files)
+
+    def hunks(self, changed: ChangedFile, context_lines: int = DEFAULT_CONTEXT_LINES) -> list[str]:
+        """The hunks of a changed file with the given number of context lines."""
+        if changed.binary:
+            return []
+        if changed.status == "untracked":
+            content = (Path(self.toplevel) / changed.path).read_text(encoding="utf-8", errors="replace")
+            lines = content.splitlines(keepends=True)
+            return [f"@@ -0,0 +1,{len(lines)} @@\n" + "".join(f"+{line}" for line in lines)]
+        paths = [changed.old_path, changed.path] if changed.old_path else [changed.path]
+        diff = _git(
+            self.toplevel,
+            "diff",
+            "--no-color",
+            "--no-ext-diff",
+            "--find-renames",
+            f"--unified={context_lines}",
+            self.base,
+            "--",
+            *paths,
+        )
+        return split_hunks(diff)
+
+
+def _untracked_file(toplevel: str, name: str) -> ChangedFile:
+    path = Path(toplevel) / name
+    try:
+        if path.stat().st_size > MAX_UNTRACKED_BYTES:
+            return ChangedFile(name, "untracked", None, None)
+        data = path.read_bytes()
+    except OSError:
+        return ChangedFile(name, "untracked", None, None)
+    if b"\0" in data:
+        return ChangedFile(name, "untracked", None, None)
+    return ChangedFile(name, "untracked", len(data.splitlines()), 0)
+
+
+def changed_hunks_page(
+    path: str | Path,
+    base_ref: str | None = None,
+    context_lines: int = DEFAULT_CONTEXT_LINES,
+    cursor: str | None = None,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+) -> dict[str, Any]:
+    """One page of the changed hunks of a checkout, highest ranked files first.
+
+    Files are added to the page while they fit the token budget. A file too large for
+    a page of its own gets the hunks that fit, the rest being counted as omitted.
+
+    Args:
+        path: Any directory inside the checkout
+        base_ref: Base branch, defaults to the remote's default branch
+        context_lines: Lines of context around each change (0-MAX_CONTEXT_LINES)
+        cursor: `next_cursor` of the previous page; without one, the first page
+        token_budget: Approximate number of tokens of the page's hunks
+
+    Returns:
+        Dict with the base commit, the number of changed files and lines, the files of
+        the page (path, status, line counts, risk reasons, score and hunks) and the
+        cursor of the next page (None on the last page)
+
+    Raises:
+        ValueError: If an argument is out of range, or the cursor was made for other changes
+        ChangedHunksError: If the checkout cannot be read
+    """
+    if not 0 <= context_lines <= MAX_CONTEXT_LINES:
+        raise ValueError(f"context_lines must be between 0 and {MAX_CONTEXT_LINES}")
+    if not MIN_TOKEN_BUDGET <= token_budget <= MAX_TOKEN_BUDGET:
+        raise ValueError(f"token_budget must be between {MIN_TOKEN_BUDGET} and {MAX_TOKEN_BUDGET}")
+
+    changes = ChangeSet.for_checkout(path, base_ref)
+    offset = 0
+    if cursor:
+        signature, offset = decode_cursor(cursor)
+        if signature != changes.signature:
+            raise ValueError("The changes differ from the ones the cursor was made for: start again without a cursor")
+
+    page: list[dict[str, Any]] = []
+    used = 0
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        for changed, hunks in _diffed(changes, changes.files[offset:], context_lines, pool):
+            cost = sum(estimate_tokens(hunk) for hunk in hunks) + estimate_tokens(changed.path)
+            if page and used + cost > token_budget:
+                break
+            entry = _file_entry(changed)
+            if cost > token_budget:
+                # Alone on its page: as many hunks as fit
+                kept: list[str] = []
+                for hunk in hunks:
+                    if kept and used + estimate_tokens(hunk) > token_budget:
+                        break
+                    kept.append(hunk)
+                    used += estimate_tokens(hunk)
+                entry.update(hunks=kept, omitted_hunks=len(hunks) - len(kept))
+            else:
+                entry["hunks"] = hunks
+                used += cost
+            page.append(entry)
+
+    end = offset + len(page)
+    return {
+        "base": changes.base,
+        "files_changed": len(changes.files),
+        "lines_added": sum(changed.added or 0 for changed in changes.files),
+        "lines_deleted": sum(changed.deleted or 0 for changed in changes.files),
+        "estimated_tokens": used,
+        "files": page,
+        "next_cursor": encode_cursor(changes.signature, end) if end < len(changes.files) else None,
+    }
+
+
+def _diffed(
+    changes: ChangeSet, files: list[ChangedFile], context_lines: int, pool: ThreadPoolExecutor
+) -> Iterator[tuple[ChangedFile, list[str]]]:
+    """Files with their hunks, diffed MAX_WORKERS at a time as they are consumed."""
+    for start in range(0, len(files), MAX_WORKERS):
+        batch = files[start : start + MAX_WORKERS]
+        yield from zip(batch, pool.map(partial(changes.hunks, context_lines=context_lines), batch), strict=True)
+
+
+def _file_entry(changed: ChangedFile) -> dict[str, Any]:
+    entry: dict[str, Any] = {"path": changed.path, "status": changed.status}
+    if changed.old_path:
+        entry["old_path"] = changed.old_path
+    if changed.binary:
+        entry["binary"] = True
+    else:
+        entry.update(added=changed.added, deleted=changed.deleted)
+    entry.update(risk=changed.risk, score=changed.score)
+    return entry
@@ -0,0 +1,947 @@
+"""Parsing of CodeRabbit review bodies.
+
+A CodeRabbit review body lists nitpick, duplicate and outside-diff-range comments in
+collapsible sections, grouped by file:
+
+    <summary>🧹 Nitpick comments (1)</summary><blockquote>
+    <summary>path/to/file.py (1)</summary><blockquote>
+    `12-14`: **Title of the comment**
+    Comment body...
+
+All three categories are extracted in a single streaming pass over the body lines. The
+rules are a port of the awk programs previously embedded in get-coderabbit-comments.sh,
+one small state machine per category, all fed the same line.
+
+The report printed by get-coderabbit-comments.sh (actionable comments from the inline
+review comments plus the body categories, counts and the LGTM filter) is built here in
+one process as well, byte-identical to the jq pipeline it replaces. Reviews are synced
+incrementally (see review_sync) and the report of a review is kept, so runs after the
+first only fetch new reviews. Reviews and the categorized comments are also recorded in
+the local review store (see review_store) for the MCP server's history queries.
+
+The same finding often shows up in several sections (a nitpick listed again as outside
+the diff range, a comment repeated under duplicates) and in every later review. Each
+comment gets a fingerprint of its file, line range and normalized body; one pass over a
+hash set drops the repeats, including findings of earlier reviews in the review store.
+Comments on lines the local checkout no longer changes are dropped too (see diff_index).
+
+Usage from the scripts:
+
+    python3 -m mcp_server.utils.coderabbit report [--stream] [--format FORMAT] [--full-resync] [--keep-repeated] \\
+        [--stale MODE] [--base-ref REF] <owner> <repo> <pr_number> <commit_sha>
+    echo "$REVIEW_BODY" | python3 -m mcp_server.utils.coderabbit parse
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import ExitStack
+from functools import partial
+from typing import Any, TextIO
+
+from mcp_server.utils.diff_index import DEFAULT_STALE_MODE, STALE_MODES, DiffIndex, stale_filter
+from mcp_server.utils.github_api import GitHubAPIError, GitHubClient
+from mcp_server.utils.github_daemon import get_shared_client
+from mcp_server.utils.json_stream import JSONStreamError, iter_lines
+from mcp_server.utils.review_store import ReviewStore
+from mcp_server.utils.review_sync import ReviewSync
+
+CODERABBIT_BOT = "coderabbitai[bot]"
+REPORT_NAME = "coderabbit"
+STORE_SOURCE = "coderabbit"
+OUTPUT_FORMATS = ("pretty", "compact", "ndjson")
+
+ACTIONABLE_COMMENTS = "actionable_comments"
+NITPICK_COMMENTS = "nitpick_comments"
+DUPLICATE_COMMENTS = "duplicate_comments"
+OUTSIDE_DIFF_RANGE_COMMENTS = "outside_diff_range_comments"
+
+NITPICK_MARKER = "🧹 Nitpick comments"
+DUPLICATE_MARKER = "♻️ Duplicate comments"
+OUTSIDE_DIFF_MARKER = "Outside diff range"
+REVIEW_DETAILS_MARKER = "📜 Review details"
+AI_PROMPT_MARKER = "🤖 Prompt for AI Agents"
+SECTION_MARKERS = re.compile(
+    "|".join(
+        re.escape(marker) for marker in (NITPICK_MARKER, DUPLICATE_MARKER, OUTSIDE_DIFF_MARKER, REVIEW_DETAILS_MARKER)
+    )
+)
+
+BLOCK_START = re.compile(r"`[0-9]+-?[0-9]*`: \*\*.*\*\*")
+BLOCK_HEADER = re.compile(r"`([^`]+)`: \*\*(.+)\*\*")
+SUMMARY_LINE = re.compile(r"<summary>.*\([0-9]+\)</summary>")
+SUMMARY_FILE = re.compile(r"<summary>([^(]+) \([0-9]+\)</summary>")
+CODE_FENCE = re.compile(r"```[^`]*```")
+HTML_TAG = re.compile(r"<[^>]*>")
+BLANK_LINES = re.compile(r"\n\n+")
+TRAILING_NEWLINES = re.compile(r"\n+\Z")
+EDGE_NEWLINES = re.compile(r"^\n+|\n+$")
+ITALIC_LABEL = re.compile(r"_[^_]+_")
+NON_WORD = re.compile(r"[\W_]+")
+POSITIVE_FEEDBACK = re.compile(
+    "LGTM|looks good|good fix|nice improvement|great work|excellent|perfect|well done"
+    "|correct implementation|good approach|nice work|good portability|better approach",
+    re.IGNORECASE,
+)
+
+# Report sections in output order, with their key in the summary
+SUMMARY_KEYS = {
+    ACTIONABLE_COMMENTS: "actionable",
+    NITPICK_COMMENTS: "nitpicks",
+    DUPLICATE_COMMENTS: "duplicates",
+    OUTSIDE_DIFF_RANGE_COMMENTS: "outside_diff_range",
+}
+# Phases of fetching a report, reported to a ReportProgress callback in this order
+REVIEWS_PHASE = "reviews"
+INLINE_COMMENTS_PHASE = "inline_comments"
+REVIEW_BODY_PHASE = "review_body"
+REPORT_PHASES = (REVIEWS_PHASE, INLINE_COMMENTS_PHASE, REVIEW_BODY_PHASE)
+# Called with a phase of REPORT_PHASES once it is done and the report sections it completed
+ReportProgress = Callable[[str, dict[str, list[dict[str, Any]]]], None]
+# Sections by priority: when a finding is repeated, its first occurrence in this order is kept
+DEDUPE_ORDER = (ACTIONABLE_COMMENTS, DUPLICATE_COMMENTS, NITPICK_COMMENTS, OUTSIDE_DIFF_RANGE_COMMENTS)
+
+
+class _Line:
+    """A body line with the features every section parser looks at, computed once."""
+
+    __slots__ = (
+        "text",
+        "block_start",
+        "quoted_block_start",
+        "separator",
+        "closes_summary",
+        "closes_blockquote",
+        "has_marker",
+        "plain",
+    )
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.block_start = text.startswith("`") and BLOCK_START.match(text) is not None
+        self.quoted_block_start = text.startswith("> `") and BLOCK_START.match(text, 2) is not None
+        self.separator = text == "----"
+        self.closes_summary = "</summary>" in text
+        self.closes_blockquote = "</blockquote>" in text
+        self.has_marker = SECTION_MARKERS.search(text) is not None
+        self.plain = not (
+            self.block_start
+            or self.quoted_block_start
+            or self.separator
+            or self.closes_summary
+            or self.closes_blockquote
+        )
+
+    def summary_file(self) -> str | None:
+        """The file named by a `<summary>path (N)</summary>` line, None if this is not a summary line."""
+        if not (self.closes_summary and SUMMARY_LINE.search(self.text)):
+            return None
+        match = SUMMARY_FILE.search(self.text)
+        name = match.group(1) if match else ""
+        # Only file-like summaries (containing a slash or a dot) switch the current file
+        return name if "/" in name or "." in name else ""
+
+
+class _SectionParser(ABC):
+    """State machine collecting the comment blocks of one review body section."""
+
+    def __init__(self, category: str, priority: str, quoted_blocks: bool = False) -> None:
+        self.category = category
+        self.priority = priority
+        self.quoted_blocks = quoted_blocks
+        self.active = True
+        self.in_section = False
+        self.in_file_section = False
+        self.in_block = False
+        self.current_file = ""
+        self.line_num = ""
+        self.title = ""
+        self.content: list[str] = []
+
+    @abstractmethod
+    def starts_section(self, text: str) -> bool:
+        """Whether a section marker line opens the section of this parser."""
+
+    @abstractmethod
+    def stops(self, text: str) -> bool:
+        """Whether a section marker line ends the section of this parser."""
+
+    def feed(self, line: _Line) -> dict[str, str] | None:
+        """Process one line, returning the comment it completes, if any."""
+        text = line.text
+        if line.has_marker:
+            if self.starts_section(text):
+                self.in_section = True
+                return None
+            if self.stops(text):
+                return self.finish()
+
+        if line.plain:
+            # Fast path for the bulk of the body: plain text continuing the current block
+            if self.in_block and text:
+                self.content.append(text)
+            return None
+
+        comment = None
+        if self.in_section:
+            summary_file = line.summary_file()
+            if summary_file is not None:
+                if self.in_block:
+                    comment = self._flush()
+                if summary_file:
+                    self.current_file = summary_file
+                    self.in_file_section = True
+                return comment
+
+        starts_block = line.block_start or (self.quoted_blocks and line.quoted_block_start)
+        if self.in_file_section and starts_block:
+            if self.in_block:
+                comment = self._flush()
+            self._start_block(text)
+            return comment
+
+        if not self.in_block:
+            return None
+        if not starts_block and not line.separator and not line.closes_summary:
+            if text:
+                self.content.append(text)
+            return None
+        if line.separator or starts_block or line.closes_blockquote:
+            comment = self._flush()
+            if starts_block:
+                self._start_block(text)
+        return comment
+
+    def finish(self) -> dict[str, str] | None:
+        """Stop parsing, returning the pending comment if any."""
+        comment = self._flush() if self.active and self.in_block else None
+        self.active = False
+        return comment
+
+    def _start_block(self, text: str) -> None:
+        match = BLOCK_HEADER.search(text)
+        self.line_num, self.title = match.groups() if match else ("", "")
+        self.content = [text]
+        self.in_block = True
+
+    def _flush(self) -> dict[str, str]:
+        content = "\n".join(self.content)
+        self.content = []
+        self.in_block = False
+        for separator in ("\n---", "\n----"):
+            if content.endswith(separator):
+                content = content[: -len(separator)]
+        content = CODE_FENCE.sub("", content)
+        content = HTML_TAG.sub("", content)
+        content = BLANK_LINES.sub("\n", content)
+        content = TRAILING_NEWLINES.sub("", content)
+        return {
+            "priority": self.priority,
+            "title": self.title,
+            "file": self.current_file,
+            "line": self.line_num,
+            "body": content,
+        }
+
+
+class _NitpickParser(_SectionParser):
+    def __init__(self) -> None:
+        super().__init__(NITPICK_COMMENTS, "LOW")
+
+    def starts_section(self, text: str) -> bool:
+        return NITPICK_MARKER in text
+
+    def stops(self, text: str) -> bool:
+        return REVIEW_DETAILS_MARKER in text
+
+
+class _DuplicateParser(_SectionParser):
+    def __init__(self) -> None:
+        super().__init__(DUPLICATE_COMMENTS, "MEDIUM")
+
+    def starts_section(self, text: str) -> bool:
+        return DUPLICATE_MARKER in text
+
+    def stops(self, text: str) -> bool:
+        return NITPICK_MARKER in text or REVIEW_DETAILS_MARKER in text
+
+
+class _OutsideDiffParser(_SectionParser):
+    def __init__(self) -> None:
+        # Outside diff range blocks may be quoted with a leading "> "
+        super().__init__(OUTSIDE_DIFF_RANGE_COMMENTS, "VERY LOW", quoted_blocks=True)
+
+    def starts_section(self, text: str) -> bool:
+        return OUTSIDE_DIFF_MARKER in text
+
+    def stops(self, text: str) -> bool:
+        return (self.in_section and NITPICK_MARKER in text) or DUPLICATE_MARKER in text or REVIEW_DETAILS_MARKER in text
+
+
+def iter_review_comments(lines: Iterable[str]) -> Iterator[tuple[str, dict[str, str]]]:
+    """Extract nitpick, duplicate and outside-diff-range comments in one pass.
+
+    Comments are yielded as soon as their block ends, so the body can be streamed and
+    never needs to be held in memory as a whole. Reading stops once every section has
+    ended.
+
+    Args:
+        lines: Lines of the review body (a trailing newline on each line is ignored)
+
+    Yields:
+        Tuples of (category, comment) where category is one of NITPICK_COMMENTS,
+        DUPLICATE_COMMENTS or OUTSIDE_DIFF_RANGE_COMMENTS and comment has the
+        priority, title, file, line and body fields
+    """
+    parsers: list[_SectionParser] = [_OutsideDiffParser(), _DuplicateParser(), _NitpickParser()]
+    for text in lines:
+        if text.endswith("\n"):
+            text = text[:-1]
+        if (
+            "</" not in text
+            and not text.startswith(("`", "> `"))
+            and text != "----"
+            and not SECTION_MARKERS.search(text)
+        ):
+            # Cheap check for plain text lines, which only ever extend the open blocks
+            if text:
+                for parser in parsers:
+                    if parser.in_block:
+                        parser.content.append(text)
+            continue
+
+        line = _Line(text)
+        for parser in parsers:
+            comment = parser.feed(line)
+            if comment is not None:
+                yield parser.category, comment
+        # Only section marker lines can end a section
+        if line.has_marker and not all(parser.active for parser in parsers):
+            parsers = [parser for parser in parsers if parser.active]
+            if not parsers:
+                return
+    for parser in parsers:
+        comment = parser.finish()
+        if comment is not None:
+            yield parser.category, comment
+
+
+def parse_review_body(body: str | Iterable[str]) -> dict[str, list[dict[str, str]]]:
+    """Parse all comment categories from a CodeRabbit review body.
+
+    Args:
+        body: The review body, or an iterable of its lines
+
+    Returns:
+        Dict with the nitpick_comments, duplicate_comments and outside_diff_range_comments
+        lists, in document order. Repeated findings are left in (see drop_repeated).
+    """
+    lines = body.split("\n") if isinstance(body, str) else body
+    result: dict[str, list[dict[str, str]]] = {
+        NITPICK_COMMENTS: [],
+        DUPLICATE_COMMENTS: [],
+        OUTSIDE_DIFF_RANGE_COMMENTS: [],
+    }
+    for category, comment in iter_review_comments(lines):
+        result[category].append(comment)
+    return result
+
+
+def dump_json(document: Any) -> str:
+    """Serialize a document exactly like `jq '.'` pretty-prints it."""
+    return json.dumps(document, indent=2, ensure_ascii=False).replace("\x7f", "\\u007f")
+
+
+def dump_record(document: Any) -> str:
+    """Serialize a document as one compact line of JSON."""
+    return json.dumps(document, ensure_ascii=False, separators=(",", ":"))
+
+
+def dump_output(document: dict[str, Any], output_format: str, records: Iterable[dict[str, Any]] = ()) -> str:
+    """Serialize a report in one of OUTPUT_FORMATS (without a trailing newline).
+
+    Args:
+        document: Report to serialize
+        output_format: "pretty" (like `jq '.'`), "compact" (one line) or "ndjson"
+        records: For ndjson, the records written one per line before the document itself,
+            which should then hold what is left (e.g. the summary)
+
+    Returns:
+        The serialized report
+    """
+    if output_format == "pretty":
+        return dump_json(document)
+    if output_format == "compact":
+        return dump_record(document)
+    if output_format == "ndjson":
+        return "\n".join([*(dump_record(record) for record in records), dump_record(document)])
+    raise ValueError(f"Unknown output format: {output_format}")
+
+
+def report_records(report: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """The comments of a report as NDJSON records, each with its category (as in stream mode)."""
+    for category, comments in report.items():
+        if category in SUMMARY_KEYS:
+            for comment in comments:
+                yield {"category": category, **comment}
+
+
+def actionable_comment(comment: dict[str, Any]) -> dict[str, Any]:
+    """Convert an inline CodeRabbit review comment into an actionable comment.
+
+    The title is the bold third line of the comment. When the comment carries a
+    "Prompt for AI Agents" section, the fenced prompt replaces the body.
+
+    Args:
+        comment: Review comment as returned by the GitHub API
+
+    Returns:
+        Dict with the priority, title, file and body fields
+    """
+    body = comment.get("body") or ""
+    lines = body.split("\n")
+    title = lines[2].removeprefix("**").removesuffix("**") if len(lines) > 2 else None
+    if AI_PROMPT_MARKER in body:
+        fenced = body.split(AI_PROMPT_MARKER)[1].split("```")
+        # Without a fenced prompt the jq transform failed; keep the whole body instead
+        if len(fenced) > 1:
+            body = EDGE_NEWLINES.sub("", fenced[1])
+    return {"priority": "HIGH", "title": title, "file": comment.get("path"), "body": body}
+
+
+def is_positive_feedback(comment: dict[str, Any]) -> bool:
+    """Whether a comment only confirms a fix (LGTM, looks good, ...) rather than asking for one."""
+    return POSITIVE_FEEDBACK.search(f"{comment.get('title') or ''} {comment.get('body') or ''}") is not None
+
+
+def comment_fingerprint(comment: dict[str, Any]) -> str:
+    """Fingerprint of the finding a comment reports: its file, line range and normalized body.
+
+    The body is compared without its decoration (the `12-14`: **Title** block header,
+    the bold title and italic labels such as _⚠️ Potential issue_), case, punctuation
+    and whitespace, so the same finding reported in another section or by a later
+    review gets the same fingerprint.
+
+    Args:
+        comment: Report comment with the title, file, line (optional) and body fields
+
+    Returns:
+        Hex digest identifying the finding
+    """
+    title = comment.get("title") or ""
+    decorations = {f"**{title}**", f"**{title}**:"}
+    words = []
+    for line in (comment.get("body") or "").split("\n"):
+        line = line.strip().removeprefix("> ")
+        if line in decorations or ITALIC_LABEL.fullmatch(line) or BLOCK_START.match(line):
+            continue
+        words += NON_WORD.sub(" ", line.casefold()).split()
+    start, _, end = str(comment.get("line") or "").replace(" ", "").partition("-")
+    key = "\0".join((comment.get("file") or "", start, end or start, " ".join(words)))
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def drop_repeated(sections: dict[str, list[dict[str, Any]]], seen: set[str]) -> int:
+    """Remove comments reporting a finding already seen, in a single pass over all sections.
+
+    Sections are visited in DEDUPE_ORDER, so a finding repeated across sections is kept in
+    the most important one. Sections left without comments are removed.
+
+    Args:
+        sections: Comments by report section, changed in place
+        seen: Fingerprints of findings reported before; the kept comments' ones are added
+
+    Returns:
+        Number of comments removed
+    """
+    repeated = 0
+    for category in DEDUPE_ORDER:
+        comments = sections.get(category)
+        if not comments:
+            continue
+        kept = []
+        for comment in comments:
+            fingerprint = comment_fingerprint(comment)
+            if fingerprint in seen:
+                repeated += 1
+            else:
+                seen.add(fingerprint)
+                kept.append(comment)
+        if kept:
+            sections[category] = kept
+        else:
+            del sections[category]
+    return repeated
+
+
+def select_latest_review(reviews: Iterable[dict[str, Any]], commit_sha: str) -> dict[str, Any] | None:
+    """Pick the most recent substantial CodeRabbit review of a commit.
+
+    Args:
+        reviews: Pull request reviews as returned by the GitHub API
+        commit_sha: Commit the review must belong to
+
+    Returns:
+        The latest matching review, or None if there is none
+    """
+    candidates = [
+        review
+        for review in reviews
+        if (review.get("user") or {}).get("login") == CODERABBIT_BOT
+        and len(review.get("body") or "") > 100
+        and review.get("commit_id") == commit_sha
+    ]
+    if not candidates:
+        return None
+    # jq sorts null before any string
+    candidates.sort(key=lambda review: (review.get("submitted_at") is not None, review.get("submitted_at") or ""))
+    return candidates[-1]
+
+
+def build_report(inline_comments: list[dict[str, Any]], review_body: str | Iterable[str]) -> dict[str, Any]:
+    """Build the get-coderabbit-comments.sh report.
+
+    Sections without comments are left out of both the summary and the report.
+    Duplicate comments that merely approve an earlier fix are filtered out.
+
+    Args:
+        inline_comments: Inline comments of the review (the actionable comments)
+        review_body: The review body, or an iterable of its lines
+
+    Returns:
+        Dict with a summary of the counts followed by the non-empty comment sections
+    """
+    sections = {ACTIONABLE_COMMENTS: [actionable_comment(comment) for comment in inline_comments]}
+    sections.update(parse_review_body(review_body))
+    sections = {category: comments for category, comments in sections.items() if comments}
+    if DUPLICATE_COMMENTS in sections:
+        # The section is kept (possibly empty) once it had comments, as with the jq filter
+        sections[DUPLICATE_COMMENTS] = [
+            comment for comment in sections[DUPLICATE_COMMENTS] if not is_positive_feedback(comment)
+        ]
+    return _with_summary(sections)
+
+
+def without_repeated(report: dict[str, Any], seen: set[str]) -> dict[str, Any]:
+    """A report without the findings it repeats (see drop_repeated).
+
+    Args:
+        report: Report as built by build_report
+        seen: Fingerprints of findings reported before; the kept comments' ones are added
+
+    Returns:
+        New report; the number of comments removed is added to the summary as `repeated`
+    """
+    sections = {category: list(report[category]) for category in SUMMARY_KEYS if category in report}
+    return _with_summary(sections, repeated=drop_repeated(sections, seen))
+
+
+def without_stale(report: dict[str, Any], index: DiffIndex | None, mode: str = DEFAULT_STALE_MODE) -> dict[str, Any]:
+    """A report without (or with flagged) comments on code that is no longer changed.
+
+    Outside diff range comments are about unchanged code by definition and always kept.
+
+    Args:
+        report: Report as built by build_report
+        index: Index of the local changes (see diff_index), None to keep every comment
+        mode: "drop", "mark" or "keep" (see stale_filter)
+
+    Returns:
+        New report; the number of stale comments is added to the summary as `stale`
+    """
+    sections = {category: list(report[category]) for category in SUMMARY_KEYS if category in report}
+    stale = 0
+    for category, comments in list(sections.items()):
+        if category == OUTSIDE_DIFF_RANGE_COMMENTS or not comments:
+            continue
+        kept, count = stale_filter(comments, index, mode)
+        stale += count
+        if kept:
+            sections[category] = kept
+        else:
+            del sections[category]
+    return _with_summary(sections, repeated=report["summary"].get("repeated", 0), stale=stale)
+
+
+def _with_summary(sections: dict[str, list[dict[str, Any]]], **removed: int) -> dict[str, Any]:
+    summary: dict[str, int] = {SUMMARY_KEYS[category]: len(comments) for category, comments in sections.items()}
+    summary["total"] = sum(summary.values())
+    summary.update((key, count) for key, count in removed.items() if count)
+    return {"summary": summary, **sections}
+
+
+def stored_comment(review: dict[str, Any], category: str, comment: dict[str, Any]) -> dict[str, Any]:
+    """A report comment as recorded in the review store, with the review's commit and time.
+
+    Args:
+        review: The review the comment comes from
+        category: Report section of the comment (e.g. NITPICK_COMMENTS)
+        comment: Comment with the priority, title, file, line and body fields
+
+    Returns:
+        Comment for ReviewStore.recording, its category being the summary key (e.g. "nitpicks")
+    """
+    return {
+        **comment,
+        "category": SUMMARY_KEYS[category],
+        "fingerprint": comment_fingerprint(comment),
+        "author": CODERABBIT_BOT,
+        "commit_sha": review.get("commit_id"),
+        "created_at": review.get("submitted_at"),
+    }
+
+
+def record_report(
+    store: ReviewStore, owner: str, repo: str, pr_number: str, review: dict[str, Any], report: Any
+) -> None:
+    """Record the comments of a report in the review store, replacing the ones of the same review."""
+    comments = (
+        stored_comment(review, category, comment) for category in SUMMARY_KEYS for comment in report.get(category, [])
+    )
+    store.record_comments(f"{owner}/{repo}", pr_number, STORE_SOURCE, comments, review_id=review.get("id"))
+
+
+def find_latest_review(
+    client: GitHubClient, owner: str, repo: str, pr_number: str, commit_sha: str, sync: ReviewSync | None = None
+) -> Any:
+    """Find the ID of the latest CodeRabbit review of a commit.
+
+    The review list is read with review bodies truncated, since it repeats the
+    (possibly huge) body of every review.
+
+    Args:
+        client: GitHub API client
+        owner: Repository owner
+        repo: Repository name
+        pr_number: Pull request number
+        commit_sha: Commit the review must belong to
+        sync: Review history to bring up to date instead of fetching all reviews
+
+    Returns:
+        The review ID, or None if CodeRabbit has not reviewed the commit
+    """
+    sync = sync or ReviewSync(client, owner, repo, pr_number)
+    review = select_latest_review(sync.reviews(), commit_sha)
+    return None if review is None else review.get("id")
+
+
+def fetch_review_report(
+    client: GitHubClient,
+    owner: str,
+    repo: str,
+    pr_number: str,
+    commit_sha: str,
+    sync: ReviewSync | None = None,
+    store: ReviewStore | None = None,
+    keep_repeated: bool = False,
+    stale: str = "keep",
+    base_ref: str | None = None,
+    progress: ReportProgress | None = None,
+) -> dict[str, Any] | None:
+    """Fetch the latest CodeRabbit review of a commit and build its report.
+
+    Findings repeated across sections, or already reported by an earlier review recorded
+    in the store, are left out (see without_repeated) unless keep_repeated is set.
+    Comments on code the local checkout no longer changes are handled as `stale` says
+    (see without_stale).
+
+    With a progress callback, each phase is reported once done along with the sections
+    of the report it completed: the actionable comments after the inline comments (they
+    come first in DEDUPE_ORDER, so the later sections cannot change them), the others
+    after the review body is parsed.
+
+    Args:
+        client: GitHub API client
+        owner: Repository owner
+        repo: Repository name
+        pr_number: Pull request number
+        commit_sha: Commit the review must belong to
+        sync: Review history; a report stored for the same review is reused
+        store: Review store the reviews and the report's comments (all of them) are recorded in
+        keep_repeated: Keep repeated findings
+        stale: "drop" or "mark" stale comments, or "keep" them without looking at the checkout
+        base_ref: Base branch of the local diff, defaults to the remote's default branch
+        progress: Called after each phase of REPORT_PHASES
+
+    Returns:
+        The report (see build_report), or None if CodeRabbit has not reviewed the commit
+    """
+    sync = sync or ReviewSync(client, owner, repo, pr_number)
+    if store is not None:
+        store.record_reviews(f"{owner}/{repo}", pr_number, sync.reviews())
+    latest_review = select_latest_review(sync.reviews(), commit_sha)
+    if progress is not None:
+        progress(REVIEWS_PHASE, {})
+    if latest_review is None:
+        return None
+    review_id = latest_review.get("id")
+    seen = set() if keep_repeated else previous_fingerprints(store, owner, repo, pr_number, review_id)
+    index = None
+    if stale != "keep":
+        index = DiffIndex.for_checkout(f"{owner}/{repo}", commit_sha, base_ref=base_ref)
+
+    def finished(report: dict[str, Any], seen: set[str]) -> dict[str, Any]:
+        if not keep_repeated:
+            report = without_repeated(report, seen)
+        if stale != "keep":
+            report = without_stale(report, index, stale)
+        return report
+
+    report: dict[str, Any] | None = sync.report(REPORT_NAME, review_id)
+    if report is None:
+        review = f"/repos/{owner}/{repo}/pulls/{pr_number}/reviews/{review_id}"
+        inline_comments = list(client.iter_array(f"{review}/comments"))
+        if progress is not None:
+            actionable = finished(build_report(inline_comments, ()), set(seen))
+            progress(INLINE_COMMENTS_PHASE, _sections(actionable, ACTIONABLE_COMMENTS))
+        report = build_report(inline_comments, iter_lines(client.iter_string_field(review, "body")))
+        sync.store_report(REPORT_NAME, review_id, report)
+    elif progress is not None:
+        progress(INLINE_COMMENTS_PHASE, _sections(finished(report, set(seen)), ACTIONABLE_COMMENTS))
+    if store is not None:
+        record_report(store, owner, repo, pr_number, latest_review, report)
+    report = finished(report, seen)
+    if progress is not None:
+        progress(REVIEW_BODY_PHASE, _sections(report, *(key for key in SUMMARY_KEYS if key != ACTIONABLE_COMMENTS)))
+    return report
+
+
+def _sections(report: dict[str, Any], *categories: str) -> dict[str, list[dict[str, Any]]]:
+    return {category: report[category] for category in categories if category in report}
+
+
+def previous_fingerprints(store: ReviewStore | None, owner: str, repo: str, pr_number: str, review_id: Any) -> set[str]:
+    """Fingerprints of the findings of CodeRabbit reviews older than the given one."""
+    if store is None or not isinstance(review_id, int):
+        return set()
+    return store.fingerprints(f"{owner}/{repo}", pr_number, STORE_SOURCE, before_review_id=review_id)
+
+
+def stream_review_report(
+    client: GitHubClient,
+    owner: str,
+    repo: str,
+    pr_number: str,
+    commit_sha: str,
+    out: TextIO,
+    sync: ReviewSync | None = None,
+    store: ReviewStore | None = None,
+    keep_repeated: bool = False,
+    stale: str = "keep",
+    base_ref: str | None = None,
+) -> bool:
+    """Write the comments of the latest CodeRabbit review of a commit as they are parsed.
+
+    Memory stays flat regardless of the review size: responses are read from the socket
+    in chunks and each comment is written out as one compact JSON record (with its
+    category) as soon as its block ends, in document order. With a store, repeated
+    findings are skipped as in fetch_review_report (the first occurrence in stream order
+    being kept), looked up in the store's fingerprint index rather than held in memory;
+    without one every finding is written. Stale comments are dropped or marked as in
+    fetch_review_report (they are still recorded). The last record holds the summary counts.
+
+    Args:
+        client: GitHub API client
+        owner: Repository owner
+        repo: Repository name
+        pr_number: Pull request number
+        commit_sha: Commit the review must belong to
+        out: Text stream the records are written to
+        sync: Review history to bring up to date instead of fetching all reviews (the
+            report itself is not stored, it is never held in memory)
+        store: Review store the reviews and comments (all of them) are recorded in, as they are parsed
+        keep_repeated: Keep repeated findings
+        stale: "drop" or "mark" stale comments, or "keep" them without looking at the checkout
+        base_ref: Base branch of the local diff, defaults to the remote's default branch
+
+    Returns:
+        False if CodeRabbit has not reviewed the commit (nothing is written)
+    """
+    sync = sync or ReviewSync(client, owner, repo, pr_number)
+    if store is not None:
+        store.record_reviews(f"{owner}/{repo}", pr_number, sync.reviews())
+    latest_review = select_latest_review(sync.reviews(), commit_sha)
+    if latest_review is None:
+        return False
+
+    with ExitStack() as stack:
+        record = None
+        if store is not None:
+            record = stack.enter_context(
+                store.recording(f"{owner}/{repo}", pr_number, STORE_SOURCE, latest_review.get("id"))
+            )
+        is_repeated = None
+        review_id = latest_review.get("id")
+        if store is not None and not keep_repeated and isinstance(review_id, int):
+            is_repeated = partial(store.has_fingerprint, f"{owner}/{repo}", pr_number, STORE_SOURCE, review_id)
+        index = None
+        if stale != "keep":
+            index = DiffIndex.for_checkout(f"{owner}/{repo}", commit_sha, base_ref=base_ref)
+        _stream_review_comments(
+            client,
+            f"/repos/{owner}/{repo}/pulls/{pr_number}",
+            latest_review,
+            out,
+            record,
+            is_repeated,
+            index,
+            stale,
+        )
+    return True
+
+
+def _stream_review_comments(
+    client: GitHubClient,
+    pull: str,
+    latest_review: dict[str, Any],
+    out: TextIO,
+    record: Callable[[dict[str, Any]], None] | None,
+    is_repeated: Callable[[str], bool] | None,
+    index: DiffIndex | None = None,
+    stale_mode: str = "keep",
+) -> None:
+    """Write (and record) the comment records and the summary of a review (see stream_review_report)."""
+    counts = dict.fromkeys(SUMMARY_KEYS, 0)
+    repeated = 0
+    stale = 0
+
+    def write(category: str, comment: dict[str, Any]) -> None:
+        nonlocal repeated, stale
+        stored = stored_comment(latest_review, category, comment)
+        # Checked before recording: the comments recorded so far are the earlier ones
+        repeat = is_repeated is not None and is_repeated(stored["fingerprint"])
+        if record is not None:
+            record(stored)
+        if repeat:
+            repeated += 1
+            return
+        if category != OUTSIDE_DIFF_RANGE_COMMENTS:
+            kept, count = stale_filter([comment], index, stale_mode)
+            stale += count
+            if not kept:
+                return
+            comment = kept[0]
+        out.write(dump_record({"category": category, **comment}) + "\n")
+        counts[category] += 1
+
+    review = f"{pull}/reviews/{latest_review.get('id')}"
+    for inline_comment in client.iter_array(f"{review}/comments"):
+        write(ACTIONABLE_COMMENTS, actionable_comment(inline_comment))
+
+    for category, comment in iter_review_comments(iter_lines(client.iter_string_field(review, "body"))):
+        if category == DUPLICATE_COMMENTS and is_positive_feedback(comment):
+            continue
+        write(category, comment)
+
+    summary = {SUMMARY_KEYS[category]: count for category, count in counts.items() if count}
+    summary["total"] = sum(summary.values())
+    if repeated:
+        summary["repeated"] = repeated
+    if stale:
+        summary["stale"] = stale
+    out.write(dump_record({"summary": summary}) + "\n")
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command line entry point used by get-coderabbit-comments.sh."""
+    parser = argparse.ArgumentParser(prog="coderabbit", description="Extract CodeRabbit review comments")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("parse", help="Parse a review body from stdin into comment categories")
+    report_parser = subparsers.add_parser("report", help="Fetch a review and print the comments report")
+    report_parser.add_argument("owner")
+    report_parser.add_argument("repo")
+    report_parser.add_argument("pr_number")
+    report_parser.add_argument("commit_sha")
+    report_parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write one JSON record per comment as it is parsed, summary last, in constant memory",
+    )
+    report_parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="pretty",
+        help="Pretty-printed JSON, compact JSON or one JSON record per comment with the summary last"
+        " (--stream always writes records)",
+    )
+    report_parser.add_argument(
+        "--full-resync", action="store_true", help="Ignore the stored review history and fetch everything again"
+    )
+    report_parser.add_argument(
+        "--keep-repeated",
+        action="store_true",
+        help="Keep findings repeated across sections or already reported by an earlier review",
+    )
+    report_parser.add_argument(
+        "--stale",
+        choices=STALE_MODES,
+        default=DEFAULT_STALE_MODE,
+        help="Drop, mark or keep comments on code the local checkout no longer changes",
+    )
+    report_parser.add_argument(
+        "--base-ref", help="Base branch of the local diff (default: the remote's default branch)"
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "parse":
+        lines = (line.decode("utf-8", errors="replace") for line in sys.stdin.buffer)
+        print(dump_json(parse_review_body(lines)))
+        return 0
+
+    client = get_shared_client()
+    report = None
+    try:
+        sync = ReviewSync.persistent(client, args.owner, args.repo, args.pr_number, full_resync=args.full_resync)
+        with ReviewStore.default() as store:
+            if args.stream:
+                found = stream_review_report(
+                    client,
+                    args.owner,
+                    args.repo,
+                    args.pr_number,
+                    args.commit_sha,
+                    sys.stdout,
+                    sync=sync,
+                    store=store,
+                    keep_repeated=args.keep_repeated,
+                    stale=args.stale,
+                    base_ref=args.base_ref,
+                )
+            else:
+                report = fetch_review_report(
+                    client,
+                    args.owner,
+                    args.repo,
+                    args.pr_number,
+                    args.commit_sha,
+                    sync=sync,
+                    store=store,
+                    keep_repeated=args.keep_repeated,
+                    stale=args.stale,
+                    base_ref=args.base_ref,
+                )
+                found = report is not None
+        sync.save()
+    except (GitHubAPIError, JSONStreamError, ValueError, sqlite3.Error) as exc:
+        print(f"❌ Error: {exc}", file=sys.stderr)
+        return 1
+    if not found:
+        print("❌ No CodeRabbit reviews found")
+        return 1
+    if report is None:
+        # Streamed: already written record by record
+        return 0
+    if args.format == "ndjson":
+        print(dump_output({"summary": report["summary"]}, args.format, report_records(report)))
+    else:
+        print(dump_output(report, args.format))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""Pre-flight context of the commit prompt, gathered by the server.
+
+The commit prompt has the agent check the repository, look at the status, the staged
+and unstaged changes and the recent history, one tool call (and one model round trip)
+each. Given the path of the checkout, the server runs these git queries itself, mostly at
+once as async subprocesses, and embeds a summary in the rendered prompt: the staged,
+unstaged and untracked files with their line counts, the diff to be committed (the
+staged one, or what `git add -u` would stage when nothing is), truncated to fit a
+character budget, and the commit message conventions detected in the recent history.
+
+The working tree is left alone, but the index is not read-only: `git write-tree` locks
+it, writes the tree object of the index and may store the cached tree back into it,
+and `git status` refreshes its stat data. write-tree therefore runs on its own before
+the other queries. The hash of the tree is the cache key: together with HEAD, the
+status and the size and modification time of the unstaged files, it tells whether the
+summary of the previous invocation is still accurate, so repeat invocations cost two
+rounds of cheap git queries.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import subprocess
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+GIT_TIMEOUT = 30
+DEFAULT_CACHE_SIZE = 16
+# Budget of the whole summary; the diff gets what the rest leaves
+MAX_CONTEXT_CHARS = 24_000
+MAX_LISTED_FILES = 40
+RECENT_COMMITS = 30
+CONVENTION_EXAMPLES = 3
+
+CONVENTIONAL_SUBJECT = re.compile(r"^(\w+)(?:\(([^)]+)\))?!?: \S")
+BRACKET_SUBJECT = re.compile(r"^\[[^\]]+\] \S")
+TICKET_SUBJECT = re.compile(r"^[A-Z][A-Z0-9]+-\d+\b")
+
+
+class GitCommandError(Exception):
+    """Raised when a git query of the pre-flight fails."""
+
+
+@dataclass
+class FileStat:
+    """Changed lines of a file (None for binary files)."""
+
+    path: str
+    added: int | None
+    deleted: int | None
+
+
+@dataclass
+class CommitContext:
+    """What the commit prompt would have the agent look up."""
+
+    toplevel: str
+    branch: str | None
+    head: str | None
+    staged: list[FileStat] = field(default_factory=list)
+    unstaged: list[FileStat] = field(default_factory=list)
+    untracked: list[str] = field(default_factory=list)
+    diff: str = ""
+    recent_subjects: list[str] = field(default_factory=list)
+
+    @property
+    def diff_source(self) -> str:
+        """Which changes the diff shows."""
+        return "staged" if self.staged else "unstaged, what `git add -u` would stage"
+
+
+async def run_git(path: str | Path, *args: str, check: bool = True) -> str:
+    """Output of a git command run in `path`.
+
+    Args:
+        path: Directory inside the checkout
+        *args: Arguments of git
+        check: Raise if git exits with an error, else return an empty string
+
+    Raises:
+        GitCommandError: If git cannot be run, times out or (with check) fails
+    """
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "git",
+            "-C",
+            str(path),
+            "-c",
+            "core.quotePath=false",
+            *args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+    except OSError as exc:
+        raise GitCommandError(f"Could not run git: {exc}") from exc
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), GIT_TIMEOUT)
+    except TimeoutError as exc:
+        process.kill()
+        await process.wait()
+        raise GitCommandError(f"git {args[0]} timed out after {GIT_TIMEOUT}s") from exc
+    if process.returncode:
+        if check:
+            raise GitCommandError(stderr.decode("utf-8", errors="replace").strip() or f"git {args[0]} failed")
+        return ""
+    return stdout.decode("utf-8", errors="replace")
+
+
+def parse_numstat(output: str) -> list[FileStat]:
+    """Parse `git diff --numstat` output (renames shown as `old => new`)."""
+    stats = []
+    for line in output.splitlines():
+        added, _, rest = line.partition("\t")
+        deleted, _, path = rest.partition("\t")
+        if path:
+            stats.append(
+                FileStat(path, int(added) if added.isdigit() else None, int(deleted) if deleted.isdigit() else None)
+            )
+    return stats
+
+
+def parse_status(output: str) -> tuple[bool, list[str], list[str]]:
+    """Parse `git status --porcelain -z` output.
+
+    Returns:
+        Tuple of (whether anything is staged, paths changed in the working tree, untracked paths)
+    """
+    staged = False
+    modified = []
+    untracked = []
+    entries = iter(output.split("\0"))
+    for entry in entries:
+        if len(entry) < 4:
+            continue
+        index, worktree, path = entry[0], entry[1], entry[3:]
+        if index in "RC":
+            # The original path follows as its own entry
+            next(entries, None)
+        if index == "?":
+            untracked.append(path)
+            continue
+        staged = staged or index not in " !"
+        if worktree not in " !":
+            modified.append(path)
+    return staged, modified, untracked
+
+
+def detect_conventions(subjects: list[str]) -> str:
+    """Describe the commit message style of recent subjects (most recent first)."""
+    if not subjects:
+        return "No commits yet: use a short imperative subject line."
+    conventional = [match for match in map(CONVENTIONAL_SUBJECT.match, subjects) if match]
+    if len(conventional) * 2 >= len(subjects):
+        types = Counter(match.group(1) for match in conventional)
+        scopes = Counter(match.group(2) for match in conventional if match.group(2))
+        style = f"Conventional Commits (types: {', '.join(name for name, _ in types.most_common(6))}"
+        if scopes:
+            style += f"; scopes: {', '.join(name for name, _ in scopes.most_common(6))}"
+        style += ")"
+    elif sum(1 for subject in subjects if BRACKET_SUBJECT.match(subject)) * 2 >= len(subjects):
+        style = "a bracketed tag before the subject, e.g. `[TAG] Subject`"
+    elif sum(1 for subject in subjects if TICKET_SUBJECT.match(subject)) * 2 >= len(subjects):
+        style = "a ticket key before the subject, e.g. `ABC-123 Subject`"
+    else:
+        style = "free-form subjects"
+    examples = "\n".join(f"- {subject}" for subject in subjects[:CONVENTION_EXAMPLES])
+    return f"Recent commits use {style}. Latest subjects:\n{examples}"
+
+
+async def gather_commit_context(path: str | Path, cache: "CommitContextCache | None" = None) -> str:
+    """The pre-flight summary of a checkout, as a markdown section of the commit prompt.
+
+    Args:
+        path: Directory inside the checkout
+        cache: Cache of earlier summaries, keyed by the index tree hash and the working tree state
+
+    Returns:
+        The summary, or a note saying why there is none (e.g. not a git repository)
+    """
+    try:
+        return await _gather(path, cache)
+    except GitCommandError as exc:
+        return f"## Pre-flight context\n\nNot available: {exc}"
+
+
+async def _gather(path: str | Path, cache: "CommitContextCache | None") -> str:
+    toplevel = (await run_git(path, "rev-parse", "--show-toplevel")).strip()
+    # Run alone: it takes index.lock, which `git status` also takes to refresh the index.
+    # Fails with unmerged paths: the summary is then not cached
+    tree = await run_git(toplevel, "write-tree", check=False)
+    branch, head, status = await asyncio.gather(
+        run_git(toplevel, "symbolic-ref", "--short", "-q", "HEAD", check=False),
+        run_git(toplevel, "rev-parse", "-q", "--verify", "HEAD", check=False),
+        run_git(toplevel, "status", "--porcelain", "-z", "--untracked-files=normal"),
+    )
+    staged, modified, untracked = parse_status(status)
+    key = None
+    if tree:
+        key = _cache_key(toplevel, head, tree, status, modified)
+        if cache is not None and (cached := cache.get(key)) is not None:
+            return cached
+
+    staged_stat, unstaged_stat, diff, log = await asyncio.gather(
+        run_git(toplevel, "diff", "--cached", "--numstat", "--find-renames"),
+        run_git(toplevel, "diff", "--numstat", "--find-renames"),
+        run_git(toplevel, "diff", *(["--cached"] if staged else []), "--no-color", "--no-ext-diff", "--find-renames"),
+        run_git(toplevel, "log", f"-n{RECENT_COMMITS}", "--no-merges", "--format=%s", check=False),
+    )
+    context = CommitContext(
+        toplevel=toplevel,
+        branch=branch.strip() or None,
+        head=head.strip() or None,
+        staged=parse_numstat(staged_stat),
+        unstaged=parse_numstat(unstaged_stat),
+        untracked=untracked,
+        diff=diff,
+        recent_subjects=log.splitlines(),
+    )
+    summary = render_commit_context(context)
+    if cache is not None and key is not None:
+        cache.put(key, summary)
+    return summary
+
+
+def _cache_key(toplevel: str, head: str, tree: str, status: str, modified: list[str]) -> str:
+    digest = hashlib.sha256("\0".join((toplevel, head, tree, status)).encode())
+    for path in modified:
+        try:
+            stat = os.stat(os.path.join(toplevel, path))
+        except OSError:
+            continue
+        digest.update(f"\0{path}\0{stat.st_size}\0{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+def _file_list(title: str, stats: list[FileStat]) -> list[str]:
+    added = sum(stat.added or 0 for stat in stats)
+    deleted = sum(stat.deleted or 0 for stat in stats)
+    lines = [f"### {title} ({len(stats)} files, +{added} -{deleted})", ""]
+    for stat in stats[:MAX_LISTED_FILES]:
+        counts = "binary" if stat.added is None else f"+{stat.added} -{stat.deleted}"
+        lines.append(f"- {stat.path} ({counts})")
+    if len(stats) > MAX_LISTED_FILES:
+        lines.append(f"- ... and {len(stats) - MAX_LISTED_FILES} more")
+    return [*lines, ""]
+
+
+def render_commit_context(context: CommitContext, max_chars: int = MAX_CONTEXT_CHARS) -> str:
+    """Render a pre-flight summary, the diff truncated so the whole stays within max_chars."""
+    where = f"branch `{context.branch}`" if context.branch else "detached HEAD"
+    head = f"`{context.head[:12]}`" if context.head else "no commits yet"
+    lines = [
+        "## Pre-flight context",
+        "",
+        f"Gathered by the server from `{context.toplevel}` ({where}, HEAD {head}). The repository check,"
+        " status, diff and history commands above have already been run: start from the analysis."
+        " Staging and the commit itself are still to be done.",
+        "",
+    ]
+    if not (context.staged or context.unstaged or context.untracked):
+        return "\n".join([*lines, "No changes to commit."])
+    if context.staged:
+        lines += _file_list("Staged changes", context.staged)
+    if context.unstaged:
+        lines += _file_list("Unstaged changes", context.unstaged)
+    if context.untracked:
+        lines += [f"### Untracked files ({len(context.untracked)}, not staged by `git add -u`)", ""]
+        lines += [f"- {path}" for path in context.untracked[:MAX_LISTED_FILES]]
+        if len(context.untracked) > MAX_LISTED_FILES:
+            lines.append(f"- ... and {len(context.untracked) - MAX_LISTED_FILES} more")
+        lines.append("")
+    lines += ["### Commit conventions", "", detect_conventions(context.recent_subjects), ""]
+
+    if context.diff:
+        header = f"### Diff ({context.diff_source})"
+        budget = max_chars - sum(len(line) + 1 for line in lines) - len(header) - 100
+        diff = context.diff.rstrip("\n")
+        note = ""
+        if len(diff) > budget:
+            # Cut at a line end
+            kept = diff[: max(budget, 0)].rpartition("\n")[0]
+            omitted = diff.count("\n") + 1 - (kept.count("\n") + 1 if kept else 0)
+            diff = kept
+            note = f"\n\n({omitted} more diff lines not shown: read the files for the rest)"
+        lines += [header, "", "```diff", diff, "```" + note]
+    return "\n".join(lines).rstrip("\n")
+
+
+class CommitContextCache:
+    """LRU cache of pre-flight summaries by checkout state."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE) -> None:
+        """Create an empty cache.
+
+        Args:
+            max_entries: Number of summaries kept
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, str] = OrderedDict()
+
+    def get(self, key: str) -> str | None:
+        """The summary stored for a key, None if there is none."""
+        summary = self._entries.get(key)
+        if summary is not None:
+            self._entries.move_to_end(key)
+        return summary
+
+    def put(self, key: str, summary: str) -> None:
+        """Store a summary, evicting the least recently used ones beyond max_entries."""
+        self._entries[key] = summary
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Forget every summary."""
+        self._entries.clear()
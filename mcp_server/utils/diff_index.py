@@ -0,0 +1,349 @@
+"""Index of the lines changed in the local checkout, to tell current review comments from stale ones.
+
+Review comments point at a file and a line of the commit that was reviewed. Once the
+code has been reworked, many of them refer to lines that are no longer part of the
+change and only cost the agent a round of checking. The index is built from one local
+`git diff --merge-base <base>` (working tree, including uncommitted edits, against the
+merge base with the pull request's base branch): the new-side line ranges of every
+hunk, merged into sorted non-overlapping intervals per file, so each lookup is a
+binary search.
+
+Comment lines belong to the reviewed commit, not to the working tree: fixing one comment
+by adding lines above others moves them. A second `git diff <reviewed commit>` maps
+each commented line to where it is now (LineMap) before it is looked up.
+
+It is only built when the checkout is the pull request's repository and contains the
+reviewed commit; otherwise comments are left as they are. The base branch is the
+remote's default branch (refs/remotes/<remote>/HEAD) unless given.
+"""
+
+import re
+import subprocess
+from bisect import bisect_right
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Any
+
+from mcp_server.utils.pr_info import PRInfoError, find_git_dirs, read_git_state, resolve_ref
+
+# Lines around a hunk still count as changed: the commented line may have moved a little
+DEFAULT_TOLERANCE = 3
+GIT_TIMEOUT = 30
+STALE_MODES = ("keep", "mark", "drop")
+DEFAULT_STALE_MODE = "drop"
+DEFAULT_BRANCHES = ("main", "master")
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+LINE_RANGE = re.compile(r"^\s*(\d+)\s*(?:-\s*(\d+)\s*)?$")
+
+
+def _diff_path(header: str) -> str | None:
+    """Path of a `--- a/...` or `+++ b/...` line, None for /dev/null."""
+    path = header[4:].rstrip("\n")
+    if path == "/dev/null":
+        return None
+    if path.startswith('"') and path.endswith('"'):
+        # Quoted for special characters (non-ASCII ones are kept as is, see core.quotePath)
+        path = path[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return path[2:] if path[:2] in ("a/", "b/") else path
+
+
+def parse_line_range(line: Any) -> tuple[int, int] | None:
+    """Parse a comment line such as 12, "12" or "12-14" into (first, last), None if there is none."""
+    if isinstance(line, int) and not isinstance(line, bool):
+        return (line, line) if line > 0 else None
+    match = LINE_RANGE.match(line) if isinstance(line, str) else None
+    if not match:
+        return None
+    first = int(match.group(1))
+    last = int(match.group(2) or first)
+    return (first, last) if 0 < first <= last else None
+
+
+def _parse_diff(lines: Iterable[str]) -> tuple[dict[str, list[tuple[int, int, int, int]]], dict[str, str]]:
+    """Hunks of a unified diff, as (old start, old count, new start, new count) by new path, and renames.
+
+    Deleted files are left out.
+    """
+    hunks: dict[str, list[tuple[int, int, int, int]]] = {}
+    renames: dict[str, str] = {}
+    old_path: str | None = None
+    path: str | None = None
+    # Removed or added lines may look like file headers: those only come before the first hunk
+    in_header = False
+    for line in lines:
+        if line.startswith("@@"):
+            in_header = False
+            match = HUNK_HEADER.match(line)
+            if match and path is not None:
+                old_start, old_count, new_start, new_count = (
+                    int(value) if value is not None else 1 for value in match.groups()
+                )
+                hunks[path].append((old_start, old_count, new_start, new_count))
+        elif line.startswith("diff "):
+            old_path = path = None
+            in_header = True
+        elif not in_header:
+            continue
+        elif line.startswith("--- "):
+            old_path = _diff_path(line)
+        elif line.startswith("+++ "):
+            path = _diff_path(line)
+            if path is not None:
+                hunks.setdefault(path, [])
+                if old_path is not None and old_path != path:
+                    renames[old_path] = path
+    return hunks, renames
+
+
+class LineMap:
+    """Where the lines of a commit are in the working tree, from `git diff <commit>`.
+
+    Lines after a hunk move by the lines it added minus the lines it removed; lines
+    within a hunk were changed and map to its new side.
+    """
+
+    def __init__(
+        self, hunks: Mapping[str, Iterable[tuple[int, int, int, int]]], renames: Mapping[str, str] | None = None
+    ) -> None:
+        """Index the hunks.
+
+        Args:
+            hunks: (old start, old count, new start, new count) of the hunks by new path
+            renames: New path by old path
+        """
+        self.renames = dict(renames or {})
+        # Path -> (hunks, first old line after each hunk, shift of the lines after each hunk)
+        self._hunks: dict[str, tuple[list[tuple[int, int, int, int]], list[int], list[int]]] = {}
+        for path, file_hunks in hunks.items():
+            ordered = sorted(file_hunks)
+            ends: list[int] = []
+            shifts: list[int] = []
+            shift = 0
+            for old_start, old_count, _, new_count in ordered:
+                # A pure insertion comes after line old_start
+                ends.append(old_start + (old_count or 1))
+                shift += new_count - old_count
+                shifts.append(shift)
+            self._hunks[path] = (ordered, ends, shifts)
+
+    @classmethod
+    def from_diff(cls, lines: Iterable[str]) -> "LineMap":
+        """Index the hunks of a unified diff (`--unified=0` keeps them apart)."""
+        return cls(*_parse_diff(lines))
+
+    def path(self, file: str) -> str:
+        """Path of a file of the commit in the working tree."""
+        return self.renames.get(file, file)
+
+    def lines(self, file: str, first: int, last: int) -> tuple[int, int]:
+        """Lines of the working tree a range of lines of the commit is at now.
+
+        Args:
+            file: Path of the file in the working tree
+            first: First line of the range in the commit
+            last: Last line of the range in the commit
+        """
+        return self._line(file, first)[0], self._line(file, last)[1]
+
+    def _line(self, file: str, line: int) -> tuple[int, int]:
+        entry = self._hunks.get(file)
+        if entry is None:
+            return line, line
+        hunks, ends, shifts = entry
+        # Last hunk before the line
+        index = bisect_right(ends, line) - 1
+        if index + 1 < len(hunks):
+            old_start, old_count, new_start, new_count = hunks[index + 1]
+            if old_count and old_start <= line:
+                # Changed since the commit: the new side of the hunk
+                return new_start, new_start + max(new_count, 1) - 1
+        shift = shifts[index] if index >= 0 else 0
+        return line + shift, line + shift
+
+
+class DiffIndex:
+    """Changed line intervals per file of a diff."""
+
+    def __init__(
+        self,
+        hunks: Mapping[str, Iterable[tuple[int, int]]],
+        renames: Mapping[str, str] | None = None,
+        tolerance: int = DEFAULT_TOLERANCE,
+        moves: LineMap | None = None,
+    ) -> None:
+        """Index the hunks.
+
+        Args:
+            hunks: New-side (first, last) line ranges by file
+            renames: New path by old path, so comments on the old path are looked up too
+            tolerance: Lines before and after a hunk that still count as changed
+            moves: Where the commented lines are in the working tree, when the comments
+                belong to another commit
+        """
+        self.tolerance = tolerance
+        self.renames = dict(renames or {})
+        self.moves = moves
+        self._starts: dict[str, list[int]] = {}
+        self._ends: dict[str, list[int]] = {}
+        for path, ranges in hunks.items():
+            starts: list[int] = []
+            ends: list[int] = []
+            for first, last in sorted(ranges):
+                if starts and first <= ends[-1] + 1:
+                    ends[-1] = max(ends[-1], last)
+                else:
+                    starts.append(first)
+                    ends.append(last)
+            self._starts[path] = starts
+            self._ends[path] = ends
+
+    @classmethod
+    def from_diff(
+        cls, lines: Iterable[str], tolerance: int = DEFAULT_TOLERANCE, moves: LineMap | None = None
+    ) -> "DiffIndex":
+        """Index a unified diff (any context size, `--unified=0` being the cheapest).
+
+        Args:
+            lines: Lines of `git diff` output
+            tolerance: Lines before and after a hunk that still count as changed
+            moves: Where the commented lines are in the working tree
+
+        Returns:
+            The index of the new-side line ranges of every hunk
+        """
+        diff_hunks, renames = _parse_diff(lines)
+        hunks = {
+            # A pure deletion sits between line `start` and the next one
+            path: [(start, start + count - 1) if count else (max(start, 1), start + 1) for _, _, start, count in ranges]
+            for path, ranges in diff_hunks.items()
+        }
+        return cls(hunks, renames, tolerance, moves)
+
+    @classmethod
+    def for_checkout(
+        cls,
+        repo_full_name: str,
+        commit_sha: str | None,
+        path: str | Path | None = None,
+        base_ref: str | None = None,
+        tolerance: int = DEFAULT_TOLERANCE,
+    ) -> "DiffIndex | None":
+        """Index the changes of the local checkout of a pull request against its merge base.
+
+        Args:
+            repo_full_name: Repository of the pull request, as owner/name
+            commit_sha: Reviewed commit, which the checkout must contain
+            path: Any directory inside the checkout, defaults to the current directory
+            base_ref: Base branch to diff against, defaults to the remote's default branch
+            tolerance: Lines before and after a hunk that still count as changed
+
+        Returns:
+            The index, or None if the checkout is not the pull request's (other
+            repository, reviewed commit missing) or git fails
+        """
+        try:
+            state = read_git_state(path)
+            _, common_dir = find_git_dirs(path)
+        except (PRInfoError, OSError):
+            return None
+        if not commit_sha or (state.repo_full_name or "").lower() != repo_full_name.lower():
+            return None
+        base = base_ref or default_branch(common_dir)
+        if base is None:
+            return None
+        git = ["git", "-C", str(path or Path.cwd()), "-c", "core.quotePath=false"]
+        diff = [*git, "diff", "--no-color", "--no-ext-diff", "--unified=0", "--find-renames"]
+        try:
+            ancestor = subprocess.run(
+                [*git, "merge-base", "--is-ancestor", commit_sha, "HEAD"], capture_output=True, timeout=GIT_TIMEOUT
+            )
+            if ancestor.returncode:
+                return None
+            changes = subprocess.run(
+                [*diff, "--merge-base", base], capture_output=True, text=True, errors="replace", timeout=GIT_TIMEOUT
+            )
+            moves = subprocess.run(
+                [*diff, commit_sha], capture_output=True, text=True, errors="replace", timeout=GIT_TIMEOUT
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        if changes.returncode or moves.returncode:
+            return None
+        return cls.from_diff(changes.stdout.splitlines(), tolerance, LineMap.from_diff(moves.stdout.splitlines()))
+
+    @property
+    def files(self) -> set[str]:
+        """Files changed by the diff."""
+        return set(self._starts)
+
+    def is_current(self, file: str | None, line: Any = None) -> bool:
+        """Whether a comment on a file (and line) still refers to changed code.
+
+        Args:
+            file: Path of the commented file
+            line: Commented line or range (12, "12" or "12-14"); without a line only the file is checked.
+                With moves, both are those of the commit the comment was made on
+
+        Returns:
+            True if the file is changed and the line, if any, is within a hunk (give or
+            take the tolerance); comments without a file are always current
+        """
+        if not file:
+            return True
+        if self.moves is not None:
+            file = self.moves.path(file)
+        line_range = parse_line_range(line)
+        if line_range is not None and self.moves is not None:
+            line_range = self.moves.lines(file, *line_range)
+        file = self.renames.get(file, file)
+        starts = self._starts.get(file)
+        if starts is None:
+            return False
+        if line_range is None:
+            return True
+        first, last = line_range[0] - self.tolerance, line_range[1] + self.tolerance
+        index = bisect_right(starts, last) - 1
+        return index >= 0 and self._ends[file][index] >= first
+
+
+def default_branch(common_dir: Path) -> str | None:
+    """The remote's default branch as a remote-tracking ref (e.g. origin/main), None if unknown."""
+    for remote in ("upstream", "origin"):
+        head = common_dir / "refs" / "remotes" / remote / "HEAD"
+        if head.is_file():
+            ref = head.read_text(encoding="utf-8").strip().removeprefix("ref:").strip()
+            return ref.removeprefix("refs/remotes/")
+        for branch in DEFAULT_BRANCHES:
+            if resolve_ref(common_dir, f"refs/remotes/{remote}/{branch}"):
+                return f"{remote}/{branch}"
+    return None
+
+
+def stale_filter(
+    comments: Iterable[dict[str, Any]], index: DiffIndex | None, mode: str = DEFAULT_STALE_MODE
+) -> tuple[list[dict[str, Any]], int]:
+    """Drop or mark the comments that no longer refer to changed code.
+
+    Args:
+        comments: Comments with file and (optionally) line fields
+        index: Index of the local changes, None to keep every comment as it is
+        mode: "drop" to remove stale comments, "mark" to flag them with `"stale": true`,
+            "keep" to leave them alone
+
+    Returns:
+        Tuple of (comments, number of stale comments)
+    """
+    comments = list(comments)
+    if index is None or mode == "keep":
+        return comments, 0
+    kept = []
+    stale = 0
+    for comment in comments:
+        if index.is_current(comment.get("file"), comment.get("line")):
+            kept.append(comment)
+            continue
+        stale += 1
+        if mode == "mark":
+            kept.append({**comment, "stale": True})
+    return kept, stale
@@ -0,0 +1,697 @@
+"""Rate-limit-aware access to the GitHub REST API.
+
+All GitHub requests made by the server and the helper scripts go through a shared
+RateLimitScheduler: a token bucket whose refill rate follows the X-RateLimit-* headers,
+an adaptive concurrency limit, and a global pause honoring Retry-After. Failed requests
+are retried with jittered exponential backoff instead of failing the whole run.
+
+Large responses can be streamed: GitHubClient.stream() hands out the response body
+as a file object read from the socket, and iter_array() / iter_string_field() decode
+it incrementally (see json_stream) so huge review bodies are never held whole.
+
+Keep-alive connections are pooled per client and shared by all threads; a connection
+the server closed while idle is replaced transparently. Short-lived script processes
+can borrow the pool of a long-lived process through the helper daemon (github_daemon).
+The few things only the GraphQL API exposes (such as review thread resolution) are
+queried through GitHubClient.graphql(), over the same connections.
+
+The module is also a drop-in replacement for `gh api` in the scripts:
+
+    python3 -m mcp_server.utils.github_api /repos/owner/repo/pulls/1 --field head.sha
+"""
+
+import argparse
+import functools
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, BinaryIO
+from urllib.parse import urlsplit
+
+from mcp_server.utils.json_stream import JSONStreamReader
+from mcp_server.utils.utils import get_cache_dir
+
+DEFAULT_API_URL = "https://api.github.com"
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+# GitHub asks clients to wait at least a minute after a secondary rate limit without Retry-After
+SECONDARY_RATE_LIMIT_WAIT = 60.0
+# Below this fraction of X-RateLimit-Limit the remaining budget is spread until the reset
+LOW_BUDGET_FRACTION = 0.1
+GRAPHQL_PATH = "/graphql"
+# Seconds a token found in the environment or with `gh auth token` is used before being
+# looked up again, so long-lived clients follow `gh auth switch`
+TOKEN_TTL = 60.0
+
+
+class GitHubAPIError(Exception):
+    """Raised when a GitHub API request fails after all retries."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(f"GitHub API request failed ({status}): {message}" if status else message)
+        self.status = status
+        self.message = message
+
+
+class RateLimitScheduler:
+    """Token bucket with adaptive concurrency driven by GitHub rate limit headers.
+
+    Requests take a concurrency slot and a token before being sent. The bucket refills at
+    the configured rate; once the X-RateLimit budget runs low the rate is slowed down to
+    spread what is left evenly until the reset time. Throttled responses halve the
+    concurrency limit and pause all requests until Retry-After (or the reset time) has
+    passed, successful responses grow it back one slot per round trip.
+
+    When a state file is given, pauses and the last known budget are persisted so that
+    short-lived script processes share the same view of the rate limit.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: int = 10,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        state_file: Path | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Create a scheduler.
+
+        Args:
+            rate: Maximum number of requests per second
+            burst: Number of requests that can be sent back to back
+            max_concurrency: Upper bound for requests in flight
+            min_concurrency: Lower bound the concurrency limit shrinks to when throttled
+            state_file: Optional JSON file used to share throttling state between processes
+            clock: Wall clock returning epoch seconds (injectable for tests)
+        """
+        self._condition = threading.Condition()
+        self._clock = clock
+        self._rate = rate
+        self._fill_rate = rate
+        self._burst = float(burst)
+        self._tokens = float(burst)
+        self._refilled_at = clock()
+        self._paused_until = 0.0
+        self._min_concurrency = min_concurrency
+        self._max_concurrency = max_concurrency
+        self._concurrency = float(max_concurrency)
+        self._in_flight = 0
+        self._waiting = 0
+        self._requests = 0
+        self._retries = 0
+        self._throttled = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._remaining: int | None = None
+        self._limit: int | None = None
+        self._reset: float | None = None
+        self._state_file = state_file
+        self._load_state()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Block until a request may be sent and hold a concurrency slot while it runs."""
+        started = self._clock()
+        with self._condition:
+            self._waiting += 1
+            try:
+                while True:
+                    delay = self._next_delay(self._clock())
+                    if delay == 0:
+                        break
+                    self._condition.wait(timeout=delay)
+            finally:
+                self._waiting -= 1
+            self._tokens -= 1
+            self._in_flight += 1
+            self._requests += 1
+            waited = self._clock() - started
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def _next_delay(self, now: float) -> float | None:
+        """Seconds to wait before the next request may start, None to wait for a free slot.
+
+        Must be called with the condition held.
+        """
+        self._tokens = min(self._burst, self._tokens + (now - self._refilled_at) * self._fill_rate)
+        self._refilled_at = now
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._in_flight >= int(self._concurrency):
+            return None
+        if self._tokens < 1:
+            return (1 - self._tokens) / self._fill_rate
+        return 0
+
+    def observe(self, status: int, headers: Mapping[str, str]) -> float:
+        """Update the scheduler from a response.
+
+        Args:
+            status: HTTP status code of the response
+            headers: Response headers (looked up case-insensitively)
+
+        Returns:
+            Seconds the caller should wait before retrying, 0 if the response was not throttled
+        """
+        lowered = {key.lower(): value for key, value in headers.items()}
+        now = self._clock()
+        remaining = _parse_int(lowered.get("x-ratelimit-remaining"))
+        limit = _parse_int(lowered.get("x-ratelimit-limit"))
+        reset = _parse_int(lowered.get("x-ratelimit-reset"))
+        retry_after = _parse_retry_after(lowered.get("retry-after"), now)
+
+        with self._condition:
+            if remaining is not None and reset is not None:
+                self._remaining, self._limit, self._reset = remaining, limit, float(reset)
+                self._fill_rate = self._budget_rate(remaining, limit, reset - now)
+                if remaining == 0:
+                    self._paused_until = max(self._paused_until, float(reset))
+
+            throttled = status == 429 or (status == 403 and (retry_after is not None or remaining == 0))
+            if retry_after is not None and (throttled or status >= 500):
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+            if throttled:
+                self._throttle_locked()
+            elif status < 400:
+                # Additive increase: one extra slot once a full window of requests succeeded
+                self._concurrency = min(self._max_concurrency, self._concurrency + 1 / self._concurrency)
+
+            self._condition.notify_all()
+            delay = max(self._paused_until - now, 0.0)
+            if throttled or delay:
+                self._save_state()
+        return delay if throttled else 0.0
+
+    def _budget_rate(self, remaining: int, limit: int | None, window: float) -> float:
+        """Refill rate for the remaining budget.
+
+        Full speed while plenty of budget is left, otherwise the remaining requests are spread
+        over the seconds left until the reset.
+        """
+        if limit and remaining > limit * LOW_BUDGET_FRACTION:
+            return self._rate
+        window = max(window, 1.0)
+        return min(self._rate, max(remaining / window, 1 / window))
+
+    def throttle(self, seconds: float) -> None:
+        """Pause all requests for the given number of seconds and shrink the concurrency limit.
+
+        Args:
+            seconds: How long no request may be sent
+        """
+        with self._condition:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+            self._throttle_locked()
+            self._save_state()
+
+    def _throttle_locked(self) -> None:
+        self._throttled += 1
+        self._tokens = 0.0
+        self._concurrency = max(float(self._min_concurrency), self._concurrency / 2)
+
+    def record_retry(self) -> None:
+        """Count a retried request in the metrics."""
+        with self._condition:
+            self._retries += 1
+
+    def metrics(self) -> dict[str, Any]:
+        """Snapshot of the scheduler state.
+
+        Returns:
+            Queue depth, in-flight requests, current limits, wait-time statistics and the
+            last known GitHub rate limit budget
+        """
+        with self._condition:
+            now = self._clock()
+            return {
+                "queue_depth": self._waiting,
+                "in_flight": self._in_flight,
+                "concurrency_limit": int(self._concurrency),
+                "requests_per_second": round(self._fill_rate, 3),
+                "paused_for": round(max(self._paused_until - now, 0.0), 3),
+                "requests": self._requests,
+                "retries": self._retries,
+                "throttled": self._throttled,
+                "total_wait_seconds": round(self._total_wait, 3),
+                "max_wait_seconds": round(self._max_wait, 3),
+                "average_wait_seconds": round(self._total_wait / self._requests, 3) if self._requests else 0.0,
+                "rate_limit_remaining": self._remaining,
+                "rate_limit_limit": self._limit,
+                "rate_limit_reset": self._reset,
+            }
+
+    def _load_state(self) -> None:
+        if self._state_file is None or not self._state_file.exists():
+            return
+        try:
+            state = json.loads(self._state_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        now = self._clock()
+        self._paused_until = float(state.get("paused_until", 0.0))
+        reset = state.get("reset")
+        if reset is not None and reset > now:
+            self._remaining, self._limit, self._reset = state.get("remaining"), state.get("limit"), float(reset)
+            if self._remaining is not None:
+                self._fill_rate = self._budget_rate(self._remaining, self._limit, reset - now)
+        if self._paused_until > now:
+            self._concurrency = max(float(self._min_concurrency), float(state.get("concurrency", self._concurrency)))
+
+    def _save_state(self) -> None:
+        if self._state_file is None:
+            return
+        state = {
+            "paused_until": self._paused_until,
+            "remaining": self._remaining,
+            "limit": self._limit,
+            "reset": self._reset,
+            "concurrency": self._concurrency,
+        }
+        tmp_file = self._state_file.with_name(f"{self._state_file.name}.{os.getpid()}.tmp")
+        try:
+            tmp_file.write_text(json.dumps(state), encoding="utf-8")
+            os.replace(tmp_file, self._state_file)
+        except OSError:
+            tmp_file.unlink(missing_ok=True)
+
+
+class GitHubResponse:
+    """A completed GitHub API response.
+
+    For streamed responses `body` is empty and `raw` is the unread HTTP response.
+    """
+
+    def __init__(
+        self,
+        status: int,
+        headers: Mapping[str, str],
+        body: bytes,
+        raw: http.client.HTTPResponse | None = None,
+    ) -> None:
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.raw = raw
+
+    def json(self) -> Any:
+        """Decode the response body as JSON."""
+        return json.loads(self.body) if self.body else None
+
+
+class GitHubClient:
+    """Minimal GitHub REST client using pooled keep-alive connections and a RateLimitScheduler."""
+
+    def __init__(
+        self,
+        api_url: str | None = None,
+        token: str | None = None,
+        scheduler: RateLimitScheduler | None = None,
+        max_retries: int = 5,
+        timeout: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+        max_idle_connections: int = 8,
+        token_ttl: float = TOKEN_TTL,
+    ) -> None:
+        """Create a client.
+
+        Args:
+            api_url: Base API URL, defaults to $GITHUB_API_URL or https://api.github.com
+            token: Auth token, defaults to $GH_TOKEN, $GITHUB_TOKEN or `gh auth token`
+            scheduler: Scheduler shared by all requests of this client
+            max_retries: How many times a failed request is retried
+            timeout: Socket timeout in seconds
+            sleep: Sleep function used between retries (injectable for tests)
+            max_idle_connections: How many idle keep-alive connections are kept for reuse
+            token_ttl: Seconds a looked up token is used before being looked up again; a
+                token given as argument is kept
+        """
+        url = urlsplit(api_url or os.environ.get("GITHUB_API_URL") or DEFAULT_API_URL)
+        self._https = url.scheme != "http"
+        self._host = url.hostname or "api.github.com"
+        self._port = url.port
+        self._prefix = url.path.rstrip("/")
+        self._token = token
+        self._token_fixed = token is not None
+        self._token_ttl = token_ttl
+        self._token_expires: float | None = None
+        self.scheduler = scheduler or RateLimitScheduler()
+        self._max_retries = max_retries
+        self._timeout = timeout
+        self._sleep = sleep
+        self._max_idle = max_idle_connections
+        self._idle: list[http.client.HTTPConnection] = []
+        self._pool_lock = threading.Lock()
+        self._connections_opened = 0
+
+    def request(self, path: str, method: str = "GET", body: Any = None) -> GitHubResponse:
+        """Send a request, retrying throttled and transient failures.
+
+        Args:
+            path: API path such as /repos/owner/repo/pulls/1 (query string allowed)
+            method: HTTP method
+            body: JSON document sent as the request body, if not None
+
+        Returns:
+            The successful response
+
+        Raises:
+            GitHubAPIError: If the request still fails after all retries
+        """
+        return self._request(method, path, stream=False, body=body)[0]
+
+    def graphql(self, query: str, variables: Mapping[str, Any] | None = None) -> Any:
+        """Run a GraphQL query.
+
+        Args:
+            query: GraphQL query document
+            variables: Values of the query variables
+
+        Returns:
+            The `data` of the response
+
+        Raises:
+            GitHubAPIError: If the request fails or the response reports errors
+        """
+        document = self.request(GRAPHQL_PATH, "POST", {"query": query, "variables": dict(variables or {})}).json()
+        errors = document.get("errors") if isinstance(document, dict) else None
+        if errors or not isinstance(document, dict):
+            message = errors[0].get("message", "") if errors and isinstance(errors[0], dict) else ""
+            raise GitHubAPIError(200, f"GraphQL query failed: {message or 'unexpected response'}")
+        return document.get("data")
+
+    @contextmanager
+    def stream(self, path: str) -> Iterator[BinaryIO]:
+        """GET a path and hand out the response body unread, to be consumed incrementally.
+
+        Retries happen before any of the body is handed out; errors while reading the
+        body are not retried. The connection goes back to the pool once the body has been
+        consumed; a body left partly unread closes it.
+
+        Args:
+            path: API path such as /repos/owner/repo/pulls/1/reviews
+
+        Yields:
+            Binary file object reading the body from the socket
+        """
+        response, connection = self._request("GET", path, stream=True)
+        raw = response.raw
+        if raw is None or connection is None:
+            raise AssertionError("unreachable")  # pragma: no cover
+        try:
+            yield raw
+        finally:
+            if not raw.isclosed() or raw.will_close:
+                connection.close()
+            self._release(connection)
+
+    def iter_array(self, path: str, max_string_length: int | None = None) -> Iterator[Any]:
+        """GET a path returning a JSON array and yield its elements as they are read.
+
+        Args:
+            path: API path such as /repos/owner/repo/pulls/1/comments
+            max_string_length: Truncate strings inside the elements to this length
+
+        Yields:
+            Decoded array elements
+        """
+        with self.stream(path) as raw:
+            yield from JSONStreamReader(raw).iter_array(max_string_length)
+
+    def iter_string_field(self, path: str, field: str) -> Iterator[str]:
+        """GET a path returning a JSON object and yield one string field in pieces.
+
+        Args:
+            path: API path such as /repos/owner/repo/pulls/1/reviews/2
+            field: Top-level field holding a string, e.g. body
+
+        Yields:
+            Consecutive pieces of the field value (nothing if missing or null)
+        """
+        with self.stream(path) as raw:
+            yield from JSONStreamReader(raw).iter_field(field)
+
+    def metrics(self) -> dict[str, Any]:
+        """Scheduler metrics plus the number of connections opened and idle in the pool."""
+        with self._pool_lock:
+            pool = {"connections_opened": self._connections_opened, "idle_connections": len(self._idle)}
+        return {**self.scheduler.metrics(), **pool}
+
+    def _request(
+        self, method: str, path: str, stream: bool, body: Any = None
+    ) -> tuple[GitHubResponse, http.client.HTTPConnection | None]:
+        """Send a request with retries.
+
+        Returns:
+            The successful response and, for streamed responses, the connection the body
+            is read from, to be released by the caller
+        """
+        payload = None if body is None else json.dumps(body).encode("utf-8")
+        for attempt in range(self._max_retries + 1):
+            wait = 0.0
+            with self.scheduler.slot():
+                try:
+                    status, headers, content, raw, connection = self._send(method, path, stream, payload)
+                except (OSError, http.client.HTTPException) as exc:
+                    if attempt == self._max_retries:
+                        raise GitHubAPIError(0, f"GitHub API request failed: {exc}") from exc
+                    status = 0
+                    headers, content = {}, b""
+
+            if status:
+                wait = self.scheduler.observe(status, headers)
+                if status < 400:
+                    return GitHubResponse(status, headers, content, raw), connection
+                secondary = status == 403 and b"secondary rate limit" in content.lower()
+                if secondary and not wait:
+                    wait = SECONDARY_RATE_LIMIT_WAIT
+                    self.scheduler.throttle(wait)
+                if attempt == self._max_retries or not (wait or secondary or status in RETRYABLE_STATUSES):
+                    raise GitHubAPIError(status, _error_message(content))
+
+            self.scheduler.record_retry()
+            self._sleep(max(wait, backoff_delay(attempt)))
+
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def get_json(self, path: str) -> Any:
+        """GET a path and decode the JSON response.
+
+        Args:
+            path: API path such as /repos/owner/repo/pulls/1
+
+        Returns:
+            Decoded JSON document
+        """
+        return self.request(path).json()
+
+    def _send(
+        self, method: str, path: str, stream: bool = False, payload: bytes | None = None
+    ) -> tuple[int, dict[str, str], bytes, http.client.HTTPResponse | None, http.client.HTTPConnection | None]:
+        if not path.startswith("/"):
+            path = f"/{path}"
+        headers = self._headers()
+        if payload is not None:
+            headers["Content-Type"] = "application/json"
+        connection, reused = self._acquire()
+        try:
+            try:
+                connection.request(method, f"{self._prefix}{path}", body=payload, headers=headers)
+                response = connection.getresponse()
+            except ConnectionError:
+                if not reused:
+                    raise
+                # The server dropped the idle keep-alive connection: retry once on a fresh one
+                connection.close()
+                connection, _ = self._acquire(fresh=True)
+                connection.request(method, f"{self._prefix}{path}", body=payload, headers=headers)
+                response = connection.getresponse()
+            if stream and response.status < 400:
+                # The caller reads the body and releases the connection
+                return response.status, dict(response.getheaders()), b"", response, connection
+            body = response.read()
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        self._release(connection)
+        return response.status, dict(response.getheaders()), body, None, None
+
+    def _headers(self) -> dict[str, str]:
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "User-Agent": "ai-prompts-mcp",
+            "X-GitHub-Api-Version": "2022-11-28",
+        }
+        if not self._token_fixed and (self._token_expires is None or time.monotonic() >= self._token_expires):
+            self._token = resolve_token()
+            self._token_expires = time.monotonic() + self._token_ttl
+        if self._token:
+            headers["Authorization"] = f"Bearer {self._token}"
+        return headers
+
+    def _acquire(self, fresh: bool = False) -> tuple[http.client.HTTPConnection, bool]:
+        """Take the most recently used idle connection, or open a new one.
+
+        Returns:
+            The connection and whether it was reused from the pool
+        """
+        with self._pool_lock:
+            if self._idle and not fresh:
+                return self._idle.pop(), True
+            self._connections_opened += 1
+        connection_class = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        return connection_class(self._host, self._port, timeout=self._timeout), False
+
+    def _release(self, connection: http.client.HTTPConnection) -> None:
+        """Return a connection to the pool; closed connections and any beyond the limit are dropped."""
+        with self._pool_lock:
+            if connection.sock is not None and len(self._idle) < self._max_idle:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with jitter for the given retry attempt.
+
+    Args:
+        attempt: Zero-based retry attempt
+        base: Delay of the first attempt in seconds
+        cap: Maximum delay in seconds
+
+    Returns:
+        A random delay between half and the full exponential delay
+    """
+    delay = min(cap, base * 2**attempt)
+    return random.uniform(delay / 2, delay)
+
+
+def resolve_token() -> str | None:
+    """Find a GitHub token from the environment or the gh CLI.
+
+    Returns:
+        The token, or None when neither GH_TOKEN/GITHUB_TOKEN nor `gh auth token` provide one
+    """
+    token = os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN")
+    if token:
+        return token
+    try:
+        result = subprocess.run(["gh", "auth", "token"], capture_output=True, text=True, timeout=10, check=False)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+@functools.cache
+def get_scheduler() -> RateLimitScheduler:
+    """Get the process-wide scheduler, sharing throttling state with other processes."""
+    return RateLimitScheduler(state_file=get_cache_dir() / "github-rate-limit.json")
+
+
+@functools.cache
+def get_client() -> GitHubClient:
+    """Get the process-wide GitHub client backed by the shared scheduler."""
+    return GitHubClient(scheduler=get_scheduler())
+
+
+def extract_field(document: Any, field: str) -> Any:
+    """Resolve a dotted path like `head.sha` or `0.id` in a decoded JSON document.
+
+    Args:
+        document: Decoded JSON document
+        field: Dotted path, numeric parts index into lists
+
+    Returns:
+        The value at the path, or None if any part is missing (like jq)
+    """
+    value = document
+    for part in field.split("."):
+        if isinstance(value, dict):
+            value = value.get(part)
+        elif isinstance(value, list) and part.lstrip("-").isdigit() and -len(value) <= int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return None
+    return value
+
+
+def format_field(value: Any) -> str:
+    """Format a value the way `gh api --jq` prints it: strings raw, everything else as JSON."""
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+def _parse_int(value: str | None) -> int | None:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _parse_retry_after(value: str | None, now: float) -> float | None:
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - now, 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _error_message(body: bytes) -> str:
+    try:
+        return str(json.loads(body).get("message", ""))
+    except (ValueError, AttributeError):
+        return body.decode("utf-8", errors="replace")[:200]
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command line entry point used by the scripts instead of `gh api`."""
+    parser = argparse.ArgumentParser(prog="github-api", description="Rate-limit-aware GitHub API GET requests")
+    parser.add_argument("endpoint", help="API path, e.g. /repos/owner/repo/pulls/1")
+    parser.add_argument("--field", help="Print only this dotted field (strings unquoted), e.g. head.sha")
+    parser.add_argument("--metrics", action="store_true", help="Print scheduler and connection metrics to stderr")
+    args = parser.parse_args(argv)
+
+    # Imported here because the daemon module builds on this one
+    from mcp_server.utils.github_daemon import get_shared_client
+
+    client = get_shared_client()
+    try:
+        response = client.request(args.endpoint)
+    except GitHubAPIError as exc:
+        print(f"❌ Error: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        if args.metrics:
+            print(json.dumps(client.metrics()), file=sys.stderr)
+
+    if args.field:
+        print(format_field(extract_field(response.json(), args.field)))
+    else:
+        sys.stdout.write(response.body.decode("utf-8"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,564 @@
+"""Long-lived helper process keeping GitHub auth and connections warm for the scripts.
+
+Every review script used to pay for its own TCP/TLS handshakes and token lookup
+(`gh auth token`) on each run. The helper daemon holds one GitHubClient, with its
+pooled keep-alive connections, resolved token and rate limit state, and serves
+requests from short-lived processes over a unix socket:
+
+    python3 -m mcp_server.utils.github_daemon serve    # started on demand by the scripts
+    python3 -m mcp_server.utils.github_daemon status   # pool and scheduler metrics
+    python3 -m mcp_server.utils.github_daemon stop
+
+Scripts get their client from get_shared_client(), which connects to the daemon and
+starts it when it is not running. The daemon exits after
+$AI_PROMPTS_MCP_DAEMON_IDLE_TIMEOUT seconds without requests (default 900). The MCP
+server hosts the daemon in-process instead, so scripts run during a session share its
+connections. Set AI_PROMPTS_MCP_DAEMON=off to send requests directly.
+
+The socket lives in a private (0700) runtime directory and its name is derived from
+the API URL and token in the environment, so processes configured differently never
+share a daemon. A token from `gh auth token` is looked up again every minute (see
+GitHubClient), so a running daemon follows `gh auth switch`.
+
+Protocol: each request is one JSON line (a request body is passed along as its
+`body`). Replies start with a JSON line; a buffered response's body follows as
+`length` raw bytes, a streamed body as frames of a 4-byte big-endian length and that
+many bytes, ended by an empty frame.
+"""
+
+import argparse
+import atexit
+import fcntl
+import hashlib
+import io
+import json
+import os
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, TextIO
+
+from mcp_server.utils.github_api import DEFAULT_API_URL, GitHubAPIError, GitHubClient, GitHubResponse, get_client
+
+DEFAULT_IDLE_TIMEOUT = 900.0
+# How long a script waits for a daemon it started before sending requests itself
+STARTUP_TIMEOUT = 5.0
+FRAME_HEADER = struct.Struct(">I")
+FRAME_SIZE = 64 * 1024
+DISABLED_VALUES = frozenset({"0", "off", "false", "no"})
+PACKAGE_ROOT = Path(__file__).resolve().parents[2]
+
+
+class DaemonAlreadyRunningError(Exception):
+    """Raised when another daemon already serves the socket."""
+
+
+class DaemonConnectionError(GitHubAPIError):
+    """Raised when the connection to the daemon breaks in the middle of a request."""
+
+    def __init__(self, message: str) -> None:
+        super().__init__(0, message)
+
+
+def daemon_enabled() -> bool:
+    """Whether scripts route requests through the daemon ($AI_PROMPTS_MCP_DAEMON, default on)."""
+    return os.environ.get("AI_PROMPTS_MCP_DAEMON", "").strip().lower() not in DISABLED_VALUES
+
+
+def get_idle_timeout() -> float:
+    """Seconds an idle daemon keeps running: $AI_PROMPTS_MCP_DAEMON_IDLE_TIMEOUT, default 900."""
+    try:
+        return float(os.environ.get("AI_PROMPTS_MCP_DAEMON_IDLE_TIMEOUT", DEFAULT_IDLE_TIMEOUT))
+    except ValueError:
+        return DEFAULT_IDLE_TIMEOUT
+
+
+def get_socket_path() -> Path:
+    """Socket of the daemon serving the current environment.
+
+    $AI_PROMPTS_MCP_DAEMON_SOCKET overrides the location. Otherwise the socket is placed
+    in $XDG_RUNTIME_DIR (or the temp directory) and named after a hash of the API URL
+    and the token variables, so a daemon never serves a different account or server.
+    """
+    override = os.environ.get("AI_PROMPTS_MCP_DAEMON_SOCKET")
+    if override:
+        return Path(override)
+    config = "\0".join([
+        os.environ.get("GITHUB_API_URL") or DEFAULT_API_URL,
+        os.environ.get("GH_TOKEN") or "",
+        os.environ.get("GITHUB_TOKEN") or "",
+    ])
+    digest = hashlib.sha256(config.encode("utf-8")).hexdigest()[:16]
+    runtime_dir = Path(os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir())
+    return runtime_dir / f"ai-prompts-mcp-{os.getuid()}" / f"github-{digest}.sock"
+
+
+def _private_dir(directory: Path) -> None:
+    """Create the socket directory, refusing one that other users could tamper with."""
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    stat = directory.stat()
+    if stat.st_uid != os.getuid() or stat.st_mode & 0o077:
+        raise PermissionError(f"Daemon directory {directory} must be private to the current user")
+
+
+def _reply(wfile: io.BufferedIOBase | BinaryIO, message: dict[str, Any]) -> None:
+    wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Serves the requests of one script connection until it disconnects."""
+
+    server: "GitHubDaemon"
+
+    def handle(self) -> None:
+        self.server.enter()
+        try:
+            for line in self.rfile:
+                request = json.loads(line)
+                operation = request.get("op")
+                if operation == "request":
+                    self._request(request["path"], request.get("method", "GET"), request.get("body"))
+                elif operation == "stream":
+                    self._stream(request["path"])
+                elif operation == "metrics":
+                    _reply(self.wfile, {"metrics": self.server.client.metrics()})
+                elif operation == "stop":
+                    _reply(self.wfile, {"ok": True})
+                    self.server.stop()
+                    return
+                else:
+                    _reply(self.wfile, {"error": f"Unknown operation: {operation}", "status": 0})
+                self.server.touch()
+        except (OSError, ValueError, KeyError):
+            # The script went away or sent garbage: drop the connection
+            return
+        finally:
+            self.server.leave()
+
+    def _request(self, path: str, method: str, body: Any = None) -> None:
+        try:
+            response = self.server.client.request(path, method, body)
+        except GitHubAPIError as exc:
+            _reply(self.wfile, {"error": exc.message, "status": exc.status})
+            return
+        _reply(self.wfile, {"status": response.status, "headers": dict(response.headers), "length": len(response.body)})
+        self.wfile.write(response.body)
+
+    def _stream(self, path: str) -> None:
+        try:
+            with self.server.client.stream(path) as raw:
+                _reply(self.wfile, {"ok": True})
+                while chunk := raw.read(FRAME_SIZE):
+                    self.wfile.write(FRAME_HEADER.pack(len(chunk)) + chunk)
+                self.wfile.write(FRAME_HEADER.pack(0))
+        except GitHubAPIError as exc:
+            _reply(self.wfile, {"error": exc.message, "status": exc.status})
+
+
+class GitHubDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server sharing one GitHubClient between processes.
+
+    Each connection is served by its own thread; all of them draw from the client's
+    connection pool and share its scheduler. An exclusive lock next to the socket
+    guarantees a single daemon per socket.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: Path,
+        client: GitHubClient,
+        idle_timeout: float | None = DEFAULT_IDLE_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Bind the socket.
+
+        Args:
+            socket_path: Unix socket to listen on
+            client: Client the requests are sent with
+            idle_timeout: Seconds without requests after which wait_until_idle returns,
+                None to serve until stopped
+            clock: Monotonic clock (injectable for tests)
+
+        Raises:
+            DaemonAlreadyRunningError: If another daemon holds the socket
+            OSError: If the socket cannot be created
+        """
+        _private_dir(socket_path.parent)
+        self.socket_path = socket_path
+        self.client = client
+        self.idle_timeout = idle_timeout
+        self._clock = clock
+        self._lock_fd = os.open(socket_path.with_suffix(".lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(self._lock_fd)
+            raise DaemonAlreadyRunningError(f"A daemon is already serving {socket_path}") from None
+        # Holding the lock, any existing socket file is left over from a daemon that died
+        socket_path.unlink(missing_ok=True)
+        try:
+            super().__init__(str(socket_path), _Handler)
+        except OSError:
+            os.close(self._lock_fd)
+            raise
+        os.chmod(socket_path, 0o600)
+        self._state = threading.Lock()
+        self._active = 0
+        self._last_activity = clock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Serve connections in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="github-daemon", daemon=True)
+        self._thread.start()
+
+    def wait_until_idle(self, poll_interval: float = 0.5) -> None:
+        """Block until stopped or, with an idle timeout, until no script used the daemon for that long."""
+        while not self._stopped.wait(poll_interval):
+            with self._state:
+                idle_for = self._clock() - self._last_activity
+                if self.idle_timeout is not None and not self._active and idle_for >= self.idle_timeout:
+                    return
+
+    def stop(self) -> None:
+        """Make wait_until_idle return."""
+        self._stopped.set()
+
+    def close(self) -> None:
+        """Stop serving, remove the socket and release the lock."""
+        if self._thread is not None:
+            self.shutdown()
+            self._thread = None
+        self.server_close()
+        self.socket_path.unlink(missing_ok=True)
+        if self._lock_fd >= 0:
+            os.close(self._lock_fd)
+            self._lock_fd = -1
+
+    def enter(self) -> None:
+        """Track a new script connection."""
+        with self._state:
+            self._active += 1
+            self._last_activity = self._clock()
+
+    def leave(self) -> None:
+        """Track a closed script connection."""
+        with self._state:
+            self._active -= 1
+            self._last_activity = self._clock()
+
+    def touch(self) -> None:
+        """Record activity, postponing the idle shutdown."""
+        with self._state:
+            self._last_activity = self._clock()
+
+
+class _FrameReader(io.RawIOBase):
+    """Reads a framed streamed body from the daemon connection."""
+
+    def __init__(self, rfile: BinaryIO) -> None:
+        self._rfile = rfile
+        self._remaining = 0
+        self.done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        if self.done:
+            return 0
+        if not self._remaining:
+            self._remaining = FRAME_HEADER.unpack(self._read_exactly(FRAME_HEADER.size))[0]
+            if not self._remaining:
+                self.done = True
+                return 0
+        data = self._read_exactly(min(len(buffer), self._remaining))
+        buffer[: len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+    def _read_exactly(self, size: int) -> bytes:
+        data = self._rfile.read(size)
+        if len(data) < size:
+            raise DaemonConnectionError("GitHub helper daemon closed the connection mid-response")
+        return data
+
+
+class _DaemonConnection:
+    """One script-side connection to the daemon."""
+
+    def __init__(self, socket_path: Path, timeout: float) -> None:
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._socket.settimeout(timeout)
+            self._socket.connect(str(socket_path))
+        except OSError:
+            self._socket.close()
+            raise
+        # Replies may take as long as GitHub (and the retries) do
+        self._socket.settimeout(None)
+        self.rfile: BinaryIO = self._socket.makefile("rb")
+        self._wfile: BinaryIO = self._socket.makefile("wb")
+
+    def call(self, message: dict[str, Any]) -> dict[str, Any]:
+        """Send a request line and read the reply line.
+
+        Raises:
+            GitHubAPIError: If the daemon reports a failed request or disconnects
+        """
+        _reply(self._wfile, message)
+        self._wfile.flush()
+        line = self.rfile.readline()
+        if not line:
+            raise DaemonConnectionError("GitHub helper daemon closed the connection")
+        reply: dict[str, Any] = json.loads(line)
+        if "error" in reply:
+            raise GitHubAPIError(reply.get("status", 0), reply["error"])
+        return reply
+
+    def close(self) -> None:
+        for closeable in (self.rfile, self._wfile, self._socket):
+            try:
+                closeable.close()
+            except OSError:
+                pass
+
+
+class DaemonClient(GitHubClient):
+    """GitHubClient sending its requests through the helper daemon.
+
+    Each thread keeps one connection to the daemon. When the daemon cannot be reached
+    the request is sent directly instead, so a vanished daemon never fails a script.
+    """
+
+    def __init__(self, socket_path: Path, connect_timeout: float = 1.0, **kwargs: Any) -> None:
+        """Create a client.
+
+        Args:
+            socket_path: Socket of the daemon
+            connect_timeout: Seconds to wait for the daemon to accept a connection
+            **kwargs: Passed to GitHubClient for direct requests
+        """
+        super().__init__(**kwargs)
+        self.socket_path = socket_path
+        self._connect_timeout = connect_timeout
+        self._local = threading.local()
+
+    def connect(self) -> None:
+        """Open this thread's connection to the daemon if not open yet.
+
+        Raises:
+            OSError: If the daemon is not running
+        """
+        if getattr(self._local, "connection", None) is None:
+            self._local.connection = _DaemonConnection(self.socket_path, self._connect_timeout)
+
+    def request(self, path: str, method: str = "GET", body: Any = None) -> GitHubResponse:
+        """Send a request through the daemon (see GitHubClient.request)."""
+        try:
+            connection = self._daemon_connection()
+        except OSError:
+            return super().request(path, method, body)
+        message = {"op": "request", "method": method, "path": path}
+        if body is not None:
+            message["body"] = body
+        with self._disconnect_on_error():
+            reply = connection.call(message)
+            body = connection.rfile.read(reply["length"])
+            if len(body) < reply["length"]:
+                raise DaemonConnectionError("GitHub helper daemon closed the connection mid-response")
+        return GitHubResponse(reply["status"], reply["headers"], body)
+
+    @contextmanager
+    def stream(self, path: str) -> Iterator[BinaryIO]:
+        """Stream a response body through the daemon (see GitHubClient.stream)."""
+        try:
+            connection = self._daemon_connection()
+        except OSError:
+            with super().stream(path) as raw:
+                yield raw
+            return
+        with self._disconnect_on_error():
+            connection.call({"op": "stream", "path": path})
+        reader = _FrameReader(connection.rfile)
+        try:
+            yield io.BufferedReader(reader, FRAME_SIZE)
+        finally:
+            if not reader.done:
+                # The rest of the body is still on its way: the connection cannot be reused
+                self._disconnect()
+
+    def metrics(self) -> dict[str, Any]:
+        """Metrics of the daemon's client, or of this client when the daemon is unreachable."""
+        try:
+            connection = self._daemon_connection()
+        except OSError:
+            return super().metrics()
+        with self._disconnect_on_error():
+            metrics: dict[str, Any] = connection.call({"op": "metrics"})["metrics"]
+        return metrics
+
+    def stop_daemon(self) -> None:
+        """Ask the daemon to exit.
+
+        Raises:
+            OSError: If the daemon is not running
+        """
+        with self._disconnect_on_error():
+            self._daemon_connection().call({"op": "stop"})
+        self._disconnect()
+
+    def _daemon_connection(self) -> _DaemonConnection:
+        self.connect()
+        connection: _DaemonConnection = self._local.connection
+        return connection
+
+    @contextmanager
+    def _disconnect_on_error(self) -> Iterator[None]:
+        """Drop the connection when a call fails in a way that leaves it out of sync.
+
+        Failed API requests reported by the daemon keep the connection usable.
+        """
+        try:
+            yield
+        except DaemonConnectionError:
+            self._disconnect()
+            raise
+        except (OSError, ValueError, KeyError) as exc:
+            self._disconnect()
+            raise DaemonConnectionError(f"GitHub helper daemon request failed: {exc}") from exc
+
+    def _disconnect(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def start_daemon(socket_path: Path) -> None:
+    """Start a detached daemon serving socket_path, outliving the calling process."""
+    env = dict(os.environ, AI_PROMPTS_MCP_DAEMON_SOCKET=str(socket_path))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(PACKAGE_ROOT), env.get("PYTHONPATH")]))
+    subprocess.Popen(
+        [sys.executable, "-m", "mcp_server.utils.github_daemon", "serve"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=env,
+        cwd=str(PACKAGE_ROOT),
+        start_new_session=True,
+    )
+
+
+def connect(
+    socket_path: Path | None = None,
+    autostart: bool = True,
+    startup_timeout: float = STARTUP_TIMEOUT,
+) -> DaemonClient | None:
+    """Connect to the daemon, starting it if needed.
+
+    Args:
+        socket_path: Socket of the daemon, defaults to get_socket_path()
+        autostart: Start a daemon when none is running
+        startup_timeout: Seconds to wait for a started daemon to accept connections
+
+    Returns:
+        A connected client, or None if no daemon could be reached
+    """
+    socket_path = socket_path or get_socket_path()
+    client = DaemonClient(socket_path)
+    try:
+        client.connect()
+        return client
+    except OSError:
+        if not autostart:
+            return None
+    try:
+        _private_dir(socket_path.parent)
+        start_daemon(socket_path)
+    except OSError:
+        return None
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        try:
+            client.connect()
+            return client
+        except OSError:
+            time.sleep(0.02)
+    return None
+
+
+def get_shared_client() -> GitHubClient:
+    """Client for short-lived processes: the daemon's when enabled and reachable, else the direct one."""
+    if daemon_enabled():
+        client = connect()
+        if client is not None:
+            return client
+    return get_client()
+
+
+def serve_in_background(client: GitHubClient, socket_path: Path | None = None) -> GitHubDaemon | None:
+    """Host the daemon in the current process (used by the MCP server) until it exits.
+
+    Args:
+        client: Client of the hosting process, shared with the scripts
+        socket_path: Socket to serve, defaults to get_socket_path()
+
+    Returns:
+        The running daemon, or None if another one already serves the socket or it
+        cannot be created
+    """
+    try:
+        daemon = GitHubDaemon(socket_path or get_socket_path(), client, idle_timeout=None)
+    except (DaemonAlreadyRunningError, OSError):
+        return None
+    daemon.start()
+    atexit.register(daemon.close)
+    return daemon
+
+
+def main(argv: list[str] | None = None, out: TextIO | None = None) -> int:
+    """Command line entry point: serve, status or stop."""
+    parser = argparse.ArgumentParser(prog="github-daemon", description="Helper daemon for GitHub API requests")
+    parser.add_argument("command", choices=["serve", "status", "stop"])
+    args = parser.parse_args(argv)
+    out = out or sys.stdout
+    socket_path = get_socket_path()
+
+    if args.command == "serve":
+        try:
+            daemon = GitHubDaemon(socket_path, get_client(), idle_timeout=get_idle_timeout())
+        except DaemonAlreadyRunningError:
+            return 0
+        daemon.start()
+        try:
+            daemon.wait_until_idle()
+        finally:
+            daemon.close()
+        return 0
+
+    client = connect(socket_path, autostart=False)
+    if client is None:
+        print("GitHub helper daemon is not running", file=out)
+        return 1
+    if args.command == "status":
+        print(json.dumps({"socket": str(socket_path), **client.metrics()}), file=out)
+    else:
+        client.stop_daemon()
+        print("GitHub helper daemon stopped", file=out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+"""Collection of human reviewer comments for get-human-reviews.sh.
+
+Only feedback submitted after the latest commit of the pull request is collected:
+inline comments of human reviews, plus standalone pull request review comments.
+CodeRabbit reviews and very short comments are skipped.
+
+The report is built in one process. Replies are grouped into their thread (following
+`in_reply_to_id`) and each thread carries its resolved and outdated state, queried from
+the GraphQL API; resolved threads are left out unless asked for.
+Reviews and comments are synced incrementally (see review_sync): after the first run
+only new reviews and comments updated since the last run are fetched. The reviews, the
+head commit and every human review comment of the pull request are recorded in the
+local review store (see review_store). Comments on lines the local checkout no longer
+changes are dropped from the report by default (see diff_index).
+
+Usage from the scripts:
+
+    python3 -m mcp_server.utils.human_reviews [--format FORMAT] [--full-resync] [--include-resolved] \
+        [--stale MODE] [--base-ref REF] <owner> <repo> <pr_number>
+"""
+
+import argparse
+import sqlite3
+import sys
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+from mcp_server.utils.coderabbit import CODERABBIT_BOT, OUTPUT_FORMATS, dump_output
+from mcp_server.utils.diff_index import DEFAULT_STALE_MODE, STALE_MODES, DiffIndex, stale_filter
+from mcp_server.utils.github_api import GitHubAPIError, GitHubClient, extract_field
+from mcp_server.utils.github_daemon import get_shared_client
+from mcp_server.utils.json_stream import JSONStreamError
+from mcp_server.utils.review_store import ReviewStore
+from mcp_server.utils.review_sync import ReviewSync
+
+STORE_SOURCE = "human"
+THREADS_QUERY = """
+query($owner: String!, $repo: String!, $number: Int!, $cursor: String) {
+  repository(owner: $owner, name: $repo) {
+    pullRequest(number: $number) {
+      reviewThreads(first: 100, after: $cursor) {
+        pageInfo { hasNextPage endCursor }
+        nodes { isResolved isOutdated comments(first: 1) { nodes { databaseId } } }
+      }
+    }
+  }
+}
+"""
+
+
+def _alternative(*values: Any) -> Any:
+    """First value that is neither null nor false (jq `a // b // c`)."""
+    for value in values[:-1]:
+        if value is not None and value is not False:
+            return value
+    return values[-1]
+
+
+def is_human_feedback(item: dict[str, Any], since: str, timestamp_field: str) -> bool:
+    """Whether a review or comment is substantial human feedback given after `since`.
+
+    Args:
+        item: Review or review comment as returned by the GitHub API
+        since: ISO 8601 timestamp of the latest commit
+        timestamp_field: Field holding the item's timestamp (submitted_at or created_at)
+
+    Returns:
+        True for non-CodeRabbit items with a body longer than 10 characters given after `since`
+    """
+    timestamp = item.get(timestamp_field)
+    return (
+        (item.get("user") or {}).get("login") != CODERABBIT_BOT
+        and len(item.get("body") or "") > 10
+        and timestamp is not None
+        and timestamp > since
+    )
+
+
+def review_comment(comment: dict[str, Any], reviewer: str | None) -> dict[str, Any]:
+    """Convert a GitHub review comment into a report comment.
+
+    Args:
+        comment: Review comment as returned by the GitHub API
+        reviewer: Login of the comment's author
+
+    Returns:
+        Dict with the reviewer, file, line and body fields
+    """
+    return {
+        "reviewer": reviewer,
+        "file": comment.get("path"),
+        "line": _alternative(comment.get("line"), comment.get("original_line"), ""),
+        "body": comment.get("body"),
+    }
+
+
+def thread_roots(comments: Iterable[dict[str, Any]]) -> dict[Any, Any]:
+    """ID of the first comment of the thread of each comment, following `in_reply_to_id`."""
+    parents = {comment["id"]: comment.get("in_reply_to_id") for comment in comments if comment.get("id") is not None}
+    roots = {}
+    for comment_id in parents:
+        root, seen = comment_id, {comment_id}
+        while parents.get(root) is not None and parents[root] not in seen:
+            root = parents[root]
+            seen.add(root)
+        roots[comment_id] = root
+    return roots
+
+
+def fetch_thread_states(client: GitHubClient, owner: str, repo: str, pr_number: str) -> dict[Any, dict[str, bool]]:
+    """Resolved and outdated state of the review threads of a pull request (GraphQL only).
+
+    Args:
+        client: GitHub API client
+        owner: Repository owner
+        repo: Repository name
+        pr_number: Pull request number
+
+    Returns:
+        Dict of {"resolved", "outdated"} by ID of the first comment of each thread
+
+    Raises:
+        GitHubAPIError: If the query fails (e.g. without a token)
+    """
+    states: dict[Any, dict[str, bool]] = {}
+    variables: dict[str, Any] = {"owner": owner, "repo": repo, "number": int(pr_number), "cursor": None}
+    while True:
+        threads = extract_field(client.graphql(THREADS_QUERY, variables), "repository.pullRequest.reviewThreads")
+        for thread in extract_field(threads, "nodes") or []:
+            first_comment = extract_field(thread, "comments.nodes.0.databaseId")
+            if first_comment is not None:
+                states[first_comment] = {
+                    "resolved": bool(thread.get("isResolved")),
+                    "outdated": bool(thread.get("isOutdated")),
+                }
+        if not extract_field(threads, "pageInfo.hasNextPage"):
+            return states
+        variables["cursor"] = extract_field(threads, "pageInfo.endCursor")
+
+
+def human_reviews(reviews: Iterable[dict[str, Any]], since: str) -> list[dict[str, Any]]:
+    """Human reviews submitted after `since`, oldest first."""
+    return sorted(
+        (review for review in reviews if is_human_feedback(review, since, "submitted_at")),
+        key=lambda review: review["submitted_at"],
+    )
+
+
+def collect_comments(
+    reviews: Iterable[dict[str, Any]],
+    review_comments: Mapping[Any, list[dict[str, Any]]],
+    pr_comments: Iterable[dict[str, Any]],
+    since: str,
+    thread_states: Mapping[Any, dict[str, bool]] | None = None,
+) -> list[dict[str, Any]]:
+    """Collect human feedback given after the latest commit, one entry per thread.
+
+    Args:
+        reviews: Pull request reviews
+        review_comments: Inline comments of each review, by review ID
+        pr_comments: Pull request review comments (all of them, to find the thread of replies)
+        since: ISO 8601 timestamp of the latest commit
+        thread_states: Thread states by first comment ID (see fetch_thread_states);
+            without one, threads are not known to be resolved and comments are outdated
+            when they no longer have a line
+
+    Returns:
+        Comments of human reviews in submission order, followed by matching pull
+        request review comments. Later comments of a thread already listed are added
+        to its `replies`; every entry has `outdated` and `resolved` (None if unknown).
+    """
+    pr_comments = list(pr_comments)
+    collected = []
+    for review in human_reviews(reviews, since):
+        reviewer = (review.get("user") or {}).get("login")
+        collected += [(comment, reviewer) for comment in review_comments.get(review.get("id"), [])]
+    collected += [
+        (comment, (comment.get("user") or {}).get("login"))
+        for comment in pr_comments
+        if is_human_feedback(comment, since, "created_at")
+    ]
+
+    roots = thread_roots([*pr_comments, *(comment for comment, _ in collected)])
+    states = thread_states or {}
+    threads: dict[Any, dict[str, Any]] = {}
+    seen: set[Any] = set()
+    comments = []
+    for comment, reviewer in collected:
+        comment_id = comment.get("id")
+        if comment_id is not None:
+            if comment_id in seen:
+                continue
+            seen.add(comment_id)
+        root = roots.get(comment_id, comment_id)
+        thread = threads.get(root) if root is not None else None
+        if thread is not None:
+            thread.setdefault("replies", []).append({"reviewer": reviewer, "body": comment.get("body")})
+            continue
+        state = states.get(root)
+        entry = review_comment(comment, reviewer)
+        if state is None:
+            entry["outdated"] = comment.get("line") is None and comment.get("original_line") is not None
+            entry["resolved"] = None
+        else:
+            entry.update(outdated=state["outdated"], resolved=state["resolved"])
+        if root is not None:
+            threads[root] = entry
+        comments.append(entry)
+    return comments
+
+
+def without_resolved(comments: Iterable[dict[str, Any]]) -> tuple[list[dict[str, Any]], int]:
+    """Leave out the threads known to be resolved.
+
+    Returns:
+        Tuple of (comments, number of resolved threads left out)
+    """
+    comments = list(comments)
+    kept = [comment for comment in comments if not comment.get("resolved")]
+    return kept, len(comments) - len(kept)
+
+
+def stored_comment(comment: dict[str, Any], resolved: bool | None = None) -> dict[str, Any]:
+    """A pull request review comment (of a thread resolved or not, if known) as recorded in the review store."""
+    return {
+        "review_id": comment.get("pull_request_review_id"),
+        "comment_id": comment.get("id"),
+        "category": STORE_SOURCE,
+        "author": (comment.get("user") or {}).get("login"),
+        "file": comment.get("path"),
+        "line": _alternative(comment.get("line"), comment.get("original_line"), None),
+        "body": comment.get("body"),
+        "commit_sha": comment.get("commit_id"),
+        "created_at": comment.get("created_at"),
+        "resolved": resolved,
+    }
+
+
+def build_report(comments: list[dict[str, Any]], **removed: int) -> dict[str, Any]:
+    """Build the get-human-reviews.sh report from the collected comments.
+
+    Args:
+        comments: Collected comments
+        **removed: Number of comments left out by reason (e.g. resolved, stale), added to the summary if non-zero
+
+    Returns:
+        Dict with the summary and the comments
+    """
+    summary = {"total": len(comments)}
+    summary.update((reason, count) for reason, count in removed.items() if count)
+    return {"summary": summary, "comments": comments}
+
+
+def fetch_human_reviews(
+    client: GitHubClient,
+    owner: str,
+    repo: str,
+    pr_number: str,
+    sync: ReviewSync | None = None,
+    store: ReviewStore | None = None,
+    include_resolved: bool = False,
+    stale: str = "keep",
+    base_ref: str | None = None,
+) -> dict[str, Any]:
+    """Fetch human feedback given after the latest commit of a pull request.
+
+    Args:
+        client: GitHub API client
+        owner: Repository owner
+        repo: Repository name
+        pr_number: Pull request number
+        sync: Review history to bring up to date instead of fetching everything
+        store: Review store the reviews, the head commit and all human review comments
+            (not only the ones in the report) are recorded in
+        include_resolved: Keep threads that are resolved (they are left out by default,
+            when their state can be queried)
+        stale: "drop" or "mark" comments on code the local checkout no longer changes
+            (see diff_index), or "keep" them without looking at the checkout
+        base_ref: Base branch of the local diff, defaults to the remote's default branch
+
+    Returns:
+        The report (see build_report)
+
+    Raises:
+        ValueError: If the latest commit or its date cannot be determined
+        GitHubAPIError: If a request fails
+    """
+    pull = f"/repos/{owner}/{repo}/pulls/{pr_number}"
+    latest_commit_sha = extract_field(client.get_json(pull), "head.sha")
+    if not latest_commit_sha:
+        raise ValueError("Could not retrieve latest commit SHA")
+
+    sync = sync or ReviewSync(client, owner, repo, pr_number)
+    latest_commit_date = sync.commit_date(latest_commit_sha)
+    if not latest_commit_date:
+        raise ValueError("Could not retrieve latest commit date")
+
+    reviews = human_reviews(sync.reviews(), latest_commit_date)
+    review_comments = {review["id"]: sync.review_comments(review["id"]) for review in reviews}
+    try:
+        thread_states = fetch_thread_states(client, owner, repo, pr_number)
+    except GitHubAPIError:
+        # The REST API has no thread resolution: fall back to reporting every thread
+        thread_states = {}
+    comments = collect_comments(reviews, review_comments, sync.pr_comments(), latest_commit_date, thread_states)
+    resolved = 0
+    if not include_resolved:
+        comments, resolved = without_resolved(comments)
+    index = None
+    if stale != "keep":
+        index = DiffIndex.for_checkout(f"{owner}/{repo}", latest_commit_sha, base_ref=base_ref)
+    comments, stale_count = stale_filter(comments, index, stale)
+    report = build_report(comments, resolved=resolved, stale=stale_count)
+    if store is not None:
+        repository = f"{owner}/{repo}"
+        store.record_commit(repository, pr_number, latest_commit_sha, latest_commit_date)
+        store.record_reviews(repository, pr_number, sync.reviews())
+        roots = thread_roots(sync.pr_comments())
+        store.record_comments(
+            repository,
+            pr_number,
+            STORE_SOURCE,
+            (
+                stored_comment(comment, thread_states.get(roots.get(comment.get("id")), {}).get("resolved"))
+                for comment in sync.pr_comments()
+                if (comment.get("user") or {}).get("login") != CODERABBIT_BOT
+            ),
+        )
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command line entry point used by get-human-reviews.sh."""
+    parser = argparse.ArgumentParser(prog="human-reviews", description="Extract human reviewer comments")
+    parser.add_argument("owner")
+    parser.add_argument("repo")
+    parser.add_argument("pr_number")
+    parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="pretty",
+        help="Pretty-printed JSON, compact JSON or one JSON record per comment with the summary last",
+    )
+    parser.add_argument(
+        "--full-resync", action="store_true", help="Ignore the stored review history and fetch everything again"
+    )
+    parser.add_argument(
+        "--include-resolved", action="store_true", help="Keep comments of review threads that are resolved"
+    )
+    parser.add_argument(
+        "--stale",
+        choices=STALE_MODES,
+        default=DEFAULT_STALE_MODE,
+        help="Drop, mark or keep comments on code the local checkout no longer changes",
+    )
+    parser.add_argument("--base-ref", help="Base branch of the local diff (default: the remote's default branch)")
+    args = parser.parse_args(argv)
+
+    client = get_shared_client()
+    try:
+        sync = ReviewSync.persistent(client, args.owner, args.repo, args.pr_number, full_resync=args.full_resync)
+        with ReviewStore.default() as store:
+            report = fetch_human_reviews(
+                client,
+                args.owner,
+                args.repo,
+                args.pr_number,
+                sync=sync,
+                store=store,
+                include_resolved=args.include_resolved,
+                stale=args.stale,
+                base_ref=args.base_ref,
+            )
+        sync.save()
+    except ValueError as exc:
+        print(f"❌ Error: {exc}")
+        return 1
+    except (GitHubAPIError, JSONStreamError, sqlite3.Error) as exc:
+        print(f"❌ Error: {exc}", file=sys.stderr)
+        return 1
+    if args.format == "ndjson":
+        print(dump_output({"summary": report["summary"]}, args.format, report["comments"]))
+    else:
+        print(dump_output(report, args.format))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
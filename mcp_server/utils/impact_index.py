@@ -0,0 +1,448 @@
+"""Which tests a change can affect, from coverage contexts and the import graph.
+
+The smart-test-runner prompt leaves the choice of tests to the agent, which mostly
+means running the whole suite after every edit. The index maps the files of a checkout
+to the tests exercising them, two ways:
+
+- Coverage contexts: a coverage data file recorded per test (`pytest --cov
+  --cov-context=test`) says which tests ran each measured file.
+- The import graph: the imports of every Python file (parsed with ast, never run) say
+  which test files import a changed module, directly or through other modules. A
+  changed conftest.py affects the tests below it.
+
+The selection of a change is the union of both, so a test missing from an old coverage
+run is still found through its imports. Changed files neither way maps (data files,
+modules only loaded dynamically) are reported as unmapped, and changes to test
+configuration (pyproject.toml, pytest.ini, ...) call for the full suite.
+
+The index is kept up to date incrementally: files are re-parsed only when their size
+or modification time changed, and the coverage data is read again only when its file
+changed, so repeat selections on a checkout cost a `git ls-files` and a stat per file.
+"""
+
+import ast
+import os
+import sqlite3
+import subprocess
+import threading
+from collections import OrderedDict, defaultdict, deque
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Any
+
+from mcp_server.utils.changed_hunks import ChangedHunksError, ChangeSet
+
+GIT_TIMEOUT = 30
+DEFAULT_CACHE_SIZE = 8
+COVERAGE_FILE = ".coverage"
+# Directories holding top-level packages (src layout)
+SOURCE_ROOTS = ("src", "lib")
+# Changes to these can affect any test
+TEST_CONFIG_FILES = frozenset({
+    "pyproject.toml",
+    "setup.cfg",
+    "setup.py",
+    "pytest.ini",
+    "tox.ini",
+    "noxfile.py",
+    ".coveragerc",
+    "requirements.txt",
+    "uv.lock",
+})
+
+
+class ImpactIndexError(Exception):
+    """Raised when the files of a checkout cannot be listed."""
+
+
+def _git(path: str | Path, *args: str) -> str:
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(path), "-c", "core.quotePath=false", *args],
+            capture_output=True,
+            text=True,
+            errors="replace",
+            timeout=GIT_TIMEOUT,
+        )
+    except (OSError, subprocess.SubprocessError) as exc:
+        raise ImpactIndexError(f"git {args[0]} failed: {exc}") from exc
+    if result.returncode:
+        raise ImpactIndexError(result.stderr.strip() or f"git {args[0]} failed")
+    return result.stdout
+
+
+def is_test_file(path: str) -> bool:
+    """Whether a path is a pytest test module (test_*.py or *_test.py)."""
+    name = PurePosixPath(path).name
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+def module_names(path: str) -> list[str]:
+    """Dotted names a Python file can be imported as, from the root and from a source root."""
+    if not path.endswith(".py"):
+        return []
+    parts = list(PurePosixPath(path).with_suffix("").parts)
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    if not parts:
+        return []
+    names = [".".join(parts)]
+    if len(parts) > 1 and parts[0] in SOURCE_ROOTS:
+        names.append(".".join(parts[1:]))
+    return names
+
+
+def parse_imports(source: str, path: str) -> set[str]:
+    """Modules imported by a Python file, with their parent packages (which importing runs).
+
+    `from a import b` gives both a.b and a, since b can be a module or a name of a.
+    Relative imports are resolved against the package of path.
+    """
+    try:
+        tree = ast.parse(source, filename=path)
+    except (SyntaxError, ValueError):
+        return set()
+    package = list(PurePosixPath(path).parent.parts)
+    modules: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            targets = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                if node.level - 1 > len(package):
+                    continue
+                base = ".".join(package[: len(package) - node.level + 1] + ([node.module] if node.module else []))
+            else:
+                base = node.module or ""
+            targets = [base] + [f"{base}.{alias.name}" if base else alias.name for alias in node.names]
+        else:
+            continue
+        for target in filter(None, targets):
+            parts = target.split(".")
+            modules.update(".".join(parts[:end]) for end in range(1, len(parts) + 1))
+    return modules
+
+
+def read_coverage_contexts(coverage_file: str | Path, toplevel: str | Path) -> dict[str, set[str]]:
+    """Test node IDs by measured file (relative to toplevel), from a coverage data file.
+
+    Only contexts recorded by pytest-cov's `--cov-context=test` (`<node id>|<phase>`)
+    are used; files outside toplevel are skipped.
+
+    Raises:
+        sqlite3.Error: If the file is not a coverage database
+    """
+    root = os.path.realpath(toplevel)
+    tests: dict[str, set[str]] = defaultdict(set)
+    connection = sqlite3.connect(f"file:{coverage_file}?mode=ro", uri=True)
+    try:
+        rows = connection.execute(
+            "SELECT file.path, context.context FROM line_bits"
+            " JOIN file ON file.id = line_bits.file_id JOIN context ON context.id = line_bits.context_id"
+            " UNION SELECT file.path, context.context FROM arc"
+            " JOIN file ON file.id = arc.file_id JOIN context ON context.id = arc.context_id"
+        ).fetchall()
+    finally:
+        connection.close()
+    for measured, context in rows:
+        node_id = context.rpartition("|")[0] if "|" in context else ""
+        if "::" not in node_id:
+            continue
+        relative = os.path.relpath(os.path.realpath(os.path.join(root, measured)), root)
+        if not relative.startswith(os.pardir):
+            tests[Path(relative).as_posix()].add(node_id)
+    return dict(tests)
+
+
+@dataclass
+class _ParsedFile:
+    stamp: tuple[int, int]
+    imports: set[str]
+
+
+class ImpactIndex:
+    """Incrementally maintained map from the files of a checkout to the tests they affect."""
+
+    def __init__(self, toplevel: str | Path) -> None:
+        """Create an empty index of a checkout; refresh() fills it.
+
+        Args:
+            toplevel: Root of the checkout
+        """
+        self.toplevel = str(toplevel)
+        self._files: dict[str, _ParsedFile] = {}
+        self._importers: dict[str, set[str]] = {}
+        self._coverage: dict[str, set[str]] = {}
+        self._coverage_stamp: tuple[str, int, int] | None = None
+        # Number of files parsed so far
+        self.parsed = 0
+        # Refreshes and selections run on worker threads; affected_tests() holds it across both
+        self._lock = threading.RLock()
+
+    def refresh(self, coverage_file: str | Path | None = None) -> None:
+        """Re-parse the Python files that changed since the last refresh and reload changed coverage data.
+
+        Args:
+            coverage_file: Coverage data file, defaults to .coverage at the root of the checkout
+
+        Raises:
+            ImpactIndexError: If the files of the checkout cannot be listed
+        """
+        with self._lock:
+            self._refresh(coverage_file)
+
+    def _refresh(self, coverage_file: str | Path | None) -> None:
+        listing = _git(self.toplevel, "ls-files", "-z", "--cached", "--others", "--exclude-standard", "--", "*.py")
+        seen = set()
+        changed = False
+        for path in filter(None, listing.split("\0")):
+            try:
+                stat = os.stat(os.path.join(self.toplevel, path))
+            except OSError:
+                # Deleted in the working tree
+                continue
+            seen.add(path)
+            stamp = (stat.st_size, stat.st_mtime_ns)
+            if (entry := self._files.get(path)) is not None and entry.stamp == stamp:
+                continue
+            try:
+                source = Path(self.toplevel, path).read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                source = ""
+            self._files[path] = _ParsedFile(stamp, parse_imports(source, path))
+            self.parsed += 1
+            changed = True
+        for path in self._files.keys() - seen:
+            del self._files[path]
+            changed = True
+        if changed or not self._importers:
+            importers: dict[str, set[str]] = defaultdict(set)
+            for path, entry in self._files.items():
+                for module in entry.imports:
+                    importers[module].add(path)
+            self._importers = dict(importers)
+        self._refresh_coverage(Path(self.toplevel, coverage_file or COVERAGE_FILE))
+
+    def _refresh_coverage(self, coverage_file: Path) -> None:
+        try:
+            stat = coverage_file.stat()
+        except OSError:
+            self._coverage, self._coverage_stamp = {}, None
+            return
+        stamp = (str(coverage_file), stat.st_size, stat.st_mtime_ns)
+        if stamp != self._coverage_stamp:
+            try:
+                self._coverage = read_coverage_contexts(coverage_file, self.toplevel)
+            except sqlite3.Error:
+                self._coverage = {}
+            self._coverage_stamp = stamp
+
+    @property
+    def coverage_files(self) -> int:
+        """Number of files with tests recorded in the coverage data."""
+        return len(self._coverage)
+
+    def importing_tests(self, path: str) -> set[str]:
+        """Test files importing a file, directly or through other modules (and conftest.py files)."""
+        tests: set[str] = set()
+        seen = {path}
+        queue = deque([path])
+        while queue:
+            current = queue.popleft()
+            if is_test_file(current) and current != path:
+                tests.add(current)
+                continue
+            if PurePosixPath(current).name == "conftest.py":
+                tests |= self.tests_below(str(PurePosixPath(current).parent))
+            for name in module_names(current):
+                for importer in self._importers.get(name, ()):
+                    if importer not in seen:
+                        seen.add(importer)
+                        queue.append(importer)
+        return tests
+
+    def tests_below(self, directory: str) -> set[str]:
+        """Test files in a directory and its subdirectories ("." for all)."""
+        prefix = "" if directory in {"", "."} else f"{directory}/"
+        return {path for path in self._files if path.startswith(prefix) and is_test_file(path)}
+
+    def affected_tests(self, paths: Iterable[str]) -> dict[str, Any]:
+        """The tests affected by changes to paths (see module docstring).
+
+        Returns:
+            Dict with the pytest arguments selecting the affected tests (test files, and node
+            IDs of other files), the tests of each changed file, the unmapped changed files
+            and whether the full suite should run (with the reasons)
+        """
+        with self._lock:
+            return self._affected_tests(paths)
+
+    def _affected_tests(self, paths: Iterable[str]) -> dict[str, Any]:
+        by_file: dict[str, list[str]] = {}
+        unmapped: list[str] = []
+        full_suite: list[str] = []
+        selected: set[str] = set()
+        for path in sorted(set(paths)):
+            name = PurePosixPath(path).name
+            if name in TEST_CONFIG_FILES:
+                full_suite.append(f"{path} configures the tests")
+                continue
+            if is_test_file(path):
+                tests = {path} if path in self._files else set()
+            elif name == "conftest.py":
+                tests = self.tests_below(str(PurePosixPath(path).parent))
+            else:
+                tests = self._coverage.get(path, set()) | self.importing_tests(path)
+                # Node IDs of test files deleted since the coverage run
+                tests = {test for test in tests if test.partition("::")[0] in self._files}
+            if not tests:
+                if path in self._files or not path.endswith(".py"):
+                    unmapped.append(path)
+                continue
+            by_file[path] = sorted(tests)
+            selected |= tests
+        # A test file selected as a whole covers its node IDs
+        whole = {test for test in selected if "::" not in test}
+        return {
+            "full_suite": bool(full_suite),
+            "full_suite_reasons": full_suite,
+            "tests": sorted(test for test in selected if "::" not in test or test.partition("::")[0] not in whole),
+            "by_file": by_file,
+            "unmapped": unmapped,
+        }
+
+
+def affected_tests(
+    path: str | Path,
+    base_ref: str | None = None,
+    coverage_file: str | None = None,
+    cache: "ImpactIndexCache | None" = None,
+) -> dict[str, Any]:
+    """The tests affected by the changes of a checkout against its base branch.
+
+    Args:
+        path: Any directory inside the checkout
+        base_ref: Base branch, defaults to the remote's default branch (see changed_hunks)
+        coverage_file: Coverage data file recorded with `--cov-context=test`, relative to the
+            root of the checkout (default .coverage)
+        cache: Indexes of earlier selections, refreshed incrementally
+
+    Returns:
+        Dict with the base, the changed files, the number of files with coverage data and the
+        selection (see ImpactIndex.affected_tests)
+
+    Raises:
+        ChangedHunksError: If the changes cannot be listed
+        ImpactIndexError: If the files of the checkout cannot be listed
+    """
+    changes = ChangeSet.for_checkout(path, base_ref)
+    index = cache.setdefault(ImpactIndex(changes.toplevel)) if cache is not None else ImpactIndex(changes.toplevel)
+    # The coverage data is usually an untracked file of the checkout itself
+    changed = [changed.path for changed in changes.files if changed.path != (coverage_file or COVERAGE_FILE)]
+    # A moved module still affects the tests importing its old name
+    changed += [changed.old_path for changed in changes.files if changed.old_path]
+    # Another caller's refresh must not land between this one and the selection
+    with index._lock:
+        index.refresh(coverage_file)
+        return {
+            "base": changes.base,
+            "changed_files": len(changes.files),
+            "coverage_files": index.coverage_files,
+            **index.affected_tests(changed),
+        }
+
+
+def affected_tests_section(path: str | Path, cache: "ImpactIndexCache | None" = None) -> str:
+    """The affected tests of a checkout as a markdown section of the smart-test-runner prompt.
+
+    Returns:
+        The section, or a note saying why there is none (e.g. not a git repository)
+    """
+    try:
+        return render_affected_tests(affected_tests(path, cache=cache))
+    except (ChangedHunksError, ImpactIndexError) as exc:
+        return f"## Affected tests\n\nNot available: {exc}"
+
+
+def render_affected_tests(selection: dict[str, Any]) -> str:
+    """Render a selection as a markdown section of the smart-test-runner prompt."""
+    lines = ["## Affected tests", ""]
+    coverage = (
+        f"coverage contexts of {selection['coverage_files']} files and the import graph"
+        if selection["coverage_files"]
+        else "the import graph (no per-test coverage data: `pytest --cov --cov-context=test` records it)"
+    )
+    lines.append(
+        f"Selected by the server from {coverage}, for {selection['changed_files']} changed files"
+        f" against `{selection['base'][:12]}`."
+    )
+    lines.append("")
+    if selection["full_suite"]:
+        lines += ["Run the full suite:", ""]
+        lines += [f"- {reason}" for reason in selection["full_suite_reasons"]]
+        return "\n".join(lines)
+    if selection["tests"]:
+        lines += ["Run only these tests first (pass them to pytest as they are):", "", "```"]
+        lines += selection["tests"]
+        lines += ["```", ""]
+    else:
+        lines += ["No test is affected by the changes.", ""]
+    if selection["unmapped"]:
+        lines += ["Changed files no test maps to (run the full suite if they are loaded by the tests):", ""]
+        lines += [f"- {path}" for path in selection["unmapped"]]
+        lines.append("")
+    lines.append("Run the full suite once the selected tests pass, before finishing.")
+    return "\n".join(lines)
+
+
+class ImpactIndexCache:
+    """LRU cache of impact indexes by checkout root."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE) -> None:
+        """Create an empty cache.
+
+        Args:
+            max_entries: Number of indexes kept
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, ImpactIndex] = OrderedDict()
+        # Used from worker threads
+        self._lock = threading.Lock()
+
+    def get(self, toplevel: str) -> ImpactIndex | None:
+        """The index of a checkout, None if there is none."""
+        with self._lock:
+            index = self._entries.get(toplevel)
+            if index is not None:
+                self._entries.move_to_end(toplevel)
+            return index
+
+    def put(self, index: ImpactIndex) -> None:
+        """Store an index, evicting the least recently used ones beyond max_entries."""
+        with self._lock:
+            self._put(index)
+
+    def setdefault(self, index: ImpactIndex) -> ImpactIndex:
+        """The index stored for the checkout of index, storing index if there is none.
+
+        Concurrent callers on one checkout thereby share a single index.
+        """
+        with self._lock:
+            stored = self._entries.get(index.toplevel)
+            if stored is None:
+                self._put(index)
+                return index
+            self._entries.move_to_end(index.toplevel)
+            return stored
+
+    def clear(self) -> None:
+        """Forget every index."""
+        with self._lock:
+            self._entries.clear()
+
+    def _put(self, index: ImpactIndex) -> None:
+        self._entries[index.toplevel] = index
+        self._entries.move_to_end(index.toplevel)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
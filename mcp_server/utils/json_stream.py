@@ -0,0 +1,250 @@
+"""Incremental JSON reading from byte streams.
+
+GitHub responses for large pull requests can hold review bodies of many megabytes,
+sometimes several times over (the review list repeats every review body). Instead of
+loading a whole response, JSONStreamReader reads it in fixed-size chunks and lets the
+caller pick what it needs:
+
+    reader = JSONStreamReader(response)
+    for review in reader.iter_array(max_string_length=1024):  # elements one at a time
+        ...
+
+    body_lines = iter_lines(JSONStreamReader(response).iter_field("body"))
+
+Only the current chunk and the value being returned are held in memory.
+"""
+
+import codecs
+import json
+import re
+from collections.abc import Iterable, Iterator
+from typing import Any, BinaryIO
+
+CHUNK_SIZE = 64 * 1024
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Longest run of complete string content: plain characters and whole escape sequences
+STRING_SEGMENT = re.compile(r'[^"\\]*(?:(?:\\["\\/bfnrt]|\\u[0-9a-fA-F]{4})[^"\\]*)*')
+HIGH_SURROGATE_ESCAPE = re.compile(r"\\u[dD][89abAB][0-9a-fA-F]{2}\Z")
+NUMBER = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?")
+NUMBER_CONTINUATIONS = frozenset("0123456789.eE+-") | {""}
+LITERALS = {"true": True, "false": False, "null": None}
+# Longest escape sequence that may still be incomplete at the end of a chunk
+MAX_ESCAPE_LENGTH = 6
+
+
+class JSONStreamError(ValueError):
+    """Raised when a stream does not hold the expected JSON."""
+
+
+class JSONStreamReader:
+    """Pull parser reading one JSON document from a binary stream chunk by chunk."""
+
+    def __init__(self, stream: BinaryIO, chunk_size: int = CHUNK_SIZE) -> None:
+        """Create a reader.
+
+        Args:
+            stream: Binary file object holding UTF-8 encoded JSON (e.g. an HTTP response)
+            chunk_size: Number of bytes read at a time
+        """
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def iter_array(self, max_string_length: int | None = None) -> Iterator[Any]:
+        """Yield the elements of the array at the current position one at a time.
+
+        Args:
+            max_string_length: Truncate strings inside the elements to this length
+
+        Yields:
+            Decoded elements
+        """
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.read_value(max_string_length)
+            if self._next_separator("]"):
+                return
+
+    def iter_field(self, name: str) -> Iterator[str]:
+        """Yield the string value of a field of the object at the current position in chunks.
+
+        Other fields are skipped without being kept. Nothing is yielded if the field is
+        missing or null.
+
+        Args:
+            name: Field name
+
+        Yields:
+            Consecutive pieces of the decoded string
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.read_string()
+            self._expect(":")
+            if key == name:
+                if self._peek() == '"':
+                    yield from self.iter_string()
+                else:
+                    self.read_value(max_string_length=0)
+                return
+            self.read_value(max_string_length=0)
+            if self._next_separator("}"):
+                return
+
+    def iter_string(self) -> Iterator[str]:
+        """Yield the string at the current position in decoded pieces, one per chunk."""
+        self._expect('"')
+        while True:
+            end = _match_end(STRING_SEGMENT, self._buf, self._pos)
+            closed = end < len(self._buf) and self._buf[end] == '"'
+            if not closed:
+                # A high surrogate escape waits for its low surrogate from the next chunk
+                tail = HIGH_SURROGATE_ESCAPE.search(self._buf, self._pos, end)
+                if tail and _starts_escape(self._buf, tail.start(), self._pos):
+                    end = tail.start()
+            if end > self._pos:
+                yield json.loads(f'"{self._buf[self._pos : end]}"', strict=False)
+                self._pos = end
+            if closed:
+                self._pos += 1
+                return
+            if len(self._buf) - self._pos >= 2 * MAX_ESCAPE_LENGTH:
+                raise JSONStreamError(f"Invalid escape sequence: {self._buf[self._pos : self._pos + 6]!r}")
+            if not self._fill():
+                raise JSONStreamError("Unterminated string")
+
+    def read_string(self, max_length: int | None = None) -> str:
+        """Read the string at the current position, truncated to max_length if given."""
+        parts = []
+        length = 0
+        for part in self.iter_string():
+            if max_length is None or length < max_length:
+                parts.append(part)
+                length += len(part)
+        text = "".join(parts)
+        return text if max_length is None else text[:max_length]
+
+    def read_value(self, max_string_length: int | None = None) -> Any:
+        """Read the value at the current position.
+
+        Args:
+            max_string_length: Truncate strings (not object keys) to this length
+
+        Returns:
+            Decoded value
+        """
+        char = self._peek()
+        if char == '"':
+            return self.read_string(max_string_length)
+        if char == "[":
+            return list(self.iter_array(max_string_length))
+        if char == "{":
+            self._pos += 1
+            document: dict[str, Any] = {}
+            if self._peek() == "}":
+                self._pos += 1
+                return document
+            while True:
+                key = self.read_string()
+                self._expect(":")
+                document[key] = self.read_value(max_string_length)
+                if self._next_separator("}"):
+                    return document
+        return self._read_scalar()
+
+    def _read_scalar(self) -> Any:
+        while len(self._buf) - self._pos < 5 and self._fill():
+            pass
+        for literal, value in LITERALS.items():
+            if self._buf.startswith(literal, self._pos):
+                self._pos += len(literal)
+                return value
+        match = NUMBER.match(self._buf, self._pos)
+        # A number is only complete once a character that cannot continue it follows
+        while match and self._buf[match.end() : match.end() + 1] in NUMBER_CONTINUATIONS and self._fill():
+            match = NUMBER.match(self._buf, self._pos)
+        if not match or match.end() == self._pos:
+            raise JSONStreamError(f"Unexpected data: {self._buf[self._pos : self._pos + 20]!r}")
+        self._pos = match.end()
+        token = match.group()
+        return int(token) if token.lstrip("-").isdigit() else float(token)
+
+    def _next_separator(self, closing: str) -> bool:
+        """Consume a ',' or the closing bracket, returning True for the latter."""
+        char = self._peek()
+        self._pos += 1
+        if char == closing:
+            return True
+        if char != ",":
+            raise JSONStreamError(f"Expected ',' or {closing!r}, got {char or 'end of stream'!r}")
+        return False
+
+    def _expect(self, expected: str) -> None:
+        char = self._peek()
+        if char != expected:
+            raise JSONStreamError(f"Expected {expected!r}, got {char or 'end of stream'!r}")
+        self._pos += 1
+
+    def _peek(self) -> str:
+        """Next non-whitespace character, or '' at the end of the stream."""
+        while True:
+            self._pos = _match_end(WHITESPACE, self._buf, self._pos)
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the unread part of the buffer, False at end of stream."""
+        if self._eof:
+            return False
+        data = self._stream.read(self._chunk_size)
+        if not data:
+            self._eof = True
+        self._buf = self._buf[self._pos :] + self._decoder.decode(data, final=not data)
+        self._pos = 0
+        return bool(data)
+
+
+def _match_end(pattern: re.Pattern[str], text: str, pos: int) -> int:
+    """End of the (possibly empty) match of pattern at pos."""
+    match = pattern.match(text, pos)
+    return match.end() if match else pos
+
+
+def _starts_escape(text: str, index: int, start: int) -> bool:
+    """Whether the backslash at index starts an escape (is not itself escaped)."""
+    backslashes = 0
+    while index - backslashes - 1 >= start and text[index - backslashes - 1] == "\\":
+        backslashes += 1
+    return backslashes % 2 == 0
+
+
+def iter_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """Split a stream of text pieces into lines (without the newline).
+
+    Args:
+        chunks: Consecutive pieces of a text, split anywhere
+
+    Yields:
+        The lines of the text; the last line is yielded even when empty
+    """
+    pending: list[str] = []
+    for chunk in chunks:
+        first, *rest = chunk.split("\n")
+        pending.append(first)
+        if rest:
+            yield "".join(pending)
+            yield from rest[:-1]
+            pending = [rest[-1]]
+    yield "".join(pending)
@@ -0,0 +1,337 @@
+"""Resolution of the pull request for the current branch, without shelling out.
+
+The repository identity is read straight from the git directory: the branch and head
+commit from HEAD (and loose or packed refs), the owner/repo from the remote URL in the
+config. Only the branch -> pull request number lookup needs the GitHub API, and its
+result is cached with a short TTL, keyed on repository, branch and head commit, so
+repeated calls by the review scripts cost no network round trip.
+
+Drop-in replacement for the former `gh`-based get-pr-info.sh:
+
+    python3 -m mcp_server.utils.pr_info   # prints "owner/repo 123"
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, NamedTuple
+from urllib.parse import quote
+
+from mcp_server.utils.github_api import GitHubAPIError, GitHubClient
+from mcp_server.utils.github_daemon import get_shared_client
+from mcp_server.utils.utils import get_cache_dir
+
+DEFAULT_TTL = 300.0
+CACHE_FILE_NAME = "pr-info.json"
+
+SECTION = re.compile(r'^\s*\[\s*([^\s\]"]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]')
+ENTRY = re.compile(r"^\s*([A-Za-z][A-Za-z0-9-]*)\s*(?:=\s*(.*?))?\s*$")
+REMOTE_URL = re.compile(
+    r"^(?:[a-z+]+://(?:[^@/]+@)?[^/]+/|[^@/]+@[^:]+:)(?P<owner>[^/]+)/(?P<repo>[^/]+?)(?:\.git)?/?$"
+)
+SHA = re.compile(r"^[0-9a-f]{40}([0-9a-f]{24})?$")
+
+
+class PRInfoError(Exception):
+    """Raised when the pull request of the current branch cannot be determined."""
+
+
+class PRInfo(NamedTuple):
+    """Repository and pull request of the current branch."""
+
+    repo_full_name: str
+    pr_number: int
+
+
+class GitState(NamedTuple):
+    """What get_pr_info needs to know about the local repository."""
+
+    branch: str | None
+    head_sha: str | None
+    repo_full_name: str | None
+    head_owner: str | None
+    # Name of the branch on its remote (branch.<name>.merge), the local name without one
+    head_branch: str | None
+
+
+def find_git_dirs(path: str | Path | None = None) -> tuple[Path, Path]:
+    """Locate the git directory of the working tree containing path.
+
+    Args:
+        path: Any directory inside the working tree, defaults to the current directory
+
+    Returns:
+        Tuple of (git dir, common dir). They differ for linked worktrees, whose HEAD
+        lives in the worktree's own git dir while refs and config are shared.
+
+    Raises:
+        PRInfoError: If path is not inside a git working tree
+    """
+    current = Path(path or Path.cwd()).resolve()
+    for directory in (current, *current.parents):
+        dot_git = directory / ".git"
+        if dot_git.is_dir():
+            return dot_git, dot_git
+        if dot_git.is_file():
+            # Linked worktree or submodule: ".git" is a file pointing at the real git dir
+            content = dot_git.read_text(encoding="utf-8").strip()
+            git_dir = (directory / content.removeprefix("gitdir:").strip()).resolve()
+            common_file = git_dir / "commondir"
+            if common_file.is_file():
+                return git_dir, (git_dir / common_file.read_text(encoding="utf-8").strip()).resolve()
+            return git_dir, git_dir
+    raise PRInfoError("Not a git repository")
+
+
+def resolve_ref(common_dir: Path, ref: str) -> str | None:
+    """Resolve a ref such as refs/heads/main to a commit SHA using loose or packed refs."""
+    loose = common_dir / ref
+    if loose.is_file():
+        sha = loose.read_text(encoding="utf-8").strip()
+        return sha if SHA.match(sha) else None
+    packed = common_dir / "packed-refs"
+    if packed.is_file():
+        for line in packed.read_text(encoding="utf-8").splitlines():
+            sha, _, name = line.partition(" ")
+            if name == ref and SHA.match(sha):
+                return sha
+    return None
+
+
+def read_head(git_dir: Path, common_dir: Path) -> tuple[str | None, str | None]:
+    """Read the current branch and head commit.
+
+    Returns:
+        Tuple of (branch, head SHA). The branch is None for a detached HEAD and the
+        SHA is None for a branch without commits.
+    """
+    head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+    if head.startswith("ref:"):
+        ref = head.removeprefix("ref:").strip()
+        branch = ref.removeprefix("refs/heads/") if ref.startswith("refs/heads/") else None
+        # Per-worktree refs live in the worktree's git dir, shared ones in the common dir
+        return branch, resolve_ref(git_dir, ref) or resolve_ref(common_dir, ref)
+    return None, head if SHA.match(head) else None
+
+
+def read_git_config(common_dir: Path) -> dict[str, dict[str, str]]:
+    """Parse the repository git config.
+
+    Only what identifying the repository needs is supported: sections with optional
+    quoted subsections and single-valued keys (the last value wins). Includes are not
+    followed.
+
+    Returns:
+        Mapping of section name (e.g. 'remote.origin', lower-cased section part) to its
+        keys (lower-cased) and values
+    """
+    config: dict[str, dict[str, str]] = {}
+    config_file = common_dir / "config"
+    if not config_file.is_file():
+        return config
+    section: dict[str, str] = {}
+    for line in config_file.read_text(encoding="utf-8").splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith(("#", ";")):
+            continue
+        header = SECTION.match(stripped)
+        if header:
+            name, subsection = header.groups()
+            key = name.lower() if subsection is None else f"{name.lower()}.{subsection}"
+            section = config.setdefault(key, {})
+            stripped = stripped[header.end() :].strip()
+            if not stripped:
+                continue
+        entry = ENTRY.match(stripped)
+        if entry:
+            value = entry.group(2) or "true"
+            section[entry.group(1).lower()] = value.strip('"')
+    return config
+
+
+def parse_remote_url(url: str) -> str | None:
+    """Extract owner/repo from a GitHub remote URL (https, ssh or scp-like syntax).
+
+    Args:
+        url: Remote URL such as git@github.com:owner/repo.git
+
+    Returns:
+        The repository full name, or None if the URL does not name an owner and a repo
+    """
+    match = REMOTE_URL.match(url.strip())
+    return f"{match['owner']}/{match['repo']}" if match else None
+
+
+def read_git_state(path: str | Path | None = None) -> GitState:
+    """Read branch, head commit and GitHub repository of the working tree containing path.
+
+    The base repository (where pull requests live) is taken from the `upstream`
+    remote if there is one, otherwise from the branch's remote or `origin`. The head
+    owner (whose branch the pull request is from) is the owner of the branch's remote,
+    and the head branch the upstream branch it merges from.
+
+    Args:
+        path: Any directory inside the working tree, defaults to the current directory
+
+    Returns:
+        The local repository state
+    """
+    git_dir, common_dir = find_git_dirs(path)
+    branch, head_sha = read_head(git_dir, common_dir)
+    config = read_git_config(common_dir)
+
+    remotes = {name.removeprefix("remote."): section for name, section in config.items() if name.startswith("remote.")}
+    branch_config = config.get(f"branch.{branch}", {}) if branch else {}
+    branch_remote = branch_config.get("remote")
+    merge_ref = branch_config.get("merge", "")
+    head_branch = merge_ref.removeprefix("refs/heads/") if merge_ref.startswith("refs/heads/") else branch
+    head_remote: str | None
+    if branch_remote in remotes:
+        head_remote = branch_remote
+    else:
+        head_remote = "origin" if "origin" in remotes else next(iter(remotes), None)
+    base_remote = "upstream" if "upstream" in remotes else head_remote
+
+    head_repo = parse_remote_url(remotes[head_remote].get("url", "")) if head_remote else None
+    base_repo = parse_remote_url(remotes[base_remote].get("url", "")) if base_remote else None
+    head_owner = head_repo.split("/")[0] if head_repo else None
+    return GitState(branch, head_sha, base_repo, head_owner, head_branch)
+
+
+class PRCache:
+    """Branch -> pull request number cache persisted as JSON, entries expiring after a TTL."""
+
+    def __init__(self, path: Path, ttl: float = DEFAULT_TTL, clock: Callable[[], float] = time.time) -> None:
+        """Create a cache.
+
+        Args:
+            path: JSON file holding the entries
+            ttl: Seconds an entry stays valid
+            clock: Wall clock (injectable for tests)
+        """
+        self.path = path
+        self.ttl = ttl
+        self._clock = clock
+
+    @staticmethod
+    def key(repo_full_name: str, branch: str, head_sha: str | None) -> str:
+        """Cache key; a new commit on the branch invalidates the entry."""
+        return f"{repo_full_name}:{branch}@{head_sha or ''}"
+
+    def get(self, key: str) -> int | None:
+        """Cached pull request number, or None if missing or expired."""
+        entry = self._load().get(key)
+        if not isinstance(entry, dict) or entry.get("expires", 0) <= self._clock():
+            return None
+        return entry.get("pr_number")
+
+    def set(self, key: str, pr_number: int) -> None:
+        """Store a pull request number, dropping expired entries."""
+        now = self._clock()
+        entries = {
+            cached_key: entry
+            for cached_key, entry in self._load().items()
+            if isinstance(entry, dict) and entry.get("expires", 0) > now
+        }
+        entries[key] = {"pr_number": pr_number, "expires": now + self.ttl}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        temp_file.write_text(json.dumps(entries), encoding="utf-8")
+        os.replace(temp_file, self.path)
+
+    def _load(self) -> dict[str, Any]:
+        try:
+            entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+
+def get_pr_cache_ttl() -> float:
+    """TTL of cached pull request numbers: $AI_PROMPTS_MCP_PR_CACHE_TTL seconds, default 300."""
+    try:
+        return float(os.environ.get("AI_PROMPTS_MCP_PR_CACHE_TTL", DEFAULT_TTL))
+    except ValueError:
+        return DEFAULT_TTL
+
+
+def find_pr_number(client: GitHubClient, repo_full_name: str, head_owner: str, branch: str) -> int | None:
+    """Look up the pull request of a branch: the open one, else the most recent closed or merged one.
+
+    Args:
+        client: GitHub API client
+        repo_full_name: Base repository the pull request is opened against
+        head_owner: Owner of the repository holding the branch
+        branch: Branch name on that repository
+
+    Returns:
+        The pull request number, or None if the branch has no pull request
+    """
+    head = quote(f"{head_owner}:{branch}", safe="")
+    pulls = client.get_json(f"/repos/{repo_full_name}/pulls?head={head}&state=open&per_page=1")
+    if not pulls:
+        # A merged branch can still have review follow-ups
+        pulls = client.get_json(
+            f"/repos/{repo_full_name}/pulls?head={head}&state=all&sort=created&direction=desc&per_page=1"
+        )
+    return pulls[0]["number"] if pulls else None
+
+
+def get_pr_info(
+    path: str | Path | None = None,
+    client: GitHubClient | None = None,
+    cache: PRCache | None = None,
+) -> PRInfo:
+    """Determine the repository and pull request of the current branch.
+
+    Args:
+        path: Any directory inside the working tree, defaults to the current directory
+        client: GitHub API client, defaults to the one shared through the helper daemon
+        cache: Pull request number cache, defaults to one in the cache directory
+
+    Returns:
+        The repository full name and pull request number
+
+    Raises:
+        PRInfoError: If the branch, the repository or the pull request cannot be determined
+        GitHubAPIError: If the pull request lookup fails
+    """
+    state = read_git_state(path)
+    if not state.branch:
+        raise PRInfoError("Could not get current branch")
+    if not state.repo_full_name:
+        raise PRInfoError("Could not get repository information")
+
+    cache = cache or PRCache(get_cache_dir() / CACHE_FILE_NAME, ttl=get_pr_cache_ttl())
+    key = PRCache.key(state.repo_full_name, state.branch, state.head_sha)
+    pr_number = cache.get(key)
+    if pr_number is None:
+        pr_number = find_pr_number(
+            client or get_shared_client(),
+            state.repo_full_name,
+            state.head_owner or "",
+            state.head_branch or state.branch,
+        )
+        if pr_number is None:
+            raise PRInfoError(f"No PR found for branch '{state.branch}'")
+        cache.set(key, pr_number)
+    return PRInfo(state.repo_full_name, pr_number)
+
+
+def main() -> int:
+    """Print "owner/repo pr_number" for the current branch, like get-pr-info.sh."""
+    try:
+        info = get_pr_info()
+    except (PRInfoError, GitHubAPIError) as exc:
+        print(f"❌ Error: {exc}", file=sys.stderr)
+        return 1
+    print(f"{info.repo_full_name} {info.pr_number}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
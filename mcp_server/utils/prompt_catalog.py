@@ -0,0 +1,231 @@
+"""A sorted catalog of the prompts of the server, listed a page at a time.
+
+prompts/list used to build and send every prompt on each call. The catalog keeps the
+listed form of every prompt (built once per prompt version) with the names in sorted
+order, and the sorted names of each tag and category, so a page is a binary search for
+the cursor position and a slice:
+
+- Cursors hold the last name of the previous page and the filters, so the pages of a
+  filtered listing stay filtered and prompts added or removed between two pages neither
+  repeat nor shift the listing.
+- The catalog is updated one prompt at a time: sync compares the version of every prompt
+  with the catalogued one and only changed prompts are replaced, added (in sorted place)
+  or removed.
+"""
+
+import base64
+import binascii
+import bisect
+import itertools
+import json
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+REFRESH_INTERVAL = 1.0
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """A prompt of the catalog: its name, what it is filtered by and its listed form."""
+
+    name: str
+    tags: frozenset[str]
+    category: str | None
+    # Changes when the listed form changes
+    version: str
+    listed: Any
+
+
+def encode_cursor(after: str, tag: str | None, category: str | None) -> str:
+    """Opaque cursor of the page after the prompt named `after`, with the filters of the listing."""
+    return base64.urlsafe_b64encode(json.dumps([after, tag, category]).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str | None, str | None]:
+    """Decode a cursor made by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor was not made by encode_cursor
+    """
+    try:
+        after, tag, category = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError, TypeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+    if not isinstance(after, str) or not all(value is None or isinstance(value, str) for value in (tag, category)):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return after, tag, category
+
+
+def _insert(names: list[str], name: str) -> None:
+    position = bisect.bisect_left(names, name)
+    if position == len(names) or names[position] != name:
+        names.insert(position, name)
+
+
+def _delete(names: list[str], name: str) -> None:
+    position = bisect.bisect_left(names, name)
+    if position < len(names) and names[position] == name:
+        del names[position]
+
+
+def _discard(index: dict[str, list[str]], key: str, name: str) -> None:
+    names = index.get(key)
+    if names is not None:
+        _delete(names, name)
+        if not names:
+            del index[key]
+
+
+class PromptCatalog:
+    """Prompts in name order, by tag and by category (see module docstring)."""
+
+    def __init__(self, refresh_interval: float = REFRESH_INTERVAL) -> None:
+        """Create an empty catalog.
+
+        Args:
+            refresh_interval: Seconds between two syncs of refresh
+        """
+        self.refresh_interval = refresh_interval
+        self._entries: dict[str, CatalogEntry] = {}
+        self._names: list[str] = []
+        self._by_tag: dict[str, list[str]] = {}
+        self._by_category: dict[str, list[str]] = {}
+        self._synced: float | None = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of prompts in the catalog."""
+        return len(self._entries)
+
+    def get(self, name: str) -> CatalogEntry | None:
+        """The entry of a prompt; None if it is not in the catalog."""
+        return self._entries.get(name)
+
+    def update(self, entry: CatalogEntry) -> bool:
+        """Add a prompt or replace its previous version.
+
+        Returns:
+            Whether the catalog changed, i.e. the prompt was new or its version changed
+        """
+        with self._lock:
+            current = self._entries.get(entry.name)
+            if current is not None and current.version == entry.version:
+                return False
+            self._remove(entry.name)
+            self._entries[entry.name] = entry
+            _insert(self._names, entry.name)
+            for tag in entry.tags:
+                _insert(self._by_tag.setdefault(tag, []), entry.name)
+            if entry.category:
+                _insert(self._by_category.setdefault(entry.category, []), entry.name)
+            return True
+
+    def remove(self, name: str) -> None:
+        """Drop a prompt from the catalog, if it is there."""
+        with self._lock:
+            self._remove(name)
+
+    def _remove(self, name: str) -> None:
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return
+        _delete(self._names, name)
+        for tag in entry.tags:
+            _discard(self._by_tag, tag, name)
+        if entry.category:
+            _discard(self._by_category, entry.category, name)
+
+    def sync(self, entries: Iterable[CatalogEntry]) -> int:
+        """Make the catalog match a full set of prompts, updating only those that changed.
+
+        Returns:
+            Number of prompts added, replaced or dropped
+        """
+        changes = 0
+        seen = set()
+        for entry in entries:
+            seen.add(entry.name)
+            changes += self.update(entry)
+        with self._lock:
+            gone = set(self._entries) - seen
+            for name in gone:
+                self._remove(name)
+        self._synced = time.monotonic()
+        return changes + len(gone)
+
+    def refresh(self, entries: Callable[[], Iterable[CatalogEntry]]) -> None:
+        """Sync with the prompts entries returns, unless synced less than refresh_interval ago."""
+        if self._synced is None or time.monotonic() - self._synced >= self.refresh_interval:
+            self.sync(entries())
+
+    def tags(self) -> dict[str, int]:
+        """Number of prompts of each tag."""
+        with self._lock:
+            return {tag: len(names) for tag, names in sorted(self._by_tag.items())}
+
+    def categories(self) -> dict[str, int]:
+        """Number of prompts of each category."""
+        with self._lock:
+            return {category: len(names) for category, names in sorted(self._by_category.items())}
+
+    def page(
+        self,
+        cursor: str | None = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        tag: str | None = None,
+        category: str | None = None,
+    ) -> tuple[list[Any], str | None]:
+        """A page of the catalog in name order, filtered by tag and category.
+
+        Args:
+            cursor: Cursor of the previous page; omit for the first page. It carries the
+                filters of the listing, which the tag and category arguments cannot change
+            page_size: Prompts per page
+            tag: Only the prompts with this tag
+            category: Only the prompts of this category
+
+        Returns:
+            The listed form of the prompts of the page, and the cursor of the next page
+            (None on the last page)
+
+        Raises:
+            ValueError: If the cursor is invalid or page_size is out of range
+        """
+        if not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+        after = None
+        if cursor is not None:
+            after, cursor_tag, cursor_category = decode_cursor(cursor)
+            if (tag or cursor_tag) != cursor_tag or (category or cursor_category) != cursor_category:
+                raise ValueError("The cursor belongs to a listing with other filters")
+            tag, category = cursor_tag, cursor_category
+        with self._lock:
+            match: Callable[[str], bool] | None = None
+            if tag is not None and category is not None:
+                by_tag, by_category = self._by_tag.get(tag, []), self._by_category.get(category, [])
+                # Walk the shorter list, checking the other filter
+                if len(by_tag) <= len(by_category):
+                    names, match = by_tag, lambda name: self._entries[name].category == category
+                else:
+                    names, match = by_category, lambda name: tag in self._entries[name].tags
+            elif tag is not None:
+                names = self._by_tag.get(tag, [])
+            elif category is not None:
+                names = self._by_category.get(category, [])
+            else:
+                names = self._names
+            start = bisect.bisect_right(names, after) if after is not None else 0
+            if match is None:
+                selected = names[start : start + page_size + 1]
+            else:
+                candidates = (names[position] for position in range(start, len(names)))
+                selected = list(itertools.islice(filter(match, candidates), page_size + 1))
+            more = len(selected) > page_size
+            del selected[page_size:]
+            listed = [self._entries[name].listed for name in selected]
+        return listed, encode_cursor(selected[-1], tag, category) if more else None
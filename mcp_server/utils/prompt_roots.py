@@ -0,0 +1,164 @@
+"""Prompt files resolved across layered prompt roots.
+
+Prompts can come from several directories: per-user overrides, team overrides and
+org-wide packs, configured in the AI_PROMPTS_MCP_PROMPT_PATH environment variable
+(separated like PATH, highest precedence first), then the prompts bundled with the
+server. A prompt named `commit` is the `commit.md` of the first root that has one.
+
+The roots are merged into a single name -> file index, so resolving a prompt is a dict
+lookup whatever the number of roots and prompts. The index is checked against the roots
+at most every refresh_interval seconds, and on the first lookup miss of a name in that
+interval, so looking up a missing prompt over and over does not stat every root each
+time. Only roots whose directory changed (a file added, removed or renamed) are listed
+again, and only the names they gained or lost are resolved again. Changes to the
+content of a file do not affect the index; the template cache sees them (see
+prompt_templates).
+
+The fragments included by prompts live in the fragments/ folder of the roots and are
+indexed the same way, so a root can override a single fragment of the bundled prompts.
+"""
+
+import os
+import threading
+import time
+from collections.abc import Sequence
+from pathlib import Path
+
+PROMPT_PATH_ENV = "AI_PROMPTS_MCP_PROMPT_PATH"
+REFRESH_INTERVAL = 1.0
+PROMPT_SUFFIX = ".md"
+FRAGMENTS_DIR = "fragments"
+# Stamp of a root never listed, unlike None for a root that does not exist
+_UNLISTED = -1
+
+
+def configured_roots(base_dir: Path, prompt_path: str | None = None) -> list[Path]:
+    """The prompt roots by precedence: those of the prompt path, then base_dir/prompts.
+
+    Args:
+        base_dir: Directory of the bundled prompts folder
+        prompt_path: Directories separated by os.pathsep, the AI_PROMPTS_MCP_PROMPT_PATH
+            environment variable when omitted
+    """
+    if prompt_path is None:
+        prompt_path = os.environ.get(PROMPT_PATH_ENV, "")
+    roots = [Path(entry).expanduser() for entry in prompt_path.split(os.pathsep) if entry.strip()]
+    return [*roots, base_dir / "prompts"]
+
+
+def _stamp(root: Path) -> int | None:
+    try:
+        return root.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _listing(root: Path) -> dict[str, Path]:
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return {}
+    return {
+        entry.name[: -len(PROMPT_SUFFIX)]: Path(entry.path)
+        for entry in entries
+        if entry.name.endswith(PROMPT_SUFFIX) and not entry.name.startswith(".") and entry.is_file()
+    }
+
+
+class PromptIndex:
+    """The prompt files of layered roots by name (see module docstring)."""
+
+    def __init__(self, roots: Sequence[Path], refresh_interval: float = REFRESH_INTERVAL) -> None:
+        """Index the prompt files of the roots.
+
+        Args:
+            roots: Prompt directories, highest precedence first; missing ones are indexed
+                once they exist
+            refresh_interval: Seconds between two checks of the roots for changes
+        """
+        self.roots = tuple(roots)
+        self.refresh_interval = refresh_interval
+        self._stamps: list[int | None] = [_UNLISTED] * len(self.roots)
+        self._listings: list[dict[str, Path]] = [{} for _ in self.roots]
+        # Name -> (position of the root, file)
+        self._index: dict[str, tuple[int, Path]] = {}
+        self._checked = 0.0
+        # Name -> time of the refresh its last miss forced
+        self._misses: dict[str, float] = {}
+        self._lock = threading.Lock()
+        # Number of root listings so far
+        self.listings = 0
+        self.refresh()
+
+    def refresh(self) -> set[str]:
+        """List the roots that changed again and resolve the names they gained or lost.
+
+        Returns:
+            The names whose file changed
+        """
+        with self._lock:
+            self._checked = time.monotonic()
+            self._misses = {
+                name: missed for name, missed in self._misses.items() if self._checked - missed < self.refresh_interval
+            }
+            changed: set[str] = set()
+            for position, root in enumerate(self.roots):
+                stamp = _stamp(root)
+                if stamp == self._stamps[position]:
+                    continue
+                listing = _listing(root) if stamp is not None else {}
+                previous = self._listings[position]
+                changed.update(
+                    name for name in listing.keys() | previous.keys() if listing.get(name) != previous.get(name)
+                )
+                self._stamps[position] = stamp
+                self._listings[position] = listing
+                self.listings += 1
+            changed = {name for name in changed if self._resolve(name)}
+        return changed
+
+    def _resolve(self, name: str) -> bool:
+        """Point name at the file of its first root; whether that changed the index."""
+        previous = self._index.get(name)
+        entry = next(
+            ((position, listing[name]) for position, listing in enumerate(self._listings) if name in listing), None
+        )
+        if entry is None:
+            self._index.pop(name, None)
+        else:
+            self._index[name] = entry
+        return entry != previous
+
+    def _refresh_if_due(self) -> None:
+        if time.monotonic() - self._checked >= self.refresh_interval:
+            self.refresh()
+
+    def resolve(self, name: str) -> Path | None:
+        """The file of a prompt, from the root with the highest precedence; None if no root has it."""
+        self._refresh_if_due()
+        entry = self._index.get(name)
+        if entry is None and self._first_miss(name) and self.refresh():
+            # Just added to a root
+            entry = self._index.get(name)
+        return entry[1] if entry is not None else None
+
+    def _first_miss(self, name: str) -> bool:
+        """Whether a miss of name is its first in refresh_interval, remembering it if so."""
+        now = time.monotonic()
+        with self._lock:
+            missed = self._misses.get(name)
+            if missed is not None and now - missed < self.refresh_interval:
+                return False
+            self._misses[name] = now
+            return True
+
+    def root_of(self, name: str) -> Path | None:
+        """The root a prompt is resolved from; None if no root has it."""
+        self._refresh_if_due()
+        entry = self._index.get(name)
+        return self.roots[entry[0]] if entry is not None else None
+
+    def names(self) -> list[str]:
+        """The names of every prompt of the roots, sorted."""
+        self._refresh_if_due()
+        return sorted(self._index)
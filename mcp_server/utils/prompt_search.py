@@ -0,0 +1,195 @@
+"""Full-text search over the prompts of the server, ranked with BM25.
+
+Each prompt is a document made of its name, its description and its body (fragments
+included). Words are lowercased runs of letters and digits; the words of the name and
+the description count several times, so a query matching them ranks above one found
+only in the body. The index is inverted: word -> {prompt: weighted frequency}, so a
+query only visits the prompts containing one of its words.
+
+The index is updated one prompt at a time: sync compares the version of every prompt
+(the digest of its compiled source) with the indexed one and re-indexes only those that
+changed, dropping the prompts that are gone. The server syncs at most once every
+refresh_interval seconds, on a search.
+"""
+
+import heapq
+import math
+import re
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+REFRESH_INTERVAL = 1.0
+# BM25 term frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+# Times the words of each field count
+FIELD_WEIGHTS = {"name": 3, "description": 2, "body": 1}
+WORD = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from if in into is it of on or that the this to was will with".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """The words of a text, lowercased, without stop words and single characters."""
+    return [word for word in WORD.findall(text.lower()) if len(word) > 1 and word not in STOP_WORDS]
+
+
+@dataclass(frozen=True)
+class PromptDocument:
+    """What is searched of a prompt, and the version it was taken from."""
+
+    name: str
+    description: str
+    body: str
+    version: str
+
+
+@dataclass
+class _Indexed:
+    # First line of the description
+    summary: str
+    version: str
+    length: int
+    terms: tuple[str, ...]
+
+
+class PromptSearchIndex:
+    """Inverted BM25 index of prompts (see module docstring)."""
+
+    def __init__(self, refresh_interval: float = REFRESH_INTERVAL) -> None:
+        """Create an empty index.
+
+        Args:
+            refresh_interval: Seconds between two syncs of refresh
+        """
+        self.refresh_interval = refresh_interval
+        self._postings: dict[str, dict[str, int]] = {}
+        self._documents: dict[str, _Indexed] = {}
+        self._total_length = 0
+        # BM25 length normalization of every prompt, computed again after a change
+        self._norms: dict[str, float] | None = None
+        self._synced: float | None = None
+        self._lock = threading.Lock()
+        # Number of prompts indexed so far
+        self.indexed = 0
+
+    def __len__(self) -> int:
+        """Number of prompts indexed."""
+        return len(self._documents)
+
+    def update(self, document: PromptDocument) -> bool:
+        """Index a prompt, replacing its previous version.
+
+        Returns:
+            Whether the prompt was indexed, i.e. it was new or its version changed
+        """
+        with self._lock:
+            current = self._documents.get(document.name)
+            if current is not None and current.version == document.version:
+                return False
+            self._remove(document.name)
+            frequencies: Counter[str] = Counter()
+            for field, text in (
+                ("name", document.name),
+                ("description", document.description),
+                ("body", document.body),
+            ):
+                for word in tokenize(text):
+                    frequencies[word] += FIELD_WEIGHTS[field]
+            for word, frequency in frequencies.items():
+                self._postings.setdefault(word, {})[document.name] = frequency
+            length = sum(frequencies.values())
+            summary = document.description.strip().split("\n", 1)[0].strip()
+            self._documents[document.name] = _Indexed(summary, document.version, length, tuple(frequencies))
+            self._total_length += length
+            self._norms = None
+            self.indexed += 1
+            return True
+
+    def remove(self, name: str) -> None:
+        """Drop a prompt from the index, if it is there."""
+        with self._lock:
+            self._remove(name)
+
+    def _remove(self, name: str) -> None:
+        indexed = self._documents.pop(name, None)
+        if indexed is None:
+            return
+        for word in indexed.terms:
+            postings = self._postings[word]
+            del postings[name]
+            if not postings:
+                del self._postings[word]
+        self._total_length -= indexed.length
+        self._norms = None
+
+    def sync(self, documents: Iterable[PromptDocument]) -> int:
+        """Make the index match a full set of prompts, re-indexing only those that changed.
+
+        Returns:
+            Number of prompts indexed again or dropped
+        """
+        changes = 0
+        seen = set()
+        for document in documents:
+            seen.add(document.name)
+            changes += self.update(document)
+        with self._lock:
+            gone = set(self._documents) - seen
+            for name in gone:
+                self._remove(name)
+        changes += len(gone)
+        self._synced = time.monotonic()
+        return changes
+
+    def refresh(self, documents: Callable[[], Iterable[PromptDocument]]) -> None:
+        """Sync with the prompts documents returns, unless synced less than refresh_interval ago."""
+        if self._synced is None or time.monotonic() - self._synced >= self.refresh_interval:
+            self.sync(documents())
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> list[dict[str, Any]]:
+        """The prompts best matching a query, best first.
+
+        Args:
+            query: Words to look for
+            limit: Maximum number of prompts returned
+
+        Returns:
+            List of dicts with the name, first line of the description and score of each prompt
+
+        Raises:
+            ValueError: If limit is out of range
+        """
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+        with self._lock:
+            count = len(self._documents)
+            if not count:
+                return []
+            norms = self._norms
+            if norms is None:
+                average = self._total_length / count or 1
+                norms = self._norms = {
+                    name: K1 * (1 - B + B * indexed.length / average) for name, indexed in self._documents.items()
+                }
+            scores: dict[str, float] = {}
+            for word in set(tokenize(query)):
+                postings = self._postings.get(word)
+                if not postings:
+                    continue
+                weight = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5)) * (K1 + 1)
+                for name, frequency in postings.items():
+                    scores[name] = scores.get(name, 0.0) + weight * frequency / (frequency + norms[name])
+            # Highest score first, then by name
+            best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+            return [
+                {"name": name, "description": self._documents[name].summary, "score": round(score, 4)}
+                for name, score in best
+            ]
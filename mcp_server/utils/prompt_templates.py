@@ -0,0 +1,441 @@
+"""Prompt arguments declared in the frontmatter, rendered by a small compiled template engine.
+
+A prompt file declares its arguments in its frontmatter:
+
+    ---
+    arguments:
+      - name: files
+        description: Files or directories to work on
+        required: false
+    ---
+
+and uses them in its body with three constructs only:
+
+- `{{ name }}` inserts the value of an argument (or of a server-provided variable such
+  as SCRIPT_PATHS). A name with no value is left as it is, so `{{SCRIPT_PATHS}}` stays
+  visible when a prompt is loaded without scripts.
+- `{% if name %}...{% else %}...{% endif %}` (or `{% if not name %}`) keeps one branch
+  depending on whether the value is non-empty. Tags alone on their line take the line
+  with them.
+- `{% include "name" %}` is replaced by the fragment `name` (a `fragments/name.md` of
+  the prompt roots) when the prompt is compiled. Fragments can include fragments; an
+  include cycle is an error.
+
+There are no expressions, attribute lookups or calls, and values are inserted as they
+are, never parsed as template text: rendering cannot run code or reach anything but
+the given values. Anything else in braces is plain text.
+
+Each prompt file is parsed once into a tree of literal text, variables and conditionals,
+and parsed again only when its size or modification time, or that of a fragment it
+includes, changes. The cache keeps the graph of which prompts include which fragments:
+a changed fragment drops the compiled and rendered entries of exactly the prompts that
+include it. Rendered prompts are kept in an LRU cache keyed by the hash of the prompt
+source (fragments included) and the values, so a parameterized prompt costs a few stats
+and a dict lookup once it has been rendered with the same arguments.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+DEFAULT_CACHE_SIZE = 256
+
+TAG = re.compile(
+    r"\{\{\s*(?P<variable>[A-Za-z_]\w*)\s*\}\}"
+    r"|\{%\s*(?:(?P<if>if)\s+(?P<negate>not\s+)?(?P<condition>[A-Za-z_]\w*)|(?P<else>else)|(?P<endif>endif))\s*%\}"
+)
+INCLUDE = re.compile(r"\{%\s*include\s+\"(?P<name>[\w-]+)\"\s*%\}")
+FRONTMATTER_LINE = re.compile(r"^(?P<indent>\s*)(?P<item>-\s+)?(?P<key>[A-Za-z_][\w-]*)\s*:\s*(?P<value>.*)$")
+
+
+class TemplateError(ValueError):
+    """Raised when a prompt template is malformed or given invalid arguments."""
+
+
+# Finds the file of a fragment by name; None if there is none
+FragmentResolver = Callable[[str], Path | None]
+# Size and modification time of a file
+Stamp = tuple[int, int]
+
+
+def _stamp(path: Path) -> Stamp | None:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+@dataclass(frozen=True)
+class PromptArgument:
+    """An argument declared in the frontmatter of a prompt."""
+
+    name: str
+    description: str = ""
+    required: bool = False
+    default: str | None = None
+
+
+@dataclass
+class _Variable:
+    name: str
+    text: str
+
+
+@dataclass
+class _Condition:
+    name: str
+    negate: bool
+    then: list["_Node"] = field(default_factory=list)
+    otherwise: list["_Node"] = field(default_factory=list)
+
+
+_Node = str | _Variable | _Condition
+
+
+def _scalar(value: str) -> str | bool | list[str]:
+    value = value.strip()
+    if value.startswith("[") and value.endswith("]"):
+        # Inline list, e.g. tags: [github, review]
+        return [str(_scalar(item)) for item in value[1:-1].split(",") if item.strip()]
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    if value.lower() in {"true", "false"}:
+        return value.lower() == "true"
+    return value
+
+
+def parse_frontmatter(text: str) -> dict[str, Any]:
+    """Parse the `key: value` lines of a frontmatter, inline lists and lists of mappings (`- key: value` items).
+
+    Only the subset of YAML the prompt files use is understood; other lines are ignored.
+    """
+    metadata: dict[str, Any] = {}
+    current: str | None = None
+    for line in text.splitlines():
+        match = FRONTMATTER_LINE.match(line)
+        if not match or line.lstrip().startswith("#"):
+            continue
+        key, value = match["key"], match["value"]
+        if not match["indent"] and not match["item"]:
+            current = key
+            metadata[key] = _scalar(value) if value.strip() else []
+        elif current is not None and isinstance(metadata[current], list):
+            if match["item"]:
+                metadata[current].append({})
+            if metadata[current]:
+                metadata[current][-1][key] = _scalar(value)
+    return metadata
+
+
+def _arguments(metadata: dict[str, Any]) -> tuple[PromptArgument, ...]:
+    declared = metadata.get("arguments") or []
+    if not isinstance(declared, list):
+        raise TemplateError("arguments must be a list of mappings with a name")
+    arguments = []
+    for entry in declared:
+        name = entry.get("name")
+        if not isinstance(name, str) or not name.isidentifier():
+            raise TemplateError(f"Invalid argument name: {name!r}")
+        default = entry.get("default")
+        arguments.append(
+            PromptArgument(
+                name=name,
+                description=str(entry.get("description", "")),
+                required=entry.get("required") is True,
+                default=None if default is None else str(default),
+            )
+        )
+    return tuple(arguments)
+
+
+def expand_includes(
+    source: str,
+    fragments: FragmentResolver | None,
+    dependencies: dict[str, tuple[Path, Stamp]],
+    chain: tuple[str, ...] = (),
+) -> str:
+    """Replace the include tags of a template with their fragments, recursively.
+
+    Args:
+        source: Template text
+        fragments: Finds the file of a fragment by name
+        dependencies: Filled with the file and stamp of every fragment included, by name
+        chain: Fragments being included, outermost first
+
+    Raises:
+        TemplateError: If a fragment does not exist or includes itself
+    """
+
+    def include(match: re.Match[str]) -> str:
+        name = match["name"]
+        if name in chain:
+            raise TemplateError(f"Include cycle: {' -> '.join([*chain, name])}")
+        path = fragments(name) if fragments is not None else None
+        stamp = _stamp(path) if path is not None else None
+        if path is None or stamp is None:
+            raise TemplateError(f"Unknown fragment: {name}")
+        dependencies[name] = (path, stamp)
+        text = path.read_text(encoding="utf-8").rstrip("\n")
+        return expand_includes(text, fragments, dependencies, (*chain, name))
+
+    return INCLUDE.sub(include, source)
+
+
+def compile_template(source: str) -> list[_Node]:
+    """Parse a template body into its tree of literal text, variables and conditionals.
+
+    Raises:
+        TemplateError: If the if, else and endif tags do not match
+    """
+    root: list[_Node] = []
+    # Open conditionals with the branch being filled
+    stack: list[tuple[_Condition, list[_Node]]] = []
+    nodes = root
+    position = 0
+    for match in TAG.finditer(source):
+        text = source[position : match.start()]
+        position = match.end()
+        if match["variable"]:
+            nodes.append(text)
+            nodes.append(_Variable(match["variable"], match.group()))
+            continue
+        # A block tag alone on its line takes the line with it
+        indent = source[source.rfind("\n", 0, match.start()) + 1 : match.start()]
+        after = source[position : position + 1]
+        if not indent.strip() and after in {"\n", ""}:
+            text = text[: len(text) - len(indent)]
+            position += len(after)
+        nodes.append(text)
+        if match["if"]:
+            condition = _Condition(match["condition"], bool(match["negate"]))
+            nodes.append(condition)
+            stack.append((condition, nodes))
+            nodes = condition.then
+        elif not stack:
+            raise TemplateError(f"{{% {match['else'] or match['endif']} %}} without {{% if %}}")
+        elif match["else"]:
+            condition = stack[-1][0]
+            if nodes is condition.otherwise:
+                raise TemplateError(f"Second {{% else %}} in {{% if {condition.name} %}}")
+            nodes = condition.otherwise
+        else:
+            nodes = stack.pop()[1]
+    if stack:
+        raise TemplateError(f"{{% if {stack[-1][0].name} %}} without {{% endif %}}")
+    nodes.append(source[position:])
+    return root
+
+
+def _render(nodes: list[_Node], values: dict[str, str], out: list[str]) -> None:
+    for node in nodes:
+        if isinstance(node, str):
+            out.append(node)
+        elif isinstance(node, _Variable):
+            out.append(values.get(node.name, node.text))
+        else:
+            _render(node.then if bool(values.get(node.name)) != node.negate else node.otherwise, values, out)
+
+
+@dataclass
+class CompiledPrompt:
+    """A prompt file parsed once: its metadata, declared arguments and template tree."""
+
+    metadata: dict[str, Any]
+    arguments: tuple[PromptArgument, ...]
+    template: list[_Node]
+    digest: str
+    # File and stamp of the fragments included, by name
+    dependencies: dict[str, tuple[Path, Stamp]] = field(default_factory=dict)
+    # Template text after the frontmatter, fragments included
+    source: str = ""
+
+    @classmethod
+    def from_source(cls, content: str, fragments: FragmentResolver | None = None) -> "CompiledPrompt":
+        """Compile the content of a prompt file, with or without frontmatter.
+
+        Args:
+            content: Content of the prompt file
+            fragments: Finds the file of a fragment by name, for include tags
+
+        Raises:
+            TemplateError: If the arguments or the template are malformed
+        """
+        metadata: dict[str, Any] = {}
+        body = content
+        # Everything between the first two --- is the frontmatter
+        if content.startswith("---"):
+            parts = content.split("---", 2)
+            if len(parts) >= 3:
+                metadata = parse_frontmatter(parts[1])
+                body = parts[2].strip()
+        dependencies: dict[str, tuple[Path, Stamp]] = {}
+        expanded = expand_includes(body, fragments, dependencies)
+        return cls(
+            metadata=metadata,
+            arguments=_arguments(metadata),
+            template=compile_template(expanded),
+            digest=hashlib.sha256(f"{content}\0{expanded}".encode()).hexdigest(),
+            dependencies=dependencies,
+            source=expanded,
+        )
+
+    def values(self, arguments: dict[str, str | None] | None = None) -> dict[str, str]:
+        """The values of the declared arguments, defaults applied.
+
+        Raises:
+            TemplateError: If an argument is not declared or a required one has no value
+        """
+        given = {name: value for name, value in (arguments or {}).items() if value is not None}
+        declared = {argument.name: argument for argument in self.arguments}
+        unknown = sorted(given.keys() - declared.keys())
+        if unknown:
+            raise TemplateError(f"Unknown prompt arguments: {', '.join(unknown)}")
+        values = {}
+        for argument in self.arguments:
+            value = given.get(argument.name, argument.default)
+            if value is None and argument.required:
+                raise TemplateError(f"Missing required prompt argument: {argument.name}")
+            values[argument.name] = "" if value is None else str(value)
+        return values
+
+    def render(self, values: dict[str, str]) -> str:
+        """Render the template with complete values (see values)."""
+        out: list[str] = []
+        _render(self.template, values, out)
+        return "".join(out)
+
+
+class PromptTemplateCache:
+    """Compiled prompts by file, and an LRU cache of rendered prompts by prompt hash and values."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE) -> None:
+        """Create an empty cache.
+
+        Args:
+            max_entries: Number of rendered prompts kept
+        """
+        self.max_entries = max_entries
+        self._compiled: dict[str, tuple[Stamp, CompiledPrompt]] = {}
+        # Fragment file -> prompt files that include it, directly or not
+        self._dependents: dict[str, set[str]] = {}
+        self._rendered: OrderedDict[tuple[str, tuple[tuple[str, str], ...]], str] = OrderedDict()
+        self._lock = threading.Lock()
+        # Numbers of compilations and renders so far
+        self.compilations = 0
+        self.renders = 0
+
+    def compiled(self, path: Path, fragments: FragmentResolver | None = None) -> CompiledPrompt:
+        """The compiled prompt of a file, compiled again only when the file or its fragments changed.
+
+        Args:
+            path: Prompt file
+            fragments: Finds the file of a fragment by name, for include tags
+
+        Raises:
+            OSError: If the file cannot be read
+            TemplateError: If the prompt is malformed
+        """
+        stamp = _stamp(path)
+        if stamp is None:
+            raise FileNotFoundError(f"Prompt file not found: {path}")
+        key = str(path)
+        with self._lock:
+            cached = self._compiled.get(key)
+        if cached is not None and cached[0] == stamp:
+            stale = self._stale_fragment(cached[1], fragments)
+            if stale is None:
+                return cached[1]
+            # Every prompt including it is out of date, not only this one
+            self.invalidate(stale)
+        prompt = CompiledPrompt.from_source(path.read_text(encoding="utf-8"), fragments)
+        with self._lock:
+            self._forget(key)
+            self._compiled[key] = (stamp, prompt)
+            for fragment, _ in prompt.dependencies.values():
+                self._dependents.setdefault(str(fragment), set()).add(key)
+            self.compilations += 1
+        return prompt
+
+    @staticmethod
+    def _stale_fragment(prompt: CompiledPrompt, fragments: FragmentResolver | None) -> Path | None:
+        """A fragment of the prompt that changed or now resolves to another file, if any."""
+        for name, (fragment, stamp) in prompt.dependencies.items():
+            if fragments is None or fragments(name) != fragment or _stamp(fragment) != stamp:
+                return fragment
+        return None
+
+    def invalidate(self, path: Path) -> list[str]:
+        """Drop the compiled and rendered entries of a file and of the prompts that include it.
+
+        Returns:
+            The prompt files dropped
+        """
+        key = str(path)
+        with self._lock:
+            dropped = sorted(({key} if key in self._compiled else set()) | self._dependents.get(key, set()))
+            for prompt in dropped:
+                self._forget(prompt)
+        return dropped
+
+    def _forget(self, key: str) -> None:
+        """Drop a compiled prompt, its rendered prompts and its edges in the graph (lock held)."""
+        cached = self._compiled.pop(key, None)
+        if cached is None:
+            return
+        prompt = cached[1]
+        for fragment, _ in prompt.dependencies.values():
+            dependents = self._dependents.get(str(fragment))
+            if dependents is not None:
+                dependents.discard(key)
+                if not dependents:
+                    del self._dependents[str(fragment)]
+        for rendered in [rendered for rendered in self._rendered if rendered[0] == prompt.digest]:
+            del self._rendered[rendered]
+
+    def render(
+        self,
+        path: Path,
+        arguments: dict[str, str | None] | None = None,
+        variables: dict[str, str] | None = None,
+        fragments: FragmentResolver | None = None,
+    ) -> str:
+        """Render a prompt file with its arguments and server-provided variables.
+
+        Args:
+            path: Prompt file
+            arguments: Values of the declared arguments (None for not given)
+            variables: Values the server provides, e.g. SCRIPT_PATHS
+            fragments: Finds the file of a fragment by name, for include tags
+
+        Raises:
+            OSError: If the file cannot be read
+            TemplateError: If the prompt is malformed or the arguments are invalid
+        """
+        prompt = self.compiled(path, fragments)
+        values = {**(variables or {}), **prompt.values(arguments)}
+        key = (prompt.digest, tuple(sorted(values.items())))
+        with self._lock:
+            rendered = self._rendered.get(key)
+            if rendered is not None:
+                self._rendered.move_to_end(key)
+                return rendered
+        rendered = prompt.render(values)
+        with self._lock:
+            self.renders += 1
+            self._rendered[key] = rendered
+            while len(self._rendered) > self.max_entries:
+                self._rendered.popitem(last=False)
+        return rendered
+
+    def clear(self) -> None:
+        """Forget every compiled and rendered prompt."""
+        with self._lock:
+            self._compiled.clear()
+            self._dependents.clear()
+            self._rendered.clear()
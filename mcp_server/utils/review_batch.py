@@ -0,0 +1,208 @@
+"""Summaries of the CodeRabbit reviews of many pull requests at once.
+
+Release managers look at the CodeRabbit comments of every open pull request of a
+repository before cutting a release. Instead of running get-coderabbit-comments.sh once
+per pull request, the batch takes repositories (owner/name, meaning all of their open
+pull requests) and single pull requests (owner/name#number) and fetches the reports of
+the latest reviews of their heads on a bounded pool of worker threads. The workers
+share one client, so every request goes through the same connection pool and rate
+limit scheduler (and the helper daemon from the command line), and the reports go
+through the review page cache, the review history and the review store like single
+runs do: the pages of a pull request cost no further requests afterwards.
+
+The result lists the summary counts of each pull request, in the order given, and
+adds them up. A pull request that fails is reported with its error instead of failing
+the batch.
+
+Usage from the scripts:
+
+    python3 -m mcp_server.utils.review_batch [--concurrency N] [--format FORMAT] <owner/repo[#pr]>...
+"""
+
+import argparse
+import re
+import sqlite3
+import sys
+from collections import Counter
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any
+
+from mcp_server.utils.coderabbit import OUTPUT_FORMATS, dump_output
+from mcp_server.utils.github_api import GitHubAPIError, GitHubClient, extract_field
+from mcp_server.utils.github_daemon import get_shared_client
+from mcp_server.utils.json_stream import JSONStreamError
+from mcp_server.utils.review_pages import ReviewPageCache
+
+DEFAULT_CONCURRENCY = 4
+MAX_CONCURRENCY = 16
+PULLS_PAGE_SIZE = 100
+
+TARGET = re.compile(r"^([\w.-]+)/([\w.-]+?)(?:#(\d+))?$")
+# Errors of one pull request, reported in its entry
+BATCH_ERRORS = (GitHubAPIError, JSONStreamError, ValueError, sqlite3.Error)
+
+
+def parse_target(target: str) -> tuple[str, str, int | None]:
+    """Split owner/name#number into (owner, name, number), the number being None for owner/name.
+
+    Raises:
+        ValueError: If the target is neither form
+    """
+    match = TARGET.match(target.strip())
+    if not match:
+        raise ValueError(f"Invalid target: {target!r} (expected owner/name or owner/name#number)")
+    owner, repo, number = match.groups()
+    return owner, repo, None if number is None else int(number)
+
+
+def open_pull_requests(client: GitHubClient, owner: str, repo: str) -> list[tuple[int, str | None]]:
+    """Numbers and head SHAs of the open pull requests of a repository, newest first."""
+    pulls: list[tuple[int, str | None]] = []
+    page = 1
+    while True:
+        query = f"state=open&per_page={PULLS_PAGE_SIZE}" + (f"&page={page}" if page > 1 else "")
+        batch = [
+            (pull["number"], extract_field(pull, "head.sha"))
+            for pull in client.iter_array(f"/repos/{owner}/{repo}/pulls?{query}")
+        ]
+        pulls += batch
+        if len(batch) < PULLS_PAGE_SIZE:
+            return pulls
+        page += 1
+
+
+def _summarize(
+    client: GitHubClient, cache: ReviewPageCache, owner: str, repo: str, number: int, head_sha: str | None
+) -> dict[str, Any]:
+    """Batch entry of one pull request (see review_batch)."""
+    entry: dict[str, Any] = {"pull_request": f"{owner}/{repo}#{number}"}
+    try:
+        if head_sha is None:
+            head_sha = extract_field(client.get_json(f"/repos/{owner}/{repo}/pulls/{number}"), "head.sha")
+            if not head_sha:
+                raise ValueError("Could not retrieve latest commit SHA")
+        report = cache.get(client, owner, repo, str(number), head_sha)
+    except BATCH_ERRORS as exc:
+        entry["error"] = str(exc)
+        return entry
+    entry.update(
+        head_sha=head_sha,
+        reviewed=report is not None,
+        summary=report["summary"] if report is not None else {"total": 0},
+    )
+    return entry
+
+
+def _expand(client: GitHubClient, target: str) -> list[tuple[str, str, int, str | None]] | dict[str, Any]:
+    """Pull requests of a target as (owner, name, number, head SHA if known), or its error entry."""
+    try:
+        owner, repo, number = parse_target(target)
+        if number is not None:
+            return [(owner, repo, number, None)]
+        return [(owner, repo, pull, head_sha) for pull, head_sha in open_pull_requests(client, owner, repo)]
+    except BATCH_ERRORS as exc:
+        return {"pull_request": target, "error": str(exc)}
+
+
+def aggregate(entries: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Totals of a batch: pull requests by outcome and the summary counts added up."""
+    outcomes: Counter[str] = Counter()
+    counts: Counter[str] = Counter()
+    for entry in entries:
+        outcomes["pull_requests"] += 1
+        if "error" in entry:
+            outcomes["failed"] += 1
+            continue
+        outcomes["reviewed" if entry["reviewed"] else "unreviewed"] += 1
+        counts.update(entry["summary"])
+    total = counts.pop("total", 0)
+    return {
+        "pull_requests": outcomes["pull_requests"],
+        "reviewed": outcomes["reviewed"],
+        "unreviewed": outcomes["unreviewed"],
+        "failed": outcomes["failed"],
+        "summary": {**dict(sorted(counts.items())), "total": total},
+    }
+
+
+def review_batch(
+    client: GitHubClient, cache: ReviewPageCache, targets: Iterable[str], concurrency: int = DEFAULT_CONCURRENCY
+) -> dict[str, Any]:
+    """Fetch the CodeRabbit reports of many pull requests concurrently and summarize them.
+
+    Args:
+        client: GitHub API client, shared by the workers
+        cache: Cache of the flattened reports (see review_pages)
+        targets: Repositories (owner/name, all open pull requests) and pull requests (owner/name#number)
+        concurrency: Number of pull requests fetched at the same time (at most MAX_CONCURRENCY)
+
+    Returns:
+        Dict with one entry per pull request (pull_request, head_sha, reviewed and the
+        report summary, or pull_request and error) and the aggregate (see aggregate)
+
+    Raises:
+        ValueError: If there are no targets or the concurrency is out of range
+    """
+    targets = list(targets)
+    if not targets:
+        raise ValueError("No pull requests or repositories given")
+    if not 0 < concurrency <= MAX_CONCURRENCY:
+        raise ValueError(f"concurrency must be between 1 and {MAX_CONCURRENCY}")
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="review-batch") as pool:
+        # Entries in input order: error entries of targets, or the key of a pull request
+        slots: list[dict[str, Any] | tuple[str, str, int]] = []
+        pulls: dict[tuple[str, str, int], tuple[str, str, int, str | None]] = {}
+        for expanded in pool.map(partial(_expand, client), targets):
+            if isinstance(expanded, dict):
+                slots.append(expanded)
+                continue
+            for pull in expanded:
+                key = (pull[0].lower(), pull[1].lower(), pull[2])
+                if key not in pulls:
+                    pulls[key] = pull
+                    slots.append(key)
+        futures = {key: pool.submit(_summarize, client, cache, *pull) for key, pull in pulls.items()}
+        entries = [slot if isinstance(slot, dict) else futures[slot].result() for slot in slots]
+    return {"pull_requests": entries, "aggregate": aggregate(entries)}
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command line entry point used by get-coderabbit-batch.sh."""
+    parser = argparse.ArgumentParser(
+        prog="review_batch", description="Summarize the CodeRabbit reviews of many pull requests"
+    )
+    parser.add_argument(
+        "targets", nargs="+", metavar="owner/repo[#pr]", help="Pull request, or repository for all open pull requests"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Pull requests fetched at the same time (1-{MAX_CONCURRENCY}, default {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="pretty",
+        help="Pretty-printed JSON, compact JSON or one JSON record per pull request with the aggregate last",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        batch = review_batch(get_shared_client(), ReviewPageCache(), args.targets, args.concurrency)
+    except ValueError as exc:
+        print(f"❌ Error: {exc}", file=sys.stderr)
+        return 1
+    if args.format == "ndjson":
+        print(dump_output({"aggregate": batch["aggregate"]}, args.format, batch["pull_requests"]))
+    else:
+        print(dump_output(batch, args.format))
+    # The other pull requests are still reported
+    return 1 if batch["aggregate"]["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""Paged, priority-ordered access to CodeRabbit review comments for the MCP server.
+
+The report of get-coderabbit-comments.sh is one document holding every category, which
+an agent has to read whole before acting on anything. The server instead flattens the
+report of the latest review of the pull request head into one list, most important
+first (actionable, outside diff range, duplicates, nitpicks), and hands it out in
+bounded pages. The flattened list is kept in a small LRU cache keyed by the head SHA, so
+later pages cost no GitHub requests, and the cursor names the SHA it pages through: a
+push while paging does not shift the pages, the next first page starts on the new head.
+
+Fetching a large review can take a while, so the phases (pull request info, review
+history, inline comments, review body) can be reported to a callback as they finish,
+together with the comments they completed: the actionable comments are known before
+the review body is parsed.
+"""
+
+import base64
+import binascii
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from mcp_server.utils.coderabbit import (
+    ACTIONABLE_COMMENTS,
+    DUPLICATE_COMMENTS,
+    NITPICK_COMMENTS,
+    OUTSIDE_DIFF_RANGE_COMMENTS,
+    REPORT_PHASES,
+    SUMMARY_KEYS,
+    ReportProgress,
+    fetch_review_report,
+)
+from mcp_server.utils.github_api import GitHubClient, extract_field
+from mcp_server.utils.review_store import ReviewStore
+from mcp_server.utils.review_sync import ReviewSync
+
+PAGE_ORDER = (ACTIONABLE_COMMENTS, OUTSIDE_DIFF_RANGE_COMMENTS, DUPLICATE_COMMENTS, NITPICK_COMMENTS)
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+DEFAULT_CACHE_SIZE = 32
+PR_INFO_PHASE = "pr_info"
+PAGE_PHASES = (PR_INFO_PHASE, *REPORT_PHASES)
+
+# Called with a phase of PAGE_PHASES once it is done and the comments it completed (flattened)
+PageProgress = Callable[[str, list[dict[str, Any]]], None]
+
+
+def encode_cursor(head_sha: str, offset: int) -> str:
+    """Opaque cursor of the page starting at `offset` of the comments of `head_sha`."""
+    return base64.urlsafe_b64encode(json.dumps([head_sha, offset]).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    """Decode a cursor made by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor was not made by encode_cursor
+    """
+    try:
+        head_sha, offset = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError, TypeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+    if not isinstance(head_sha, str) or not isinstance(offset, int) or offset < 0:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return head_sha, offset
+
+
+def flatten_report(report: dict[str, Any]) -> list[dict[str, Any]]:
+    """The comments of a report in PAGE_ORDER, each with its `category` (as in the summary)."""
+    return [
+        {"category": SUMMARY_KEYS[category], **comment}
+        for category in PAGE_ORDER
+        for comment in report.get(category, [])
+    ]
+
+
+def _flattening(progress: PageProgress) -> ReportProgress:
+    return lambda phase, sections: progress(phase, flatten_report(sections))
+
+
+class ReviewPageCache:
+    """LRU cache of the flattened report of the latest CodeRabbit review of each head SHA.
+
+    Heads CodeRabbit has not reviewed yet are not cached, so the review is found once it is posted.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE) -> None:
+        """Create an empty cache.
+
+        Args:
+            max_entries: Number of pull request heads kept
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str, str, str], dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Forget every cached report."""
+        with self._lock:
+            self._entries.clear()
+
+    def get(
+        self,
+        client: GitHubClient,
+        owner: str,
+        repo: str,
+        pr_number: str,
+        head_sha: str,
+        progress: PageProgress | None = None,
+    ) -> dict[str, Any] | None:
+        """The summary and flattened comments of a head, fetched on a miss.
+
+        Misses go through the review history and the review store like the scripts do.
+        Hits report no phases.
+
+        Args:
+            client: GitHub API client
+            owner: Repository owner
+            repo: Repository name
+            pr_number: Pull request number
+            head_sha: Commit the review must belong to
+            progress: Called after each phase of fetching the report (see fetch_review_report)
+
+        Returns:
+            Dict with the summary and the comments, or None if CodeRabbit has not reviewed the commit
+        """
+        key = (owner.lower(), repo.lower(), str(pr_number), head_sha)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        report_progress = None if progress is None else _flattening(progress)
+        sync = ReviewSync.persistent(client, owner, repo, pr_number)
+        with ReviewStore.default() as store:
+            report = fetch_review_report(
+                client, owner, repo, pr_number, head_sha, sync=sync, store=store, progress=report_progress
+            )
+        sync.save()
+        if report is None:
+            return None
+        entry = {"summary": report["summary"], "comments": flatten_report(report)}
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+
+def review_comment_page(
+    client: GitHubClient,
+    cache: ReviewPageCache,
+    repository: str,
+    pr_number: int | str,
+    cursor: str | None = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    progress: PageProgress | None = None,
+) -> dict[str, Any]:
+    """One page of the CodeRabbit comments of a pull request head, most important first.
+
+    Args:
+        client: GitHub API client
+        cache: Cache of the flattened reports
+        repository: Repository as owner/name
+        pr_number: Pull request number
+        cursor: `next_cursor` of the previous page; without one, the first page of the current head
+        page_size: Number of comments per page (at most MAX_PAGE_SIZE)
+        progress: Called after each phase of PAGE_PHASES that ran; the pull request info
+            is only fetched without a cursor, the report only when it is not cached
+
+    Returns:
+        Dict with the head SHA, whether CodeRabbit reviewed it, the report summary, the
+        total number of comments, the comments of the page and the cursor of the next
+        page (None on the last page)
+
+    Raises:
+        ValueError: If the repository, page size or cursor is invalid, or the head commit cannot be determined
+        GitHubAPIError: If a request fails
+    """
+    owner, _, repo = repository.partition("/")
+    if not owner or not repo or "/" in repo:
+        raise ValueError(f"Invalid repository: {repository!r} (expected owner/name)")
+    if not 0 < page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+
+    if cursor:
+        head_sha, offset = decode_cursor(cursor)
+    else:
+        head_sha = extract_field(client.get_json(f"/repos/{owner}/{repo}/pulls/{pr_number}"), "head.sha")
+        offset = 0
+        if not head_sha:
+            raise ValueError("Could not retrieve latest commit SHA")
+        if progress is not None:
+            progress(PR_INFO_PHASE, [])
+
+    entry = cache.get(client, owner, repo, str(pr_number), head_sha, progress)
+    comments = entry["comments"] if entry else []
+    end = offset + page_size
+    return {
+        "head_sha": head_sha,
+        "reviewed": entry is not None,
+        "summary": entry["summary"] if entry else {"total": 0},
+        "total": len(comments),
+        "comments": comments[offset:end],
+        "next_cursor": encode_cursor(head_sha, end) if end < len(comments) else None,
+    }
@@ -0,0 +1,413 @@
+"""Local SQLite store of fetched reviews and review comments.
+
+The review scripts record what they fetch here: reviews (by repository, pull request,
+commit and review ID), the commits they saw at the head of a pull request, and the
+comments of each run, including the categories and priorities parsed from CodeRabbit
+reviews. The MCP server answers repeated or historical questions ("all unresolved
+nitpicks on this PR since commit X") from the store with indexed queries instead of
+going back to GitHub.
+
+Rows are replaced per review (CodeRabbit) or per pull request (human comments) when
+they are recorded again, so the store always holds the latest version of each. The
+database lives at AI_PROMPTS_MCP_CACHE_DIR/reviews.sqlite3 and uses write-ahead
+logging, so scripts can write while the server reads.
+"""
+
+import re
+import sqlite3
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+from mcp_server.utils.utils import get_cache_dir
+
+SCHEMA_VERSION = 2
+DATABASE_NAME = "reviews.sqlite3"
+BUSY_TIMEOUT = 10.0
+# Unknown priorities (human comments) sort last
+PRIORITY_RANKS = {"HIGH": 0, "MEDIUM": 1, "LOW": 2, "VERY LOW": 3}
+UNKNOWN_PRIORITY_RANK = len(PRIORITY_RANKS)
+COMMIT_PREFIX = re.compile(r"^[0-9a-fA-F]{4,64}$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    repository TEXT NOT NULL,
+    pr_number INTEGER NOT NULL,
+    review_id INTEGER NOT NULL,
+    author TEXT,
+    state TEXT,
+    commit_sha TEXT,
+    submitted_at TEXT,
+    body TEXT,
+    PRIMARY KEY (repository, pr_number, review_id)
+);
+CREATE INDEX IF NOT EXISTS reviews_by_commit ON reviews (repository, pr_number, commit_sha);
+
+CREATE TABLE IF NOT EXISTS commits (
+    repository TEXT NOT NULL,
+    pr_number INTEGER NOT NULL,
+    sha TEXT NOT NULL,
+    date TEXT,
+    PRIMARY KEY (repository, pr_number, sha)
+);
+
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY,
+    repository TEXT NOT NULL,
+    pr_number INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    review_id INTEGER,
+    comment_id INTEGER,
+    category TEXT NOT NULL,
+    priority TEXT,
+    priority_rank INTEGER NOT NULL,
+    author TEXT,
+    file TEXT,
+    line TEXT,
+    title TEXT,
+    body TEXT,
+    commit_sha TEXT,
+    created_at TEXT,
+    resolved INTEGER,
+    fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS comments_by_review ON comments (repository, pr_number, source, review_id);
+CREATE INDEX IF NOT EXISTS comments_by_category ON comments (repository, pr_number, category, created_at);
+CREATE INDEX IF NOT EXISTS comments_by_time ON comments (repository, pr_number, created_at);
+CREATE INDEX IF NOT EXISTS comments_by_file ON comments (repository, pr_number, file);
+CREATE INDEX IF NOT EXISTS comments_by_fingerprint ON comments (repository, pr_number, source, fingerprint);
+"""
+# The store is a cache of what GitHub returned: tables of other versions are dropped, not migrated
+DROP_TABLES = "DROP TABLE IF EXISTS reviews; DROP TABLE IF EXISTS commits; DROP TABLE IF EXISTS comments;"
+
+COMMENT_FIELDS = (
+    "review_id",
+    "comment_id",
+    "category",
+    "priority",
+    "author",
+    "file",
+    "line",
+    "title",
+    "body",
+    "commit_sha",
+    "created_at",
+    "resolved",
+    "fingerprint",
+)
+RESULT_FIELDS = ("source", *COMMENT_FIELDS)
+
+
+def get_review_store_path() -> Path:
+    """Location of the review store in the cache directory."""
+    return get_cache_dir() / DATABASE_NAME
+
+
+def _optional_text(value: Any) -> str | None:
+    return None if value is None else str(value)
+
+
+def _optional_flag(value: Any) -> int | None:
+    return None if value is None else int(bool(value))
+
+
+class ReviewStore:
+    """Indexed store of reviews and review comments, keyed by repository, pull request, commit and review."""
+
+    def __init__(self, path: Path | str = ":memory:") -> None:
+        """Open (and create if needed) the store.
+
+        Args:
+            path: Database file, ":memory:" for a throwaway store
+        """
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            drop = DROP_TABLES if version else ""
+            self._connection.executescript(
+                f"BEGIN IMMEDIATE;{drop}{SCHEMA}PRAGMA user_version={SCHEMA_VERSION};COMMIT;"
+            )
+
+    @classmethod
+    def default(cls) -> "ReviewStore":
+        """ReviewStore in the cache directory (see get_review_store_path)."""
+        return cls(get_review_store_path())
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._connection.close()
+
+    def __enter__(self) -> "ReviewStore":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in one write transaction, rolled back on errors."""
+        connection = self._connection
+        if connection.in_transaction:
+            yield connection
+            return
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def record_reviews(self, repository: str, pr_number: int | str, reviews: Iterable[Mapping[str, Any]]) -> None:
+        """Insert or update reviews as returned by the GitHub API (bodies as given, e.g. truncated).
+
+        Args:
+            repository: Repository as owner/name
+            pr_number: Pull request number
+            reviews: Reviews; items without an ID are skipped
+        """
+        rows = [
+            (
+                repository,
+                int(pr_number),
+                review["id"],
+                (review.get("user") or {}).get("login"),
+                review.get("state"),
+                review.get("commit_id"),
+                review.get("submitted_at"),
+                review.get("body"),
+            )
+            for review in reviews
+            if isinstance(review.get("id"), int)
+        ]
+        with self._transaction() as connection:
+            connection.executemany("INSERT OR REPLACE INTO reviews VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def record_commit(self, repository: str, pr_number: int | str, sha: str, date: str | None) -> None:
+        """Remember the date of a commit seen at the head of a pull request."""
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO commits VALUES (?, ?, ?, ?)", (repository, int(pr_number), sha, date)
+            )
+
+    @contextmanager
+    def recording(
+        self, repository: str, pr_number: int | str, source: str, review_id: int | None = None
+    ) -> Iterator[Callable[[Mapping[str, Any]], None]]:
+        """Replace the comments of a review, or all comments of a source, with the ones added.
+
+        The previous comments are deleted and the new ones inserted in one transaction,
+        committed when the block ends, so comments can be recorded as they are produced.
+
+        Args:
+            repository: Repository as owner/name
+            pr_number: Pull request number
+            source: Where the comments come from ("coderabbit", "human")
+            review_id: Review the comments belong to, None to replace every comment of the source
+
+        Yields:
+            Function adding one comment, a mapping with any of COMMENT_FIELDS (category is required)
+        """
+        pr = int(pr_number)
+        with self._transaction() as connection:
+            if review_id is None:
+                connection.execute(
+                    "DELETE FROM comments WHERE repository = ? AND pr_number = ? AND source = ?",
+                    (repository, pr, source),
+                )
+            else:
+                connection.execute(
+                    "DELETE FROM comments WHERE repository = ? AND pr_number = ? AND source = ? AND review_id = ?",
+                    (repository, pr, source, review_id),
+                )
+
+            def add(comment: Mapping[str, Any]) -> None:
+                priority = comment.get("priority")
+                connection.execute(
+                    "INSERT INTO comments (repository, pr_number, source, review_id, comment_id, category, priority,"
+                    " priority_rank, author, file, line, title, body, commit_sha, created_at, resolved, fingerprint)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        repository,
+                        pr,
+                        source,
+                        review_id if review_id is not None else comment.get("review_id"),
+                        comment.get("comment_id"),
+                        comment["category"],
+                        priority,
+                        PRIORITY_RANKS.get(priority or "", UNKNOWN_PRIORITY_RANK),
+                        comment.get("author"),
+                        comment.get("file"),
+                        _optional_text(comment.get("line")),
+                        comment.get("title"),
+                        comment.get("body"),
+                        comment.get("commit_sha"),
+                        comment.get("created_at"),
+                        _optional_flag(comment.get("resolved")),
+                        comment.get("fingerprint"),
+                    ),
+                )
+
+            yield add
+
+    def record_comments(
+        self,
+        repository: str,
+        pr_number: int | str,
+        source: str,
+        comments: Iterable[Mapping[str, Any]],
+        review_id: int | None = None,
+    ) -> None:
+        """Replace the comments of a review, or all comments of a source (see recording)."""
+        with self.recording(repository, pr_number, source, review_id) as add:
+            for comment in comments:
+                add(comment)
+
+    def fingerprints(
+        self, repository: str, pr_number: int | str, source: str, before_review_id: int | None = None
+    ) -> set[str]:
+        """Fingerprints of the stored comments of a source, e.g. to skip findings already reported.
+
+        Args:
+            repository: Repository as owner/name
+            pr_number: Pull request number
+            source: Where the comments come from ("coderabbit", "human")
+            before_review_id: Only comments of reviews older than this one (lower ID)
+
+        Returns:
+            The fingerprints recorded with the comments
+        """
+        query = "SELECT DISTINCT fingerprint FROM comments WHERE repository = ? AND pr_number = ? AND source = ?"
+        parameters: list[Any] = [repository, int(pr_number), source]
+        if before_review_id is not None:
+            query += " AND review_id < ?"
+            parameters.append(before_review_id)
+        return {row[0] for row in self._connection.execute(query, parameters) if row[0] is not None}
+
+    def has_fingerprint(
+        self, repository: str, pr_number: int | str, source: str, up_to_review_id: int, fingerprint: str
+    ) -> bool:
+        """Whether a comment with this fingerprint was recorded for a review up to the given one.
+
+        Args:
+            repository: Repository as owner/name
+            pr_number: Pull request number
+            source: Where the comments come from ("coderabbit", "human")
+            up_to_review_id: Latest review to look at (included, e.g. while it is being recorded)
+            fingerprint: Fingerprint to look up
+        """
+        row = self._connection.execute(
+            "SELECT 1 FROM comments WHERE repository = ? AND pr_number = ? AND source = ? AND fingerprint = ?"
+            " AND review_id <= ? LIMIT 1",
+            (repository, int(pr_number), source, fingerprint, up_to_review_id),
+        ).fetchone()
+        return row is not None
+
+    def commit_time(self, repository: str, pr_number: int | str, commit: str) -> str | None:
+        """When a commit (full SHA or unique prefix) showed up on a pull request.
+
+        This is the commit date if the commit was seen at the head of the pull request,
+        else the time of its first review.
+
+        Returns:
+            ISO 8601 timestamp, None if the commit is not in the store
+
+        Raises:
+            ValueError: If commit is not a hexadecimal SHA or SHA prefix
+        """
+        if not COMMIT_PREFIX.match(commit):
+            raise ValueError(f"Invalid commit SHA: {commit}")
+        pattern = f"{commit.lower()}*"
+        pr = int(pr_number)
+        row = self._connection.execute(
+            "SELECT COALESCE("
+            " (SELECT MIN(date) FROM commits WHERE repository = ? AND pr_number = ? AND sha GLOB ?),"
+            " (SELECT MIN(submitted_at) FROM reviews WHERE repository = ? AND pr_number = ? AND commit_sha GLOB ?))",
+            (repository, pr, pattern, repository, pr, pattern),
+        ).fetchone()
+        time: str | None = row[0]
+        return time
+
+    def query_comments(
+        self,
+        repository: str,
+        pr_number: int | str,
+        category: str | None = None,
+        source: str | None = None,
+        since_commit: str | None = None,
+        file: str | None = None,
+        unresolved_only: bool = False,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Stored comments of a pull request, highest priority first, then oldest first.
+
+        Args:
+            repository: Repository as owner/name
+            pr_number: Pull request number
+            category: Only this category (e.g. "nitpicks", "actionable", "human")
+            source: Only comments from this source ("coderabbit", "human")
+            since_commit: Only comments made after this commit (full SHA or prefix) showed up
+            file: Only comments on this file
+            unresolved_only: Skip comments known to be resolved
+            limit: Maximum number of comments
+
+        Returns:
+            Comments with the source and COMMENT_FIELDS; resolved is None when unknown
+
+        Raises:
+            ValueError: If since_commit is invalid or not in the store
+        """
+        conditions = ["repository = ?", "pr_number = ?"]
+        parameters: list[Any] = [repository, int(pr_number)]
+        if category is not None:
+            conditions.append("category = ?")
+            parameters.append(category)
+        if source is not None:
+            conditions.append("source = ?")
+            parameters.append(source)
+        if file is not None:
+            conditions.append("file = ?")
+            parameters.append(file)
+        if since_commit is not None:
+            since = self.commit_time(repository, pr_number, since_commit)
+            if since is None:
+                raise ValueError(f"Commit {since_commit} is not in the review store")
+            conditions.append("created_at >= ?")
+            parameters.append(since)
+        if unresolved_only:
+            conditions.append("resolved IS NOT 1")
+        query = (
+            f"SELECT {', '.join(RESULT_FIELDS)} FROM comments WHERE {' AND '.join(conditions)}"
+            " ORDER BY priority_rank, created_at, id"
+        )
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(limit)
+        comments = [dict(row) for row in self._connection.execute(query, parameters)]
+        for comment in comments:
+            if comment["resolved"] is not None:
+                comment["resolved"] = bool(comment["resolved"])
+        return comments
+
+    def reviews(self, repository: str, pr_number: int | str, commit: str | None = None) -> list[dict[str, Any]]:
+        """Stored reviews of a pull request (optionally of one commit), oldest first."""
+        query = "SELECT * FROM reviews WHERE repository = ? AND pr_number = ?"
+        parameters: list[Any] = [repository, int(pr_number)]
+        if commit is not None:
+            query += " AND commit_sha = ?"
+            parameters.append(commit)
+        query += " ORDER BY submitted_at, review_id"
+        return [dict(row) for row in self._connection.execute(query, parameters)]
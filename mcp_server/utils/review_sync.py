@@ -0,0 +1,235 @@
+"""Incremental synchronization of the review history of a pull request.
+
+The review scripts used to refetch every review, review body and comment on each run.
+ReviewSync keeps what was fetched in a per-PR state file together with a cursor (last
+seen review ID, last seen comment ID and update time, head commit), so a later run
+only asks GitHub for what changed and merges it into the stored history:
+
+- reviews: only the last known page of the review list is fetched again, the cursor's
+  review ID confirming that nothing before it changed (otherwise the list is refetched)
+- pull request review comments: fetched with `since` set to the last update seen and
+  merged by comment ID, so edits replace the stored copy
+- inline comments of a review and the commit date of the head commit: fetched once
+- reports built from a review (see coderabbit) are stored with the review they came from
+
+Deletions and edits of review bodies are not visible in deltas; a full resync
+(`full_resync=True`, `--full-resync` or REVIEW_FULL_RESYNC=1 in the scripts) drops the
+state and fetches everything again.
+"""
+
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote
+
+from mcp_server.utils.github_api import GitHubClient, extract_field
+from mcp_server.utils.utils import get_cache_dir
+
+STATE_VERSION = 1
+REVIEWS_PAGE_SIZE = 100
+# Review bodies are only checked for their length; CodeRabbit's can be huge
+REVIEW_BODY_PREVIEW = 1024
+REVIEW_FIELDS = ("id", "user", "body", "state", "commit_id", "submitted_at")
+REPOSITORY_PART = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+def get_sync_state_path(owner: str, repo: str, pr_number: str | int) -> Path:
+    """State file of a pull request in the cache directory.
+
+    Raises:
+        ValueError: If owner, repo or pull request number could escape the cache directory
+    """
+    parts = (owner, repo, str(pr_number))
+    if not all(REPOSITORY_PART.match(part) and part not in (".", "..") for part in parts):
+        raise ValueError(f"Invalid pull request: {owner}/{repo}#{pr_number}")
+    return get_cache_dir() / "review-sync" / owner / repo / f"{pr_number}.json"
+
+
+def _empty_state() -> dict[str, Any]:
+    return {
+        "version": STATE_VERSION,
+        "cursor": {"head_sha": None, "last_review_id": None, "last_comment_id": None, "comments_since": None},
+        "head_date": None,
+        "reviews": [],
+        "review_comments": {},
+        "pr_comments": [],
+        "reports": {},
+    }
+
+
+def _review_summary(review: dict[str, Any]) -> dict[str, Any]:
+    """The fields of a review the reports use."""
+    return {field: review[field] for field in REVIEW_FIELDS if field in review}
+
+
+class ReviewSync:
+    """Review history of one pull request, brought up to date with as few requests as possible.
+
+    Each kind of data is synchronized at most once per instance. Without a state path
+    nothing is persisted and the first access fetches everything.
+    """
+
+    def __init__(
+        self,
+        client: GitHubClient,
+        owner: str,
+        repo: str,
+        pr_number: str | int,
+        path: Path | None = None,
+        full_resync: bool = False,
+    ) -> None:
+        """Load the stored state.
+
+        Args:
+            client: GitHub API client
+            owner: Repository owner
+            repo: Repository name
+            pr_number: Pull request number
+            path: State file, None to keep the state in memory only
+            full_resync: Ignore the stored state and fetch everything again
+        """
+        self.client = client
+        self.repository = f"/repos/{owner}/{repo}"
+        self.pull = f"{self.repository}/pulls/{pr_number}"
+        self.path = path
+        self.state = _empty_state() if full_resync or path is None else self._load(path)
+        self._synced: set[str] = set()
+
+    @classmethod
+    def persistent(
+        cls, client: GitHubClient, owner: str, repo: str, pr_number: str | int, full_resync: bool = False
+    ) -> "ReviewSync":
+        """ReviewSync stored in the cache directory (see get_sync_state_path)."""
+        return cls(client, owner, repo, pr_number, get_sync_state_path(owner, repo, pr_number), full_resync)
+
+    @property
+    def cursor(self) -> dict[str, Any]:
+        """Last seen review ID, comment ID and update time, and head commit."""
+        cursor: dict[str, Any] = self.state["cursor"]
+        return cursor
+
+    def reviews(self) -> list[dict[str, Any]]:
+        """Reviews of the pull request in API order, bodies truncated to REVIEW_BODY_PREVIEW."""
+        reviews: list[dict[str, Any]] = self.state["reviews"]
+        if "reviews" in self._synced:
+            return reviews
+        self._synced.add("reviews")
+
+        last_id = self.cursor["last_review_id"]
+        # Refetch the page holding the last seen review: it must still be there
+        page = (len(reviews) - 1) // REVIEWS_PAGE_SIZE + 1 if reviews else 1
+        fetched = self._review_pages(page)
+        if reviews and last_id not in {review.get("id") for review in fetched}:
+            # Reviews were deleted (or the state is stale): start over
+            reviews.clear()
+            page = 1
+            fetched = self._review_pages(page)
+        del reviews[(page - 1) * REVIEWS_PAGE_SIZE :]
+        reviews.extend(fetched)
+        self.cursor["last_review_id"] = reviews[-1].get("id") if reviews else None
+        return reviews
+
+    def _review_pages(self, first_page: int) -> list[dict[str, Any]]:
+        """Reviews from first_page to the last page."""
+        reviews = []
+        page = first_page
+        while True:
+            query = f"per_page={REVIEWS_PAGE_SIZE}" + (f"&page={page}" if page > 1 else "")
+            items = self.client.iter_array(f"{self.pull}/reviews?{query}", max_string_length=REVIEW_BODY_PREVIEW)
+            batch = [_review_summary(review) for review in items]
+            reviews += batch
+            if len(batch) < REVIEWS_PAGE_SIZE:
+                return reviews
+            page += 1
+
+    def review_comments(self, review_id: Any) -> list[dict[str, Any]]:
+        """Inline comments of a review, fetched on first use."""
+        stored: dict[str, list[dict[str, Any]]] = self.state["review_comments"]
+        key = str(review_id)
+        if key not in stored:
+            stored[key] = list(self.client.iter_array(f"{self.pull}/reviews/{review_id}/comments"))
+        return stored[key]
+
+    def pr_comments(self) -> list[dict[str, Any]]:
+        """Pull request review comments, merged with the ones updated since the last sync."""
+        comments: list[dict[str, Any]] = self.state["pr_comments"]
+        if "pr_comments" in self._synced:
+            return comments
+        self._synced.add("pr_comments")
+
+        since = self.cursor["comments_since"]
+        if since is None:
+            comments[:] = self.client.iter_array(f"{self.pull}/comments")
+        else:
+            self._merge_comments(comments, self.client.iter_array(f"{self.pull}/comments?since={quote(since)}"))
+
+        # Merging needs IDs and the cursor needs update times: without them, refetch next time
+        complete = bool(comments) and all(
+            isinstance(comment.get("id"), int) and comment.get("updated_at") for comment in comments
+        )
+        self.cursor["last_comment_id"] = max(comment["id"] for comment in comments) if complete else None
+        self.cursor["comments_since"] = max(comment["updated_at"] for comment in comments) if complete else None
+        return comments
+
+    def _merge_comments(self, comments: list[dict[str, Any]], updated: Any) -> None:
+        """Replace stored comments by their updated versions and append new ones."""
+        positions = {comment.get("id"): index for index, comment in enumerate(comments)}
+        for comment in updated:
+            index = positions.get(comment.get("id"))
+            if index is None:
+                positions[comment.get("id")] = len(comments)
+                comments.append(comment)
+            else:
+                comments[index] = comment
+            # Review comments are listed here too: keep the review's stored copy current
+            review_comments = self.state["review_comments"].get(str(comment.get("pull_request_review_id")), [])
+            for position, review_comment in enumerate(review_comments):
+                if review_comment.get("id") == comment.get("id"):
+                    review_comments[position] = comment
+
+    def commit_date(self, sha: str) -> str | None:
+        """Committer date of the head commit, fetched only when the head moved."""
+        if self.cursor["head_sha"] != sha or not self.state["head_date"]:
+            date = extract_field(self.client.get_json(f"{self.repository}/commits/{sha}"), "commit.committer.date")
+            self.cursor["head_sha"] = sha
+            self.state["head_date"] = date
+        head_date: str | None = self.state["head_date"]
+        return head_date
+
+    def report(self, name: str, review_id: Any) -> Any:
+        """Stored report of the given kind if it was built from the given review, else None."""
+        stored = self.state["reports"].get(name)
+        return stored["report"] if stored and stored.get("review_id") == review_id else None
+
+    def store_report(self, name: str, review_id: Any, report: Any) -> None:
+        """Store the report of a kind built from a review, replacing the previous one."""
+        self.state["reports"][name] = {"review_id": review_id, "report": report}
+
+    def save(self) -> None:
+        """Persist the state (no-op for in-memory instances)."""
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # A temp file of its own: threads of the server save the same pull request concurrently
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=self.path.parent, prefix=f"{self.path.name}.", suffix=".tmp", delete=False
+        ) as temp_file:
+            temp_file.write(json.dumps(self.state))
+        try:
+            os.replace(temp_file.name, self.path)
+        except OSError:
+            os.unlink(temp_file.name)
+            raise
+
+    @staticmethod
+    def _load(path: Path) -> dict[str, Any]:
+        try:
+            state = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return _empty_state()
+        if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+            return _empty_state()
+        return state
@@ -0,0 +1,198 @@
+"""Snapshots of a working tree kept as git refs, to roll back a cleanup pass.
+
+The code-beautifier prompt used to back up by committing everything and copying the
+source tree to a backup folder, which costs a full copy of the repository on every run.
+A snapshot here is a commit written with git plumbing and kept under refs/snapshots/,
+without touching the branch, the index or the working tree:
+
+- A temporary copy of the index is updated with the working tree versions of the files
+  about to change (every file when no paths are given). The copy keeps the stat data of
+  the real index, so only changed files are read and hashed, and unchanged contents are
+  objects git already has: a snapshot costs O(changed files) in time and disk.
+- The tree of that index is committed on top of HEAD and the commit stored in a ref.
+
+Restoring checks the files of the snapshot out into the working tree again (the index
+is left alone). The newest MAX_SNAPSHOTS snapshots of a repository are kept.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+GIT_TIMEOUT = 60
+SNAPSHOT_REFS = "refs/snapshots/"
+MAX_SNAPSHOTS = 20
+DEFAULT_LABEL = "Snapshot before changes"
+# Starts the lines of the snapshot's paths in the commit message
+PATHS_HEADER = "Paths:"
+# Snapshot commits are not the user's work: they do not need the user's identity
+SNAPSHOT_IDENTITY = {
+    "GIT_AUTHOR_NAME": "Snapshot",
+    "GIT_AUTHOR_EMAIL": "snapshot@localhost",
+    "GIT_COMMITTER_NAME": "Snapshot",
+    "GIT_COMMITTER_EMAIL": "snapshot@localhost",
+}
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot cannot be taken, found or restored."""
+
+
+def _git(path: str | Path, *args: str, env: dict[str, str] | None = None, stdin: str | None = None) -> str:
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(path), "-c", "core.quotePath=false", *args],
+            input=stdin,
+            capture_output=True,
+            text=True,
+            errors="replace",
+            timeout=GIT_TIMEOUT,
+            env={**os.environ, **env} if env else None,
+        )
+    except (OSError, subprocess.SubprocessError) as exc:
+        raise SnapshotError(f"git {args[0]} failed: {exc}") from exc
+    if result.returncode:
+        raise SnapshotError(result.stderr.strip() or f"git {args[0]} failed")
+    return result.stdout
+
+
+def _head(toplevel: str) -> str | None:
+    try:
+        return _git(toplevel, "rev-parse", "-q", "--verify", "HEAD^{commit}").strip()
+    except SnapshotError:
+        # No commits yet
+        return None
+
+
+def create_snapshot(path: str | Path, paths: list[str] | None = None, label: str | None = None) -> dict[str, Any]:
+    """Snapshot the working tree versions of files (see module docstring).
+
+    Args:
+        path: Any directory inside the checkout
+        paths: Files or directories about to change, relative to the root of the checkout;
+            every file of the working tree when omitted (ignored files excepted)
+        label: Description stored as the message of the snapshot commit
+
+    Returns:
+        Dict with the snapshot name, its commit, the paths it covers and the files in them
+        that differ from HEAD
+
+    Raises:
+        SnapshotError: If path is not in a git checkout or git fails
+    """
+    toplevel = _git(path, "rev-parse", "--show-toplevel").strip()
+    head = _head(toplevel)
+    index = _git(toplevel, "rev-parse", "--path-format=absolute", "--git-path", "index").strip()
+    pathspec = list(paths) if paths else ["."]
+
+    with tempfile.TemporaryDirectory(prefix="snapshot-") as directory:
+        index_file = os.path.join(directory, "index")
+        if os.path.exists(index):
+            # Reuse the stat data of the real index: unchanged files are not hashed again
+            shutil.copyfile(index, index_file)
+        elif head is not None:
+            _git(toplevel, "read-tree", head, env={"GIT_INDEX_FILE": index_file})
+        _git(toplevel, "add", "--all", "--ignore-errors", "--", *pathspec, env={"GIT_INDEX_FILE": index_file})
+        tree = _git(toplevel, "write-tree", env={"GIT_INDEX_FILE": index_file}).strip()
+
+    message = "\n".join([label or DEFAULT_LABEL, "", PATHS_HEADER, *pathspec]) + "\n"
+    parents = ["-p", head] if head is not None else []
+    commit = _git(toplevel, "commit-tree", tree, *parents, "-m", message, env=SNAPSHOT_IDENTITY).strip()
+    # Sorts by creation time, to the microsecond
+    name = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    _git(toplevel, "update-ref", f"{SNAPSHOT_REFS}{name}", commit)
+    _prune(toplevel)
+
+    base = head if head is not None else _git(toplevel, "hash-object", "-t", "tree", "/dev/null").strip()
+    changed = _git(toplevel, "diff-tree", "-r", "--name-only", "-z", "--no-renames", base, commit, "--", *pathspec)
+    return {
+        "snapshot": name,
+        "commit": commit,
+        "paths": pathspec,
+        "changed_files": [name for name in changed.split("\0") if name],
+    }
+
+
+def list_snapshots(path: str | Path) -> list[dict[str, Any]]:
+    """The snapshots of a checkout, newest first, with their commit, label, paths and creation time."""
+    output = _git(
+        path,
+        "for-each-ref",
+        "--sort=-refname",
+        "--format=%(refname)%00%(objectname)%00%(creatordate:iso-strict)%00%(contents)%00",
+        SNAPSHOT_REFS,
+    )
+    snapshots = []
+    fields = output.split("\0")
+    for start in range(0, len(fields) - 4, 4):
+        ref, commit, created, contents = fields[start : start + 4]
+        label, _, body = contents.strip("\n").partition("\n\n")
+        header, *snapshot_paths = body.splitlines()
+        if header != PATHS_HEADER or not snapshot_paths:
+            snapshot_paths = ["."]
+        snapshots.append({
+            "snapshot": ref.strip("\n").removeprefix(SNAPSHOT_REFS),
+            "commit": commit,
+            "created": created,
+            "label": label,
+            "paths": snapshot_paths,
+        })
+    return snapshots
+
+
+def restore_snapshot(path: str | Path, snapshot: str, paths: list[str] | None = None) -> dict[str, Any]:
+    """Check the files of a snapshot out into the working tree again.
+
+    Files of the snapshot's paths that were tracked are brought back to their snapshot
+    version (and deleted if they did not exist then); files created since and never added
+    are left as they are. The index is not changed.
+
+    Args:
+        path: Any directory inside the checkout
+        snapshot: Name of the snapshot (see create_snapshot)
+        paths: Part of the snapshot's paths to restore; all of them when omitted
+
+    Returns:
+        Dict with the snapshot name, the restored paths and the files that differed from
+        the snapshot before the restore
+
+    Raises:
+        SnapshotError: If the snapshot does not exist or git fails
+    """
+    toplevel = _git(path, "rev-parse", "--show-toplevel").strip()
+    match = next((entry for entry in list_snapshots(toplevel) if entry["snapshot"] == snapshot), None)
+    if match is None:
+        raise SnapshotError(f"No snapshot named {snapshot!r}")
+    pathspec = list(paths) if paths else match["paths"]
+    status = _git(toplevel, "diff", "--name-status", "-z", "--no-renames", match["commit"], "--", *pathspec)
+    fields = status.split("\0")
+    differing = dict(zip(fields[1::2], fields[0::2], strict=False))
+    restored = [name for name, letter in differing.items() if letter != "A"]
+    if restored:
+        _git(
+            toplevel,
+            "restore",
+            f"--source={match['commit']}",
+            "--worktree",
+            "--pathspec-from-file=-",
+            "--pathspec-file-nul",
+            stdin="\0".join(restored),
+        )
+    # Tracked since the snapshot: it did not exist then
+    for name in (name for name, letter in differing.items() if letter == "A"):
+        Path(toplevel, name).unlink(missing_ok=True)
+    return {
+        "snapshot": snapshot,
+        "paths": pathspec,
+        "restored_files": sorted(differing),
+    }
+
+
+def _prune(toplevel: str) -> None:
+    """Delete the snapshots beyond the newest MAX_SNAPSHOTS."""
+    for entry in list_snapshots(toplevel)[MAX_SNAPSHOTS:]:
+        _git(toplevel, "update-ref", "-d", f"{SNAPSHOT_REFS}{entry['snapshot']}")
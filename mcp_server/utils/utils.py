@@ -1,7 +1,16 @@
 """Utility functions for loading prompts and resolving script paths."""
 
+import os
 from pathlib import Path
 
+from mcp_server.utils.prompt_roots import FRAGMENTS_DIR, PROMPT_PATH_ENV, PromptIndex, configured_roots
+from mcp_server.utils.prompt_templates import PromptTemplateCache
+
+# Compiled prompt files and rendered prompts, shared by every prompt of the server
+prompt_templates = PromptTemplateCache()
+# Prompt and fragment indexes by prompt path, base directory and folder of the roots
+_prompt_indexes: dict[tuple[str, Path, str], PromptIndex] = {}
+
 
 def get_script_path(script_name: str, base_dir: Path | None = None) -> Path:
     """Get the absolute path to a script in the scripts directory.
@@ -21,43 +30,110 @@ def get_script_path(script_name: str, base_dir: Path | None = None) -> Path:
     return scripts_dir / script_name
 
 
-def load_prompt_from_markdown(prompt_name: str, scripts: list[str] | None = None, base_dir: Path | None = None) -> str:
+def get_cache_dir() -> Path:
+    """Get the directory used for persistent caches and state, creating it if needed.
+
+    The location can be overridden with the AI_PROMPTS_MCP_CACHE_DIR environment variable,
+    otherwise it lives under $XDG_CACHE_HOME (or ~/.cache).
+
+    Returns:
+        Absolute path to the cache directory
+    """
+    cache_dir = os.environ.get("AI_PROMPTS_MCP_CACHE_DIR")
+    if cache_dir:
+        path = Path(cache_dir)
+    else:
+        xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
+        path = (Path(xdg_cache_home) if xdg_cache_home else Path.home() / ".cache") / "ai-prompts-mcp"
+
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def get_prompt_index(base_dir: Path | None = None, folder: str = "") -> PromptIndex:
+    """Get the index of the prompt files of the configured prompt roots.
+
+    The roots are the directories of the AI_PROMPTS_MCP_PROMPT_PATH environment variable,
+    highest precedence first, then the prompts directory of base_dir.
+
+    Args:
+        base_dir: Optional base directory to use instead of auto-detecting from module location
+        folder: Folder of the roots to index instead of the roots themselves (e.g. fragments)
+
+    Returns:
+        The index, created on first use for these roots
+    """
+    if base_dir is None:
+        # Get the parent directory of this utils module (mcp_server)
+        base_dir = Path(__file__).parent.parent
+
+    key = (os.environ.get(PROMPT_PATH_ENV, ""), base_dir, folder)
+    index = _prompt_indexes.get(key)
+    if index is None:
+        index = _prompt_indexes[key] = PromptIndex([root / folder for root in configured_roots(base_dir, key[0])])
+    return index
+
+
+def get_fragment_index(base_dir: Path | None = None) -> PromptIndex:
+    """Get the index of the fragments prompts include, from the fragments folder of the prompt roots.
+
+    Args:
+        base_dir: Optional base directory to use instead of auto-detecting from module location
+
+    Returns:
+        The index, created on first use for these roots
+    """
+    return get_prompt_index(base_dir, FRAGMENTS_DIR)
+
+
+def load_prompt_from_markdown(
+    prompt_name: str,
+    scripts: list[str] | None = None,
+    base_dir: Path | None = None,
+    arguments: dict[str, str | None] | None = None,
+) -> str:
     """Load prompt content from a markdown file in the prompts directory.
 
+    The file is the one of the prompt root with the highest precedence (see get_prompt_index),
+    so prompt roots configured in AI_PROMPTS_MCP_PROMPT_PATH override the bundled prompts.
+    The prompt is rendered with the template engine of prompt_templates: its include tags
+    are replaced by fragments (see get_fragment_index) and the arguments it declares in its
+    frontmatter fill its {{ name }} and {% if name %} tags.
+
     Args:
         prompt_name: Name of the prompt file (without .md extension)
         scripts: List of script paths to replace {{SCRIPT_PATHS}} placeholder.
                 Example: ["folder/script1.sh", "folder/script2.sh"]
         base_dir: Optional base directory to use instead of auto-detecting from module location
+        arguments: Values of the arguments declared by the prompt (None for not given)
 
     Returns:
         The content of the markdown file with metadata stripped and placeholders replaced
+
+    Raises:
+        TemplateError: If the prompt is malformed, an argument is not declared by the prompt
+            or a required one is missing
     """
     if base_dir is None:
         # Get the parent directory of this utils module (mcp_server)
         base_dir = Path(__file__).parent.parent
 
-    prompts_dir = base_dir / "prompts"
-    prompt_file = prompts_dir / f"{prompt_name}.md"
+    index = get_prompt_index(base_dir)
+    prompt_file = index.resolve(prompt_name)
+    if prompt_file is not None and not prompt_file.is_file():
+        # Removed since the index was last refreshed
+        index.refresh()
+        prompt_file = index.resolve(prompt_name)
 
-    if not prompt_file.exists():
+    if prompt_file is None:
         return f"Error: Prompt file '{prompt_name}.md' not found in prompts directory."
 
-    content = prompt_file.read_text(encoding="utf-8")
-
-    # Remove frontmatter if it exists (between --- lines at the start)
-    if content.startswith("---"):
-        parts = content.split("---", 2)
-        if len(parts) >= 3:
-            content = parts[2].strip()
-
+    variables = {}
     # Replace script placeholders with actual paths
     if scripts:
         # Get full paths for all scripts
         full_paths = [str(get_script_path(script_path, base_dir)) for script_path in scripts]
         # Join with spaces for command line usage
-        script_command = " ".join(full_paths)
-        # Replace the placeholder
-        content = content.replace("{{SCRIPT_PATHS}}", script_command)
+        variables["SCRIPT_PATHS"] = " ".join(full_paths)
 
-    return content
+    return prompt_templates.render(prompt_file, arguments, variables, get_fragment_index(base_dir).resolve)